@@ -0,0 +1,124 @@
+import re
+import time
+import discord
+from money import dc_to_units, units_to_dc, lamports_to_sol
+
+DC_VALUE_USD = 1.00
+PAGE_SIZE = 10
+# queue name -> (transaction_type, status, embed title, footer)
+QUEUES = {
+    "deposits": ("deposit", "pending_verification", "💳 Pending Deposit Requests", "Use: .approve_deposit <request_id> to verify and approve"),
+    "withdrawals": ("withdrawal", "pending", "💳 Pending Withdrawal Requests", "Use: .approve <request_id> <solana_address> to process"),
+}
+AGE_UNITS = {"m": 60, "h": 3600, "d": 86400}
+AGE_PATTERN = re.compile(r"^(\d+)([mhd])$")
+MENTION_PATTERN = re.compile(r"^<@!?(\d+)>$")
+FILTER_USAGE = "Filters: `@user`, `min:<DC>`, `max:<DC>`, `older:<age>`, `newer:<age>` (age like `30m`, `6h`, `2d`)"
+
+
+def create_queue_indexes(cursor):
+    """Indexes behind the admin queues; each holds every column the queue filters and sorts on."""
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_transactions_queue ON bot_transactions (transaction_type, status, timestamp, transaction_id, dc_amount)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_transactions_user ON bot_transactions (user_id, transaction_type, status, timestamp, transaction_id)")
+
+
+def _cutoff(age):
+    match = AGE_PATTERN.match(age)
+    if not match:
+        raise ValueError(f"Invalid age `{age}`")
+    seconds = int(match.group(1)) * AGE_UNITS[match.group(2)]
+    # bot_transactions.timestamp is CURRENT_TIMESTAMP, i.e. UTC 'YYYY-MM-DD HH:MM:SS'
+    return time.strftime("%Y-%m-%d %H:%M:%S", time.gmtime(time.time() - seconds))
+
+
+def parse_filters(args):
+    """Turns command arguments into a filter dict; raises ValueError with a message for the admin."""
+    filters = {}
+    for arg in args:
+        mention = MENTION_PATTERN.match(arg)
+        key, _, value = arg.partition(":")
+        if mention or arg.isdigit():
+            filters["user_id"] = int(mention.group(1) if mention else arg)
+        elif key in ("min", "max") and value:
+            try:
+                filters[f"{key}_dc"] = float(value)
+            except ValueError:
+                raise ValueError(f"Invalid amount `{value}`")
+        elif key == "older" and value:
+            filters["older_than"] = _cutoff(value)
+        elif key == "newer" and value:
+            filters["newer_than"] = _cutoff(value)
+        else:
+            raise ValueError(f"Unknown filter `{arg}`")
+    return filters
+
+
+def describe_filters(filters):
+    parts = []
+    if "user_id" in filters:
+        parts.append(f"user <@{filters['user_id']}>")
+    if "min_dc" in filters:
+        parts.append(f"≥ {filters['min_dc']:.2f} DC")
+    if "max_dc" in filters:
+        parts.append(f"≤ {filters['max_dc']:.2f} DC")
+    if "older_than" in filters:
+        parts.append(f"before {filters['older_than']} UTC")
+    if "newer_than" in filters:
+        parts.append(f"since {filters['newer_than']} UTC")
+    return ", ".join(parts)
+
+
+def fetch_page(db_conn, queue, filters, cursor=None):
+    """Returns (rows, next_cursor) for one page of a queue, newest first.
+
+    Pages are keyset-paginated on (timestamp, transaction_id): `cursor` is the key of the last row
+    of the previous page, so each page is one index range scan that starts where the previous one stopped,
+    however deep into the queue it is. Filters are checked on index entries before any row is read. next_cursor is None on the last page.
+    """
+    transaction_type, status = QUEUES[queue][:2]
+    where = ["transaction_type = ?", "status = ?"]
+    params = [transaction_type, status]
+    if "user_id" in filters:
+        where.append("user_id = ?")
+        params.append(filters["user_id"])
+    if "min_dc" in filters:
+        where.append("dc_amount >= ?")
+        params.append(dc_to_units(filters["min_dc"]))
+    if "max_dc" in filters:
+        where.append("dc_amount <= ?")
+        params.append(dc_to_units(filters["max_dc"]))
+    if "older_than" in filters:
+        where.append("timestamp <= ?")
+        params.append(filters["older_than"])
+    if "newer_than" in filters:
+        where.append("timestamp >= ?")
+        params.append(filters["newer_than"])
+    if cursor is not None:
+        where.append("(timestamp, transaction_id) < (?, ?)")
+        params.extend(cursor)
+    rows = db_conn.execute(f"""
+        SELECT transaction_id, user_id, recipient, dc_amount, sol_amount, tx_hash, sol_address, timestamp
+        FROM bot_transactions WHERE {' AND '.join(where)}
+        ORDER BY timestamp DESC, transaction_id DESC LIMIT ?
+    """, params + [PAGE_SIZE + 1]).fetchall()
+    if len(rows) > PAGE_SIZE:
+        rows = rows[:PAGE_SIZE]
+        return rows, (rows[-1][7], rows[-1][0])
+    return rows, None
+
+
+def queue_embed(queue, filters, rows, page):
+    _, _, title, footer = QUEUES[queue]
+    description = f"Filtered by {describe_filters(filters)}" if filters else "Review and verify pending requests"
+    embed = discord.Embed(title=title, color=discord.Color.blurple(), description=description)
+    for trans_id, user_id, recipient, dc_units, lamports, tx_hash, sol_address, timestamp in rows:
+        dc_amount, sol_amount = units_to_dc(dc_units), lamports_to_sol(lamports)
+        mention = f" (<@{user_id}>)" if user_id else ""
+        value = f"**User:** {recipient}{mention}\n**Amount:** {dc_amount:.2f} DC [${dc_amount * DC_VALUE_USD:.2f}]\n**SOL:** {sol_amount:.6f}\n"
+        if tx_hash:
+            value += f"**Hash:** `{tx_hash}`\n"
+        if sol_address:
+            value += f"**Address:** `{sol_address}`\n"
+        embed.add_field(name=f"Request #{trans_id}", value=value + f"**Time:** {timestamp}", inline=False)
+    embed.set_footer(text=f"Page {page + 1} • {footer}")
+    return embed
@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+"""Load test: N concurrent .deposit flows, routed by ConversationManager vs. stacked wait_for listeners.
+
+The conversation side runs the bot's real deposit steps (amount reply, Done button, tx hash reply)
+against fake channels, with chat noise from other users interleaved. The wait_for side registers
+the same two message listeners per flow on a discord.py Client and feeds it the same messages.
+
+Usage: python benchmarks/bench_conversations.py [num_flows] [noise_per_flow]
+"""
+import asyncio
+import os
+import random
+import sys
+import tempfile
+import time
+import types
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+os.chdir(tempfile.mkdtemp(prefix="dragon_bench_"))
+
+import discord
+import main
+
+
+class FakeChannel:
+    def __init__(self, channel_id):
+        self.id = channel_id
+        self.sent = []
+
+    async def send(self, content=None, **kwargs):
+        self.sent.append((content, kwargs))
+
+
+def fake_message(user_id, channel, content):
+    author = types.SimpleNamespace(id=user_id, mention=f"<@{user_id}>", name=f"user{user_id}")
+    return types.SimpleNamespace(author=author, channel=channel, content=content)
+
+
+def script(num_flows, noise_per_flow, channel):
+    """Returns (replies, noise) message lists for every flow's amount and tx-hash replies."""
+    rng = random.Random(99)
+    amounts = [fake_message(user_id, channel, "10") for user_id in range(1, num_flows + 1)]
+    hashes = [fake_message(user_id, channel, f"tx{user_id:064d}") for user_id in range(1, num_flows + 1)]
+    noise = [fake_message(1000000 + rng.randrange(10000), channel, "gl everyone") for _ in range(num_flows * noise_per_flow)]
+    return amounts, hashes, noise
+
+
+def interleave(replies, noise):
+    messages = replies + noise
+    random.Random(7).shuffle(messages)
+    return messages
+
+
+async def bench_conversations(num_flows, noise_per_flow):
+    bot = main.bot
+    bot.db_init()
+    bot.sol_price_usd = 150.0
+    channel = FakeChannel(1)
+    amounts, hashes, noise = script(num_flows, noise_per_flow, channel)
+
+    for user_id in range(1, num_flows + 1):
+        bot.conversations.start(user_id, channel.id, "deposit", "amount", main.PROMPT_TIMEOUT, username=f"user{user_id}")
+
+    started = time.perf_counter()
+    dispatched = 0
+    for message in interleave(amounts, noise):
+        await bot.conversations.dispatch(message)
+        dispatched += 1
+    for content, kwargs in list(channel.sent):
+        view = kwargs.get("view")
+        if isinstance(view, main.DepositView):
+            await view.callback(view.user_id, view.dc_amount, view.sol_amount, view.usd_amount, "done")
+    for message in interleave(hashes, noise):
+        await bot.conversations.dispatch(message)
+        dispatched += 1
+    elapsed = time.perf_counter() - started
+
+    cursor = bot.db_conn.cursor()
+    cursor.execute("SELECT COUNT(*) FROM bot_transactions WHERE status = 'pending_verification'")
+    completed = cursor.fetchone()[0]
+    return elapsed, dispatched, completed
+
+
+async def bench_wait_for(num_flows, noise_per_flow):
+    client = discord.Client(intents=discord.Intents.none())
+    await client._async_setup_hook()
+    channel = FakeChannel(1)
+    amounts, hashes, noise = script(num_flows, noise_per_flow, channel)
+    completed = 0
+
+    async def flow(user_id):
+        nonlocal completed
+        check = lambda m: m.author.id == user_id and m.channel.id == channel.id
+        await client.wait_for("message", timeout=60.0, check=check)
+        await client.wait_for("message", timeout=60.0, check=check)
+        completed += 1
+
+    tasks = [asyncio.create_task(flow(user_id)) for user_id in range(1, num_flows + 1)]
+    await asyncio.sleep(0)
+
+    started = time.perf_counter()
+    dispatched = 0
+    for messages in (interleave(amounts, noise), interleave(hashes, noise)):
+        for message in messages:
+            client.dispatch("message", message)
+            dispatched += 1
+        # Let every flow resume and register its next listener
+        for _ in range(3):
+            await asyncio.sleep(0)
+    await asyncio.gather(*tasks)
+    elapsed = time.perf_counter() - started
+    return elapsed, dispatched, completed
+
+
+async def bench_routing(num_flows, num_messages):
+    """Per-message cost of unrelated chat while `num_flows` prompts are open, for both schemes."""
+    channel = FakeChannel(1)
+    noise = [fake_message(1000000 + i, channel, "gl everyone") for i in range(num_messages)]
+
+    client = discord.Client(intents=discord.Intents.none())
+    await client._async_setup_hook()
+    waiters = [
+        asyncio.create_task(client.wait_for("message", timeout=60.0, check=lambda m, user_id=user_id: m.author.id == user_id and m.channel.id == channel.id))
+        for user_id in range(1, num_flows + 1)
+    ]
+    await asyncio.sleep(0)
+    started = time.perf_counter()
+    for message in noise:
+        client.dispatch("message", message)
+    wait_for_time = time.perf_counter() - started
+    for task in waiters:
+        task.cancel()
+
+    conversations = main.ConversationManager(main.TimingWheel())
+    for user_id in range(1, num_flows + 1):
+        conversations.start(user_id, channel.id, "deposit", "amount", main.PROMPT_TIMEOUT)
+    started = time.perf_counter()
+    for message in noise:
+        await conversations.dispatch(message)
+    manager_time = time.perf_counter() - started
+    return wait_for_time / num_messages, manager_time / num_messages
+
+
+def report(name, result):
+    elapsed, dispatched, completed = result
+    print(f"{name}")
+    print(f"  messages routed : {dispatched}")
+    print(f"  flows completed : {completed}")
+    print(f"  total time      : {elapsed * 1000:.1f} ms ({elapsed / dispatched * 1e6:.1f} us/message)")
+
+
+async def run(num_flows, noise_per_flow):
+    print(f"{num_flows} concurrent deposit flows, {noise_per_flow} chat messages per flow per step\n")
+    report("wait_for listeners (routing only)", await bench_wait_for(num_flows, noise_per_flow))
+    report("ConversationManager (full deposit steps incl. DB writes)", await bench_conversations(num_flows, noise_per_flow))
+    print("\nrouting cost of one unrelated chat message:")
+    for open_flows in (10, 100, num_flows, num_flows * 4):
+        wait_for_cost, manager_cost = await bench_routing(open_flows, 2000)
+        print(f"  {open_flows:5d} open flows : wait_for {wait_for_cost * 1e6:8.1f} us   ConversationManager {manager_cost * 1e6:6.2f} us")
+    for task in asyncio.all_tasks() - {asyncio.current_task()}:
+        task.cancel()
+
+
+if __name__ == "__main__":
+    num_flows = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    noise_per_flow = int(sys.argv[2]) if len(sys.argv) > 2 else 4
+    asyncio.run(run(num_flows, noise_per_flow))
@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""Benchmark: how long does startup take to replay N journaled Blackjack/Mines games?
+
+Usage: python benchmarks/bench_game_restore.py [num_games]
+"""
+import asyncio
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+os.chdir(tempfile.mkdtemp(prefix="dragon_bench_"))
+
+import main
+from blackjack import BlackjackGame
+from mines import generate_mines_board
+from game_journal import encode_tile
+
+
+async def populate(bot, num_games):
+    """Creates `num_games` funded users, each with one open game and a few journaled moves."""
+    rng = random.Random(1234)
+    for user_id in range(1, num_games + 1):
+        await bot.update_user_balance(user_id, 1000.0, f"user{user_id}")
+        seed = rng.randrange(1000000000)
+        seed_generator = lambda *_: (seed, "bench_seed", 0)
+        if user_id % 2:
+            reservation_id, _, _ = await bot.escrow.reserve(user_id, f"user{user_id}", "blackjack", 10.0, 180)
+            game = BlackjackGame(user_id, seed_generator)
+            game.start_game(10.0)
+            await bot.game_journal.open_game(reservation_id, user_id, "blackjack", seed, "bench_seed", 0, 10.0, None, 1, user_id * 2, None)
+            if game.state == "PLAYER_TURN" and game.hit() == "CONTINUE":
+                await bot.game_journal.record_move(reservation_id, "h", 180)
+        else:
+            reservation_id, _, _ = await bot.escrow.reserve(user_id, f"user{user_id}", "mines", 10.0, 180)
+            game_state = generate_mines_board(seed_generator, user_id, 3)
+            await bot.game_journal.open_game(reservation_id, user_id, "mines", seed, "bench_seed", 0, 10.0, 3, 1, user_id * 2, user_id * 2 + 1)
+            safe = [i for i in range(25) if i not in game_state["mine_positions"]][:rng.randint(0, 5)]
+            for tile_index in safe:
+                await bot.game_journal.record_move(reservation_id, encode_tile(tile_index), 180)
+
+
+async def run(num_games):
+    bot = main.bot
+    bot.db_init()
+    await populate(bot, num_games)
+    main.active_blackjack_games.clear()
+    main.active_mines_games.clear()
+
+    started = time.perf_counter()
+    await bot.restore_active_games()
+    elapsed = time.perf_counter() - started
+
+    restored = len(bot.game_sessions)
+    print(f"games journaled : {num_games}")
+    print(f"games restored  : {restored}")
+    print(f"restore time    : {elapsed * 1000:.1f} ms ({elapsed / max(1, restored) * 1e6:.1f} us/game)")
+    for task in asyncio.all_tasks() - {asyncio.current_task()}:
+        task.cancel()
+
+
+if __name__ == "__main__":
+    asyncio.run(run(int(sys.argv[1]) if len(sys.argv) > 1 else 5000))
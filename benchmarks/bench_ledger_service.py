@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""Benchmark: Blackjack rounds/s with the ledger in-process vs. behind the ledger service with N shard processes.
+
+Each fake shard process plays complete rounds for its own users: escrow reserve, a seeded Blackjack
+hand, the status embed and component payload a real round would render, then settle. Those are the
+same calls the bot makes for a `.bj` command and its Stand click, minus the Discord HTTP round trips.
+Afterwards the ledger is checked: balances plus open escrow must equal the funding plus net payouts,
+and every settled round must be in the round history.
+
+Usage: python benchmarks/bench_ledger_service.py [rounds_per_shard] [max_shards]
+"""
+import asyncio
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+import types
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from money import dc_to_units
+os.chdir(tempfile.mkdtemp(prefix="dragon_bench_"))
+
+USERS_PER_SHARD = 200
+STARTING_BALANCE = 1_000_000.0
+
+
+def fake_member(user_id):
+    avatar = types.SimpleNamespace(url="https://cdn.discordapp.com/embed/avatars/0.png")
+    return types.SimpleNamespace(id=user_id, name=f"user{user_id}", display_name=f"user{user_id}", display_avatar=avatar)
+
+
+def play_rounds(ledger, shard, rounds):
+    from blackjack import BlackjackGame
+    from rounds import blackjack_round
+    from views import blackjack_components
+
+    async def run():
+        escrow = ledger.escrow
+        for i in range(rounds):
+            user_id = shard * USERS_PER_SHARD + i % USERS_PER_SHARD + 1
+            reservation_id, _, _ = await escrow.reserve(user_id, f"user{user_id}", "blackjack", 1.0, 180)
+            game = BlackjackGame(user_id, lambda *_: (shard * 1_000_000 + i, "bench_seed", i))
+            game.seed_epoch = 0
+            game.start_game(1.0)
+            member = fake_member(user_id)
+            game.get_status_embed(member, hide_dealer=True).to_dict()
+            blackjack_components(reservation_id).to_components()
+            if game.state != "ENDED":
+                game.stand()
+            game.get_status_embed(member, hide_dealer=False).to_dict()
+            blackjack_components(reservation_id, disabled=True).to_components()
+            await escrow.settle(reservation_id, game.get_result()["payout"], member.name, blackjack_round(game))
+
+    asyncio.run(run())
+
+
+def shard_process(socket_path, shard, rounds, start_barrier):
+    from ledger_service import LedgerClient
+    client = LedgerClient(socket_path)
+    start_barrier.wait()
+    play_rounds(client, shard, rounds)
+
+
+def service_process(db_file, socket_path):
+    from ledger_service import LedgerServer
+    asyncio.run(LedgerServer(db_file, socket_path).serve())
+
+
+def fresh_database(db_file, shards):
+    import sqlite3
+    from migrations import migrate
+    from treasury import bootstrap_totals
+    conn = sqlite3.connect(db_file)
+    conn.execute("PRAGMA journal_mode=WAL")
+    migrate(conn)
+    bootstrap_totals(conn)
+    conn.executemany(
+        "INSERT INTO users (user_id, username, dragon_coins) VALUES (?, ?, ?)",
+        [(user_id, f"user{user_id}", dc_to_units(STARTING_BALANCE)) for user_id in range(1, shards * USERS_PER_SHARD + 1)]
+    )
+    conn.commit()
+    return conn
+
+
+def check_ledger(conn, shards):
+    funded = shards * USERS_PER_SHARD * dc_to_units(STARTING_BALANCE)
+    balances = conn.execute("SELECT SUM(dragon_coins) FROM users").fetchone()[0]
+    open_stake, net = conn.execute(
+        "SELECT COALESCE(SUM(CASE WHEN status = 'open' THEN stake END), 0), COALESCE(SUM(CASE WHEN status = 'settled' THEN payout - stake END), 0) FROM escrow_reservations"
+    ).fetchone()
+    # Every settled round is also in the players' history
+    settled = conn.execute("SELECT COUNT(*) FROM escrow_reservations WHERE status = 'settled'").fetchone()[0]
+    recorded = conn.execute("SELECT COUNT(*) FROM rounds").fetchone()[0]
+    # Integer micro-DC, so the books balance exactly
+    return balances + open_stake == funded + net and settled == recorded
+
+
+def bench_in_process(rounds):
+    from ledger import AsyncLedger
+    conn = fresh_database("inprocess.db", 1)
+    started = time.perf_counter()
+    play_rounds(AsyncLedger(conn), 0, rounds)
+    elapsed = time.perf_counter() - started
+    return rounds / elapsed, check_ledger(conn, 1)
+
+
+def bench_service(shards, rounds):
+    db_file = f"service_{shards}.db"
+    socket_path = os.path.join(os.getcwd(), f"ledger_{shards}.sock")
+    conn = fresh_database(db_file, shards)
+    service = multiprocessing.Process(target=service_process, args=(db_file, socket_path))
+    service.start()
+    while not os.path.exists(socket_path):
+        time.sleep(0.05)
+
+    barrier = multiprocessing.Barrier(shards + 1)
+    workers = [multiprocessing.Process(target=shard_process, args=(socket_path, shard, rounds, barrier)) for shard in range(shards)]
+    for worker in workers:
+        worker.start()
+    barrier.wait()
+    started = time.perf_counter()
+    for worker in workers:
+        worker.join()
+    elapsed = time.perf_counter() - started
+    service.terminate()
+    service.join()
+    return shards * rounds / elapsed, check_ledger(conn, shards)
+
+
+if __name__ == "__main__":
+    rounds = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    max_shards = int(sys.argv[2]) if len(sys.argv) > 2 else 4
+    print(f"CPU cores: {os.cpu_count()}   rounds per shard: {rounds}\n")
+    throughput, consistent = bench_in_process(rounds)
+    print(f"in-process ledger, 1 process : {throughput:8.0f} rounds/s   ledger consistent: {consistent}")
+    shards = 1
+    while shards <= max_shards:
+        throughput, consistent = bench_service(shards, rounds)
+        print(f"ledger service, {shards} shard process(es) : {throughput:8.0f} rounds/s   ledger consistent: {consistent}")
+        shards *= 2
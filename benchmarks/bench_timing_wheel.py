@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""Benchmark: expiring N open game rounds with per-View timers vs. the shared timing wheel.
+
+The per-View side uses real discord.py Views registered in a ViewStore, so each one arms its own
+timeout task exactly as it does when a game message is sent. The wheel side opens the same number
+of GameSessions on a TimingWheel.
+
+Usage: python benchmarks/bench_timing_wheel.py [num_sessions] [timeout_seconds]
+"""
+import asyncio
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from discord.ui import View, Button
+from discord.ui.view import ViewStore
+from game_sessions import GameSessions
+from timing_wheel import TimingWheel
+
+
+class TimedView(View):
+    def __init__(self, game_id, timeout, expired):
+        super().__init__(timeout=timeout)
+        self.expired = expired
+        self.add_item(Button(label="Hit", custom_id=f"bj_hit_{game_id}"))
+        self.add_item(Button(label="Stand", custom_id=f"bj_stand_{game_id}"))
+
+    async def on_timeout(self):
+        self.expired.append(self)
+
+
+async def wait_for(condition, limit):
+    deadline = time.monotonic() + limit
+    while not condition() and time.monotonic() < deadline:
+        await asyncio.sleep(0.01)
+
+
+async def bench_views(num_sessions, timeout):
+    expired = []
+    store = ViewStore(None)
+    tracemalloc.start()
+    started = time.perf_counter()
+    for game_id in range(num_sessions):
+        store.add_view(TimedView(game_id, timeout, expired), message_id=game_id)
+    arm = time.perf_counter() - started
+    memory = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    views = list(store._synced_message_views.values())
+    started = time.perf_counter()
+    for view in views:
+        view._refresh_timeout()
+    touch = time.perf_counter() - started
+    tasks = len(asyncio.all_tasks()) - 1
+
+    cpu = time.process_time()
+    deadline = time.monotonic() + timeout
+    await wait_for(lambda: len(expired) == num_sessions, timeout + 30)
+    lag = time.monotonic() - deadline
+    cpu = time.process_time() - cpu
+    return arm, touch, memory, tasks, cpu, lag, len(expired)
+
+
+async def bench_wheel(num_sessions, timeout, tick):
+    expired = []
+
+    async def on_expire(sessions):
+        expired.extend(sessions)
+
+    wheel = TimingWheel(tick=tick)
+    sessions = GameSessions(wheel, on_expire)
+    wheel.start()
+    tracemalloc.start()
+    started = time.perf_counter()
+    for game_id in range(num_sessions):
+        sessions.open(game_id, "bj", game_id, 10.0, None, timeout, 1, game_id)
+    arm = time.perf_counter() - started
+    memory = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    opened = [sessions.get(game_id) for game_id in range(num_sessions)]
+    started = time.perf_counter()
+    for session in opened:
+        sessions.touch(session)
+    touch = time.perf_counter() - started
+    tasks = len(asyncio.all_tasks()) - 1
+
+    cpu = time.process_time()
+    deadline = time.monotonic() + timeout
+    await wait_for(lambda: len(expired) == num_sessions, timeout + 30)
+    lag = time.monotonic() - deadline
+    cpu = time.process_time() - cpu
+    wheel.stop()
+    return arm, touch, memory, tasks, cpu, lag, len(expired)
+
+
+def report(name, num_sessions, result):
+    arm, touch, memory, tasks, cpu, lag, expired = result
+    print(f"{name}")
+    print(f"  arm {num_sessions} timers : {arm * 1000:8.1f} ms ({arm / num_sessions * 1e6:.1f} us each)")
+    print(f"  reset all timers  : {touch * 1000:8.1f} ms")
+    print(f"  memory            : {memory / 1024 / 1024:8.2f} MiB")
+    print(f"  asyncio tasks     : {tasks:8d}")
+    print(f"  CPU while waiting : {cpu * 1000:8.1f} ms")
+    print(f"  expired           : {expired:8d} (last one {lag:+.2f} s after the deadline)")
+
+
+async def main(num_sessions, timeout):
+    report("per-View timers (discord.py ViewStore)", num_sessions, await bench_views(num_sessions, timeout))
+    report("TimingWheel (tick 1.0 s)", num_sessions, await bench_wheel(num_sessions, timeout, 1.0))
+
+
+if __name__ == "__main__":
+    num_sessions = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    timeout = float(sys.argv[2]) if len(sys.argv) > 2 else 3.0
+    asyncio.run(main(num_sessions, timeout))
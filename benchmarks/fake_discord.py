@@ -0,0 +1,302 @@
+"""In-process stand-in for the Discord gateway and REST API, for load tests and trace replays.
+
+Gateway events are injected straight into the bot's connection state (`parse_message_create`,
+`parse_interaction_create`), so discord.py builds real Message/Interaction objects and dispatches
+on_message/on_interaction as it would for a websocket event. REST calls are answered by a fake
+aiohttp session installed under discord.py's HTTPClient, so discord.py's own rate-limit handling
+runs against simulated 429s: a global bucket (Discord's default is 50 requests/s, interaction
+callbacks exempt) and an optional per-channel bucket for message sends.
+
+Replies are routed back to whoever injected the event through a ContextVar: discord.py runs each
+event handler in a task created from the injecting task's context, so the REST calls a command
+makes can be matched to the simulated player that sent it.
+"""
+import asyncio
+import itertools
+import json
+import time
+from contextvars import ContextVar
+import aiohttp
+import discord
+from yarl import URL
+from ratelimit import RateLimiter
+
+GUILD_ID = 1444449000000000000
+BOT_USER_ID = 1444448000000000000
+APPLICATION_ID = BOT_USER_ID
+# Game channels the commands accept, plus the elite casino channel
+GAME_CHANNELS = {
+    "cf": 1444449509944987819,
+    "bj": 1444449583416610930,
+    "rl": 1444449686177054821,
+    "mines": 1444449762408661215,
+}
+ELITE_CASINO_CHANNEL_ID = 1444450537398472734
+
+# The simulated client (player, replayed user) that injected the current event
+current_client = ContextVar("current_client", default=None)
+
+snowflakes = itertools.count(1_500_000_000_000_000_000)
+# Bucket size advertised for routes that are not being rate limited
+UNLIMITED_BUCKET = 100_000
+
+
+def user_payload(user_id, name=None, bot=False):
+    return {"id": str(user_id), "username": name or f"player{user_id}", "discriminator": "0", "global_name": None, "avatar": None, "bot": bot}
+
+
+def member_payload(user_id, name=None):
+    return {"user": user_payload(user_id, name), "roles": [], "joined_at": "2025-01-01T00:00:00+00:00", "deaf": False, "mute": False, "flags": 0}
+
+
+def message_payload(message_id, channel_id, author, content="", **fields):
+    payload = {
+        "id": str(message_id), "channel_id": str(channel_id), "guild_id": str(GUILD_ID), "author": author,
+        "content": content, "timestamp": "2025-01-01T00:00:00+00:00", "edited_timestamp": None, "tts": False,
+        "mention_everyone": False, "mentions": [], "mention_roles": [], "attachments": [], "embeds": [],
+        "pinned": False, "type": 0, "flags": 0, "components": [],
+    }
+    payload.update(fields)
+    return payload
+
+
+def custom_ids(components, enabled_only=True):
+    """Flattens a message's component rows into the custom_ids of its buttons."""
+    ids = []
+    for row in components or ():
+        for component in row.get("components", ()):
+            if "custom_id" in component and not (enabled_only and component.get("disabled")):
+                ids.append(component["custom_id"])
+    return ids
+
+
+class Bucket:
+    """Fixed-window request counter, like Discord's per-route buckets."""
+
+    def __init__(self, limit, window):
+        self.limit = limit
+        self.window = window
+        self.reset_at = 0.0
+        self.remaining = limit
+
+    def take(self, now):
+        """Returns (allowed, remaining, seconds until reset)."""
+        if now >= self.reset_at:
+            self.reset_at = now + self.window
+            self.remaining = self.limit
+        if self.remaining == 0:
+            return False, 0, self.reset_at - now
+        self.remaining -= 1
+        return True, self.remaining, self.reset_at - now
+
+
+class FakeResponse:
+    def __init__(self, status, body, headers):
+        self.status = status
+        self.reason = "Too Many Requests" if status == 429 else "OK"
+        self.headers = headers
+        self._body = body
+
+    async def text(self, encoding="utf-8"):
+        return self._body
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+
+class FakeRequest:
+    """What `session.request(...)` returns: an awaitable async context manager.
+
+    Sends the session's trace signals like aiohttp does, so the bot's REST metrics see fake calls too.
+    """
+
+    def __init__(self, rest, method, url, kwargs):
+        self.rest = rest
+        self.method = method
+        self.url = URL(url)
+        self.coro = rest.handle(method, url, kwargs)
+        self.response = None
+
+    async def __aenter__(self):
+        traces = [(trace, trace.trace_config_ctx()) for trace in self.rest.trace_configs]
+        for trace, context in traces:
+            await trace.on_request_start.send(self.rest, context, aiohttp.TraceRequestStartParams(self.method, self.url, {}))
+        try:
+            self.response = await self.coro
+        except Exception as e:
+            for trace, context in traces:
+                await trace.on_request_exception.send(self.rest, context, aiohttp.TraceRequestExceptionParams(self.method, self.url, {}, e))
+            raise
+        for trace, context in traces:
+            await trace.on_request_end.send(self.rest, context, aiohttp.TraceRequestEndParams(self.method, self.url, {}, self.response))
+        return self.response
+
+    async def __aexit__(self, *exc):
+        return False
+
+
+class FakeRest:
+    """Answers discord.py's REST calls and hands message sends and interaction responses to the client that caused them."""
+
+    def __init__(self, latency=0.05, global_rate=50, channel_limit=0, channel_window=5.0):
+        self.latency = latency
+        self.global_bucket = Bucket(global_rate, 1.0) if global_rate else None
+        self.channel_limit = channel_limit
+        self.channel_window = channel_window
+        self.channel_buckets = {}
+        self.messages = {}
+        self.requests = 0
+        self.rate_limited = 0
+        self.trace_configs = []
+        self.bot_author = user_payload(BOT_USER_ID, "Dragon Casino", bot=True)
+
+    # aiohttp.ClientSession surface used by discord.py
+    def request(self, method, url, **kwargs):
+        return FakeRequest(self, method, url, kwargs)
+
+    async def close(self):
+        pass
+
+    @property
+    def closed(self):
+        return False
+
+    def rate_limited_response(self, retry_after, is_global, bucket=None):
+        self.rate_limited += 1
+        headers = {"content-type": "application/json", "Via": "1.1 google", "X-RateLimit-Scope": "global" if is_global else "user"}
+        if is_global:
+            headers["X-RateLimit-Global"] = "true"
+        else:
+            headers.update({"X-Ratelimit-Bucket": bucket, "X-Ratelimit-Limit": str(self.channel_limit), "X-Ratelimit-Remaining": "0", "X-Ratelimit-Reset-After": f"{retry_after:.3f}"})
+        body = json.dumps({"message": "You are being rate limited.", "retry_after": round(retry_after, 3), "global": is_global})
+        return FakeResponse(429, body, headers)
+
+    async def handle(self, method, url, kwargs):
+        self.requests += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        path = url.split("/api/v10", 1)[-1]
+        parts = path.strip("/").split("/")
+        now = time.monotonic()
+        is_callback = parts[0] == "interactions"
+
+        if self.global_bucket is not None and not is_callback:
+            allowed, _, retry_after = self.global_bucket.take(now)
+            if not allowed:
+                return self.rate_limited_response(retry_after, True)
+
+        # Discord sends bucket headers on every response; without them discord.py sends one request per route at a time
+        headers = {"content-type": "application/json", "X-Ratelimit-Bucket": f"{method}-{parts[0]}", "X-Ratelimit-Limit": str(UNLIMITED_BUCKET), "X-Ratelimit-Remaining": str(UNLIMITED_BUCKET - 1), "X-Ratelimit-Reset-After": "1.000"}
+        if method == "POST" and parts[0] == "channels" and parts[2:] == ["messages"] and self.channel_limit:
+            bucket_name = "channel-messages"
+            bucket = self.channel_buckets.get(parts[1])
+            if bucket is None:
+                bucket = self.channel_buckets[parts[1]] = Bucket(self.channel_limit, self.channel_window)
+            allowed, remaining, reset_after = bucket.take(now)
+            if not allowed:
+                return self.rate_limited_response(reset_after, False, bucket_name)
+            headers.update({"X-Ratelimit-Bucket": bucket_name, "X-Ratelimit-Limit": str(self.channel_limit), "X-Ratelimit-Remaining": str(remaining), "X-Ratelimit-Reset-After": f"{reset_after:.3f}"})
+
+        body = self.json_body(kwargs)
+        client = current_client.get()
+        if is_callback:
+            # POST /interactions/{id}/{token}/callback
+            if client is not None:
+                client.deliver("callback", body.get("data") or {})
+            return FakeResponse(204, "", {})
+        if parts[0] == "channels" and len(parts) >= 3 and parts[2] == "messages":
+            channel_id = int(parts[1])
+            if method == "POST":
+                message_id = next(snowflakes)
+                payload = message_payload(message_id, channel_id, self.bot_author, **body)
+                self.messages[message_id] = payload
+                if client is not None:
+                    client.deliver("message", payload)
+                return FakeResponse(200, json.dumps(payload), headers)
+            if method == "PATCH" and len(parts) == 4:
+                message_id = int(parts[3])
+                payload = self.messages.get(message_id) or message_payload(message_id, channel_id, self.bot_author)
+                payload.update(body)
+                if client is not None:
+                    client.deliver("edit", payload)
+                return FakeResponse(200, json.dumps(payload), headers)
+        if parts[0] == "users" and len(parts) == 2 and parts[1].isdigit():
+            return FakeResponse(200, json.dumps(user_payload(int(parts[1]))), headers)
+        if parts[0] == "users" and parts[1:] == ["@me", "channels"]:
+            return FakeResponse(200, json.dumps({"id": str(next(snowflakes)), "type": 1, "recipients": [user_payload(int(body.get("recipient_id", 0)))]}), headers)
+        return FakeResponse(200, json.dumps({}), headers)
+
+    @staticmethod
+    def json_body(kwargs):
+        data = kwargs.get("data")
+        if isinstance(data, (str, bytes)):
+            try:
+                return json.loads(data)
+            except ValueError:
+                return {}
+        return {}
+
+
+class Unthrottled(RateLimiter):
+    """Stand-in for the bot's command throttle that lets everything through."""
+
+    def check(self, user_id, channel_id, command):
+        return None
+
+
+class FakeGateway:
+    """Sets up the bot's connection state as if READY and GUILD_CREATE had arrived, then injects events."""
+
+    def __init__(self, bot, rest):
+        self.bot = bot
+        self.rest = rest
+
+    async def connect(self):
+        bot = self.bot
+        await bot._async_setup_hook()
+        # What HTTPClient.static_login would set up, minus the real aiohttp session
+        bot.http.token = "fake-token"
+        bot.http._HTTPClient__session = self.rest
+        if bot.http.http_trace is not None:
+            bot.http.http_trace.freeze()
+            self.rest.trace_configs = [bot.http.http_trace]
+        bot.http._global_over = asyncio.Event()
+        bot.http._global_over.set()
+        state = bot._connection
+        state.user = discord.ClientUser(state=state, data=user_payload(BOT_USER_ID, "Dragon Casino", bot=True))
+        state.application_id = APPLICATION_ID
+        channels = [
+            {"id": str(channel_id), "type": 0, "name": f"channel-{channel_id}", "position": index, "permission_overwrites": []}
+            for index, channel_id in enumerate(list(GAME_CHANNELS.values()) + [ELITE_CASINO_CHANNEL_ID])
+        ]
+        state._add_guild_from_data({
+            "id": str(GUILD_ID), "name": "Dragon Casino (fake)", "owner_id": str(BOT_USER_ID), "channels": channels,
+            "roles": [{"id": str(GUILD_ID), "name": "@everyone", "permissions": str(discord.Permissions.general().value), "position": 0, "color": 0, "hoist": False, "managed": False, "mentionable": False}],
+            "members": [], "member_count": 0,
+        })
+
+    @staticmethod
+    def spawned_tasks(parse, data):
+        """Runs a parse_* handler and returns the event handler tasks discord.py created for it."""
+        before = asyncio.all_tasks()
+        parse(data)
+        return asyncio.all_tasks() - before
+
+    def message(self, user_id, channel_id, content, name=None):
+        """Injects a MESSAGE_CREATE; returns the tasks handling it."""
+        data = message_payload(next(snowflakes), channel_id, user_payload(user_id, name), content)
+        data["member"] = member_payload(user_id, name)
+        return self.spawned_tasks(self.bot._connection.parse_message_create, data)
+
+    def click(self, user_id, message, custom_id, name=None):
+        """Injects a button INTERACTION_CREATE on `message`; returns the tasks handling it."""
+        data = {
+            "id": str(next(snowflakes)), "application_id": str(APPLICATION_ID), "type": 3, "token": f"token{next(snowflakes)}",
+            "version": 1, "guild_id": str(GUILD_ID), "channel_id": message["channel_id"],
+            "channel": {"id": message["channel_id"], "type": 0}, "member": dict(member_payload(user_id, name), permissions="0"),
+            "message": message, "data": {"custom_id": custom_id, "component_type": 2}, "locale": "en-US",
+        }
+        return self.spawned_tasks(self.bot._connection.parse_interaction_create, data)
@@ -0,0 +1,208 @@
+#!/usr/bin/env python3
+"""Load test: simulated players playing .cf, .rl, .bj and .mines against DragonCasinoBot, ramping up concurrency.
+
+Every player is a closed loop: send a game command through the fake gateway, wait for the bot's
+message, click through the round (Heads; Spin; Hit then Stand; one tile then Cash Out), repeat.
+REST calls are answered by benchmarks/fake_discord.py, which adds a fixed latency and returns 429s
+from Discord's global bucket (and, with --channel-limit, a per-channel send bucket), so discord.py's
+real rate-limit handling is part of every measured latency.
+
+For each concurrency level the report shows rounds/s, gateway events/s, p50/p95/p99 latency from
+event injection to the bot's reply, and the error rate (timeouts and unexpected replies), plus the
+number of 429s served. Use --global-rate 0 --latency 0 to find the CPU ceiling of one process.
+Players click far faster than people do, so the bot's command throttle (ratelimit.py) is off unless
+--throttle is given.
+
+Usage: python benchmarks/load_test.py [--levels 10,50,100,250] [--duration 10] [--latency 0.05]
+       [--global-rate 50] [--channel-limit 0] [--timeout 10] [--throttle] [--record trace.jsonl.gz]
+
+--record writes the generated traffic as a trace for benchmarks/replay_trace.py.
+"""
+import argparse
+import asyncio
+import itertools
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+LAUNCH_CWD = os.getcwd()
+os.chdir(tempfile.mkdtemp(prefix="dragon_bench_"))
+
+import main
+from traces import TraceRecorder
+from fake_discord import FakeGateway, FakeRest, GAME_CHANNELS, Unthrottled, current_client, custom_ids
+
+GAME_MIX = ("cf", "rl", "bj", "mines")
+STARTING_BALANCE = 1_000_000.0
+BET = 1
+
+
+class UnexpectedReply(Exception):
+    pass
+
+
+class Player:
+    """One simulated user; receives the bot's REST output for the events it injected."""
+
+    def __init__(self, user_id, gateway, timeout):
+        self.user_id = user_id
+        self.gateway = gateway
+        self.timeout = timeout
+        self.inbox = asyncio.Queue()
+        self.latencies = []
+        self.rounds = 0
+        self.events = 0
+        self.errors = 0
+
+    def deliver(self, kind, payload):
+        self.inbox.put_nowait((kind, payload))
+
+    async def expect(self, kind, started=None):
+        """Waits for the next delivery of `kind`, skipping edits of other messages; records the latency from `started`."""
+        while True:
+            got, payload = await asyncio.wait_for(self.inbox.get(), self.timeout)
+            if got == kind:
+                if started is not None:
+                    self.latencies.append(time.perf_counter() - started)
+                return payload
+
+    async def command(self, game, content):
+        self.events += 1
+        started = time.perf_counter()
+        self.gateway.message(self.user_id, GAME_CHANNELS[game], content)
+        message = await self.expect("message", started)
+        # A natural blackjack comes back with its buttons already disabled; anything without buttons is a refusal
+        if not custom_ids(message.get("components"), enabled_only=False):
+            raise UnexpectedReply(message.get("content") or "message without buttons")
+        return message
+
+    async def click(self, message, action):
+        """Clicks the enabled button whose custom_id contains `action`; returns the edited components or None."""
+        custom_id = next((cid for cid in custom_ids(message.get("components")) if f":{action}:" in cid), None)
+        if custom_id is None:
+            return None
+        self.events += 1
+        started = time.perf_counter()
+        self.gateway.click(self.user_id, message, custom_id)
+        callback = await self.expect("callback", started)
+        if "components" in callback:
+            message = dict(message, components=callback["components"])
+        return message
+
+    async def play_round(self, game):
+        if game == "cf":
+            await self.click(await self.command(game, f".cf {BET}"), "heads")
+        elif game == "rl":
+            await self.click(await self.command(game, f".rl {BET} red"), "spin")
+        elif game == "bj":
+            message = await self.command(game, f".bj {BET}")
+            message = await self.click(message, "hit")
+            if message is not None:
+                await self.click(message, "stand")
+        elif game == "mines":
+            board = await self.command(game, f".mines {BET} 3")
+            cashout = await self.expect("message")
+            board = await self.click(board, "tile")
+            if board is not None and custom_ids(board.get("components")):
+                await self.click(cashout, "cashout")
+
+    async def run(self, games, stop_at):
+        current_client.set(self)
+        for game in games:
+            if time.perf_counter() >= stop_at:
+                return
+            try:
+                await self.play_round(game)
+                self.rounds += 1
+            except (asyncio.TimeoutError, UnexpectedReply):
+                self.errors += 1
+                # Drain anything that arrives late so the next round starts clean
+                await asyncio.sleep(0.1)
+                while not self.inbox.empty():
+                    self.inbox.get_nowait()
+
+
+def percentile(sorted_values, q):
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(q * len(sorted_values)))]
+
+
+async def run_level(bot, gateway, rest, concurrency, duration, timeout, user_ids):
+    players = []
+    for _ in range(concurrency):
+        user_id = next(user_ids)
+        await bot.update_user_balance(user_id, STARTING_BALANCE, f"player{user_id}")
+        players.append(Player(user_id, gateway, timeout))
+
+    rate_limited_before = rest.rate_limited
+    started = time.perf_counter()
+    stop_at = started + duration
+    await asyncio.gather(*(
+        player.run(itertools.cycle(GAME_MIX[index % len(GAME_MIX):] + GAME_MIX[:index % len(GAME_MIX)]), stop_at)
+        for index, player in enumerate(players)
+    ))
+    elapsed = time.perf_counter() - started
+
+    latencies = sorted(latency for player in players for latency in player.latencies)
+    events = sum(player.events for player in players)
+    rounds = sum(player.rounds for player in players)
+    errors = sum(player.errors for player in players)
+    return {
+        "rounds/s": rounds / elapsed,
+        "events/s": events / elapsed,
+        "p50": percentile(latencies, 0.5),
+        "p95": percentile(latencies, 0.95),
+        "p99": percentile(latencies, 0.99),
+        "errors": errors / max(1, rounds + errors),
+        "429s": rest.rate_limited - rate_limited_before,
+    }
+
+
+async def run(args):
+    bot = main.bot
+    rest = FakeRest(latency=args.latency, global_rate=args.global_rate, channel_limit=args.channel_limit, channel_window=args.channel_window)
+    gateway = FakeGateway(bot, rest)
+    await gateway.connect()
+    bot.db_init()
+    bot.timing_wheel.start()
+    user_ids = itertools.count(10_000)
+    if not args.throttle:
+        bot.rate_limiter = Unthrottled()
+    if args.record:
+        bot.trace_recorder = TraceRecorder(os.path.join(LAUNCH_CWD, args.record), main.BOT_PREFIX)
+
+    print(f"REST latency {args.latency * 1000:.0f}ms, global limit {args.global_rate or 'off'}/s, "
+          f"channel send limit {f'{args.channel_limit}/{args.channel_window:g}s' if args.channel_limit else 'off'}, "
+          f"throttle {'on' if args.throttle else 'off'}, {args.duration}s per level\n")
+    print(f"{'players':>8} {'rounds/s':>9} {'events/s':>9} {'p50':>8} {'p95':>8} {'p99':>8} {'errors':>7} {'429s':>6}")
+    for concurrency in args.levels:
+        result = await run_level(bot, gateway, rest, concurrency, args.duration, args.timeout, user_ids)
+        print(f"{concurrency:>8} {result['rounds/s']:>9.1f} {result['events/s']:>9.1f} "
+              f"{result['p50'] * 1000:>6.0f}ms {result['p95'] * 1000:>6.0f}ms {result['p99'] * 1000:>6.0f}ms "
+              f"{result['errors']:>7.1%} {result['429s']:>6}")
+        # Let games that timed out expire before the next level
+        await asyncio.sleep(args.timeout if result["errors"] else 0.5)
+
+    print("\nStage breakdown over the whole run (bot.metrics):")
+    for stage, (count, p50, p95, total) in sorted(bot.metrics.stage_summary().items()):
+        print(f"  {stage:<12} {count:>8} calls  p50 {p50 * 1000:7.2f}ms  p95 {p95 * 1000:7.2f}ms  total {total:7.2f}s")
+    bot.timing_wheel.stop()
+    if bot.trace_recorder is not None:
+        bot.trace_recorder.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--levels", type=lambda value: [int(level) for level in value.split(",")], default=[10, 50, 100, 250])
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds per concurrency level")
+    parser.add_argument("--latency", type=float, default=0.05, help="simulated REST latency in seconds")
+    parser.add_argument("--global-rate", type=int, default=50, help="global REST requests per second before 429 (0 = off)")
+    parser.add_argument("--channel-limit", type=int, default=0, help="message sends per channel per window before 429 (0 = off)")
+    parser.add_argument("--channel-window", type=float, default=5.0)
+    parser.add_argument("--timeout", type=float, default=10.0, help="seconds to wait for a reply before counting an error")
+    parser.add_argument("--throttle", action="store_true", help="keep the bot's per-user/channel command throttle on")
+    parser.add_argument("--record", help="also record the generated traffic to this trace file")
+    asyncio.run(run(parser.parse_args()))
@@ -0,0 +1,210 @@
+#!/usr/bin/env python3
+"""Replays a recorded trace (see traces.py / `.trace start`) against a local bot through the fake gateway.
+
+Events are injected at their recorded offsets divided by --speed. Each trace user's events run in
+order: latency is measured to the bot's first message for a command and to the interaction response
+for a click, and the next event waits until the bot has finished handling the previous one. A click is
+sent to the newest message the bot sent that user with an enabled button for the same game, action
+and tile, since game ids differ between runs; clicks with no such message are counted as skipped.
+
+Runs are deterministic per user: every trace user starts with the same balance and client seed, and
+the server seed is pinned, so two releases replaying the same trace must end with the same balances.
+The result (final balances and latency percentiles per command/button) is written with --out, and
+--compare diffs it against an earlier result; differing balances make the exit status 1.
+The command throttle (ratelimit.py) depends on timing, so it is off unless --throttle is given.
+
+Usage: python benchmarks/replay_trace.py TRACE [--speed 1] [--latency 0.05] [--global-rate 50]
+       [--throttle] [--out result.json] [--compare old_result.json]
+"""
+import argparse
+import asyncio
+import json
+import os
+import re
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+LAUNCH_CWD = os.getcwd()
+os.chdir(tempfile.mkdtemp(prefix="dragon_bench_"))
+
+import main
+from traces import read_trace
+from money import dc_to_units
+from fake_discord import FakeGateway, FakeRest, Unthrottled, current_client, custom_ids
+
+REPLAY_SERVER_SEED = "replay-server-seed"
+STARTING_BALANCE = 1_000_000.0
+USER_ID_BASE = 20_000
+REPLY_TIMEOUT = 10.0
+MENTION_PATTERN = re.compile(r"<@(\d+)>")
+
+
+class ReplayUser:
+    """One anonymized trace user; replays its events in order and keeps the bot's messages to click on."""
+
+    def __init__(self, anon_id, gateway):
+        self.anon_id = anon_id
+        self.user_id = USER_ID_BASE + anon_id
+        self.gateway = gateway
+        self.events = []
+        self.inbox = asyncio.Queue()
+        self.messages = []
+        self.latencies = {}
+        self.skipped = 0
+        self.timeouts = 0
+
+    def deliver(self, kind, payload):
+        if kind == "message" and custom_ids(payload.get("components")):
+            self.messages.append(payload)
+        elif kind == "edit":
+            # Applied right away: a later click must not pick a button the bot has since disabled
+            self.update_message(payload)
+        self.inbox.put_nowait((kind, payload))
+
+    def find_message(self, game, action, arg):
+        wanted = f"dc:{game}:{action}:"
+        for message in reversed(self.messages):
+            for custom_id in custom_ids(message.get("components")):
+                if custom_id.startswith(wanted) and (arg is None or custom_id.endswith(f":{arg}")):
+                    return message, custom_id
+        return None, None
+
+    async def wait_for(self, kind, label, started):
+        try:
+            while True:
+                got, payload = await asyncio.wait_for(self.inbox.get(), REPLY_TIMEOUT)
+                if got == kind:
+                    self.latencies.setdefault(label, []).append(time.perf_counter() - started)
+                    return payload
+        except asyncio.TimeoutError:
+            self.timeouts += 1
+
+    def update_message(self, payload):
+        for index, message in enumerate(self.messages):
+            if message["id"] == payload["id"]:
+                self.messages[index] = payload
+
+    async def run(self, replay_started, speed):
+        current_client.set(self)
+        handlers = ()
+        for event in self.events:
+            if handlers:
+                await asyncio.wait(handlers)
+            delay = replay_started + event[1] / 1000 / speed - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            if event[0] == "m":
+                _, _, _, channel_id, content = event
+                label = content.split(" ", 1)[0]
+                started = time.perf_counter()
+                handlers = self.gateway.message(self.user_id, channel_id, MENTION_PATTERN.sub(lambda match: f"<@{USER_ID_BASE + int(match.group(1))}>", content))
+                await self.wait_for("message", label, started)
+            else:
+                _, _, _, channel_id, game, action, arg = event
+                message, custom_id = self.find_message(game, action, arg)
+                if message is None:
+                    self.skipped += 1
+                    handlers = ()
+                    continue
+                started = time.perf_counter()
+                handlers = self.gateway.click(self.user_id, message, custom_id)
+                callback = await self.wait_for("callback", f"{game}:{action}", started)
+                if callback and "components" in callback:
+                    self.update_message(dict(message, components=callback["components"]))
+
+
+def seed_users(bot, users):
+    """Gives every trace user the same balance and client seed on every run."""
+    bot.db_conn.executemany(
+        "INSERT INTO users (user_id, username, dragon_coins, client_seed) VALUES (?, ?, ?, ?)",
+        [(user.user_id, f"replay{user.anon_id}", dc_to_units(STARTING_BALANCE), f"replay-client-seed-{user.anon_id}") for user in users]
+    )
+    bot.db_conn.commit()
+
+
+def percentiles(values):
+    values = sorted(values)
+    pick = lambda q: values[min(len(values) - 1, int(q * len(values)))]
+    return {"count": len(values), "p50": pick(0.5), "p95": pick(0.95), "p99": pick(0.99)}
+
+
+def compare_results(result, previous):
+    """Prints balance and latency differences; returns True if the balances match."""
+    old_balances = previous["balances"]
+    differing = [(user, old_balances.get(user), balance) for user, balance in result["balances"].items() if abs((old_balances.get(user) or 0.0) - balance) > 0.005]
+    print(f"\nBalances: {len(differing)} of {len(result['balances'])} users differ from the previous result")
+    for user, old, new in differing[:10]:
+        print(f"  user {user}: {old} -> {new}")
+    print(f"\n{'event':<16} {'p50 before':>11} {'p50 now':>9} {'p95 before':>11} {'p95 now':>9}")
+    for label, stats in sorted(result["latency"].items()):
+        before = previous["latency"].get(label)
+        if before:
+            print(f"{label:<16} {before['p50'] * 1000:>9.1f}ms {stats['p50'] * 1000:>7.1f}ms {before['p95'] * 1000:>9.1f}ms {stats['p95'] * 1000:>7.1f}ms")
+    return not differing
+
+
+async def replay(args):
+    header, events = read_trace(os.path.join(LAUNCH_CWD, args.trace))
+    bot = main.bot
+    rest = FakeRest(latency=args.latency, global_rate=args.global_rate)
+    gateway = FakeGateway(bot, rest)
+    await gateway.connect()
+    bot.db_init()
+    bot.daily_server_seed = REPLAY_SERVER_SEED
+    if not args.throttle:
+        bot.rate_limiter = Unthrottled()
+    bot.timing_wheel.start()
+
+    users = {}
+    for event in events:
+        user = users.get(event[2])
+        if user is None:
+            user = users[event[2]] = ReplayUser(event[2], gateway)
+        user.events.append(event)
+    seed_users(bot, users.values())
+
+    duration = events[-1][1] / 1000 if events else 0.0
+    print(f"Replaying {len(events)} events from {len(users)} users recorded {header['started']} "
+          f"({duration:.0f}s of traffic at {args.speed:g}x)\n")
+    started = time.perf_counter()
+    await asyncio.gather(*(user.run(started, args.speed) for user in users.values()))
+    elapsed = time.perf_counter() - started
+    bot.timing_wheel.stop()
+
+    latency = {}
+    for user in users.values():
+        for label, values in user.latencies.items():
+            latency.setdefault(label, []).extend(values)
+    result = {
+        "trace": args.trace,
+        "balances": {str(user.anon_id): bot.get_user_data(user.user_id)[2] for user in users.values()},
+        "latency": {label: percentiles(values) for label, values in latency.items()},
+    }
+
+    print(f"{'event':<16} {'count':>7} {'p50':>9} {'p95':>9} {'p99':>9}")
+    for label, stats in sorted(result["latency"].items()):
+        print(f"{label:<16} {stats['count']:>7} {stats['p50'] * 1000:>7.1f}ms {stats['p95'] * 1000:>7.1f}ms {stats['p99'] * 1000:>7.1f}ms")
+    print(f"\n{len(events) / elapsed:.1f} events/s over {elapsed:.1f}s, "
+          f"{sum(user.timeouts for user in users.values())} timeouts, {sum(user.skipped for user in users.values())} skipped clicks, {rest.rate_limited} 429s")
+
+    if args.out:
+        with open(os.path.join(LAUNCH_CWD, args.out), "w") as f:
+            json.dump(result, f, indent=1)
+    if args.compare:
+        with open(os.path.join(LAUNCH_CWD, args.compare)) as f:
+            return 0 if compare_results(result, json.load(f)) else 1
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("trace")
+    parser.add_argument("--speed", type=float, default=1.0, help="replay speed multiplier (e.g. 10 for 10x)")
+    parser.add_argument("--latency", type=float, default=0.05, help="simulated REST latency in seconds")
+    parser.add_argument("--global-rate", type=int, default=50, help="global REST requests per second before 429 (0 = off)")
+    parser.add_argument("--throttle", action="store_true", help="keep the bot's per-user/channel command throttle on")
+    parser.add_argument("--out", help="write balances and latency percentiles to this JSON file")
+    parser.add_argument("--compare", help="diff against a result written earlier with --out")
+    sys.exit(asyncio.run(replay(parser.parse_args())))
@@ -0,0 +1,296 @@
+#!/usr/bin/env python3
+"""Benchmark suite: game engines, fairness draws and settlement, compared against a stored baseline.
+
+Each case is timed in batches of at least MIN_BATCH_SECONDS and reported as the best of REPEATS
+batches (ops/s), plus the bytes allocated per op as traced by tracemalloc in a separate pass. Cases
+that touch the database run against a fresh SQLite file in a temp directory, with the bot's real
+methods; the coinflip round goes through the real command callback and the interaction router with
+fake ctx/interaction objects.
+
+A case fails when its ops/s drops, or its allocations grow, by more than the tolerance relative to
+benchmarks/baseline.json. The exit status is 1 if any case fails.
+
+Usage: python benchmarks/run.py [--update] [--tolerance 0.25] [case ...]
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+import types
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+BASELINE_FILE = os.path.join(HERE, "baseline.json")
+sys.path.insert(0, os.path.join(HERE, ".."))
+os.chdir(tempfile.mkdtemp(prefix="dragon_bench_"))
+
+import discord
+import main
+from blackjack import BlackjackGame, calculate_hand_value
+from mines import generate_mines_board, get_payout_multiplier
+from roulette import spin_wheel, check_win
+from interaction_router import game_custom_id
+from fake_discord import Unthrottled
+
+MIN_BATCH_SECONDS = 0.2
+REPEATS = 5
+ALLOCATION_OPS = 200
+COINFLIP_CHANNEL_ID = 1444449509944987819
+ROULETTE_BETS = ("red", "black", "odd", "even", "low", "high", "17")
+NUM_USERS = 500
+
+
+def counter_seed_generator():
+    """Deterministic stand-in for get_fair_result, so engine cases measure only the engine."""
+    counter = itertools.count()
+
+    def seed_generator(user_id, min_val, max_val):
+        n = next(counter)
+        return min_val + (n * 2654435761) % (max_val - min_val + 1), "bench_seed", n
+    return seed_generator
+
+
+def fake_member(user_id):
+    avatar = types.SimpleNamespace(url="https://cdn.discordapp.com/embed/avatars/0.png")
+    return types.SimpleNamespace(
+        id=user_id, name=f"user{user_id}", display_name=f"user{user_id}", mention=f"<@{user_id}>",
+        display_avatar=avatar, guild_permissions=types.SimpleNamespace(administrator=False)
+    )
+
+
+class FakeContext:
+    """Just enough of commands.Context for the game commands."""
+
+    message_ids = itertools.count(1)
+
+    def __init__(self, user_id, channel_id):
+        self.author = fake_member(user_id)
+        self.channel = types.SimpleNamespace(id=channel_id)
+        self.sent = None
+
+    async def send(self, content=None, **fields):
+        self.sent = fields
+        return types.SimpleNamespace(id=next(self.message_ids))
+
+
+class FakeResponse:
+    async def edit_message(self, **fields):
+        fields["embed"].to_dict()
+        fields["view"].to_components()
+
+    async def send_message(self, content=None, **fields):
+        pass
+
+
+class FakeInteraction:
+    def __init__(self, user, custom_id, channel_id):
+        self.type = discord.InteractionType.component
+        self.data = {"custom_id": custom_id}
+        self.user = user
+        self.channel_id = channel_id
+        self.response = FakeResponse()
+
+
+def setup_database(loop, bot):
+    bot.db_init()
+    # The cases replay one user far faster than a person clicks
+    bot.rate_limiter = Unthrottled()
+
+    async def fund():
+        for user_id in range(1, NUM_USERS + 1):
+            await bot.update_user_balance(user_id, 1_000_000_000.0, f"user{user_id}")
+    loop.run_until_complete(fund())
+
+
+def case_blackjack(bot):
+    seed_generator = counter_seed_generator()
+    member = fake_member(1)
+
+    def op():
+        game = BlackjackGame(1, seed_generator)
+        game.start_game(10.0)
+        while game.state == "PLAYER_TURN" and calculate_hand_value(game.player_hand) < 17:
+            game.hit()
+        if game.state == "PLAYER_TURN":
+            game.stand()
+        game.get_result()
+        game.get_status_embed(member, hide_dealer=False).to_dict()
+    return op
+
+
+def case_mines(bot):
+    seed_generator = counter_seed_generator()
+
+    def op():
+        game_state = generate_mines_board(seed_generator, 1, 5)
+        for clicks in range(1, 21):
+            get_payout_multiplier(game_state["mines_count"], clicks)
+    return op
+
+
+def case_roulette(bot):
+    seed_generator = counter_seed_generator()
+
+    def op():
+        spin_result = spin_wheel(seed_generator, 1)
+        for bet_type in ROULETTE_BETS:
+            check_win(spin_result, bet_type)
+    return op
+
+
+def case_fair_result(bot):
+    users = itertools.cycle(range(1, NUM_USERS + 1))
+
+    def op():
+        bot.get_fair_result(next(users), 0, 9999)
+    return op
+
+
+def case_update_game_stats(bot):
+    users = itertools.cycle(range(1, NUM_USERS + 1))
+
+    async def op():
+        user_id = next(users)
+        await bot.update_game_stats(user_id, 10.0, -10.0, f"user{user_id}")
+    return op
+
+
+def case_escrow_settle(bot):
+    users = itertools.cycle(range(1, NUM_USERS + 1))
+
+    async def op():
+        user_id = next(users)
+        reservation_id, _, _ = await bot.escrow.reserve(user_id, f"user{user_id}", "coinflip", 10.0, 60)
+        await bot.escrow.settle(reservation_id, 19.0, f"user{user_id}")
+    return op
+
+
+def case_coinflip_round(bot):
+    """`.cf 10` then a Heads click, through the real command callback and interaction router."""
+    users = itertools.cycle(range(1, NUM_USERS + 1))
+    callback = bot.get_command("cf").callback
+
+    async def op():
+        user_id = next(users)
+        ctx = FakeContext(user_id, COINFLIP_CHANNEL_ID)
+        await callback(ctx, 10.0)
+        ctx.sent["embed"].to_dict()
+        game_id = int(ctx.sent["view"].children[0].custom_id.split(":")[3])
+        await bot.interaction_router.dispatch(FakeInteraction(ctx.author, game_custom_id("cf", "heads", game_id), ctx.channel.id))
+    return op
+
+
+CASES = {
+    "blackjack_round": case_blackjack,
+    "mines_board": case_mines,
+    "roulette_spin": case_roulette,
+    "fair_result": case_fair_result,
+    "update_game_stats": case_update_game_stats,
+    "escrow_settle": case_escrow_settle,
+    "coinflip_round": case_coinflip_round,
+}
+
+
+def run_batch(loop, op, n):
+    """Runs `op` n times and returns the elapsed seconds."""
+    if asyncio.iscoroutinefunction(op):
+        async def batch():
+            for _ in range(n):
+                await op()
+        started = time.perf_counter()
+        loop.run_until_complete(batch())
+        return time.perf_counter() - started
+    started = time.perf_counter()
+    for _ in range(n):
+        op()
+    return time.perf_counter() - started
+
+
+def measure(loop, op):
+    """Returns (best ops/s, bytes allocated per op)."""
+    n = 1
+    while run_batch(loop, op, n) < MIN_BATCH_SECONDS:
+        n *= 2
+    ops_per_second = max(n / run_batch(loop, op, n) for _ in range(REPEATS))
+
+    tracemalloc.start()
+    allocated = 0
+    for _ in range(ALLOCATION_OPS):
+        tracemalloc.reset_peak()
+        before = tracemalloc.get_traced_memory()[0]
+        run_batch(loop, op, 1)
+        allocated += tracemalloc.get_traced_memory()[1] - before
+    tracemalloc.stop()
+    return ops_per_second, allocated / ALLOCATION_OPS
+
+
+def compare(name, result, baseline, tolerance):
+    """Returns a list of regression messages for one case."""
+    if name not in baseline:
+        return []
+    problems = []
+    ops, allocated = result
+    base_ops, base_allocated = baseline[name]["ops_per_second"], baseline[name]["bytes_per_op"]
+    if ops < base_ops * (1 - tolerance):
+        problems.append(f"{name}: {ops:,.0f} ops/s is {1 - ops / base_ops:.0%} below baseline {base_ops:,.0f}")
+    if allocated > base_allocated * (1 + tolerance) + 64:
+        problems.append(f"{name}: {allocated:,.0f} B/op is {allocated / base_allocated - 1:.0%} above baseline {base_allocated:,.0f}")
+    return problems
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("cases", nargs="*", help=f"cases to run (default: all of {', '.join(CASES)})")
+    parser.add_argument("--update", action="store_true", help="write the results to baseline.json instead of comparing")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed slowdown / allocation growth (default 0.25)")
+    args = parser.parse_args()
+
+    names = args.cases or list(CASES)
+    unknown = [name for name in names if name not in CASES]
+    if unknown:
+        parser.error(f"unknown case(s): {', '.join(unknown)}")
+
+    baseline = {}
+    if os.path.exists(BASELINE_FILE):
+        with open(BASELINE_FILE) as f:
+            baseline = json.load(f)
+
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    bot = main.bot
+    setup_database(loop, bot)
+
+    results = {}
+    problems = []
+    print(f"{'case':<20} {'ops/s':>12} {'B/op':>10} {'baseline ops/s':>16}")
+    for name in names:
+        results[name] = measure(loop, CASES[name](bot))
+        ops, allocated = results[name]
+        base = baseline.get(name, {}).get("ops_per_second")
+        print(f"{name:<20} {ops:>12,.0f} {allocated:>10,.0f} {f'{base:,.0f}' if base else '-':>16}")
+        problems.extend(compare(name, results[name], baseline, args.tolerance))
+
+    if args.update:
+        for name, (ops, allocated) in results.items():
+            baseline[name] = {"ops_per_second": round(ops), "bytes_per_op": round(allocated)}
+        with open(BASELINE_FILE, "w") as f:
+            json.dump(baseline, f, indent=2, sort_keys=True)
+            f.write("\n")
+        print(f"\nBaseline updated: {BASELINE_FILE}")
+        return 0
+
+    if problems:
+        print("\nREGRESSIONS:")
+        for problem in problems:
+            print(f"  {problem}")
+        return 1
+    print("\nNo regressions.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main_cli())
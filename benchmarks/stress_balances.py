@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+"""Stress test: concurrent bets from one user must never take the balance below zero.
+
+Every bet follows the bot's path: under the user's lock, read the balance, await (as the commands
+do for Discord calls), then reserve the stake in escrow; settle or refund later, outside the lock.
+First many asyncio tasks bet at once in one process. Then several shard processes bet on the same
+user at once through the ledger service. A trigger records any write that leaves a balance below
+zero, whichever connection made it. Afterwards the ledger must balance exactly.
+
+Usage: python benchmarks/stress_balances.py [bets] [shards]
+"""
+import asyncio
+import multiprocessing
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from money import dc_to_units
+os.chdir(tempfile.mkdtemp(prefix="dragon_stress_"))
+
+USER_ID = 1
+STARTING_BALANCE = 500.0
+STAKES = (1.0, 5.0, 10.0, 25.0, 50.0)
+# Concurrent betting tasks in the one-process run; each places its share of the bets in turn
+PLAYERS = 200
+
+
+def fresh_database(db_file):
+    from migrations import migrate
+    from treasury import bootstrap_totals
+    conn = sqlite3.connect(db_file)
+    conn.execute("PRAGMA journal_mode=WAL")
+    migrate(conn)
+    conn.execute("INSERT INTO users (user_id, username, dragon_coins) VALUES (?, 'stress', ?)", (USER_ID, dc_to_units(STARTING_BALANCE)))
+    conn.commit()
+    bootstrap_totals(conn)
+    # Catches a negative balance at the moment it is written, not only in the final state
+    conn.execute("CREATE TABLE negative_balances (user_id INTEGER, dragon_coins INTEGER)")
+    conn.execute("""
+        CREATE TRIGGER record_negative_balance AFTER UPDATE OF dragon_coins ON users WHEN NEW.dragon_coins < 0
+        BEGIN INSERT INTO negative_balances VALUES (NEW.user_id, NEW.dragon_coins); END
+    """)
+    conn.commit()
+    return conn
+
+
+def check_ledger(conn):
+    """Returns a list of problems; empty when the books balance and no balance went negative."""
+    problems = []
+    negatives = conn.execute("SELECT COUNT(*), MIN(dragon_coins) FROM negative_balances").fetchone()
+    if negatives[0]:
+        problems.append(f"{negatives[0]} writes left a negative balance (lowest {negatives[1]} micro-DC)")
+    balance = conn.execute("SELECT dragon_coins FROM users WHERE user_id = ?", (USER_ID,)).fetchone()[0]
+    open_stake, net = conn.execute(
+        "SELECT COALESCE(SUM(CASE WHEN status = 'open' THEN stake END), 0), COALESCE(SUM(CASE WHEN status = 'settled' THEN payout - stake END), 0) FROM escrow_reservations"
+    ).fetchone()
+    if balance + open_stake != dc_to_units(STARTING_BALANCE) + net:
+        problems.append(f"ledger off: balance {balance} + open {open_stake} != funding + net {net}")
+    return problems
+
+
+async def place_bet(conn, ledger, locks, rng, stats):
+    stake = rng.choice(STAKES)
+    await asyncio.sleep(rng.random() * 0.001)
+    async with locks.hold(USER_ID):
+        balance = conn.execute("SELECT dragon_coins FROM users WHERE user_id = ?", (USER_ID,)).fetchone()[0]
+        # Stands in for fetch_user and the other awaits between the balance check and the debit
+        await asyncio.sleep(0)
+        reservation_id, _, _ = await ledger.escrow.reserve(USER_ID, "stress", "coinflip", stake, 60)
+        # A rejected reserve must not leave the write lock held on the shared connection
+        if conn.in_transaction:
+            stats["open_transactions"] += 1
+        if reservation_id is None:
+            stats["rejected"] += 1
+            # Under the lock nothing can spend the balance between the check and the reserve
+            if balance >= dc_to_units(stake):
+                stats["stale_checks"] += 1
+            return
+    stats["placed"] += 1
+    await asyncio.sleep(rng.random() * 0.001)
+    outcome = rng.random()
+    if outcome < 0.1:
+        await ledger.escrow.refund(reservation_id)
+    else:
+        await ledger.escrow.settle(reservation_id, stake * 2 if outcome < 0.55 else 0.0)
+
+
+def run_in_process(bets):
+    from ledger import AsyncLedger
+    from user_locks import UserLocks
+    conn = fresh_database("inprocess.db")
+    ledger = AsyncLedger(conn)
+    locks = UserLocks()
+    rng = random.Random(28)
+    stats = {"placed": 0, "rejected": 0, "stale_checks": 0, "open_transactions": 0}
+
+    async def player(count):
+        for _ in range(count):
+            await place_bet(conn, ledger, locks, rng, stats)
+
+    async def run():
+        await asyncio.gather(*(player(bets // PLAYERS) for _ in range(PLAYERS)))
+
+    started = time.perf_counter()
+    asyncio.run(run())
+    elapsed = time.perf_counter() - started
+    problems = check_ledger(conn)
+    if stats["stale_checks"]:
+        problems.append(f"{stats['stale_checks']} balance checks went stale under the user lock")
+    if stats["open_transactions"]:
+        problems.append(f"{stats['open_transactions']} reserves left a transaction open")
+    if len(locks):
+        problems.append(f"{len(locks)} user locks left behind")
+    return stats, elapsed, problems
+
+
+def service_process(db_file, socket_path):
+    from ledger_service import LedgerServer
+    asyncio.run(LedgerServer(db_file, socket_path).serve())
+
+
+def shard_process(socket_path, shard, bets, start_barrier):
+    from ledger_service import LedgerClient
+    client = LedgerClient(socket_path)
+    rng = random.Random(shard)
+    start_barrier.wait()
+
+    async def run():
+        for _ in range(bets):
+            stake = rng.choice(STAKES)
+            reservation_id, _, _ = await client.escrow.reserve(USER_ID, "stress", "coinflip", stake, 60)
+            if reservation_id is None:
+                continue
+            outcome = rng.random()
+            if outcome < 0.1:
+                await client.escrow.refund(reservation_id)
+            else:
+                await client.escrow.settle(reservation_id, stake * 2 if outcome < 0.55 else 0.0)
+
+    asyncio.run(run())
+
+
+def run_through_service(bets, shards):
+    db_file = "service.db"
+    socket_path = os.path.join(os.getcwd(), "ledger.sock")
+    conn = fresh_database(db_file)
+    service = multiprocessing.Process(target=service_process, args=(db_file, socket_path))
+    service.start()
+    while not os.path.exists(socket_path):
+        time.sleep(0.05)
+    barrier = multiprocessing.Barrier(shards + 1)
+    workers = [multiprocessing.Process(target=shard_process, args=(socket_path, shard, bets, barrier)) for shard in range(shards)]
+    for worker in workers:
+        worker.start()
+    barrier.wait()
+    started = time.perf_counter()
+    for worker in workers:
+        worker.join()
+    elapsed = time.perf_counter() - started
+    service.terminate()
+    service.join()
+    problems = check_ledger(conn)
+    placed = conn.execute("SELECT COUNT(*) FROM escrow_reservations").fetchone()[0]
+    problems.extend(f"shard process {shard} exited with {worker.exitcode}" for shard, worker in enumerate(workers) if worker.exitcode)
+    return placed, elapsed, problems
+
+
+if __name__ == "__main__":
+    bets = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    shards = int(sys.argv[2]) if len(sys.argv) > 2 else 4
+    failed = False
+
+    stats, elapsed, problems = run_in_process(bets)
+    print(f"one process, {PLAYERS} concurrent players x {bets // PLAYERS} bets: {stats['placed']} placed, {stats['rejected']} rejected, {elapsed:.2f}s")
+    for problem in problems:
+        print(f"  FAIL: {problem}")
+    failed |= bool(problems)
+
+    placed, elapsed, problems = run_through_service(bets, shards)
+    print(f"ledger service, {shards} shard processes x {bets} bets on one user: {placed} placed, {elapsed:.2f}s")
+    for problem in problems:
+        print(f"  FAIL: {problem}")
+    failed |= bool(problems)
+
+    print("FAILED" if failed else "Balances never went negative; ledger consistent.")
+    sys.exit(1 if failed else 0)
@@ -27,36 +27,45 @@ def calculate_hand_value(hand):
         
     return value
 
-def create_deck(num_decks=6):
+def create_deck(num_decks=6, shuffle=True):
     """Creates a standard deck of cards."""
     deck = []
     for _ in range(num_decks):
         for suit in SUITS:
             for rank in RANKS:
                 deck.append(rank + suit)
-    random.shuffle(deck)
+    if shuffle:
+        random.shuffle(deck)
+    return deck
+
+def create_seeded_deck(seed):
+    """Creates a deck shuffled only by the provably fair seed, so the same seed always yields the same deck."""
+    deck = create_deck(num_decks=6, shuffle=False)
+    random.Random(seed).shuffle(deck)
     return deck
 
 class BlackjackGame:
     def __init__(self, user_id, seed_generator):
         self.user_id = user_id
         self.seed_generator = seed_generator
-        self.deck = self._create_seeded_deck()
+        self.seed, self.client_seed, self.nonce = seed_generator(user_id, 0, 1000000000)
+        # Server seed epoch the seed was drawn in, set by the bot for the round history
+        self.seed_epoch = None
+        self.deck = create_seeded_deck(self.seed)
         self.player_hand = []
         self.dealer_hand = []
         self.state = "BETTING"
         self.bet = 0.0
 
-    def _create_seeded_deck(self):
-        """Creates a deck and shuffles it using the provably fair seed."""
-        result_num, _, _ = self.seed_generator(self.user_id, 0, 1000000000)
-        
-        deck = create_deck(num_decks=6)
-        
-        temp_random = random.Random(result_num)
-        temp_random.shuffle(deck)
-        
-        return deck
+    @classmethod
+    def restore(cls, user_id, seed, client_seed, nonce, bet, actions):
+        """Rebuilds a game from its seed and the journaled player actions ('h' per hit)."""
+        game = cls(user_id, lambda *_: (seed, client_seed, nonce))
+        game.start_game(bet)
+        for action in actions:
+            if action == "h":
+                game.hit()
+        return game
 
     def start_game(self, bet_amount):
         """Deals initial cards and starts the game."""
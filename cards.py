@@ -0,0 +1,293 @@
+"""Image cards for .profile and .leaderboard, drawn with Pillow in a process pool.
+
+Drawing a card is tens of milliseconds of CPU, so it happens in worker processes and never holds up
+the event loop. Finished cards are cached by a hash of everything drawn on them. Each card has a
+slot (one per player's profile, one for the leaderboard) holding the hash it was drawn from and the
+PNG: a repeat command whose stats have not changed is a dict lookup, and any changed stat gives a
+new hash, so the card is redrawn and replaces the stale one.
+"""
+import asyncio
+import hashlib
+import io
+import multiprocessing
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+import discord
+from PIL import Image, ImageDraw, ImageFont
+from money import units_to_dc
+
+CARD_WORKERS = 2
+CARD_CACHE_SIZE = 2_000
+SPARKLINE_ROUNDS = 30
+AVATAR_SIZE = 176
+
+BACKGROUND = (30, 31, 34)
+PANEL = (43, 45, 49)
+TEXT = (242, 243, 245)
+MUTED = (148, 155, 164)
+GOLD = (241, 196, 15)
+RED = (231, 76, 60)
+GREEN = (46, 204, 113)
+MEDALS = {1: GOLD, 2: (192, 192, 192), 3: (205, 127, 50)}
+
+# Loaded once per worker process
+_fonts = {}
+
+
+def _font(size, bold=False):
+    key = (size, bold)
+    if key not in _fonts:
+        try:
+            # Pillow finds the file under /usr/share/fonts
+            _fonts[key] = ImageFont.truetype("DejaVuSans-Bold.ttf" if bold else "DejaVuSans.ttf", size)
+        except OSError:
+            # Latin-1 only, so card text sticks to Latin-1 punctuation
+            _fonts[key] = ImageFont.load_default()
+    return _fonts[key]
+
+
+def _load_fonts():
+    for size in (14, 16, 20, 34, 40):
+        _font(size)
+        _font(size, bold=True)
+
+
+def _fit(draw, text, font, width):
+    """Cuts `text` down with an ellipsis until it fits in `width` pixels."""
+    if draw.textlength(text, font=font) <= width:
+        return text
+    while text and draw.textlength(text + "...", font=font) > width:
+        text = text[:-1]
+    return text + "..."
+
+
+def _text_right(draw, x, y, text, font, fill):
+    # Anchors need a FreeType font; measuring also works with the fallback bitmap font
+    draw.text((x - draw.textlength(text, font=font), y), text, font=font, fill=fill)
+
+
+def _png(image):
+    buffer = io.BytesIO()
+    image.save(buffer, "PNG")
+    return buffer.getvalue()
+
+
+def _avatar(avatar, name, accent):
+    """A round avatar with an accent ring; the player's initial when there is no image."""
+    size = AVATAR_SIZE
+    if avatar:
+        face = Image.open(io.BytesIO(avatar)).convert("RGBA").resize((size, size), Image.LANCZOS)
+    else:
+        face = Image.new("RGBA", (size, size), PANEL)
+        draw = ImageDraw.Draw(face)
+        initial = (name[:1] or "?").upper()
+        font = _font(40, bold=True)
+        left, top, right, bottom = draw.textbbox((0, 0), initial, font=font)
+        draw.text(((size - right - left) / 2, (size - bottom - top) / 2), initial, font=font, fill=TEXT)
+    mask = Image.new("L", (size, size), 0)
+    ImageDraw.Draw(mask).ellipse((0, 0, size - 1, size - 1), fill=255)
+    ring = Image.new("RGBA", (size + 12, size + 12), (0, 0, 0, 0))
+    ImageDraw.Draw(ring).ellipse((0, 0, size + 11, size + 11), fill=accent)
+    ring.paste(face, (6, 6), mask)
+    return ring
+
+
+def _sparkline(draw, box, pnl):
+    """Cumulative net result of the last rounds, oldest on the left, with the break-even line."""
+    left, top, right, bottom = box
+    draw.rounded_rectangle(box, radius=10, fill=PANEL)
+    total = units_to_dc(sum(pnl))
+    draw.text((left + 14, top + 8), f"Last {len(pnl)} rounds" if pnl else "No rounds yet", font=_font(14), fill=MUTED)
+    if pnl:
+        _text_right(draw, right - 14, top + 8, f"{total:+,.2f} DC", _font(14, bold=True), GREEN if total >= 0 else RED)
+    if len(pnl) < 2:
+        return
+    points = [0]
+    for net in pnl:
+        points.append(points[-1] + net)
+    low, high = min(points), max(points)
+    span = (high - low) or 1
+    plot_top, plot_bottom = top + 32, bottom - 10
+    plot_left, plot_right = left + 14, right - 14
+    step = (plot_right - plot_left) / (len(points) - 1)
+
+    def y(value):
+        return plot_bottom - (value - low) / span * (plot_bottom - plot_top)
+    zero = y(0)
+    for x in range(plot_left, plot_right, 12):
+        draw.line((x, zero, min(x + 6, plot_right), zero), fill=MUTED, width=1)
+    draw.line([(plot_left + i * step, y(value)) for i, value in enumerate(points)], fill=GREEN if points[-1] >= 0 else RED, width=3, joint="curve")
+
+
+def render_profile_card(stats, avatar):
+    """Draws a profile card and returns it as PNG bytes; runs in a worker process.
+
+    `stats` is CardRenderer.profile's tuple of plain values, `avatar` the image bytes or None.
+    """
+    name, is_elite, _avatar_key, balance, wagered, won, games, rank, pnl = stats
+    accent = GOLD if is_elite else RED
+    image = Image.new("RGB", (900, 320), BACKGROUND)
+    draw = ImageDraw.Draw(image)
+    draw.rectangle((0, 0, 7, 319), fill=accent)
+    ring = _avatar(avatar, name, accent)
+    image.paste(ring, (34, 34), ring)
+
+    rank_text = f"#{rank:,}"
+    rank_font = _font(40, bold=True)
+    _text_right(draw, 866, 26, rank_text, rank_font, accent)
+    _text_right(draw, 866, 74, "RANK", _font(14), MUTED)
+    name_width = 866 - 250 - draw.textlength(rank_text, font=rank_font) - 24
+    draw.text((250, 30), _fit(draw, name, _font(34, bold=True), name_width), font=_font(34, bold=True), fill=TEXT)
+    draw.text((250, 76), "Elite Dragon" if is_elite else "Dragon", font=_font(20), fill=accent)
+
+    columns = (("BALANCE", f"{balance:,.2f}"), ("WAGERED", f"{wagered:,.2f}"), ("WON", f"{won:,.2f}"), ("GAMES", f"{games:,}"))
+    for i, (label, value) in enumerate(columns):
+        left = 250 + i * 156
+        draw.rounded_rectangle((left, 120, left + 146, 190), radius=10, fill=PANEL)
+        draw.text((left + 12, 130), label, font=_font(14), fill=MUTED)
+        draw.text((left + 12, 154), _fit(draw, value, _font(20, bold=True), 124), font=_font(20, bold=True), fill=TEXT)
+
+    _sparkline(draw, (250, 206, 866, 292), pnl)
+    draw.text((34, 250), "Dragon Casino", font=_font(16, bold=True), fill=MUTED)
+    draw.text((34, 272), "Amounts in DC", font=_font(14), fill=MUTED)
+    return _png(image)
+
+
+def render_leaderboard_card(rows, _avatar=None):
+    """Draws the leaderboard as PNG bytes from (username, balance, wagered, won, games) rows in micro-DC."""
+    height = 110 + 64 * len(rows) + 16
+    image = Image.new("RGB", (900, height), BACKGROUND)
+    draw = ImageDraw.Draw(image)
+    draw.rectangle((0, 0, 899, 7), fill=GOLD)
+    draw.text((34, 28), "Dragon Casino Leaderboard", font=_font(34, bold=True), fill=TEXT)
+    draw.text((34, 72), f"Top {len(rows)} players by Dragon Coin balance", font=_font(16), fill=MUTED)
+
+    for rank, (username, balance, wagered, won, games) in enumerate(rows, 1):
+        top = 110 + 64 * (rank - 1)
+        draw.rounded_rectangle((24, top, 876, top + 56), radius=10, fill=PANEL)
+        medal = MEDALS.get(rank)
+        draw.ellipse((38, top + 10, 74, top + 46), fill=medal or BACKGROUND)
+        label = str(rank)
+        left, label_top, right, label_bottom = draw.textbbox((0, 0), label, font=_font(16, bold=True))
+        draw.text((56 - (right + left) / 2, top + 28 - (label_bottom + label_top) / 2), label, font=_font(16, bold=True), fill=BACKGROUND if medal else TEXT)
+
+        balance_text = f"{units_to_dc(balance):,.2f} DC"
+        _text_right(draw, 860, top + 8, balance_text, _font(20, bold=True), medal or TEXT)
+        name_width = 860 - 92 - draw.textlength(balance_text, font=_font(20, bold=True)) - 24
+        draw.text((92, top + 8), _fit(draw, username or "Unknown", _font(20, bold=True), name_width), font=_font(20, bold=True), fill=TEXT)
+        details = f"Wagered {units_to_dc(wagered or 0):,.2f} · Won {units_to_dc(won or 0):,.2f} · {games or 0:,} games"
+        draw.text((92, top + 34), details, font=_font(14), fill=MUTED)
+    return _png(image)
+
+
+def balance_rank(db_conn, user_id):
+    """1 + the number of players with a higher balance; a count over idx_users_balance."""
+    return db_conn.execute(
+        "SELECT COUNT(*) + 1 FROM users WHERE dragon_coins > (SELECT dragon_coins FROM users WHERE user_id = ?)", (user_id,)
+    ).fetchone()[0]
+
+
+def recent_pnl(db_conn, user_id, rounds=SPARKLINE_ROUNDS):
+    """Net result in micro-DC of a player's last `rounds` rounds, oldest first; one primary-key range read."""
+    rows = db_conn.execute("SELECT payout - stake FROM rounds WHERE user_id = ? ORDER BY round_id DESC LIMIT ?", (user_id, rounds)).fetchall()
+    return tuple(row[0] for row in reversed(rows))
+
+
+class CardRenderer:
+    """Renders profile and leaderboard cards in a process pool and caches them by content hash.
+
+    The stats a card shows are read on every command, which is cheap; only a hash that differs
+    from the one in the card's slot leads to a render. Concurrent requests for the same card share
+    one render, the way UserCache shares a fetch. Until start() has run, or after the pool broke,
+    only cached cards are served and anything else raises, so commands fall back to text.
+    """
+
+    def __init__(self, bot, workers=CARD_WORKERS, max_size=CARD_CACHE_SIZE):
+        self.bot = bot
+        self.workers = workers
+        self.max_size = max_size
+        self.pool = None
+        self.broken = False
+        # slot -> (content hash, PNG bytes), least recently used first
+        self.cards = OrderedDict()
+        self.in_flight = {}
+
+    def __len__(self):
+        return len(self.cards)
+
+    def start(self):
+        """Starts the worker processes.
+
+        Workers are forked: the entry scripts import main without a __main__ guard, so a spawned
+        worker would start a second bot. A fork pool starts every worker on its first task, so
+        that is done here, before the process is busy, and each worker loads its fonts.
+        """
+        if self.pool is not None or self.broken:
+            return
+        self.pool = ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context("fork"))
+        for _ in range(self.workers):
+            self.pool.submit(_load_fonts)
+
+    def stop_broken_pool(self):
+        """Shuts down a pool whose worker died and stops rendering until restart.
+
+        A replacement pool would be forked from the running bot, whose threads (SQLite, aiohttp,
+        executor workers) may hold locks the child inherits, so none is started.
+        """
+        if self.pool is None:
+            return
+        self.pool.shutdown(wait=False, cancel_futures=True)
+        self.pool = None
+        self.broken = True
+        print("[CARDS] A card worker died; serving cached cards and text until restart")
+
+    async def profile(self, member, name, is_elite, balance, wagered, won, games):
+        """A member's profile card as PNG bytes; balance, wagered and won in DC."""
+        db_conn = self.bot.db_conn
+        avatar = member.display_avatar
+        stats = (name, is_elite, avatar.key, balance, wagered, won, games, balance_rank(db_conn, member.id), recent_pnl(db_conn, member.id))
+        return await self._card(("profile", member.id), stats, render_profile_card, avatar)
+
+    async def leaderboard(self, rows):
+        """The leaderboard card for (username, balance, wagered, won, games) rows in micro-DC."""
+        return await self._card(("leaderboard",), tuple(rows), render_leaderboard_card)
+
+    async def _card(self, slot, stats, render, avatar=None):
+        digest = hashlib.sha256(repr(stats).encode()).digest()
+        entry = self.cards.get(slot)
+        if entry is not None and entry[0] == digest:
+            self.cards.move_to_end(slot)
+            self.bot.metrics.card_renders.inc(slot[0], "cache")
+            return entry[1]
+        if self.pool is None:
+            raise RuntimeError("card workers are not running")
+        task = self.in_flight.get(digest)
+        if task is None:
+            task = self.in_flight[digest] = asyncio.ensure_future(self._render(slot, digest, stats, render, avatar))
+            self.bot.metrics.card_renders.inc(slot[0], "render")
+        else:
+            self.bot.metrics.card_renders.inc(slot[0], "shared")
+        # Shielded so one caller being cancelled does not cancel the render the others are waiting on
+        return await asyncio.shield(task)
+
+    async def _render(self, slot, digest, stats, render, avatar):
+        try:
+            image = None
+            if avatar is not None:
+                try:
+                    image = await avatar.with_static_format("png").with_size(256).read()
+                except discord.HTTPException as e:
+                    print(f"[CARDS] Could not fetch avatar, drawing the initial instead: {e}")
+            try:
+                png = await asyncio.get_running_loop().run_in_executor(self.pool, render, stats, image)
+            except BrokenProcessPool:
+                self.stop_broken_pool()
+                raise
+        finally:
+            self.in_flight.pop(digest, None)
+        self.cards[slot] = (digest, png)
+        self.cards.move_to_end(slot)
+        if len(self.cards) > self.max_size:
+            self.cards.popitem(last=False)
+        return png
@@ -0,0 +1,95 @@
+class Conversation:
+    """One user's multi-step prompt flow (e.g. .deposit) in one channel."""
+    __slots__ = ("user_id", "channel_id", "kind", "step", "data", "timer", "busy")
+
+    def __init__(self, user_id, channel_id, kind, step, data):
+        self.user_id = user_id
+        self.channel_id = channel_id
+        self.kind = kind
+        self.step = step
+        self.data = data
+        self.timer = None
+        self.busy = False
+
+
+class ConversationManager:
+    """Routes chat replies to open conversations by (user_id, channel_id).
+
+    Replaces stacked `bot.wait_for('message', check=...)` listeners, whose checks all run against
+    every incoming message, with one dict lookup per message. Each conversation is an explicit
+    step name plus its collected data; every step registers a reply handler and an optional
+    timeout handler, and step timeouts run on the shared timing wheel. Nothing is tied to a
+    pending future or a Context, so open conversations carry on across gateway reconnects.
+    """
+
+    def __init__(self, wheel):
+        self.wheel = wheel
+        self._active = {}
+        self._steps = {}
+
+    def register_step(self, kind, step, on_reply, on_timeout=None):
+        """`on_reply(conversation, message)` handles the user's reply; `on_timeout(conversation)` runs if none comes.
+
+        A step with no reply handler waits on something else, such as a button, and lets chat through.
+        """
+        self._steps[(kind, step)] = (on_reply, on_timeout)
+
+    def step_handlers(self):
+        """{(kind, step): on_reply} for every registered step."""
+        return {key: on_reply for key, (on_reply, _) in self._steps.items()}
+
+    def start(self, user_id, channel_id, kind, step, timeout, **data):
+        """Opens a conversation, replacing any the user already had open in this channel."""
+        previous = self._active.get((user_id, channel_id))
+        if previous is not None:
+            self.end(previous)
+        conversation = Conversation(user_id, channel_id, kind, step, data)
+        conversation.timer = self.wheel.schedule(timeout, self._expire, conversation)
+        self._active[(user_id, channel_id)] = conversation
+        return conversation
+
+    def goto(self, conversation, step, timeout):
+        """Moves a conversation to its next step and restarts the step timeout."""
+        conversation.step = step
+        self.wheel.reschedule(conversation.timer, timeout)
+
+    def end(self, conversation):
+        if self._active.get((conversation.user_id, conversation.channel_id)) is conversation:
+            del self._active[(conversation.user_id, conversation.channel_id)]
+        self.wheel.cancel(conversation.timer)
+
+    def is_open(self, conversation):
+        return self._active.get((conversation.user_id, conversation.channel_id)) is conversation
+
+    def get(self, user_id, channel_id):
+        return self._active.get((user_id, channel_id))
+
+    async def dispatch(self, message):
+        """Feeds a message to its author's open conversation in that channel. Returns True if it was consumed."""
+        conversation = self._active.get((message.author.id, message.channel.id))
+        if conversation is None or conversation.busy:
+            return False
+        on_reply = self._steps[(conversation.kind, conversation.step)][0]
+        if on_reply is None:
+            return False
+        conversation.busy = True
+        try:
+            await on_reply(conversation, message)
+        finally:
+            conversation.busy = False
+        return True
+
+    async def _expire(self, conversations):
+        for conversation in conversations:
+            if not self.is_open(conversation):
+                continue
+            del self._active[(conversation.user_id, conversation.channel_id)]
+            on_timeout = self._steps[(conversation.kind, conversation.step)][1]
+            if on_timeout is not None:
+                try:
+                    await on_timeout(conversation)
+                except Exception as e:
+                    print(f"[CONVERSATIONS] Error timing out {conversation.kind} step '{conversation.step}': {e}")
+
+    def __len__(self):
+        return len(self._active)
@@ -0,0 +1,140 @@
+import time
+from money import dc_to_units, units_to_dc
+from treasury import apply_totals, read_totals
+from rounds import record_round
+
+# Extra time a reservation stays open after its game view would have timed out
+ESCROW_GRACE_SECONDS = 60
+
+
+class Escrow:
+    """Holds stakes of in-flight games in the escrow_reservations table.
+
+    A stake is moved out of the user's balance and into an open reservation in a single
+    transaction, guarded by `dragon_coins >= stake`. The reservation is later settled with a
+    payout or refunded by id; anything left open past its expiry is refunded in bulk.
+    Stakes and payouts are passed in DC and stored in micro-DC.
+    """
+
+    def __init__(self, ledger):
+        self.ledger = ledger
+
+    def reserve(self, user_id, username, game, stake, ttl):
+        """Debits `stake` into a new open reservation and takes the round's provably fair nonce.
+
+        The nonce is claimed in the same UPDATE as the debit, so rounds drawn concurrently (from any
+        shard process, or while another game is still open) never share one. Returns
+        (reservation_id, balance_before, nonce), or (None, None, None) if the balance is insufficient.
+        """
+        stake = dc_to_units(stake)
+        if stake <= 0:
+            return None, None, None
+        conn = self.ledger.db_conn
+        cursor = conn.cursor()
+        cursor.execute(
+            "UPDATE users SET dragon_coins = dragon_coins - ?, username = ?, nonce = nonce + 1 WHERE user_id = ? AND dragon_coins >= ? RETURNING dragon_coins, nonce - 1",
+            (stake, username, user_id, stake)
+        )
+        rows = cursor.fetchall()
+        if not rows:
+            # The UPDATE opened a write transaction even though it matched nothing; end it so the lock is released
+            conn.rollback()
+            return None, None, None
+        balance_after, nonce = rows[0]
+        balance_before = units_to_dc(balance_after + stake)
+        now = int(time.time())
+        cursor.execute(
+            "INSERT INTO escrow_reservations (user_id, game, stake, status, created_at, expires_at) VALUES (?, ?, ?, 'open', ?, ?)",
+            (user_id, game, stake, now, now + ttl + ESCROW_GRACE_SECONDS)
+        )
+        apply_totals(cursor, user_balances=-stake, escrow_open=stake, escrow_open_count=1)
+        conn.commit()
+        return cursor.lastrowid, balance_before, nonce
+
+    def extend(self, reservation_id, ttl):
+        """Pushes back the expiry of an open reservation, e.g. after a move in a long-running game."""
+        conn = self.ledger.db_conn
+        conn.execute(
+            "UPDATE escrow_reservations SET expires_at = ? WHERE reservation_id = ? AND status = 'open'",
+            (int(time.time()) + ttl + ESCROW_GRACE_SECONDS, reservation_id)
+        )
+        conn.commit()
+
+    def settle(self, reservation_id, payout, username=None, round_info=None):
+        """Closes an open reservation, credits `payout` and records the round in the user's stats.
+
+        `username` refreshes the stored name when known. `round_info` is (seed_epoch, client_seed,
+        nonce, packed outcome); with it the round is added to the player's history (rounds.py).
+        Returns False if the reservation was already settled or refunded.
+        """
+        payout = dc_to_units(payout)
+        conn = self.ledger.db_conn
+        cursor = conn.cursor()
+        now = int(time.time())
+        cursor.execute(
+            "UPDATE escrow_reservations SET status = 'settled', payout = ?, settled_at = ? WHERE reservation_id = ? AND status = 'open' RETURNING user_id, stake, game",
+            (payout, now, reservation_id)
+        )
+        rows = cursor.fetchall()
+        if not rows:
+            conn.commit()
+            return False
+        user_id, stake, game = rows[0]
+        # The round's nonce was already taken by reserve
+        self.ledger.record_game(cursor, user_id, stake, payout, username, advance_nonce=False)
+        if round_info is not None:
+            record_round(cursor, reservation_id, user_id, game, stake, payout, now, *round_info)
+        # update_game_stats counted the payout against the house; the stake comes back to it out of escrow
+        apply_totals(cursor, escrow_open=-stake, escrow_open_count=-1, house_pnl=stake)
+        conn.commit()
+        return True
+
+    def refund(self, reservation_id):
+        """Returns the stake of an open reservation to the user. Returns False if it was already closed."""
+        conn = self.ledger.db_conn
+        cursor = conn.cursor()
+        cursor.execute(
+            "UPDATE escrow_reservations SET status = 'refunded', payout = stake, settled_at = ? WHERE reservation_id = ? AND status = 'open' RETURNING user_id, stake",
+            (int(time.time()), reservation_id)
+        )
+        rows = cursor.fetchall()
+        if not rows:
+            conn.commit()
+            return False
+        user_id, stake = rows[0]
+        cursor.execute("UPDATE users SET dragon_coins = dragon_coins + ? WHERE user_id = ?", (stake, user_id))
+        apply_totals(cursor, user_balances=stake, escrow_open=-stake, escrow_open_count=-1)
+        conn.commit()
+        return True
+
+    def sweep_expired(self):
+        """Refunds every open reservation past its expiry in one transaction. Returns (count, total_stake in DC)."""
+        conn = self.ledger.db_conn
+        cursor = conn.cursor()
+        now = int(time.time())
+        cursor.execute(
+            "SELECT COUNT(*), COALESCE(SUM(stake), 0) FROM escrow_reservations WHERE status = 'open' AND expires_at <= ?",
+            (now,)
+        )
+        count, total = cursor.fetchone()
+        if count == 0:
+            return 0, 0.0
+        cursor.execute("""
+            UPDATE users SET dragon_coins = dragon_coins + (
+                SELECT SUM(stake) FROM escrow_reservations e
+                WHERE e.user_id = users.user_id AND e.status = 'open' AND e.expires_at <= ?
+            )
+            WHERE user_id IN (SELECT user_id FROM escrow_reservations WHERE status = 'open' AND expires_at <= ?)
+        """, (now, now))
+        cursor.execute(
+            "UPDATE escrow_reservations SET status = 'refunded', payout = stake, settled_at = ? WHERE status = 'open' AND expires_at <= ?",
+            (now, now)
+        )
+        apply_totals(cursor, user_balances=total, escrow_open=-total, escrow_open_count=-count)
+        conn.commit()
+        return count, units_to_dc(total)
+
+    def open_exposure(self):
+        """Returns (open_count, open_stake_total) across all in-flight games, from the treasury running totals."""
+        totals = read_totals(self.ledger.db_conn)
+        return totals.get("escrow_open_count", 0), units_to_dc(totals.get("escrow_open", 0))
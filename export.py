@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""Streaming exports of game rounds and bot_transactions as gzip'd CSV or JSONL.
+
+Rows are read from an iterating cursor on a read-only connection and written one at a time, so
+memory use is the same for ten rows or ten million. Output is split into parts that each stay
+under Discord's attachment limit. The bot runs exports in a worker thread (.export); accountants can
+run the same export offline.
+
+Usage: python export.py rounds|transactions [--user USER_ID] [--format csv|jsonl] [--out DIR]  (database from DB_FILE)
+"""
+import argparse
+import csv
+import gzip
+import io
+import json
+import os
+import sqlite3
+import time
+from money import units_to_dc, lamports_to_sol
+from rounds import GAME_NAMES, describe_outcome
+
+EXPORT_DIR = "exports"
+FORMATS = ("csv", "jsonl")
+# Discord's default attachment limit is 10 MiB. zlib holds back some output before it reaches the
+# file, so a part is closed once it reaches MAX_PART_BYTES minus PART_HEADROOM
+MAX_PART_BYTES = 8 * 1024 * 1024
+PART_HEADROOM = 1024 * 1024
+# About 20% faster than gzip's default of 9 for under 1% larger files
+GZIP_LEVEL = 6
+
+ROUND_COLUMNS = ("round_id", "user_id", "game", "stake_dc", "payout_dc", "settled_at", "seed_epoch", "client_seed", "nonce", "outcome", "outcome_packed")
+TRANSACTION_COLUMNS = ("transaction_id", "user_id", "recipient", "transaction_type", "status", "dc_amount", "sol_amount", "sol_address", "tx_hash", "timestamp")
+
+
+def _utc(timestamp):
+    # Same format as bot_transactions.timestamp
+    return time.strftime("%Y-%m-%d %H:%M:%S", time.gmtime(timestamp))
+
+
+def iter_rounds(db_conn, user_id=None):
+    """Yields round rows in primary-key order, converted for export."""
+    where, params = ("WHERE user_id = ?", (user_id,)) if user_id is not None else ("", ())
+    for round_id, row_user_id, game_code, stake, payout, settled_at, seed_epoch, client_seed, nonce, outcome in db_conn.execute(f"""
+        SELECT round_id, user_id, game, stake, payout, settled_at, seed_epoch, client_seed, nonce, outcome
+        FROM rounds {where} ORDER BY user_id, round_id
+    """, params):
+        game = GAME_NAMES[game_code]
+        yield (round_id, row_user_id, game, units_to_dc(stake), units_to_dc(payout), _utc(settled_at),
+               seed_epoch, client_seed, nonce, describe_outcome(game, outcome), outcome)
+
+
+def iter_transactions(db_conn, user_id=None):
+    """Yields bot_transactions rows in id order, with amounts in DC and SOL."""
+    where, params = ("WHERE user_id = ?", (user_id,)) if user_id is not None else ("", ())
+    for row in db_conn.execute(f"""
+        SELECT transaction_id, user_id, recipient, transaction_type, status, dc_amount, sol_amount, sol_address, tx_hash, timestamp
+        FROM bot_transactions {where} ORDER BY transaction_id
+    """, params):
+        dc_units, lamports = row[5], row[6]
+        yield row[:5] + (units_to_dc(dc_units or 0), lamports_to_sol(lamports or 0)) + row[7:]
+
+
+# export kind -> (columns, row generator)
+EXPORTS = {
+    "rounds": (ROUND_COLUMNS, iter_rounds),
+    "transactions": (TRANSACTION_COLUMNS, iter_transactions),
+}
+
+
+class ExportPart:
+    """One gzip'd output file; `size` is how many compressed bytes have reached the disk."""
+
+    def __init__(self, path, fmt, columns):
+        self.path = path
+        self.raw = open(path, "wb")
+        self.text = io.TextIOWrapper(gzip.GzipFile(fileobj=self.raw, mode="wb", compresslevel=GZIP_LEVEL), encoding="utf-8", newline="")
+        self.columns = columns
+        if fmt == "csv":
+            self.write = csv.writer(self.text).writerow
+            self.write(columns)
+        else:
+            self.write = self._write_json
+
+    def _write_json(self, row):
+        self.text.write(json.dumps(dict(zip(self.columns, row))) + "\n")
+
+    @property
+    def size(self):
+        return self.raw.tell()
+
+    def close(self):
+        # Closing the text wrapper finishes the gzip stream; the file object passed to GzipFile stays open
+        self.text.close()
+        self.raw.close()
+
+
+def write_export(db_file, kind, fmt="csv", user_id=None, out_dir=EXPORT_DIR, max_bytes=MAX_PART_BYTES):
+    """Streams one export into gzip'd parts in `out_dir`. Returns (part paths, row count).
+
+    Opens its own read-only connection, so it can run in a worker thread while the bot keeps
+    writing. The rows come from one SELECT, a consistent snapshot of the moment it started. No files
+    are written when there are no rows.
+    """
+    columns, rows = EXPORTS[kind]
+    part_limit = max_bytes - min(PART_HEADROOM, max_bytes // 4)
+    os.makedirs(out_dir, exist_ok=True)
+    stem = os.path.join(out_dir, f"{kind}_{user_id or 'all'}_{time.strftime('%Y%m%d_%H%M%S', time.gmtime())}")
+    db_conn = sqlite3.connect(f"file:{db_file}?mode=ro", uri=True)
+    paths = []
+    count = 0
+    part = None
+    try:
+        for row in rows(db_conn, user_id):
+            if part is None or part.size >= part_limit:
+                if part is not None:
+                    part.close()
+                part = ExportPart(f"{stem}_part{len(paths) + 1}.{fmt}.gz", fmt, columns)
+                paths.append(part.path)
+            part.write(row)
+            count += 1
+    finally:
+        if part is not None:
+            part.close()
+        db_conn.close()
+    return paths, count
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export game rounds or transactions as gzip'd CSV/JSONL parts.")
+    parser.add_argument("kind", choices=sorted(EXPORTS))
+    parser.add_argument("--user", type=int, help="only this user's rows (default: everyone)")
+    parser.add_argument("--format", choices=FORMATS, default="csv")
+    parser.add_argument("--out", default=EXPORT_DIR, help=f"output directory (default: {EXPORT_DIR})")
+    parser.add_argument("--max-bytes", type=int, default=MAX_PART_BYTES, help="target size of each part")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    paths, count = write_export(os.getenv("DB_FILE", "dragon_casino.db"), args.kind, args.format, args.user, args.out, args.max_bytes)
+    for path in paths:
+        print(f"{path}  {os.path.getsize(path):,} bytes")
+    print(f"[EXPORT] {count:,} {args.kind} rows in {len(paths)} parts, {time.perf_counter() - started:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
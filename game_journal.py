@@ -0,0 +1,87 @@
+import time
+from escrow import ESCROW_GRACE_SECONDS
+from money import dc_to_units, units_to_dc
+
+
+def encode_tile(tile_index):
+    """Encodes a Mines tile index (0-24) as a single journal character."""
+    return chr(ord('a') + tile_index)
+
+
+def decode_tiles(actions):
+    """Decodes a Mines journal action string back into tile indices."""
+    return [ord(action) - ord('a') for action in actions]
+
+
+class GameJournal:
+    """Persists in-flight Blackjack and Mines games compactly so they can be replayed after a restart.
+
+    A game is stored as its provably fair seed, bet parameters and the string of actions taken
+    (one character per move). Rows are keyed by the game's escrow reservation id. The journal
+    belongs to the ledger, since a move also pushes back the game's escrow expiry; with the ledger
+    service these writes go through it like every other escrow write.
+    """
+
+    def __init__(self, ledger):
+        self.ledger = ledger
+
+    def open_game(self, reservation_id, user_id, game, seed, client_seed, nonce, bet, mines_count, channel_id, message_id, extra_message_id=None, seed_epoch=None, guild_id=None):
+        """Journals a newly started game; `seed_epoch` is the server seed epoch its seed was drawn in, `guild_id` 0 in DMs."""
+        conn = self.ledger.db_conn
+        conn.execute("""
+            INSERT OR REPLACE INTO game_journal
+                (reservation_id, user_id, game, seed, client_seed, nonce, bet, mines_count, actions, channel_id, message_id, extra_message_id, updated_at, seed_epoch, guild_id)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, '', ?, ?, ?, ?, ?, ?)
+        """, (reservation_id, user_id, game, seed, client_seed, nonce, dc_to_units(bet), mines_count, channel_id, message_id, extra_message_id, int(time.time()), seed_epoch, guild_id))
+        conn.commit()
+
+    def record_move(self, reservation_id, action, ttl):
+        """Appends one action and pushes back the reservation's expiry in the same commit."""
+        conn = self.ledger.db_conn
+        now = int(time.time())
+        conn.execute(
+            "UPDATE game_journal SET actions = actions || ?, updated_at = ? WHERE reservation_id = ?",
+            (action, now, reservation_id)
+        )
+        conn.execute(
+            "UPDATE escrow_reservations SET expires_at = ? WHERE reservation_id = ? AND status = 'open'",
+            (now + ttl + ESCROW_GRACE_SECONDS, reservation_id)
+        )
+        conn.commit()
+
+    def close_game(self, reservation_id):
+        """Drops a finished game from the journal."""
+        conn = self.ledger.db_conn
+        conn.execute("DELETE FROM game_journal WHERE reservation_id = ?", (reservation_id,))
+        conn.commit()
+
+    def resume_open_games(self, ttl):
+        """Extends journaled games whose stake is still in escrow by `ttl` so players can continue after a restart.
+
+        Journal rows of games that were settled or refunded are purged in the same pass. Returns
+        how many games are left to restore.
+        """
+        conn = self.ledger.db_conn
+        cursor = conn.cursor()
+        now = int(time.time())
+        cursor.execute("""
+            DELETE FROM game_journal WHERE reservation_id NOT IN (
+                SELECT reservation_id FROM escrow_reservations WHERE status = 'open' AND expires_at > ?
+            )
+        """, (now,))
+        cursor.execute("""
+            UPDATE escrow_reservations SET expires_at = ?
+            WHERE status = 'open' AND reservation_id IN (SELECT reservation_id FROM game_journal)
+        """, (now + ttl + ESCROW_GRACE_SECONDS,))
+        count = cursor.execute("SELECT COUNT(*) FROM game_journal").fetchone()[0]
+        conn.commit()
+        return count
+
+
+def load_open_games(db_conn):
+    """Returns every journaled game, bets in DC; run GameJournal.resume_open_games first."""
+    rows = db_conn.execute("""
+        SELECT reservation_id, user_id, game, seed, client_seed, nonce, bet, mines_count, actions, channel_id, message_id, extra_message_id, seed_epoch, guild_id
+        FROM game_journal
+    """).fetchall()
+    return [row[:6] + (units_to_dc(row[6]),) + row[7:] for row in rows]
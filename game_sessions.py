@@ -0,0 +1,62 @@
+class GameSession:
+    """Compact in-memory state of one open game round, keyed by its escrow reservation id."""
+    __slots__ = ("game_id", "game", "user_id", "bet", "state", "timeout", "timer", "channel_id", "message_id", "extra_message_id")
+
+    def __init__(self, game_id, game, user_id, bet, state, timeout, channel_id=None, message_id=None, extra_message_id=None):
+        self.game_id = game_id
+        self.game = game
+        self.user_id = user_id
+        self.bet = bet
+        self.state = state
+        self.timeout = timeout
+        self.timer = None
+        self.channel_id = channel_id
+        self.message_id = message_id
+        self.extra_message_id = extra_message_id
+
+
+class GameSessions:
+    """Registry of open game rounds. Button clicks find their round here by the id in the custom_id.
+
+    Idle timeouts are kept on the shared timing wheel; rounds that time out are removed and handed
+    to `on_expire` in one batch per tick.
+    """
+
+    def __init__(self, wheel, on_expire):
+        self._sessions = {}
+        self.wheel = wheel
+        self.on_expire = on_expire
+
+    def open(self, game_id, game, user_id, bet, state, timeout, channel_id=None, message_id=None, extra_message_id=None):
+        session = GameSession(game_id, game, user_id, bet, state, timeout, channel_id, message_id, extra_message_id)
+        session.timer = self.wheel.schedule(timeout, self._expire, session)
+        self._sessions[game_id] = session
+        return session
+
+    def get(self, game_id):
+        return self._sessions.get(game_id)
+
+    def close(self, game_id):
+        """Removes a round. Returns the session, or None if it was already closed."""
+        session = self._sessions.pop(game_id, None)
+        if session is not None:
+            self.wheel.cancel(session.timer)
+        return session
+
+    def touch(self, session):
+        """Restarts the round's idle timeout after player activity."""
+        self.wheel.reschedule(session.timer, session.timeout)
+
+    async def _expire(self, sessions):
+        expired = [session for session in sessions if self._sessions.pop(session.game_id, None) is not None]
+        if expired:
+            await self.on_expire(expired)
+
+    def count_by_game(self):
+        counts = {}
+        for session in self._sessions.values():
+            counts[session.game] = counts.get(session.game, 0) + 1
+        return counts
+
+    def __len__(self):
+        return len(self._sessions)
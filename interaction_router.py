@@ -0,0 +1,71 @@
+import discord
+
+CUSTOM_ID_PREFIX = "dc"
+
+
+def game_custom_id(game, action, game_id, arg=None):
+    """Builds a component custom_id that carries everything the router needs: dc:<game>:<action>:<game_id>[:<arg>]."""
+    if arg is None:
+        return f"{CUSTOM_ID_PREFIX}:{game}:{action}:{game_id}"
+    return f"{CUSTOM_ID_PREFIX}:{game}:{action}:{game_id}:{arg}"
+
+
+def parse_custom_id(custom_id):
+    """Returns (game, action, game_id, arg) for a router custom_id, or None for anything else."""
+    parts = custom_id.split(":")
+    if len(parts) < 4 or parts[0] != CUSTOM_ID_PREFIX or not parts[3].isdigit():
+        return None
+    return parts[1], parts[2], int(parts[3]), parts[4] if len(parts) > 4 else None
+
+
+class InteractionRouter:
+    """Single dispatcher for all game button clicks.
+
+    Game messages are sent with components whose custom_id encodes the game and round id, and no
+    View is kept in discord.py's view store. Each click is routed here from on_interaction and
+    handed to the game's handler together with the round's session. Buttons in
+    `persistent_handlers` (admin posts) have no session: their handler gets the id and looks up
+    its own state, so they keep working across restarts for as long as the message exists.
+    """
+
+    def __init__(self, bot, handlers, persistent_handlers=None):
+        self.bot = bot
+        self.handlers = handlers
+        self.persistent_handlers = persistent_handlers or {}
+
+    async def dispatch(self, interaction: discord.Interaction):
+        if interaction.type != discord.InteractionType.component:
+            return
+        parsed = parse_custom_id(interaction.data.get("custom_id", ""))
+        if parsed is None:
+            return
+        game, action, game_id, arg = parsed
+        handler = self.handlers.get(game) or self.persistent_handlers.get(game)
+        if handler is None:
+            return
+
+        # Throttled before the session lookup, so a mashed button costs no more than this check
+        scope = self.bot.rate_limiter.check(interaction.user.id, interaction.channel_id, f"button:{game}")
+        if scope is not None:
+            self.bot.metrics.rate_limited.inc(f"button:{game}", scope)
+            if self.bot.rate_limiter.should_notice(interaction.user.id):
+                return await interaction.response.send_message("You're clicking too fast, slow down.", ephemeral=True)
+            return await interaction.response.defer()
+
+        if game in self.persistent_handlers:
+            target = game_id
+        else:
+            target = self.bot.game_sessions.get(game_id)
+            if target is None:
+                return await interaction.response.send_message("This game has already ended.", ephemeral=True)
+            if interaction.user.id != target.user_id:
+                return await interaction.response.send_message("This is not your game!", ephemeral=True)
+
+        metrics = self.bot.metrics
+        token = metrics.command_started(f"button:{game}:{action}")
+        failed = True
+        try:
+            await handler(self.bot, interaction, target, action, arg)
+            failed = False
+        finally:
+            metrics.command_finished(token, failed)
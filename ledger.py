@@ -0,0 +1,221 @@
+import secrets
+from escrow import Escrow
+from game_journal import GameJournal
+from money import dc_to_units, sol_to_lamports
+from treasury import apply_totals
+
+
+class Ledger:
+    """Balance-changing operations on the users, escrow_reservations and bot_transactions tables.
+
+    Every method that moves money updates the treasury running totals in the same transaction.
+    Methods take DC and SOL amounts and store them as integer micro-DC and lamports (see money.py).
+
+    In a single process the bot reaches a Ledger on its own SQLite connection through AsyncLedger.
+    In a sharded deployment the ledger service owns the only Ledger and shard processes reach it
+    through LedgerClient. Both expose the same coroutine methods, so call sites do not change.
+    """
+
+    def __init__(self, db_conn=None):
+        self.db_conn = db_conn
+        self.escrow = Escrow(self)
+        self.journal = GameJournal(self)
+
+    def attach(self, db_conn):
+        self.db_conn = db_conn
+
+    def _credit(self, cursor, user_id, dc_units, username):
+        client_seed = secrets.token_hex(16)
+
+        # Wager and usage counters are owned by the responsible-gaming tracker (usage_slots)
+        cursor.execute("""
+            INSERT INTO users (user_id, username, dragon_coins, client_seed)
+            VALUES (?, ?, ?, ?)
+            ON CONFLICT(user_id) DO UPDATE SET
+                dragon_coins = dragon_coins + excluded.dragon_coins,
+                username = excluded.username,
+                client_seed = CASE WHEN client_seed = 'default_seed' THEN excluded.client_seed ELSE client_seed END
+        """, (user_id, username, dc_units, client_seed))
+
+    def update_user_balance(self, user_id, amount_dc, username):
+        """Adds or subtracts DC from a user's balance, recorded as an adjustment (.give, .remove)."""
+        dc_units = dc_to_units(amount_dc)
+        cursor = self.db_conn.cursor()
+        self._credit(cursor, user_id, dc_units, username)
+        if dc_units:
+            cursor.execute("INSERT INTO bot_transactions (user_id, recipient, dc_amount, sol_amount, transaction_type, status) VALUES (?, ?, ?, 0, 'adjustment', 'completed')",
+                           (user_id, username, dc_units))
+            apply_totals(cursor, user_balances=dc_units, admin_adjustments=dc_units)
+        self.db_conn.commit()
+
+    def credit_deposit(self, user_id, username, dc_amount, sol_amount):
+        """Credits a deposit that needs no review (tip.cc tips to the bot)."""
+        dc_units, lamports = dc_to_units(dc_amount), sol_to_lamports(sol_amount)
+        cursor = self.db_conn.cursor()
+        self._credit(cursor, user_id, dc_units, username)
+        cursor.execute("INSERT INTO bot_transactions (user_id, recipient, sol_amount, dc_amount, transaction_type, status) VALUES (?, ?, ?, ?, 'deposit', 'completed')",
+                       (user_id, username, lamports, dc_units))
+        apply_totals(cursor, user_balances=dc_units, dc_deposited=dc_units, sol_deposited=lamports)
+        self.db_conn.commit()
+
+    def request_deposit(self, user_id, username, dc_amount, sol_amount, tx_hash):
+        """Records a deposit awaiting admin verification and counts it towards the wager requirement. Returns the request id."""
+        dc_units, lamports = dc_to_units(dc_amount), sol_to_lamports(sol_amount)
+        cursor = self.db_conn.cursor()
+        cursor.execute("INSERT INTO bot_transactions (user_id, recipient, sol_amount, dc_amount, tx_hash, transaction_type, status) VALUES (?, ?, ?, ?, ?, 'deposit', 'pending_verification')",
+                       (user_id, username, lamports, dc_units, tx_hash))
+        request_id = cursor.lastrowid
+        cursor.execute("""
+            INSERT INTO users (user_id, username, total_deposited)
+            VALUES (?, ?, ?)
+            ON CONFLICT(user_id) DO UPDATE SET
+                total_deposited = total_deposited + excluded.total_deposited
+        """, (user_id, username, dc_units))
+        apply_totals(cursor, dc_pending_deposits=dc_units, sol_pending_deposits=lamports)
+        self.db_conn.commit()
+        return request_id
+
+    def approve_deposit(self, request_id):
+        """Marks a pending deposit approved and credits it. Returns False if it was not pending."""
+        cursor = self.db_conn.cursor()
+        cursor.execute(
+            "UPDATE bot_transactions SET status = 'approved' WHERE transaction_id = ? AND transaction_type = 'deposit' AND status = 'pending_verification' RETURNING user_id, recipient, dc_amount, sol_amount",
+            (request_id,)
+        )
+        rows = cursor.fetchall()
+        if not rows:
+            self.db_conn.commit()
+            return False
+        user_id, username, dc_units, lamports = rows[0]
+        self._credit(cursor, user_id, dc_units, username)
+        apply_totals(cursor, user_balances=dc_units, dc_pending_deposits=-dc_units, sol_pending_deposits=-lamports,
+                     dc_deposited=dc_units, sol_deposited=lamports)
+        self.db_conn.commit()
+        return True
+
+    def request_withdrawal(self, user_id, username, dc_amount, sol_amount, sol_address):
+        """Debits `dc_amount` into a pending withdrawal. Returns the request id, or None if the balance is insufficient."""
+        dc_units, lamports = dc_to_units(dc_amount), sol_to_lamports(sol_amount)
+        cursor = self.db_conn.cursor()
+        cursor.execute(
+            "UPDATE users SET dragon_coins = dragon_coins - ?, username = ? WHERE user_id = ? AND dragon_coins >= ? RETURNING user_id",
+            (dc_units, username, user_id, dc_units)
+        )
+        if not cursor.fetchall():
+            self.db_conn.commit()
+            return None
+        cursor.execute("INSERT INTO bot_transactions (user_id, recipient, sol_address, sol_amount, dc_amount, transaction_type, status) VALUES (?, ?, ?, ?, ?, 'withdrawal', 'pending')",
+                       (user_id, username, sol_address, lamports, dc_units))
+        request_id = cursor.lastrowid
+        apply_totals(cursor, user_balances=-dc_units, dc_pending_withdrawals=dc_units, sol_pending_withdrawals=lamports)
+        self.db_conn.commit()
+        return request_id
+
+    def complete_withdrawal(self, request_id):
+        """Marks a pending withdrawal as sent. Returns False if it was not pending."""
+        cursor = self.db_conn.cursor()
+        cursor.execute(
+            "UPDATE bot_transactions SET status = 'completed' WHERE transaction_id = ? AND transaction_type = 'withdrawal' AND status = 'pending' RETURNING dc_amount, sol_amount",
+            (request_id,)
+        )
+        rows = cursor.fetchall()
+        if rows:
+            dc_units, lamports = rows[0]
+            apply_totals(cursor, dc_pending_withdrawals=-dc_units, sol_pending_withdrawals=-lamports, dc_withdrawn=dc_units, sol_withdrawn=lamports)
+        self.db_conn.commit()
+        return bool(rows)
+
+    def update_game_stats(self, user_id, wager, win_loss, username, commit=True):
+        """Updates user's gambling statistics and balance. A username of None keeps the stored name."""
+        self.record_game(self.db_conn.cursor(), user_id, dc_to_units(wager), dc_to_units(win_loss), username)
+        if commit:
+            self.db_conn.commit()
+
+    def record_game(self, cursor, user_id, wager, win_loss, username, advance_nonce=True):
+        """update_game_stats with amounts already in micro-DC, inside the caller's transaction.
+
+        Escrowed rounds pass advance_nonce=False, since Escrow.reserve already took their nonce.
+        """
+        client_seed = secrets.token_hex(16)
+
+        cursor.execute("""
+            INSERT INTO users (user_id, username, dragon_coins, total_wagered, total_won, games_played, nonce, client_seed, session_start_time)
+            VALUES (?, ?, ?, ?, ?, ?, 1, ?, CURRENT_TIMESTAMP)
+            ON CONFLICT(user_id) DO UPDATE SET
+                dragon_coins = dragon_coins + ?,
+                total_wagered = total_wagered + ?,
+                total_won = total_won + ?,
+                games_played = games_played + 1,
+                nonce = nonce + ?,
+                username = COALESCE(?, username),
+                client_seed = CASE WHEN client_seed = 'default_seed' THEN ? ELSE client_seed END
+        """, (user_id, username or f"User {user_id}", win_loss, wager, max(0, win_loss), 1, client_seed, win_loss, wager, max(0, win_loss), int(advance_nonce), username, client_seed))
+        apply_totals(cursor, user_balances=win_loss, house_pnl=-win_loss)
+
+
+class AsyncLedger:
+    """The bot's in-process ledger, with the coroutine methods of LedgerClient.
+
+    Each call runs inline on the bot's own connection: a local SQLite write takes well under a
+    millisecond, so there is nothing to wait on. Escrow and game journal methods live on the same
+    object, as they do on LedgerClient.
+    """
+
+    def __init__(self, db_conn=None):
+        self.ledger = Ledger(db_conn)
+        self.escrow = self
+        self.journal = self
+
+    def attach(self, db_conn):
+        self.ledger.attach(db_conn)
+
+    async def reserve(self, user_id, username, game, stake, ttl):
+        return self.ledger.escrow.reserve(user_id, username, game, stake, ttl)
+
+    async def extend(self, reservation_id, ttl):
+        self.ledger.escrow.extend(reservation_id, ttl)
+
+    async def settle(self, reservation_id, payout, username=None, round_info=None):
+        return self.ledger.escrow.settle(reservation_id, payout, username, round_info)
+
+    async def refund(self, reservation_id):
+        return self.ledger.escrow.refund(reservation_id)
+
+    async def sweep_expired(self):
+        return self.ledger.escrow.sweep_expired()
+
+    async def open_exposure(self):
+        return self.ledger.escrow.open_exposure()
+
+    async def update_user_balance(self, user_id, amount_dc, username):
+        self.ledger.update_user_balance(user_id, amount_dc, username)
+
+    async def update_game_stats(self, user_id, wager, win_loss, username, commit=True):
+        self.ledger.update_game_stats(user_id, wager, win_loss, username, commit)
+
+    async def credit_deposit(self, user_id, username, dc_amount, sol_amount):
+        self.ledger.credit_deposit(user_id, username, dc_amount, sol_amount)
+
+    async def request_deposit(self, user_id, username, dc_amount, sol_amount, tx_hash):
+        return self.ledger.request_deposit(user_id, username, dc_amount, sol_amount, tx_hash)
+
+    async def approve_deposit(self, request_id):
+        return self.ledger.approve_deposit(request_id)
+
+    async def request_withdrawal(self, user_id, username, dc_amount, sol_amount, sol_address):
+        return self.ledger.request_withdrawal(user_id, username, dc_amount, sol_amount, sol_address)
+
+    async def complete_withdrawal(self, request_id):
+        return self.ledger.complete_withdrawal(request_id)
+
+    async def open_game(self, reservation_id, user_id, game, seed, client_seed, nonce, bet, mines_count, channel_id, message_id, extra_message_id=None, seed_epoch=None, guild_id=None):
+        self.ledger.journal.open_game(reservation_id, user_id, game, seed, client_seed, nonce, bet, mines_count, channel_id, message_id, extra_message_id, seed_epoch, guild_id)
+
+    async def record_move(self, reservation_id, action, ttl):
+        self.ledger.journal.record_move(reservation_id, action, ttl)
+
+    async def close_game(self, reservation_id):
+        self.ledger.journal.close_game(reservation_id)
+
+    async def resume_open_games(self, ttl):
+        return self.ledger.journal.resume_open_games(ttl)
@@ -0,0 +1,352 @@
+#!/usr/bin/env python3
+"""Ledger service for sharded deployments.
+
+One service process owns every balance-changing write. Gateway shard processes send it requests over
+a Unix socket using a compact binary protocol, so the money path stays serialized on one SQLite
+connection while gateway, game and embed work spreads over one process per core.
+
+Frames are a 5-byte header (opcode or status, payload length) followed by the payload. Fixed fields
+are packed with struct; strings are a 2-byte length plus UTF-8 bytes, with 0xFFFF meaning None.
+
+Escrow and game journal writes go through the service, including the expiry a journaled move
+pushes back. Two kinds of write stay on the shard's own connection: the server seed chain, whose
+rows are written once per epoch with BEGIN IMMEDIATE and insert-if-absent statements so any number
+of processes converge on one chain, and the responsible-gaming counters, which hold no money and
+are flushed once a minute per user by the shard that tracks them.
+
+Usage: python ledger_service.py  (socket path from LEDGER_SOCKET, database from DB_FILE)
+"""
+import asyncio
+import os
+import sqlite3
+import struct
+from ledger import Ledger
+from migrations import run_background_migrations
+from treasury import verify_totals
+
+DEFAULT_SOCKET_PATH = "/tmp/dragon_ledger.sock"
+# The service owns every write, so it is the process that checks the treasury totals
+TREASURY_VERIFY_SECONDS = 1800
+# A request not answered within this long fails instead of stalling the shard's commands
+LEDGER_TIMEOUT_SECONDS = 5.0
+
+HEADER = struct.Struct("!BI")
+STRING_LENGTH = struct.Struct("!H")
+NO_STRING = 0xFFFF
+
+STATUS_OK = 0
+STATUS_ERROR = 1
+
+OP_PING = 0
+OP_RESERVE = 1
+OP_EXTEND = 2
+OP_SETTLE = 3
+OP_REFUND = 4
+OP_SWEEP = 5
+OP_EXPOSURE = 6
+OP_ADJUST_BALANCE = 7
+OP_GAME_STATS = 8
+OP_CREDIT_DEPOSIT = 9
+OP_REQUEST_DEPOSIT = 10
+OP_APPROVE_DEPOSIT = 11
+OP_REQUEST_WITHDRAWAL = 12
+OP_COMPLETE_WITHDRAWAL = 13
+OP_OPEN_GAME = 14
+OP_RECORD_MOVE = 15
+OP_CLOSE_GAME = 16
+OP_RESUME_GAMES = 17
+
+# opcode: (request fields, number of trailing strings, response fields)
+OPS = {
+    OP_PING: (struct.Struct("!"), 0, struct.Struct("!")),
+    OP_RESERVE: (struct.Struct("!qdI"), 2, struct.Struct("!qdq")),
+    OP_EXTEND: (struct.Struct("!qI"), 0, struct.Struct("!")),
+    OP_SETTLE: (struct.Struct("!qdqqq"), 2, struct.Struct("!?")),
+    OP_REFUND: (struct.Struct("!q"), 0, struct.Struct("!?")),
+    OP_SWEEP: (struct.Struct("!"), 0, struct.Struct("!Id")),
+    OP_EXPOSURE: (struct.Struct("!"), 0, struct.Struct("!Id")),
+    OP_ADJUST_BALANCE: (struct.Struct("!qd"), 1, struct.Struct("!")),
+    OP_GAME_STATS: (struct.Struct("!qdd"), 1, struct.Struct("!")),
+    OP_CREDIT_DEPOSIT: (struct.Struct("!qdd"), 1, struct.Struct("!")),
+    OP_REQUEST_DEPOSIT: (struct.Struct("!qdd"), 2, struct.Struct("!q")),
+    OP_APPROVE_DEPOSIT: (struct.Struct("!q"), 0, struct.Struct("!?")),
+    OP_REQUEST_WITHDRAWAL: (struct.Struct("!qdd"), 2, struct.Struct("!q")),
+    OP_COMPLETE_WITHDRAWAL: (struct.Struct("!q"), 0, struct.Struct("!?")),
+    OP_OPEN_GAME: (struct.Struct("!qqqqdqqqqqq"), 2, struct.Struct("!")),
+    OP_RECORD_MOVE: (struct.Struct("!qI"), 1, struct.Struct("!")),
+    OP_CLOSE_GAME: (struct.Struct("!q"), 0, struct.Struct("!")),
+    OP_RESUME_GAMES: (struct.Struct("!I"), 0, struct.Struct("!I")),
+}
+
+# Sent in place of None for the optional integer fields of OP_OPEN_GAME
+NO_INTEGER = -1
+
+
+def encode_request(op, fields, strings=()):
+    request_fields = OPS[op][0]
+    payload = [request_fields.pack(*fields)]
+    for value in strings:
+        if value is None:
+            payload.append(STRING_LENGTH.pack(NO_STRING))
+        else:
+            data = value.encode()
+            payload.append(STRING_LENGTH.pack(len(data)))
+            payload.append(data)
+    body = b"".join(payload)
+    return HEADER.pack(op, len(body)) + body
+
+
+def decode_request(op, payload):
+    request_fields, num_strings, _ = OPS[op]
+    fields = request_fields.unpack_from(payload)
+    offset = request_fields.size
+    strings = []
+    for _ in range(num_strings):
+        (length,) = STRING_LENGTH.unpack_from(payload, offset)
+        offset += STRING_LENGTH.size
+        if length == NO_STRING:
+            strings.append(None)
+        else:
+            strings.append(payload[offset:offset + length].decode())
+            offset += length
+    return fields, strings
+
+
+def execute(ledger, op, fields, strings):
+    """Runs one decoded request against the ledger and returns the response fields."""
+    escrow = ledger.escrow
+    if op == OP_PING:
+        return ()
+    if op == OP_RESERVE:
+        user_id, stake, ttl = fields
+        username, game = strings
+        reservation_id, balance_before, nonce = escrow.reserve(user_id, username, game, stake, ttl)
+        return (reservation_id or 0, balance_before or 0.0, nonce or 0)
+    if op == OP_EXTEND:
+        escrow.extend(*fields)
+        return ()
+    if op == OP_SETTLE:
+        reservation_id, payout, seed_epoch, nonce, outcome = fields
+        username, client_seed = strings
+        # A settle without round info is sent with no client seed
+        round_info = None if client_seed is None else (seed_epoch, client_seed, nonce, outcome)
+        return (escrow.settle(reservation_id, payout, username, round_info),)
+    if op == OP_REFUND:
+        return (escrow.refund(fields[0]),)
+    if op == OP_SWEEP:
+        return escrow.sweep_expired()
+    if op == OP_EXPOSURE:
+        return escrow.open_exposure()
+    if op == OP_ADJUST_BALANCE:
+        ledger.update_user_balance(fields[0], fields[1], strings[0])
+        return ()
+    if op == OP_GAME_STATS:
+        ledger.update_game_stats(fields[0], fields[1], fields[2], strings[0])
+        return ()
+    if op == OP_CREDIT_DEPOSIT:
+        ledger.credit_deposit(fields[0], strings[0], fields[1], fields[2])
+        return ()
+    if op == OP_REQUEST_DEPOSIT:
+        return (ledger.request_deposit(fields[0], strings[0], fields[1], fields[2], strings[1]),)
+    if op == OP_APPROVE_DEPOSIT:
+        return (ledger.approve_deposit(fields[0]),)
+    if op == OP_REQUEST_WITHDRAWAL:
+        return (ledger.request_withdrawal(fields[0], strings[0], fields[1], fields[2], strings[1]) or 0,)
+    if op == OP_COMPLETE_WITHDRAWAL:
+        return (ledger.complete_withdrawal(fields[0]),)
+    if op == OP_OPEN_GAME:
+        reservation_id, user_id, seed, nonce, bet, mines_count, channel_id, message_id, extra_message_id, seed_epoch, guild_id = fields
+        game, client_seed = strings
+        ledger.journal.open_game(reservation_id, user_id, game, seed, client_seed, nonce, bet,
+                                 *(None if value == NO_INTEGER else value for value in (mines_count, channel_id, message_id, extra_message_id, seed_epoch, guild_id)))
+        return ()
+    if op == OP_RECORD_MOVE:
+        ledger.journal.record_move(fields[0], strings[0], fields[1])
+        return ()
+    if op == OP_CLOSE_GAME:
+        ledger.journal.close_game(fields[0])
+        return ()
+    if op == OP_RESUME_GAMES:
+        return (ledger.journal.resume_open_games(fields[0]),)
+    raise ValueError(f"unknown opcode {op}")
+
+
+class LedgerServer:
+    """Serves ledger requests from any number of shard connections, one request at a time."""
+
+    def __init__(self, db_file, socket_path=DEFAULT_SOCKET_PATH):
+        self.db_file = db_file
+        self.socket_path = socket_path
+        self.ledger = None
+        self.requests = 0
+
+    async def handle_connection(self, reader, writer):
+        try:
+            while True:
+                header = await reader.readexactly(HEADER.size)
+                op, length = HEADER.unpack(header)
+                payload = await reader.readexactly(length) if length else b""
+                try:
+                    fields, strings = decode_request(op, payload)
+                    body = OPS[op][2].pack(*execute(self.ledger, op, fields, strings))
+                    status = STATUS_OK
+                except Exception as e:
+                    # Drop whatever the failed request wrote, so the next request's commit does not include it
+                    self.ledger.db_conn.rollback()
+                    body = str(e).encode()
+                    status = STATUS_ERROR
+                self.requests += 1
+                writer.write(HEADER.pack(status, len(body)) + body)
+        except (asyncio.IncompleteReadError, ConnectionResetError):
+            pass
+        finally:
+            writer.close()
+
+    async def serve(self):
+        conn = sqlite3.connect(self.db_file)
+        conn.execute("PRAGMA journal_mode=WAL")
+        self.ledger = Ledger(conn)
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+        server = await asyncio.start_unix_server(self.handle_connection, path=self.socket_path)
+        print(f"[LEDGER] Serving {self.db_file} on {self.socket_path}")
+        verifier = asyncio.create_task(self.verify_treasury_periodically(conn))
+        # run_cluster applied the schema migrations before starting the service
+        migrations = asyncio.create_task(run_background_migrations(conn, self.db_file))
+        async with server:
+            try:
+                await server.serve_forever()
+            finally:
+                verifier.cancel()
+                migrations.cancel()
+
+    async def verify_treasury_periodically(self, conn):
+        while True:
+            await asyncio.sleep(TREASURY_VERIFY_SECONDS)
+            try:
+                drift = verify_totals(conn)
+            except Exception as e:
+                print(f"[TREASURY] Verification failed: {e}")
+                continue
+            for key, (running, recomputed) in drift.items():
+                print(f"[TREASURY] Drift in {key}: running {running}, recomputed {recomputed}")
+
+
+class LedgerClient:
+    """Client used by shard processes. Has the coroutine methods of AsyncLedger.
+
+    One request is in flight per connection at a time. A request that fails mid-way or is not
+    answered within LEDGER_TIMEOUT_SECONDS drops the connection, so a late response can never be
+    read as the answer to the next request; the next call reconnects.
+    """
+
+    def __init__(self, socket_path=DEFAULT_SOCKET_PATH):
+        self.socket_path = socket_path
+        self.reader = None
+        self.writer = None
+        self.lock = asyncio.Lock()
+        self.escrow = self
+        self.journal = self
+
+    def attach(self, db_conn=None):
+        """The shard's own SQLite connection is not used for ledger writes; the first call connects."""
+
+    async def connect(self):
+        self.disconnect()
+        self.reader, self.writer = await asyncio.open_unix_connection(self.socket_path)
+
+    def disconnect(self):
+        if self.writer is not None:
+            self.writer.close()
+        self.reader = self.writer = None
+
+    async def _round_trip(self, request):
+        if self.writer is None or self.reader.at_eof():
+            await self.connect()
+        self.writer.write(request)
+        await self.writer.drain()
+        status, length = HEADER.unpack(await self.reader.readexactly(HEADER.size))
+        body = await self.reader.readexactly(length) if length else b""
+        return status, body
+
+    async def call(self, op, fields=(), strings=()):
+        request = encode_request(op, fields, strings)
+        async with self.lock:
+            try:
+                status, body = await asyncio.wait_for(self._round_trip(request), LEDGER_TIMEOUT_SECONDS)
+            except asyncio.IncompleteReadError as e:
+                # No retry: the service may already have applied the request
+                self.disconnect()
+                raise ConnectionError("ledger service closed the connection") from e
+            except BaseException:
+                # Covers timeouts and cancellation too: a response still on its way belongs to this request
+                self.disconnect()
+                raise
+        if status != STATUS_OK:
+            raise RuntimeError(f"ledger service error: {body.decode()}")
+        return OPS[op][2].unpack(body)
+
+    async def ping(self):
+        await self.call(OP_PING)
+
+    async def reserve(self, user_id, username, game, stake, ttl):
+        if stake <= 0:
+            return None, None, None
+        reservation_id, balance_before, nonce = await self.call(OP_RESERVE, (user_id, stake, int(ttl)), (username, game))
+        if reservation_id == 0:
+            return None, None, None
+        return reservation_id, balance_before, nonce
+
+    async def extend(self, reservation_id, ttl):
+        await self.call(OP_EXTEND, (reservation_id, int(ttl)))
+
+    async def settle(self, reservation_id, payout, username=None, round_info=None):
+        seed_epoch, client_seed, nonce, outcome = round_info or (0, None, 0, 0)
+        return (await self.call(OP_SETTLE, (reservation_id, payout, seed_epoch, nonce, outcome), (username, client_seed)))[0]
+
+    async def refund(self, reservation_id):
+        return (await self.call(OP_REFUND, (reservation_id,)))[0]
+
+    async def sweep_expired(self):
+        return await self.call(OP_SWEEP)
+
+    async def open_exposure(self):
+        return await self.call(OP_EXPOSURE)
+
+    async def update_user_balance(self, user_id, amount_dc, username):
+        await self.call(OP_ADJUST_BALANCE, (user_id, amount_dc), (username,))
+
+    async def update_game_stats(self, user_id, wager, win_loss, username, commit=True):
+        await self.call(OP_GAME_STATS, (user_id, wager, win_loss), (username,))
+
+    async def credit_deposit(self, user_id, username, dc_amount, sol_amount):
+        await self.call(OP_CREDIT_DEPOSIT, (user_id, dc_amount, sol_amount), (username,))
+
+    async def request_deposit(self, user_id, username, dc_amount, sol_amount, tx_hash):
+        return (await self.call(OP_REQUEST_DEPOSIT, (user_id, dc_amount, sol_amount), (username, tx_hash)))[0]
+
+    async def approve_deposit(self, request_id):
+        return (await self.call(OP_APPROVE_DEPOSIT, (request_id,)))[0]
+
+    async def request_withdrawal(self, user_id, username, dc_amount, sol_amount, sol_address):
+        return (await self.call(OP_REQUEST_WITHDRAWAL, (user_id, dc_amount, sol_amount), (username, sol_address)))[0] or None
+
+    async def complete_withdrawal(self, request_id):
+        return (await self.call(OP_COMPLETE_WITHDRAWAL, (request_id,)))[0]
+
+    async def open_game(self, reservation_id, user_id, game, seed, client_seed, nonce, bet, mines_count, channel_id, message_id, extra_message_id=None, seed_epoch=None, guild_id=None):
+        optional = tuple(NO_INTEGER if value is None else value for value in (mines_count, channel_id, message_id, extra_message_id, seed_epoch, guild_id))
+        await self.call(OP_OPEN_GAME, (reservation_id, user_id, seed, nonce, bet) + optional, (game, client_seed))
+
+    async def record_move(self, reservation_id, action, ttl):
+        await self.call(OP_RECORD_MOVE, (reservation_id, int(ttl)), (action,))
+
+    async def close_game(self, reservation_id):
+        await self.call(OP_CLOSE_GAME, (reservation_id,))
+
+    async def resume_open_games(self, ttl):
+        return (await self.call(OP_RESUME_GAMES, (int(ttl),)))[0]
+
+
+if __name__ == "__main__":
+    asyncio.run(LedgerServer(os.getenv("DB_FILE", "dragon_casino.db"), os.getenv("LEDGER_SOCKET", DEFAULT_SOCKET_PATH)).serve())
@@ -9,29 +9,64 @@ import hmac
 import time
 import random
 import asyncio
-import secrets
+import io
+import shutil
+import tempfile
 from dotenv import load_dotenv
 import qrcode
 from PIL import Image, ImageDraw
 from blackjack import BlackjackGame, active_blackjack_games
 from roulette import spin_wheel, check_win, get_payout_multiplier, get_roulette_embed
-from mines import generate_mines_board, get_payout_multiplier as get_mines_multiplier, get_mines_embed, active_mines_games, BOARD_SIZE
-from views import CoinflipView, BlackjackView, RouletteView, MinesView, DepositView, WithdrawView, ConfirmWithdrawalView
+from mines import generate_mines_board, restore_mines_board, get_payout_multiplier as get_mines_multiplier, get_mines_embed, active_mines_games, BOARD_SIZE
+from views import (
+    DepositView, WithdrawView, QueuePagerView, HistoryPagerView, CONVERSATION_VIEW_TIMEOUT, GAME_HANDLERS, GAME_EXPIRY_HANDLERS, PERSISTENT_HANDLERS,
+    COINFLIP_TIMEOUT, ROULETTE_TIMEOUT, BLACKJACK_TIMEOUT, MINES_TIMEOUT, ADMIN_WITHDRAWALS_CHANNEL_ID,
+    coinflip_components, roulette_components, blackjack_components, mines_board_components, mines_cashout_components,
+    withdrawal_components, remember_withdrawal_post, disable_withdrawal_post
+)
+from responsible_gaming import ResponsibleGamingTracker
+from admin_queues import parse_filters, fetch_page, queue_embed, FILTER_USAGE, MENTION_PATTERN
+from user_locks import UserLocks
+from ledger import AsyncLedger
+from ledger_service import LedgerClient
+from game_journal import decode_tiles, load_open_games
+from game_sessions import GameSessions
+from timing_wheel import TimingWheel
+from conversations import ConversationManager
+from interaction_router import InteractionRouter
+from metrics import Metrics, message_received
+from profiling import Profiler, MAX_PROFILE_SECONDS
+from traces import TraceRecorder, TRACE_DIR
+from ratelimit import RateLimiter
+from outbound import OutboundScheduler, PRIORITY_REPLY
+from user_cache import UserCache
+from migrations import migrate, run_background_migrations
+from money import DC_UNITS, units_to_dc, lamports_to_sol
+from treasury import bootstrap_totals, verify_totals, read_totals, last_verification
+from rounds import fetch_history, history_embed, blackjack_round
+from export import write_export, EXPORTS, FORMATS, EXPORT_DIR
+from cards import CardRenderer
+from seeds import SEED_EPOCH_SECONDS, SEED_EPOCH_TIMES, current_epoch, epoch_start, hash_seed, ensure_chain, seed_for_epoch, lookup as lookup_seed, reveal_ended, commitment as seed_commitment, describe_commitment
 
 load_dotenv()
 
 BOT_PREFIX = "."
 DC_VALUE_USD = 1.00
-DB_FILE = "dragon_casino.db"
-# Use 30-minute epochs (1800 seconds) instead of daily (86400 seconds)
-DAILY_SECRET_SEED = hashlib.sha256(str(int(time.time() // 1800)).encode()).hexdigest()
-DAILY_PUBLIC_HASH = hashlib.sha256(DAILY_SECRET_SEED.encode()).hexdigest()
+DB_FILE = os.getenv("DB_FILE", "dragon_casino.db")
+SEED_CHANNEL_ID = 1444449287617384599
 
 # Solana Configuration
 SOLANA_RPC_URL = os.getenv("SOLANA_RPC_URL", "https://api.mainnet-beta.solana.com")
 BOT_WALLET_ADDRESS = os.getenv("BOT_WALLET_ADDRESS", "")
 QR_CODES_DIR = "qr_codes"
 
+# How long deposit/withdraw prompts wait for a reply
+PROMPT_TIMEOUT = 120
+
+# Prometheus endpoint; only reachable from the host unless METRICS_HOST is changed
+METRICS_HOST = os.getenv("METRICS_HOST", "127.0.0.1")
+METRICS_PORT = int(os.getenv("METRICS_PORT", "9108"))
+
 # Chat Channels (No Commands Allowed)
 NO_COMMAND_CHANNELS = [1444449830825885736, 1444450499540684931]  # General and Elite chat channels
 
@@ -61,273 +96,269 @@ def get_dragon_casino_qr() -> str:
         return qr_file
     return None
 
-class DragonCasinoBot(commands.Bot):
+def format_ms(seconds):
+    return "∞" if seconds == float("inf") else f"{seconds * 1000:.1f}ms"
+
+def shard_config():
+    """Reads SHARD_COUNT / SHARD_IDS (e.g. "0,1") for running a subset of shards in this process."""
+    shard_count = os.getenv("SHARD_COUNT")
+    shard_ids = os.getenv("SHARD_IDS")
+    if not shard_count:
+        return {}
+    config = {"shard_count": int(shard_count)}
+    if shard_ids:
+        config["shard_ids"] = [int(shard_id) for shard_id in shard_ids.split(",")]
+    return config
+
+class DragonCasinoBot(commands.AutoShardedBot):
     def __init__(self):
         intents = discord.Intents.default()
         intents.message_content = True
         intents.members = True
-        super().__init__(command_prefix=BOT_PREFIX, intents=intents)
+        self.metrics = Metrics()
+        # Times every REST call, interaction responses included, as they leave the HTTP session
+        super().__init__(command_prefix=BOT_PREFIX, intents=intents, http_trace=self.metrics.discord_trace(), **shard_config())
         
         self.db_conn = None
         self.sol_price_usd = 0.0
-        self.daily_server_seed = DAILY_SECRET_SEED
-        self.daily_public_hash = DAILY_PUBLIC_HASH
+        # Server seed of the current 30-minute epoch; set by rotate_server_seed
+        self.seed_epoch = None
+        self.daily_server_seed = None
         self.active_blackjack_games = active_blackjack_games
+        self.responsible_gaming = ResponsibleGamingTracker(self)
+        self.user_locks = UserLocks()
+        # With LEDGER_SOCKET set, balance writes go to the shared ledger service instead of this process's connection
+        ledger_socket = os.getenv("LEDGER_SOCKET")
+        self.ledger = LedgerClient(ledger_socket) if ledger_socket else AsyncLedger()
+        self.escrow = self.ledger.escrow
+        self.game_journal = self.ledger.journal
+        self.timing_wheel = TimingWheel(tick=1.0)
+        self.game_sessions = GameSessions(self.timing_wheel, self.expire_game_sessions)
+        self.conversations = ConversationManager(self.timing_wheel)
+        self.interaction_router = InteractionRouter(self, GAME_HANDLERS, PERSISTENT_HANDLERS)
+        self.games_restored = False
+        self.metrics_server = None
+        self.instrument()
+        self.profiler = Profiler(self)
+        self.trace_recorder = None
+        self.rate_limiter = RateLimiter()
+        self.outbound = OutboundScheduler(self)
+        self.user_cache = UserCache(self)
+        self.cards = CardRenderer(self)
+        self.background_migrations = None
+
+    def instrument(self):
+        """Wraps the DB and ledger entry points so their time is recorded per command stage; Discord calls are traced."""
+        metrics = self.metrics
+        metrics.instrument(self, "db_read", "get_user_data")
+        metrics.instrument(self.escrow, "db_write", "reserve", "extend", "settle", "refund")
+        # update_game_stats is left out: games record their result through settle, which is timed above
+        metrics.instrument(self.ledger, "db_write", "update_user_balance", "credit_deposit", "request_deposit", "approve_deposit", "request_withdrawal", "complete_withdrawal")
+        metrics.instrument(self.game_journal, "db_write", "open_game", "record_move", "close_game")
+        metrics.gauge("dragon_active_blackjack_games", "Blackjack games in progress", lambda: len(active_blackjack_games))
+        metrics.gauge("dragon_active_mines_games", "Mines games in progress", lambda: len(active_mines_games))
+        metrics.gauge("dragon_game_sessions", "Open game sessions awaiting a click", lambda: len(self.game_sessions))
+        metrics.gauge("dragon_conversations", "Open deposit/withdraw conversations", lambda: len(self.conversations))
+        metrics.gauge("dragon_timers", "Timers pending on the timing wheel", lambda: len(self.timing_wheel))
+        metrics.gauge("dragon_user_cache_size", "Users held in the resolved-user TTL cache", lambda: len(self.user_cache))
+        metrics.gauge("dragon_card_cache_size", "Rendered profile and leaderboard cards held in memory", lambda: len(self.cards))
+        metrics.gauge("dragon_outbound_queue", "Messages waiting in the outbound queue", lambda: len(self.outbound))
+        metrics.gauge("dragon_event_loop_lag_last_seconds", "Most recent event loop lag sample", lambda: metrics.last_loop_lag)
+        self.before_invoke(self.before_command)
+        self.after_invoke(self.after_command)
+
+    async def before_command(self, ctx):
+        ctx.metrics_token = self.metrics.command_started(ctx.command.qualified_name)
+        received = message_received.get()
+        if received is not None:
+            self.metrics.observe_stage("auth", time.perf_counter() - received)
+
+    async def after_command(self, ctx):
+        self.metrics.command_finished(ctx.metrics_token, ctx.command_failed)
+
+    async def setup_hook(self):
+        # Before the gateway connects, so the card workers are forked from a quiet process
+        self.cards.start()
+        # Also before the gateway connects: a long schema migration (the money conversion on a large
+        # database) blocks the loop, and there is no heartbeat to miss yet
+        self.db_init()
 
     async def on_ready(self):
         print(f"Logged in as {self.user} (ID: {self.user.id})")
-        self.db_init()
-        self.fetch_sol_price.start()
-        self.update_and_post_daily_seed.start()
+        if not self.responsible_gaming.loaded:
+            self.responsible_gaming.load(self.db_conn)
+        self.responsible_gaming.start()
+        self.outbound.start()
+        # With a ledger service the service runs them, since it owns the writes
+        if not isinstance(self.ledger, LedgerClient) and self.background_migrations is None:
+            self.background_migrations = asyncio.create_task(run_background_migrations(self.db_conn, DB_FILE))
+        if not self.games_restored:
+            await self.restore_active_games()
+        if not self.flush_usage_counters.is_running():
+            self.flush_usage_counters.start()
+        if not self.sweep_escrow.is_running():
+            self.sweep_escrow.start()
+        if not self.timing_wheel.is_running():
+            self.timing_wheel.start()
+        if not self.prune_rate_limits.is_running():
+            self.prune_rate_limits.start()
+        # With a ledger service the service verifies, since it owns the writes
+        if not isinstance(self.ledger, LedgerClient) and not self.verify_treasury.is_running():
+            self.verify_treasury.start()
+        self.metrics.start_loop_monitor()
+        if self.metrics_server is None:
+            try:
+                self.metrics_server = await self.metrics.serve(METRICS_HOST, METRICS_PORT)
+            except OSError as e:
+                print(f"[METRICS] Could not listen on {METRICS_HOST}:{METRICS_PORT}: {e}")
+        if not self.fetch_sol_price.is_running():
+            self.fetch_sol_price.start()
+        if not self.rotate_seed_epoch.is_running():
+            # Reveals what ended while the bot was offline; the loop then runs on each epoch boundary
+            self.publish_seed_reveals(self.seed_epoch)
+            self.rotate_seed_epoch.start()
         print("Bot is ready and running.")
 
+    async def on_interaction(self, interaction: discord.Interaction):
+        if self.trace_recorder is not None:
+            self.trace_recorder.record_interaction(interaction)
+        await self.interaction_router.dispatch(interaction)
+
     def db_init(self):
-        """Initializes the SQLite database connection and creates the tables."""
+        """Opens the SQLite database and applies pending schema migrations."""
+        if self.db_conn is not None:
+            return
         self.db_conn = sqlite3.connect(DB_FILE)
-        cursor = self.db_conn.cursor()
-        
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS users (
-                user_id INTEGER PRIMARY KEY,
-                username TEXT NOT NULL,
-                dragon_coins REAL DEFAULT 0.00,
-                total_wagered REAL DEFAULT 0.00,
-                total_won REAL DEFAULT 0.00,
-                games_played INTEGER DEFAULT 0,
-                is_elite_dragon BOOLEAN DEFAULT 0,
-                client_seed TEXT DEFAULT 'default_seed',
-                nonce INTEGER DEFAULT 0,
-                total_deposited REAL DEFAULT 0.00,
-                daily_wager_amount REAL DEFAULT 0.00,
-                daily_usage_seconds INTEGER DEFAULT 0,
-                last_usage_warning_time DATETIME DEFAULT NULL,
-                session_start_time DATETIME DEFAULT CURRENT_TIMESTAMP,
-                last_daily_reset DATE DEFAULT NULL
-            )
-        """)
-        
-        cursor.execute("PRAGMA table_info(users)") 
-        columns = [col[1] for col in cursor.fetchall()]
-        if 'daily_wager_amount' not in columns:
-            cursor.execute("ALTER TABLE users ADD COLUMN daily_wager_amount REAL DEFAULT 0.00")
-        if 'daily_usage_seconds' not in columns:
-            cursor.execute("ALTER TABLE users ADD COLUMN daily_usage_seconds INTEGER DEFAULT 0")
-        if 'last_usage_warning_time' not in columns:
-            cursor.execute("ALTER TABLE users ADD COLUMN last_usage_warning_time DATETIME DEFAULT NULL")
-        if 'session_start_time' not in columns:
-            cursor.execute("ALTER TABLE users ADD COLUMN session_start_time DATETIME DEFAULT NULL")
-        
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS bot_transactions (
-                transaction_id INTEGER PRIMARY KEY AUTOINCREMENT,
-                user_id INTEGER,
-                recipient TEXT,
-                sol_address TEXT,
-                sol_amount REAL,
-                dc_amount REAL,
-                transaction_type TEXT,
-                status TEXT DEFAULT 'pending',
-                tx_hash TEXT,
-                timestamp DATETIME DEFAULT CURRENT_TIMESTAMP
-            )
-        """)
-        
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS seed_history (
-                seed_id INTEGER PRIMARY KEY AUTOINCREMENT,
-                secret_seed TEXT NOT NULL,
-                public_hash TEXT NOT NULL,
-                posted_at DATETIME DEFAULT CURRENT_TIMESTAMP,
-                secret_revealed BOOLEAN DEFAULT 0
-            )
-        """)
-        self.db_conn.commit()
+        # WAL lets shard processes read while the ledger service writes
+        self.db_conn.execute("PRAGMA journal_mode=WAL")
+        migrate(self.db_conn)
+        # After every table it totals exists; only does work the first time
+        bootstrap_totals(self.db_conn)
+        self.ledger.attach(self.db_conn)
+        self.extend_seed_chain(current_epoch())
+        self.rotate_server_seed(current_epoch())
         print("Database initialized with provably fair fields.")
 
     def get_user_data(self, user_id):
-        """Retrieves user data from the database."""
+        """Retrieves user data from the database, with money columns converted from micro-DC to DC."""
         cursor = self.db_conn.cursor()
-        cursor.execute("SELECT * FROM users WHERE user_id = ?", (user_id,))
+        # Converted in SQL so the row comes back as one tuple (x / 1e6 rounds the same as units_to_dc)
+        cursor.execute(f"""
+            SELECT user_id, username, dragon_coins / {DC_UNITS}.0, total_wagered / {DC_UNITS}.0, total_won / {DC_UNITS}.0, games_played,
+                   is_elite_dragon, client_seed, nonce, total_deposited / {DC_UNITS}.0, daily_wager_amount / {DC_UNITS}.0,
+                   daily_usage_seconds, last_usage_warning_time, session_start_time, last_daily_reset
+            FROM users WHERE user_id = ?
+        """, (user_id,))
         return cursor.fetchone()
 
-    def update_user_balance(self, user_id, amount_dc, username):
+    async def update_user_balance(self, user_id, amount_dc, username):
         """Adds or subtracts DC from a user's balance."""
-        cursor = self.db_conn.cursor()
-        client_seed = secrets.token_hex(16)
-        today = time.strftime("%Y-%m-%d")
-        
-        daily_wager_increment = 0
-        if amount_dc < 0:
-            daily_wager_increment = abs(amount_dc)
-        
-        cursor.execute("""
-            INSERT INTO users (user_id, username, dragon_coins, client_seed, daily_wager_amount, session_start_time, last_daily_reset) 
-            VALUES (?, ?, ?, ?, ?, CURRENT_TIMESTAMP, ?) 
-            ON CONFLICT(user_id) DO UPDATE SET 
-                dragon_coins = dragon_coins + excluded.dragon_coins,
-                username = excluded.username,
-                daily_wager_amount = CASE 
-                    WHEN last_daily_reset = ? THEN daily_wager_amount + ?
-                    ELSE ?
-                END,
-                last_daily_reset = CASE 
-                    WHEN last_daily_reset = ? THEN last_daily_reset
-                    ELSE ?
-                END,
-                session_start_time = CASE 
-                    WHEN last_daily_reset = ? THEN session_start_time
-                    ELSE CURRENT_TIMESTAMP
-                END,
-                client_seed = CASE WHEN client_seed = 'default_seed' THEN ? ELSE client_seed END
-        """, (user_id, username, amount_dc, client_seed, daily_wager_increment, today, today, daily_wager_increment, daily_wager_increment, today, today, today, client_seed))
-        self.db_conn.commit()
-
-    def update_game_stats(self, user_id, wager, win_loss, username):
-        """Updates user's gambling statistics and balance."""
-        cursor = self.db_conn.cursor()
-        client_seed = secrets.token_hex(16)
-        
-        cursor.execute("""
-            INSERT INTO users (user_id, username, dragon_coins, total_wagered, total_won, games_played, nonce, client_seed, daily_wager_amount, session_start_time) 
-            VALUES (?, ?, ?, ?, ?, ?, 1, ?, ?, CURRENT_TIMESTAMP) 
-            ON CONFLICT(user_id) DO UPDATE SET 
-                dragon_coins = dragon_coins + ?,
-                total_wagered = total_wagered + ?,
-                total_won = total_won + ?,
-                games_played = games_played + 1,
-                nonce = nonce + 1,
-                username = ?,
-                daily_wager_amount = daily_wager_amount + ?,
-                client_seed = CASE WHEN client_seed = 'default_seed' THEN ? ELSE client_seed END
-        """, (user_id, username, win_loss, wager, max(0, win_loss), 1, client_seed, wager, win_loss, wager, max(0, win_loss), username, wager, client_seed))
-        self.db_conn.commit()
+        await self.ledger.update_user_balance(user_id, amount_dc, username)
+
+    async def update_game_stats(self, user_id, wager, win_loss, username, commit=True):
+        """Updates user's gambling statistics and balance. A username of None keeps the stored name."""
+        await self.ledger.update_game_stats(user_id, wager, win_loss, username, commit)
     
     def get_daily_wager_progress(self, user_id, initial_balance):
-        """Calculate daily wager progress as percentage. Returns (current_wager, percent, wager_threshold)."""
-        cursor = self.db_conn.cursor()
-        cursor.execute("SELECT daily_wager_amount FROM users WHERE user_id = ?", (user_id,))
-        result = cursor.fetchone()
-        current_wager = result[0] if result else 0.0
-        wager_threshold = initial_balance
-        if wager_threshold <= 0:
-            return current_wager, 0, wager_threshold
-        percent = min(100, int((current_wager / wager_threshold) * 100))
-        return current_wager, percent, wager_threshold
+        """Calculate wager progress over the last 24 hours as percentage. Returns (current_wager, percent, wager_threshold)."""
+        return self.responsible_gaming.get_daily_wager_progress(user_id, initial_balance)
     
     def get_dragon_casino_time(self, user_id):
-        """Calculate total dragon casino time in seconds for today."""
-        cursor = self.db_conn.cursor()
-        cursor.execute("SELECT session_start_time, daily_usage_seconds FROM users WHERE user_id = ?", (user_id,))
-        result = cursor.fetchone()
-        if not result:
-            return 0
-        session_start, daily_seconds = result
-        current_time = int(time.time())
-        if session_start:
+        """Calculate total dragon casino time in seconds over the last 24 hours."""
+        return self.responsible_gaming.get_usage_seconds(user_id)
+
+    @tasks.loop(minutes=1)
+    async def flush_usage_counters(self):
+        """Persists in-memory responsible-gaming counters."""
+        try:
+            self.responsible_gaming.flush(self.db_conn)
+        except Exception as e:
+            print(f"[RG] Error flushing usage counters: {e}")
+
+    def runs_shard_of(self, guild_id, channel_id):
+        """Whether this process runs the shard that receives events from `guild_id` (0 for DMs, on shard 0)."""
+        if self.shard_ids is None:
+            return True
+        if guild_id is None:
+            # Journaled before guild ids were recorded: guild channels are cached only by their own shard
+            return self.get_channel(channel_id) is not None
+        return (guild_id >> 22) % self.shard_count in self.shard_ids
+
+    async def restore_active_games(self):
+        """Replays journaled Blackjack and Mines games of this process's shards and reopens their sessions after a restart."""
+        started = time.perf_counter()
+        await self.game_journal.resume_open_games(BLACKJACK_TIMEOUT)
+        # Only the process receiving a game's button clicks restores it, so each game has one timeout
+        rows = [row for row in load_open_games(self.db_conn) if self.runs_shard_of(row[13], row[9])]
+        for reservation_id, user_id, game_type, seed, client_seed, nonce, bet, mines_count, actions, channel_id, message_id, extra_message_id, seed_epoch, _ in rows:
+            if game_type == "blackjack":
+                game = BlackjackGame.restore(user_id, seed, client_seed, nonce, bet, actions)
+                game.seed_epoch = seed_epoch
+                self.active_blackjack_games[user_id] = game
+                self.game_sessions.open(reservation_id, "bj", user_id, bet, game, BLACKJACK_TIMEOUT, channel_id, message_id)
+            else:
+                game_state = restore_mines_board(seed, client_seed, nonce, mines_count, decode_tiles(actions))
+                game_state["seed_epoch"] = seed_epoch
+                game_state["bet"] = bet
+                game_state["reservation_id"] = reservation_id
+                active_mines_games[user_id] = game_state
+                self.game_sessions.open(reservation_id, "mines", user_id, bet, game_state, MINES_TIMEOUT, channel_id, message_id, extra_message_id)
+        self.games_restored = True
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        print(f"[GAMES] Restored {len(rows)} in-flight games in {elapsed_ms:.1f} ms")
+
+    async def expire_game_sessions(self, sessions):
+        """Times out game rounds that have been idle past their timeout (called by the timing wheel)."""
+        for session in sessions:
             try:
-                session_start_ts = int(time.mktime(time.strptime(session_start, "%Y-%m-%d %H:%M:%S")))
-                elapsed = max(0, current_time - session_start_ts)
-                return daily_seconds + elapsed
-            except:
-                return daily_seconds
-        return daily_seconds
-    
-    async def check_addiction_warnings(self, user_id, ctx, initial_balance):
-        """Check and send addiction warnings if thresholds are met."""
+                await GAME_EXPIRY_HANDLERS[session.game](self, session)
+            except Exception as e:
+                print(f"[GAMES] Error expiring {session.game} round #{session.game_id}: {e}")
+
+    def expire_view_after(self, view, timeout):
+        """Stops a timer-less conversation View (deposit/withdraw) after `timeout` seconds via the timing wheel."""
+        self.timing_wheel.schedule(timeout, self._stop_views, view)
+
+    async def _stop_views(self, views):
+        for view in views:
+            view.stop()
+
+    @tasks.loop(minutes=5)
+    async def sweep_escrow(self):
+        """Refunds stakes of games that were never settled (first run happens at startup)."""
         try:
-            ADMIN_CHANNEL_ID = 1445050819383791658
-            
-            cursor = self.db_conn.cursor()
-            cursor.execute("SELECT last_daily_reset, daily_wager_amount FROM users WHERE user_id = ?", (user_id,))
-            result = cursor.fetchone()
-            today = time.strftime("%Y-%m-%d")
-            
-            if result:
-                last_reset, daily_wager = result
-                if last_reset != today:
-                    cursor.execute("UPDATE users SET daily_wager_amount = 0, session_start_time = CURRENT_TIMESTAMP, last_daily_reset = ? WHERE user_id = ?", (today, user_id))
-                    self.db_conn.commit()
-            
-            current_wager, wager_percent, threshold = self.get_daily_wager_progress(user_id, initial_balance)
-            casino_time_sec = self.get_dragon_casino_time(user_id)
-            casino_time_min = casino_time_sec // 60
-            
-            user_obj = await self.fetch_user(user_id)
-            username = user_obj.name if user_obj else f"User {user_id}"
-            
-            cursor = self.db_conn.cursor()
-            cursor.execute("SELECT last_usage_warning_time FROM users WHERE user_id = ?", (user_id,))
-            result = cursor.fetchone()
-            last_warning_time = result[0] if result else None
-            
-            should_warn = False
-            warning_reason = ""
-            
-            if wager_percent >= 100 and threshold > 0:
-                should_warn = True
-                warning_reason = f"wagered 100% of their balance ({current_wager:.2f} DC)"
-            elif wager_percent >= 50 and threshold > 0:
-                should_warn = True
-                warning_reason = f"wagered 50% of their balance ({current_wager:.2f} DC)"
-            elif casino_time_min >= 30:
-                if not last_warning_time:
-                    should_warn = True
-                    warning_reason = f"exceeded 30 minutes of Dragon Casino Time ({casino_time_min} minutes)"
-                else:
-                    try:
-                        last_warn_ts = int(time.mktime(time.strptime(last_warning_time, "%Y-%m-%d %H:%M:%S")))
-                        if int(time.time()) - last_warn_ts >= 1800:
-                            should_warn = True
-                            warning_reason = f"exceeded another 30 minutes of Dragon Casino Time ({casino_time_min} minutes total)"
-                    except:
-                        should_warn = False
-            
-            if should_warn:
-                dm_embed = discord.Embed(
-                    title="⚠️ Addiction Warning - Dragon Casino",
-                    description="We care about your wellbeing! Take a break from gambling.",
-                    color=discord.Color.red()
-                )
-                dm_embed.add_field(name="⏰ Action Needed", value="Please stop gambling and come back tomorrow.", inline=False)
-                if "wagered" in warning_reason:
-                    dm_embed.add_field(name="📊 Why?", value=f"You have {warning_reason}. That's enough for today!", inline=False)
-                else:
-                    dm_embed.add_field(name="⏱️ Why?", value=f"You have {warning_reason}. Time to take a break!", inline=False)
-                dm_embed.add_field(name="💡 Resources", value="If gambling is affecting you, please seek help.", inline=False)
-                
-                try:
-                    await user_obj.send(embed=dm_embed)
-                except:
-                    pass
-                
-                admin_channel = self.get_channel(ADMIN_CHANNEL_ID)
-                if admin_channel:
-                    admin_embed = discord.Embed(
-                        title="🚨 Addiction Warning Alert",
-                        color=discord.Color.red()
-                    )
-                    admin_embed.add_field(name="👤 User", value=f"{username} (ID: {user_id})", inline=False)
-                    if "wagered" in warning_reason:
-                        admin_embed.add_field(name="⚠️ Alert Type", value="Wager Threshold Reached", inline=True)
-                        admin_embed.add_field(name="📊 Details", value=f"{warning_reason}", inline=True)
-                    else:
-                        admin_embed.add_field(name="⚠️ Alert Type", value="Usage Time Threshold Reached", inline=True)
-                        admin_embed.add_field(name="⏱️ Details", value=f"{warning_reason}", inline=True)
-                    admin_embed.add_field(name="⏰ Timestamp", value=f"<t:{int(time.time())}:F>", inline=False)
-                    
-                    await admin_channel.send(embed=admin_embed)
-                
-                cursor.execute("UPDATE users SET last_usage_warning_time = CURRENT_TIMESTAMP WHERE user_id = ?", (user_id,))
-                self.db_conn.commit()
+            count, total = await self.escrow.sweep_expired()
+            if count:
+                print(f"[ESCROW] Refunded {count} expired reservations ({total:.2f} DC)")
+        except Exception as e:
+            print(f"[ESCROW] Error sweeping expired reservations: {e}")
+
+    @tasks.loop(minutes=30)
+    async def verify_treasury(self):
+        """Recomputes the treasury totals from scratch and alerts admins if the running totals drifted."""
+        ADMIN_TREASURY_CHANNEL_ID = 1445049709214306434
+        try:
+            drift = verify_totals(self.db_conn)
         except Exception as e:
-            print(f"Error in addiction warnings: {e}")
+            print(f"[TREASURY] Verification failed: {e}")
+            return
+        for key, (running, recomputed) in drift.items():
+            print(f"[TREASURY] Drift in {key}: running {running}, recomputed {recomputed}")
+            self.outbound.alert(ADMIN_TREASURY_CHANNEL_ID, "⚠️ Treasury Drift",
+                                f"`{key}`: running **{running}**, recomputed **{recomputed}** (micro-DC, lamports for sol_ totals)")
+
+    @tasks.loop(minutes=5)
+    async def prune_rate_limits(self):
+        """Drops throttle buckets of users and channels that have gone quiet."""
+        self.rate_limiter.prune()
 
     @tasks.loop(minutes=1)
     async def fetch_sol_price(self):
         """Fetches the current SOL/USD price from CoinGecko."""
         try:
             url = "https://api.coingecko.com/api/v3/simple/price?ids=solana&vs_currencies=usd"
-            response = requests.get(url)
+            with self.metrics.external("coingecko"):
+                response = requests.get(url)
             response.raise_for_status()
             data = response.json()
             
@@ -336,52 +367,67 @@ class DragonCasinoBot(commands.Bot):
         except Exception as e:
             print(f"Error fetching SOL price: {e}")
 
-    @tasks.loop(minutes=30)
-    async def update_and_post_daily_seed(self):
-        """Posts seed hash and secret seed every 30 minutes."""
+    def rotate_server_seed(self, epoch):
+        """Switches games to the server seed of `epoch`."""
+        seed = seed_for_epoch(self.db_conn, epoch)
+        if seed is None:
+            self.extend_seed_chain(epoch)
+            seed = seed_for_epoch(self.db_conn, epoch)
+        self.daily_server_seed = seed
+        self.seed_epoch = epoch
+
+    def extend_seed_chain(self, epoch):
+        """Generates and announces the next seed chain if the current one is about to run out."""
+        new_chain = ensure_chain(self.db_conn, epoch)
+        if new_chain is not None:
+            self.announce_seed_chain(*new_chain)
+
+    def announce_seed_chain(self, chain_id, first_epoch, terminal_hash):
+        """Posts the terminal hash of a new chain, which commits to every seed in it."""
+        embed = discord.Embed(
+            title="⛓️ New Seed Chain Committed",
+            description=f"Seed chain #{chain_id} starts <t:{epoch_start(first_epoch)}:f>. Every server seed in it is fixed by this hash.",
+            color=discord.Color.gold(),
+            timestamp=discord.utils.utcnow()
+        )
+        embed.add_field(name="🔗 Terminal Hash", value=f"`{terminal_hash}`", inline=False)
+        embed.add_field(name="ℹ️ Verify", value=f"SHA-256 of the first seed revealed from this chain (epoch {first_epoch}) equals this hash.", inline=False)
+        self.outbound.send(SEED_CHANNEL_ID, embed=embed)
+
+    def publish_seed_reveals(self, epoch):
+        """Reveals the seeds of epochs that ended before `epoch` and posts the newest one."""
+        revealed = reveal_ended(self.db_conn, epoch)
+        if not revealed:
+            return
+        ended, seed = revealed[0]
+        embed = discord.Embed(
+            title="🔐 Provably Fair Seed Revealed",
+            description=f"Epoch {ended} ended <t:{epoch_start(ended + 1)}:f>. Its server seed is now public.",
+            color=discord.Color.gold(),
+            timestamp=discord.utils.utcnow()
+        )
+        embed.add_field(name="🔑 Revealed Seed", value=f"`{seed}`", inline=False)
+        embed.add_field(name="📊 Committed Hash", value=f"`{hash_seed(seed)}`", inline=False)
+        embed.add_field(name="ℹ️ Verify", value="The SHA-256 of each seed is the seed revealed before it (or the chain's terminal hash), so one hash checks it. "
+                        "The revealed seed is also the hash of the next epoch's seed. Use `.seed <epoch>` to look up any epoch.", inline=False)
+        if len(revealed) > 1:
+            embed.add_field(name="⏪ Also Revealed", value=f"{len(revealed) - 1} earlier epochs (from {revealed[-1][0]})", inline=False)
+        embed.set_footer(text="Next seed revealed in 30 minutes")
+        self.outbound.send(SEED_CHANNEL_ID, embed=embed)
+        print(f"[SEEDS] Revealed seeds through epoch {ended} ({len(revealed)} new)")
+
+    @tasks.loop(time=SEED_EPOCH_TIMES)
+    async def rotate_seed_epoch(self):
+        """Runs on each epoch boundary: switches to the new seed and reveals the one that just ended."""
         try:
-            SEED_CHANNEL_ID = 1444449287617384599
-            channel = self.get_channel(SEED_CHANNEL_ID)
-            
-            if not channel:
-                print(f"[ERROR] Could not find seed channel {SEED_CHANNEL_ID}")
-                return
-            
-            cursor = self.db_conn.cursor()
-            # Use 30-minute epochs (1800 seconds) instead of daily (86400 seconds)
-            current_epoch = int(time.time() // 1800)
-            
-            # Check if we already posted a seed for this epoch
-            cursor.execute("SELECT seed_id FROM seed_history WHERE posted_at >= datetime('now', '-2 minutes') AND secret_seed = ?",
-                          (hashlib.sha256(str(current_epoch).encode()).hexdigest(),))
-            recent_post = cursor.fetchone()
-            
-            if not recent_post:
-                # Generate new seed for this 30-minute epoch
-                self.daily_server_seed = hashlib.sha256(str(current_epoch).encode()).hexdigest()
-                self.daily_public_hash = hashlib.sha256(self.daily_server_seed.encode()).hexdigest()
-                
-                # Store in database
-                cursor.execute("INSERT INTO seed_history (secret_seed, public_hash, secret_revealed) VALUES (?, ?, 1)",
-                             (self.daily_server_seed, self.daily_public_hash))
-                self.db_conn.commit()
-                
-                embed = discord.Embed(
-                    title="🔐 Provably Fair Seed Posted",
-                    description="New seed with both secret and hash disclosed",
-                    color=discord.Color.gold(),
-                    timestamp=discord.utils.utcnow()
-                )
-                embed.add_field(name="🔑 Secret Seed", value=f"`{self.daily_server_seed}`", inline=False)
-                embed.add_field(name="📊 Public Hash", value=f"`{self.daily_public_hash}`", inline=False)
-                embed.add_field(name="ℹ️ Info", value="Both the secret seed and hash are now disclosed. Users can verify game fairness.", inline=False)
-                embed.set_footer(text="Next seed in 30 minutes")
-                
-                await channel.send(embed=embed)
-                print(f"[SEEDS] Posted new seed for 30-min epoch {current_epoch} with secret disclosed")
-        
+            # The loop can wake a moment early; wait for the boundary it was scheduled for
+            epoch = round(time.time() / SEED_EPOCH_SECONDS)
+            await asyncio.sleep(max(0.0, epoch_start(epoch) - time.time()))
+            self.extend_seed_chain(epoch)
+            self.rotate_server_seed(epoch)
+            self.publish_seed_reveals(epoch)
         except Exception as e:
-            print(f"[ERROR] Failed in seed posting task: {e}")
+            print(f"[ERROR] Failed in seed rotation task: {e}")
 
     def sol_to_dc(self, sol_amount):
         """Converts a Solana amount to Dragon Coins (DC)."""
@@ -402,7 +448,8 @@ class DragonCasinoBot(commands.Bot):
                 "params": [tx_hash, {"encoding": "json"}]
             }
             
-            response = requests.post(SOLANA_RPC_URL, json=payload, headers=headers, timeout=10)
+            with self.metrics.external("solana_rpc"):
+                response = requests.post(SOLANA_RPC_URL, json=payload, headers=headers, timeout=10)
             response.raise_for_status()
             data = response.json()
             
@@ -430,14 +477,24 @@ class DragonCasinoBot(commands.Bot):
         except Exception as e:
             return None, f"Error verifying transaction: {str(e)}"
 
-    def get_fair_result(self, user_id, min_val=0, max_val=10000):
-        """Generates a provably fair random number between min_val and max_val."""
+    def get_fair_result(self, user_id, min_val=0, max_val=10000, nonce=None):
+        """Generates a provably fair random number between min_val and max_val.
+
+        Escrowed rounds pass the nonce Escrow.reserve took for them; otherwise the stored one is used.
+        """
         user_data = self.get_user_data(user_id)
         if not user_data:
             return None, None, None
             
-        _, _, _, _, _, _, _, client_seed, nonce, _, _, _, _, _, _ = user_data
+        _, _, _, _, _, _, _, client_seed, stored_nonce, _, _, _, _, _, _ = user_data
+        if nonce is None:
+            nonce = stored_nonce
         
+        started = time.perf_counter()
+        # Games started in the instant between a boundary and the rotation task use the new seed too
+        epoch = current_epoch()
+        if epoch != self.seed_epoch:
+            self.rotate_server_seed(epoch)
         data = f"{self.daily_server_seed}:{client_seed}:{nonce}"
         
         hashed = hmac.new(
@@ -449,18 +506,24 @@ class DragonCasinoBot(commands.Bot):
         random_int = int(hashed[:8], 16)
         
         result = min_val + (random_int % (max_val - min_val + 1))
+        self.metrics.observe_stage("fairness", time.perf_counter() - started)
         
         return result, client_seed, nonce
 
-    def get_game_seed_generator(self):
-        """Returns a function that generates a provably fair result for a game."""
+    def get_game_seed_generator(self, nonce=None):
+        """Returns a function that generates a provably fair result for a game, with `nonce` if given."""
         def seed_generator(user_id, min_val, max_val):
-            return self.get_fair_result(user_id, min_val, max_val)
+            return self.get_fair_result(user_id, min_val, max_val, nonce)
         return seed_generator
 
     async def on_message(self, message):
         if message.author.id == self.user.id:
             return
+        message_received.set(time.perf_counter())
+
+        # Replies to an open .deposit/.withdraw prompt
+        if await self.conversations.dispatch(message):
+            return
 
         content = message.content
         
@@ -491,15 +554,10 @@ class DragonCasinoBot(commands.Bot):
                 
                 if sender_id:
                     dc_amount = self.sol_to_dc(sol_amount)
-                    sender = self.get_user(sender_id)
+                    sender = await self.user_cache.resolve(sender_id)
                     
                     if sender:
-                        self.update_user_balance(sender_id, dc_amount, sender.name)
-                        
-                        cursor = self.db_conn.cursor()
-                        cursor.execute("INSERT INTO bot_transactions (sol_amount, dc_amount, transaction_type) VALUES (?, ?, ?)", 
-                                     (sol_amount, dc_amount, "deposit"))
-                        self.db_conn.commit()
+                        await self.ledger.credit_deposit(sender_id, sender.name, dc_amount, sol_amount)
                         
                         await message.channel.send(
                             f"**🔥 Dragon Coin Deposit Confirmed!**\n"
@@ -531,15 +589,10 @@ class DragonCasinoBot(commands.Bot):
                         
                         if sender_id:
                             dc_amount = self.sol_to_dc(sol_amount)
-                            sender = self.get_user(sender_id)
+                            sender = await self.user_cache.resolve(sender_id)
                             
                             if sender:
-                                self.update_user_balance(sender_id, dc_amount, sender.name)
-                                
-                                cursor = self.db_conn.cursor()
-                                cursor.execute("INSERT INTO bot_transactions (sol_amount, dc_amount, transaction_type) VALUES (?, ?, ?)", 
-                                             (sol_amount, dc_amount, "deposit"))
-                                self.db_conn.commit()
+                                await self.ledger.credit_deposit(sender_id, sender.name, dc_amount, sol_amount)
                                 
                                 await message.channel.send(
                                     f"**🔥 Dragon Coin Deposit Confirmed!**\n"
@@ -548,8 +601,26 @@ class DragonCasinoBot(commands.Bot):
                                 )
                                 return
 
+        if self.trace_recorder is not None:
+            self.trace_recorder.record_message(message)
+        command = self.command_name(message)
+        if command is not None:
+            scope = self.rate_limiter.check(message.author.id, message.channel.id, command)
+            if scope is not None:
+                self.metrics.rate_limited.inc(command, scope)
+                if self.rate_limiter.should_notice(message.author.id):
+                    await message.channel.send(f"{message.author.mention}, slow down! You're sending commands too fast.")
+                return
         await self.process_commands(message)
 
+    def command_name(self, message):
+        """Name of the command a message would invoke, found without running the command parser."""
+        content = message.content
+        if not content.startswith(BOT_PREFIX):
+            return None
+        command = self.all_commands.get(content[len(BOT_PREFIX):].split(" ", 1)[0])
+        return command.name if command else None
+
 bot = DragonCasinoBot()
 
 @bot.command(name="deposit", help="Deposit Dragon Coins via SOL. Usage: .deposit")
@@ -587,26 +658,21 @@ async def deposit_command(ctx):
     embed_step1.add_field(name="💹 Current SOL Price", value=f"**${bot.sol_price_usd:.2f}** USD", inline=True)
     embed_step1.set_footer(text="You have 2 minutes to enter the amount")
     
-    msg_step1 = await ctx.send(embed=embed_step1)
-    
+    await ctx.send(embed=embed_step1)
+    bot.conversations.start(user_id, ctx.channel.id, "deposit", "amount", PROMPT_TIMEOUT, username=username)
+
+async def deposit_amount_step(conversation, message):
+    channel = message.channel
+    bot.conversations.end(conversation)
     try:
-        def check_amount(m):
-            return m.author.id == user_id and m.channel.id == ctx.channel.id
-        
-        response = await bot.wait_for('message', timeout=120.0, check=check_amount)
-        
-        try:
-            dc_amount = float(response.content.strip())
-            if dc_amount <= 0:
-                return await ctx.send("❌ Invalid amount. Please provide a positive DC amount.")
-        except ValueError:
-            return await ctx.send("❌ Invalid format. Please provide a valid number (e.g., `10` or `50.5`).")
-        
-    except asyncio.TimeoutError:
-        return await ctx.send("⏱️ Timeout. Please run `.deposit` again.")
+        dc_amount = float(message.content.strip())
+        if dc_amount <= 0:
+            return await channel.send("❌ Invalid amount. Please provide a positive DC amount.")
+    except ValueError:
+        return await channel.send("❌ Invalid format. Please provide a valid number (e.g., `10` or `50.5`).")
     
     if bot.sol_price_usd == 0.0:
-        return await ctx.send("❌ Unable to fetch SOL price. Please try again in a moment.")
+        return await channel.send("❌ Unable to fetch SOL price. Please try again in a moment.")
     
     # Convert DC to USD and SOL
     usd_amount = dc_amount * DC_VALUE_USD
@@ -615,7 +681,7 @@ async def deposit_command(ctx):
     # Check minimum deposit ($0.25 USD = 0.25 DC)
     MIN_USD_VALUE = 0.25
     if sol_amount < MIN_USD_VALUE / bot.sol_price_usd:
-        return await ctx.send(f"❌ Minimum deposit is **${MIN_USD_VALUE:.2f}** USD (**{MIN_USD_VALUE / DC_VALUE_USD:.2f} DC**). Please enter a higher DC amount.")
+        return await channel.send(f"❌ Minimum deposit is **${MIN_USD_VALUE:.2f}** USD (**{MIN_USD_VALUE / DC_VALUE_USD:.2f} DC**). Please enter a higher DC amount.")
     
     # STEP 2: Show static Dragon Casino QR code and wallet address
     qr_file = get_dragon_casino_qr()
@@ -634,7 +700,15 @@ async def deposit_command(ctx):
     embed_step2.add_field(name="✅ After Sending", value="Click the **Done** button below once you've sent the SOL", inline=False)
     embed_step2.set_footer(text="⚠️ Please double-check the address before sending!")
     
+    # The conversation now waits on the Done/Cancel buttons rather than a chat reply
+    conversation = bot.conversations.start(
+        conversation.user_id, conversation.channel_id, "deposit", "sent", CONVERSATION_VIEW_TIMEOUT,
+        username=conversation.data["username"], dc_amount=dc_amount, sol_amount=sol_amount
+    )
+    
     async def deposit_callback(uid, dc_amt, sol_amt, usd_amt, action):
+        if not bot.conversations.is_open(conversation):
+            return
         if action == "done":
             # STEP 3: Ask for transaction hash
             embed_step3 = discord.Embed(
@@ -646,106 +720,85 @@ async def deposit_command(ctx):
             embed_step3.add_field(name="⚠️ Important", value="**Send only the hash, NOT the transaction link!**\n\nExample: `4Xx8Jw4fKp3...` (not the full URL)", inline=False)
             embed_step3.set_footer(text="You have 2 minutes to enter the hash")
             
-            await ctx.send(embed=embed_step3)
-            
-            try:
-                def check_hash(m):
-                    return m.author.id == uid and m.channel.id == ctx.channel.id
-                
-                response = await bot.wait_for('message', timeout=120.0, check=check_hash)
-                tx_hash = response.content.strip()
-                
-                # Store pending deposit and update total_deposited
-                cursor = bot.db_conn.cursor()
-                cursor.execute("INSERT INTO bot_transactions (user_id, recipient, sol_amount, dc_amount, tx_hash, transaction_type, status) VALUES (?, ?, ?, ?, ?, ?, ?)",
-                             (uid, username, sol_amt, dc_amt, tx_hash, "deposit", "pending_verification"))
-                cursor.execute("""
-                    INSERT INTO users (user_id, username, total_deposited) 
-                    VALUES (?, ?, ?) 
-                    ON CONFLICT(user_id) DO UPDATE SET 
-                        total_deposited = total_deposited + excluded.total_deposited
-                """, (uid, username, dc_amt))
-                bot.db_conn.commit()
-                
-                # Get the request ID
-                request_id = cursor.lastrowid
-                
-                # Post to admin channel
-                ADMIN_DEPOSITS_CHANNEL_ID = 1445049709214306434
-                admin_channel = bot.get_channel(ADMIN_DEPOSITS_CHANNEL_ID)
-                if admin_channel:
-                    admin_embed = discord.Embed(
-                        title="📥 New Deposit Request",
-                        color=discord.Color.blue(),
-                        timestamp=discord.utils.utcnow()
-                    )
-                    admin_embed.add_field(name="Request ID", value=f"#{request_id}", inline=True)
-                    admin_embed.add_field(name="User", value=f"<@{uid}> ({username})", inline=True)
-                    admin_embed.add_field(name="📊 DC Amount", value=f"**{dc_amt:.2f} DC** [${dc_amt * DC_VALUE_USD:.2f}]", inline=True)
-                    admin_embed.add_field(name="🪙 SOL Amount", value=f"**{sol_amt:.6f} SOL**", inline=True)
-                    admin_embed.add_field(name="📋 Transaction Hash", value=f"`{tx_hash}`", inline=False)
-                    admin_embed.add_field(name="⚠️ Action", value=f"Use `.approve_deposit {request_id}` to verify and approve", inline=False)
-                    admin_embed.set_footer(text="Review on blockchain before approving")
-                    
-                    await admin_channel.send(embed=admin_embed)
-                
-                embed_confirm = discord.Embed(
-                    title="✅ Deposit Request Sent!",
-                    color=discord.Color.green()
-                )
-                embed_confirm.add_field(name="📊 Amount Requested", value=f"**{dc_amt:.2f} DC** [${dc_amt * DC_VALUE_USD:.2f}]", inline=True)
-                embed_confirm.add_field(name="🪙 SOL Sent", value=f"**{sol_amt:.6f} SOL**", inline=True)
-                embed_confirm.add_field(name="📋 Transaction Hash", value=f"`{tx_hash}`", inline=False)
-                embed_confirm.add_field(name="⏳ Status", value="Pending admin verification\nAn admin will verify and approve your deposit shortly", inline=False)
-                await ctx.send(embed=embed_confirm)
-                
-            except asyncio.TimeoutError:
-                await ctx.send("⏱️ **Transaction timeout!** You did not provide the transaction hash within 2 minutes.\n\nPlease run `.deposit` again to start over.")
+            await channel.send(embed=embed_step3)
+            bot.conversations.goto(conversation, "tx_hash", PROMPT_TIMEOUT)
         
         elif action == "cancel":
-            await ctx.send("❌ Deposit cancelled.")
+            bot.conversations.end(conversation)
+            await channel.send("❌ Deposit cancelled.")
     
     # STEP 2: Show Done/Cancel buttons with QR code
-    view = DepositView(user_id, dc_amount, sol_amount, usd_amount, BOT_WALLET_ADDRESS, deposit_callback)
+    view = DepositView(conversation.user_id, dc_amount, sol_amount, usd_amount, BOT_WALLET_ADDRESS, deposit_callback, timeout=None)
+    bot.expire_view_after(view, CONVERSATION_VIEW_TIMEOUT)
     if qr_file:
         with open(qr_file, 'rb') as f:
             file = discord.File(f, filename="dragon_qr.png")
-            await ctx.send(embed=embed_step2, view=view, file=file)
+            await channel.send(embed=embed_step2, view=view, file=file)
     else:
-        await ctx.send(embed=embed_step2, view=view)
+        await channel.send(embed=embed_step2, view=view)
     
     # Send wallet address in a separate, easy-to-copy format (inline code)
-    await ctx.send(f"📮 **Send SOL to:** `{BOT_WALLET_ADDRESS}`\n\n✅ Click the address above to copy")
+    await channel.send(f"📮 **Send SOL to:** `{BOT_WALLET_ADDRESS}`\n\n✅ Click the address above to copy")
+
+async def deposit_tx_hash_step(conversation, message):
+    bot.conversations.end(conversation)
+    uid = conversation.user_id
+    username = conversation.data["username"]
+    dc_amt = conversation.data["dc_amount"]
+    sol_amt = conversation.data["sol_amount"]
+    tx_hash = message.content.strip()
+    
+    # Store pending deposit and update total_deposited
+    request_id = await bot.ledger.request_deposit(uid, username, dc_amt, sol_amt, tx_hash)
+    
+    # Post to admin channel in the next digest
+    ADMIN_DEPOSITS_CHANNEL_ID = 1445049709214306434
+    bot.outbound.alert(ADMIN_DEPOSITS_CHANNEL_ID, "📥 New Deposit Requests",
+                       f"**#{request_id}** <@{uid}> ({username}): **{dc_amt:.2f} DC** [${dc_amt * DC_VALUE_USD:.2f}] for **{sol_amt:.6f} SOL**, tx `{tx_hash}`. Verify, then `.approve_deposit {request_id}`")
+    
+    embed_confirm = discord.Embed(
+        title="✅ Deposit Request Sent!",
+        color=discord.Color.green()
+    )
+    embed_confirm.add_field(name="📊 Amount Requested", value=f"**{dc_amt:.2f} DC** [${dc_amt * DC_VALUE_USD:.2f}]", inline=True)
+    embed_confirm.add_field(name="🪙 SOL Sent", value=f"**{sol_amt:.6f} SOL**", inline=True)
+    embed_confirm.add_field(name="📋 Transaction Hash", value=f"`{tx_hash}`", inline=False)
+    embed_confirm.add_field(name="⏳ Status", value="Pending admin verification\nAn admin will verify and approve your deposit shortly", inline=False)
+    await message.channel.send(embed=embed_confirm)
+
+async def deposit_amount_timeout(conversation):
+    bot.outbound.send(conversation.channel_id, PRIORITY_REPLY, content="⏱️ Timeout. Please run `.deposit` again.")
 
-@bot.command(name="pending_deposits", help="[Admin] View pending deposit requests.")
+async def deposit_tx_hash_timeout(conversation):
+    bot.outbound.send(conversation.channel_id, PRIORITY_REPLY, content="⏱️ **Transaction timeout!** You did not provide the transaction hash within 2 minutes.\n\nPlease run `.deposit` again to start over.")
+
+bot.conversations.register_step("deposit", "amount", deposit_amount_step, deposit_amount_timeout)
+bot.conversations.register_step("deposit", "sent", None)
+bot.conversations.register_step("deposit", "tx_hash", deposit_tx_hash_step, deposit_tx_hash_timeout)
+
+async def send_admin_queue(ctx, queue, args, empty_message):
+    """Sends the first page of an admin queue with Prev/Next buttons."""
+    try:
+        filters = parse_filters(args)
+    except ValueError as e:
+        return await ctx.send(f"❌ {e}\n{FILTER_USAGE}")
+    rows, next_cursor = fetch_page(bot.db_conn, queue, filters)
+    if not rows:
+        return await ctx.send(empty_message)
+    embed = queue_embed(queue, filters, rows, 0)
+    if next_cursor is None:
+        return await ctx.send(embed=embed)
+    view = QueuePagerView(bot, ctx.author.id, queue, filters, next_cursor, timeout=None)
+    bot.expire_view_after(view, CONVERSATION_VIEW_TIMEOUT)
+    await ctx.send(embed=embed, view=view)
+
+@bot.command(name="pending_deposits", help="[Admin] View pending deposit requests. Usage: .pending_deposits [@user] [min:<DC>] [max:<DC>] [older:<age>] [newer:<age>]")
 @commands.has_permissions(administrator=True)
-async def pending_deposits_command(ctx):
+async def pending_deposits_command(ctx, *filters):
     if is_no_command_zone(ctx.channel.id, True):
         return await ctx.send("❌ Commands are not allowed in this channel. Please use a game channel or DMs.")
     
-    cursor = bot.db_conn.cursor()
-    cursor.execute("SELECT transaction_id, recipient, dc_amount, sol_amount, tx_hash, status, timestamp FROM bot_transactions WHERE transaction_type = 'deposit' AND status = 'pending_verification' ORDER BY timestamp DESC LIMIT 20")
-    deposits = cursor.fetchall()
-    
-    if not deposits:
-        return await ctx.send("📊 No pending deposit requests.")
-    
-    embed = discord.Embed(
-        title="💳 Pending Deposit Requests",
-        color=discord.Color.blurple(),
-        description="Review and verify pending deposits"
-    )
-    
-    for deposit in deposits:
-        trans_id, recipient, dc_amt, sol_amt, tx_hash, status, timestamp = deposit
-        embed.add_field(
-            name=f"Request #{trans_id}",
-            value=f"**From:** {recipient}\n**Amount:** {dc_amt:.2f} DC [${dc_amt * DC_VALUE_USD:.2f}]\n**SOL:** {sol_amt:.6f}\n**Hash:** `{tx_hash}`\n**Time:** {timestamp}",
-            inline=False
-        )
-    
-    embed.set_footer(text="Use: .approve_deposit <request_id> to verify and approve")
-    await ctx.send(embed=embed)
+    await send_admin_queue(ctx, "deposits", filters, "📊 No pending deposit requests.")
 
 @bot.command(name="approve_deposit", help="[Admin] Verify and approve a deposit request.")
 @commands.has_permissions(administrator=True)
@@ -760,7 +813,8 @@ async def approve_deposit_command(ctx, request_id: int):
     if not result:
         return await ctx.send(f"❌ Deposit request #{request_id} not found.")
     
-    user_id, recipient, dc_amount, sol_amount, tx_hash, status = result
+    user_id, recipient, dc_units, lamports, tx_hash, status = result
+    dc_amount, sol_amount = units_to_dc(dc_units), lamports_to_sol(lamports)
     
     if status != 'pending_verification':
         return await ctx.send(f"❌ Request #{request_id} is already {status}.")
@@ -771,12 +825,9 @@ async def approve_deposit_command(ctx, request_id: int):
     if error:
         return await ctx.send(f"❌ Transaction verification failed: {error}\nRequest #{request_id} remains pending.")
     
-    # Approve and credit DC
-    bot.update_user_balance(user_id, dc_amount, recipient)
-    
-    # Delete completed transaction from pending list
-    cursor.execute("DELETE FROM bot_transactions WHERE transaction_id = ?", (request_id,))
-    bot.db_conn.commit()
+    # Approve and credit DC; the request stays in bot_transactions as 'approved'
+    if not await bot.ledger.approve_deposit(request_id):
+        return await ctx.send(f"❌ Request #{request_id} was already handled.")
     
     embed = discord.Embed(
         title="✅ Deposit Approved!",
@@ -792,25 +843,20 @@ async def approve_deposit_command(ctx, request_id: int):
     await ctx.send(embed=embed)
     
     # Send DM to user
-    try:
-        user = await bot.fetch_user(user_id)
-        dm_embed = discord.Embed(
-            title="✅ Deposit Approved!",
-            color=discord.Color.green()
-        )
-        dm_embed.add_field(name="Request ID", value=f"#{request_id}", inline=True)
-        dm_embed.add_field(name="Amount Credited", value=f"**{dc_amount:.2f} DC** [${dc_amount * DC_VALUE_USD:.2f}]", inline=True)
-        dm_embed.add_field(name="SOL Received", value=f"**{sol_amount:.6f} SOL**", inline=False)
-        dm_embed.add_field(name="Status", value="Your deposit has been verified and DC credited to your account!", inline=False)
-        await user.send(embed=dm_embed)
-    except Exception as e:
-        print(f"Could not send DM to user {user_id}: {e}")
+    dm_embed = discord.Embed(
+        title="✅ Deposit Approved!",
+        color=discord.Color.green()
+    )
+    dm_embed.add_field(name="Request ID", value=f"#{request_id}", inline=True)
+    dm_embed.add_field(name="Amount Credited", value=f"**{dc_amount:.2f} DC** [${dc_amount * DC_VALUE_USD:.2f}]", inline=True)
+    dm_embed.add_field(name="SOL Received", value=f"**{sol_amount:.6f} SOL**", inline=False)
+    dm_embed.add_field(name="Status", value="Your deposit has been verified and DC credited to your account!", inline=False)
+    bot.outbound.dm(user_id, embed=dm_embed)
     
-    # Post approved deposit to completed deposits channel
+    # Post approved deposit to completed deposits channel in the next digest
     COMPLETED_DEPOSITS_CHANNEL_ID = 1445050084965355614
-    completed_channel = bot.get_channel(COMPLETED_DEPOSITS_CHANNEL_ID)
-    if completed_channel:
-        await completed_channel.send(embed=embed)
+    bot.outbound.alert(COMPLETED_DEPOSITS_CHANNEL_ID, "✅ Deposits Approved",
+                       f"**#{request_id}** <@{user_id}> ({recipient}): **{dc_amount:.2f} DC** [${dc_amount * DC_VALUE_USD:.2f}] for **{sol_amount:.6f} SOL**, tx `{tx_hash}`")
 
 @bot.command(name="balance", help="Check Dragon Coin balance. Usage: .balance or .balance @user (admin only)")
 async def balance_command(ctx, member: discord.Member = None):
@@ -842,7 +888,7 @@ async def balance_command(ctx, member: discord.Member = None):
     user_data = bot.get_user_data(user_id)
     
     if not user_data:
-        bot.update_user_balance(user_id, 0.00, username)
+        await bot.update_user_balance(user_id, 0.00, username)
         user_data = bot.get_user_data(user_id)
     
     _, _, dc_balance, _, _, _, _, _, _, _, _, _, _, _, _ = user_data
@@ -884,7 +930,7 @@ async def profile_command(ctx, member: discord.Member = None):
     user_data = bot.get_user_data(user_id)
     
     if not user_data:
-        bot.update_user_balance(user_id, 0.00, ctx.author.name)
+        await bot.update_user_balance(user_id, 0.00, ctx.author.name)
         user_data = bot.get_user_data(user_id)
 
     _, username, dc_balance, wagered, won, games, is_elite, client_seed, nonce, total_deposited, daily_wager, daily_usage_sec, _, _, _ = user_data
@@ -898,27 +944,126 @@ async def profile_command(ctx, member: discord.Member = None):
     
     wager_bar = "█" * (wager_percent // 10) + "░" * (10 - wager_percent // 10)
     
+    # The card shows role, balance, wagered/won, games, rank and recent results; the text fields are the fallback
+    try:
+        card = await bot.cards.profile(target_user, username, target_is_elite_role, dc_balance, wagered, won, games)
+    except Exception as e:
+        print(f"[CARDS] Error rendering profile card for {user_id}: {e}")
+        card = None
+    
     embed = discord.Embed(
         title=f"🔥 {username}'s Dragon Casino Profile",
         color=discord.Color.gold() if target_is_elite_role else discord.Color.red()
     )
-    embed.set_thumbnail(url=target_user.display_avatar.url)
-    
-    embed.add_field(name="Current Role", value=role_name, inline=False)
-    embed.add_field(name="DC Balance", value=f"**{dc_balance:.2f} DC** [${dc_balance * DC_VALUE_USD:.2f}]", inline=True)
-    embed.add_field(name="Games Played", value=f"{games}", inline=True)
-    embed.add_field(name="Total Wagered (All-Time)", value=f"{wagered:.2f} DC [${wagered * DC_VALUE_USD:.2f}]", inline=True)
-    embed.add_field(name="Total Won (All-Time)", value=f"{won:.2f} DC [${won * DC_VALUE_USD:.2f}]", inline=True)
+    if card is None:
+        embed.set_thumbnail(url=target_user.display_avatar.url)
+        embed.add_field(name="Current Role", value=role_name, inline=False)
+        embed.add_field(name="DC Balance", value=f"**{dc_balance:.2f} DC** [${dc_balance * DC_VALUE_USD:.2f}]", inline=True)
+        embed.add_field(name="Games Played", value=f"{games}", inline=True)
+        embed.add_field(name="Total Wagered (All-Time)", value=f"{wagered:.2f} DC [${wagered * DC_VALUE_USD:.2f}]", inline=True)
+        embed.add_field(name="Total Won (All-Time)", value=f"{won:.2f} DC [${won * DC_VALUE_USD:.2f}]", inline=True)
     
-    embed.add_field(name="📊 Daily Wager Progress", value=f"{wager_bar} {wager_percent}%\n{current_wager:.2f} / {wager_threshold:.2f} DC", inline=False)
-    embed.add_field(name="⏱️ Dragon Casino Time (Today)", value=f"**{casino_time_min} minutes**", inline=True)
+    embed.add_field(name="📊 Wager Progress (Last 24h)", value=f"{wager_bar} {wager_percent}%\n{current_wager:.2f} / {wager_threshold:.2f} DC", inline=False)
+    embed.add_field(name="⏱️ Dragon Casino Time (Last 24h)", value=f"**{casino_time_min} minutes**", inline=True)
     
     embed.add_field(name="Client Seed", value=client_seed, inline=False)
     embed.add_field(name="Next Nonce", value=nonce, inline=True)
-    embed.add_field(name="Server Hash (Daily)", value=f"`{bot.daily_public_hash}`", inline=False)
-    
+    # Never the plain hash of the seed in play: that is the previous epoch's seed, which may still be held back
+    committed = seed_commitment(bot.db_conn, bot.seed_epoch)
+    if committed is not None:
+        embed.add_field(name=f"Server Hash (Epoch {bot.seed_epoch})", value=f"`{committed[0]}`\n{describe_commitment(*committed)}", inline=False)
+    
+    if card is None:
+        return await ctx.send(embed=embed)
+    embed.set_image(url="attachment://profile.png")
+    await ctx.send(embed=embed, file=discord.File(io.BytesIO(card), filename="profile.png"))
+
+@bot.command(name="seed", help="Look up the server seed of a 30-minute epoch. Usage: .seed [epoch]")
+async def seed_command(ctx, epoch: int = None):
+    """Shows an epoch's committed hash, and its seed once the epoch has ended."""
+    if is_no_command_zone(ctx.channel.id, ctx.author.guild_permissions.administrator):
+        return await ctx.send("❌ Commands are not allowed in this channel. Please use a game channel or DMs.")
+    if epoch is None:
+        epoch = bot.seed_epoch
+    # Later epochs are not shown: their seeds are still secret and hash to the seeds of earlier ones
+    row = lookup_seed(bot.db_conn, epoch) if epoch <= bot.seed_epoch else None
+    if row is None:
+        return await ctx.send(f"❌ No server seed to show for epoch {epoch}. The current epoch is {bot.seed_epoch}.")
+    chain_id, seed, revealed, first_epoch, terminal_hash = row
+    embed = discord.Embed(
+        title=f"🔐 Server Seed - Epoch {epoch}",
+        description=f"<t:{epoch_start(epoch)}:f> to <t:{epoch_start(epoch + 1)}:t> • chain #{chain_id}",
+        color=discord.Color.gold()
+    )
+    if revealed:
+        embed.add_field(name="📊 Committed Hash", value=f"`{hash_seed(seed)}`", inline=False)
+        committed_by = f"the chain's terminal hash `{terminal_hash}`" if epoch == first_epoch else f"the seed revealed for epoch {epoch - 1}"
+        embed.add_field(name="🔑 Seed", value=f"`{seed}`", inline=False)
+        embed.add_field(name="ℹ️ Verify", value=f"SHA-256 of the seed is the committed hash, which is {committed_by}.", inline=False)
+    else:
+        # hash_seed(seed) would be the previous epoch's seed, which may still be held back for a game in progress
+        value, rounds, anchor_epoch = seed_commitment(bot.db_conn, epoch)
+        embed.add_field(name="📊 Committed Hash", value=f"`{value}`", inline=False)
+        embed.add_field(name="ℹ️ Verify", value=describe_commitment(value, rounds, anchor_epoch), inline=False)
+        embed.add_field(name="🔑 Seed", value=f"Revealed after <t:{epoch_start(epoch + 1)}:f>, once no game dealt from it is still in progress", inline=False)
     await ctx.send(embed=embed)
 
+@bot.command(name="history", help="Page through your past game rounds. Usage: .history or .history @user (admin/staff only)")
+async def history_command(ctx, member: discord.Member = None):
+    """Shows a player's settled rounds, newest first, with the fields needed to verify each one."""
+    is_admin = ctx.author.guild_permissions.administrator
+    has_staff = has_admin_or_staff_role(ctx.author)
+    if is_no_command_zone(ctx.channel.id, is_admin, has_staff):
+        return await ctx.send("❌ Commands are not allowed in this channel. Please use a game channel or DMs.")
+    if member and not (is_admin or has_staff):
+        return await ctx.send("❌ Only admins and staff can check other users' history.")
+    user = member or ctx.author
+    rows, next_cursor = fetch_history(bot.db_conn, user.id)
+    if not rows:
+        return await ctx.send(f"📜 No game rounds recorded for {user.display_name} yet.")
+    embed = history_embed(user, rows, 0)
+    if next_cursor is None:
+        return await ctx.send(embed=embed)
+    view = HistoryPagerView(bot, ctx.author.id, user, next_cursor, timeout=None)
+    bot.expire_view_after(view, CONVERSATION_VIEW_TIMEOUT)
+    await ctx.send(embed=embed, view=view)
+
+@bot.command(name="export", help="DM yourself your game rounds or transactions as gzip'd CSV/JSONL. Usage: .export rounds|transactions [csv|jsonl] [@user|all (admin/staff only)]")
+async def export_command(ctx, kind: str, fmt: str = "csv", target: str = None):
+    """Streams the export to files in a worker thread and DMs them part by part."""
+    is_admin = ctx.author.guild_permissions.administrator
+    has_staff = has_admin_or_staff_role(ctx.author)
+    if is_no_command_zone(ctx.channel.id, is_admin, has_staff):
+        return await ctx.send("❌ Commands are not allowed in this channel. Please use a game channel or DMs.")
+    kind, fmt = kind.lower(), fmt.lower()
+    if kind not in EXPORTS or fmt not in FORMATS:
+        return await ctx.send("❌ Usage: `.export rounds|transactions [csv|jsonl]`")
+    user_id = ctx.author.id
+    if target is not None:
+        if not (is_admin or has_staff):
+            return await ctx.send("❌ Only admins and staff can export other users' data.")
+        mention = MENTION_PATTERN.match(target)
+        if target.lower() == "all":
+            user_id = None
+        elif mention or target.isdigit():
+            user_id = int(mention.group(1) if mention else target)
+        else:
+            return await ctx.send("❌ Give a user mention, a user ID or `all`.")
+
+    await ctx.send(f"📦 Preparing your {kind} export, it will arrive by DM.")
+    os.makedirs(EXPORT_DIR, exist_ok=True)
+    out_dir = tempfile.mkdtemp(dir=EXPORT_DIR)
+    try:
+        paths, count = await asyncio.to_thread(write_export, DB_FILE, kind, fmt, user_id, out_dir)
+        if not paths:
+            return await ctx.author.send(f"📦 No {kind} to export.")
+        for index, path in enumerate(paths, 1):
+            await ctx.author.send(content=f"📦 {kind.capitalize()} export, {count:,} rows • part {index}/{len(paths)}", file=discord.File(path))
+    except discord.Forbidden:
+        await ctx.send(f"❌ {ctx.author.mention}, I couldn't DM you. Allow DMs from server members and try again.")
+    finally:
+        shutil.rmtree(out_dir, ignore_errors=True)
+
 @bot.command(name="withdraw", help="Request a withdrawal of Dragon Coins to SOL.")
 async def withdraw_command(ctx):
     """Two-step withdrawal process: Ask amount → Show confirmation → Send to admins."""
@@ -939,7 +1084,7 @@ async def withdraw_command(ctx):
     # Get user balance first
     user_data = bot.get_user_data(user_id)
     if not user_data:
-        bot.update_user_balance(user_id, 0.00, username)
+        await bot.update_user_balance(user_id, 0.00, username)
         user_data = bot.get_user_data(user_id)
     
     _, _, dc_balance, _, _, _, _, _, _, _, _, _, _, _, _ = user_data
@@ -955,37 +1100,37 @@ async def withdraw_command(ctx):
     embed_step1.add_field(name="📋 Enter Amount", value="Please reply with the DC amount (e.g., `10` or `50.5`)", inline=False)
     embed_step1.set_footer(text="You have 2 minutes to enter the amount")
     
-    msg_step1 = await ctx.send(embed=embed_step1)
-    
+    await ctx.send(embed=embed_step1)
+    bot.conversations.start(user_id, ctx.channel.id, "withdraw", "amount", PROMPT_TIMEOUT, username=username)
+
+async def withdraw_amount_step(conversation, message):
+    channel = message.channel
+    user_id = conversation.user_id
     try:
-        def check_amount(m):
-            return m.author.id == user_id and m.channel.id == ctx.channel.id
-        
-        response = await bot.wait_for('message', timeout=120.0, check=check_amount)
-        
-        try:
-            dc_amount = float(response.content.strip())
-            if dc_amount <= 0:
-                return await ctx.send("❌ Invalid amount. Please provide a positive DC amount.")
-        except ValueError:
-            return await ctx.send("❌ Invalid format. Please provide a valid number (e.g., `10` or `50.5`).")
-        
-    except asyncio.TimeoutError:
-        return await ctx.send("⏱️ Timeout. Please run `.withdraw` again.")
+        dc_amount = float(message.content.strip())
+        if dc_amount <= 0:
+            bot.conversations.end(conversation)
+            return await channel.send("❌ Invalid amount. Please provide a positive DC amount.")
+    except ValueError:
+        bot.conversations.end(conversation)
+        return await channel.send("❌ Invalid format. Please provide a valid number (e.g., `10` or `50.5`).")
     
     # Check balance and SOL price
     user_data = bot.get_user_data(user_id)
     if not user_data or user_data[2] < dc_amount:
-        return await ctx.send(f"{ctx.author.mention}, you do not have **{dc_amount:.2f} DC** [${dc_amount * DC_VALUE_USD:.2f}] to withdraw.")
+        bot.conversations.end(conversation)
+        return await channel.send(f"{message.author.mention}, you do not have **{dc_amount:.2f} DC** [${dc_amount * DC_VALUE_USD:.2f}] to withdraw.")
 
     if bot.sol_price_usd == 0.0:
-        return await ctx.send("❌ Unable to fetch SOL price. Please try again in a moment.")
+        bot.conversations.end(conversation)
+        return await channel.send("❌ Unable to fetch SOL price. Please try again in a moment.")
     
     # Check wager requirement: total_wagered must be >= total_deposited
     _, _, dc_balance, total_wagered, _, _, _, _, _, total_deposited, _, _, _, _, _ = user_data
     if total_wagered < total_deposited:
+        bot.conversations.end(conversation)
         remaining_wager = total_deposited - total_wagered
-        return await ctx.send(f"❌ Wager requirement not met!\n\n📊 **Total Deposited:** {total_deposited:.2f} DC\n🎰 **Total Wagered:** {total_wagered:.2f} DC\n⚠️ **Remaining to Wager:** **{remaining_wager:.2f} DC**\n\nYou must wager the full deposited amount before withdrawing.")
+        return await channel.send(f"❌ Wager requirement not met!\n\n📊 **Total Deposited:** {total_deposited:.2f} DC\n🎰 **Total Wagered:** {total_wagered:.2f} DC\n⚠️ **Remaining to Wager:** **{remaining_wager:.2f} DC**\n\nYou must wager the full deposited amount before withdrawing.")
     
     # Convert DC to SOL
     usd_value = dc_amount * DC_VALUE_USD
@@ -994,8 +1139,8 @@ async def withdraw_command(ctx):
     # Check minimum withdrawal ($0.25 USD = 0.25 DC)
     MIN_USD_VALUE = 0.25
     if sol_amount < MIN_USD_VALUE / bot.sol_price_usd:
-        bot.update_user_balance(user_id, dc_amount, username)  # Refund the deducted amount
-        return await ctx.send(f"❌ Minimum withdrawal is **${MIN_USD_VALUE:.2f}** USD (**{MIN_USD_VALUE / DC_VALUE_USD:.2f} DC**). Please withdraw a higher amount.")
+        bot.conversations.end(conversation)
+        return await channel.send(f"❌ Minimum withdrawal is **${MIN_USD_VALUE:.2f}** USD (**{MIN_USD_VALUE / DC_VALUE_USD:.2f} DC**). Please withdraw a higher amount.")
     
     # STEP 2: Ask for Solana address
     embed_step2 = discord.Embed(
@@ -1007,58 +1152,48 @@ async def withdraw_command(ctx):
     embed_step2.add_field(name="📝 Example", value="`2wV9M71BjEUcuDmQBLYwbxveyhap7KLRyVRBPDstPgo2`", inline=False)
     embed_step2.set_footer(text="You have 2 minutes to enter your address")
     
-    msg_step2 = await ctx.send(embed=embed_step2)
-    
-    try:
-        def check_address(m):
-            return m.author.id == user_id and m.channel.id == ctx.channel.id
-        
-        response_address = await bot.wait_for('message', timeout=120.0, check=check_address)
-        recipient_solana_address = response_address.content.strip()
-        
-        # Basic validation: Check if it looks like a Solana address (44-88 chars, alphanumeric)
-        if not recipient_solana_address or len(recipient_solana_address) < 32:
-            return await ctx.send("❌ Invalid Solana address. Please provide a valid address.")
-        
-    except asyncio.TimeoutError:
-        return await ctx.send("⏱️ **Withdrawal timeout!** You did not provide your wallet address within 2 minutes.\n\nPlease run `.withdraw` again to start over.")
-    
-    # Auto-submit: Deduct DC from user immediately
-    bot.update_user_balance(user_id, -dc_amount, username)
+    conversation.data.update(dc_amount=dc_amount, sol_amount=sol_amount)
+    bot.conversations.goto(conversation, "address", PROMPT_TIMEOUT)
+    await channel.send(embed=embed_step2)
+
+async def withdraw_address_step(conversation, message):
+    bot.conversations.end(conversation)
+    channel = message.channel
+    user_id = conversation.user_id
+    username = conversation.data["username"]
+    dc_amount = conversation.data["dc_amount"]
+    sol_amount = conversation.data["sol_amount"]
+    usd_value = dc_amount * DC_VALUE_USD
+    recipient_solana_address = message.content.strip()
     
-    # Create withdrawal request
-    cursor = bot.db_conn.cursor()
-    try:
-        cursor.execute("INSERT INTO bot_transactions (user_id, recipient, sol_address, sol_amount, dc_amount, transaction_type, status) VALUES (?, ?, ?, ?, ?, ?, ?)",
-                     (user_id, username, recipient_solana_address, sol_amount, dc_amount, "withdrawal", "pending"))
-    except Exception:
-        # If sol_address column doesn't exist, insert without it
-        cursor.execute("INSERT INTO bot_transactions (user_id, recipient, sol_amount, dc_amount, transaction_type, status) VALUES (?, ?, ?, ?, ?, ?)",
-                     (user_id, username, sol_amount, dc_amount, "withdrawal", "pending"))
-    bot.db_conn.commit()
+    # Basic validation: Check if it looks like a Solana address (44-88 chars, alphanumeric)
+    if not recipient_solana_address or len(recipient_solana_address) < 32:
+        return await channel.send("❌ Invalid Solana address. Please provide a valid address.")
     
-    # Get the request ID
-    request_id = cursor.lastrowid
+    # Auto-submit: Deduct DC and create the request in one step, re-checking the balance since games may have run meanwhile
+    async with bot.user_locks.hold(user_id):
+        request_id = await bot.ledger.request_withdrawal(user_id, username, dc_amount, sol_amount, recipient_solana_address)
+    if request_id is None:
+        return await channel.send(f"{message.author.mention}, you no longer have **{dc_amount:.2f} DC** [${dc_amount * DC_VALUE_USD:.2f}] to withdraw.")
     
     # Post to admin channel with confirmation buttons
-    ADMIN_WITHDRAWALS_CHANNEL_ID = 1445049709214306434
-    admin_channel = bot.get_channel(ADMIN_WITHDRAWALS_CHANNEL_ID)
-    if admin_channel:
-        admin_embed = discord.Embed(
-            title="📤 New Withdrawal Request",
-            color=discord.Color.blue(),
-            timestamp=discord.utils.utcnow()
-        )
-        admin_embed.add_field(name="Request ID", value=f"#{request_id}", inline=True)
-        admin_embed.add_field(name="User", value=f"<@{user_id}> ({username})", inline=True)
-        admin_embed.add_field(name="📊 DC Amount", value=f"**{dc_amount:.2f} DC** [${usd_value:.2f}]", inline=True)
-        admin_embed.add_field(name="🪙 SOL Amount", value=f"**{sol_amount:.6f} SOL**", inline=True)
-        admin_embed.add_field(name="📮 Send To Address", value=f"`{recipient_solana_address}`", inline=False)
-        admin_embed.add_field(name="⚠️ Action", value=f"Send SOL to the address above from bot wallet, then click confirm", inline=False)
-        admin_embed.set_footer(text="Click 'SOL Sent - Confirm' after manually sending SOL")
-        
-        view = ConfirmWithdrawalView(bot, request_id, user_id, username, dc_amount, sol_amount)
-        await admin_channel.send(embed=admin_embed, view=view)
+    admin_embed = discord.Embed(
+        title="📤 New Withdrawal Request",
+        color=discord.Color.blue(),
+        timestamp=discord.utils.utcnow()
+    )
+    admin_embed.add_field(name="Request ID", value=f"#{request_id}", inline=True)
+    admin_embed.add_field(name="User", value=f"<@{user_id}> ({username})", inline=True)
+    admin_embed.add_field(name="📊 DC Amount", value=f"**{dc_amount:.2f} DC** [${usd_value:.2f}]", inline=True)
+    admin_embed.add_field(name="🪙 SOL Amount", value=f"**{sol_amount:.6f} SOL**", inline=True)
+    admin_embed.add_field(name="📮 Send To Address", value=f"`{recipient_solana_address}`", inline=False)
+    admin_embed.add_field(name="⚠️ Action", value=f"Send SOL to the address above from bot wallet, then click confirm", inline=False)
+    admin_embed.set_footer(text="Click 'SOL Sent - Confirm' after manually sending SOL")
+    
+    # Needs a button, so it is queued as its own message rather than digested. Admins may confirm hours
+    # later, so the buttons are routed by custom_id and stay live across restarts until the request is completed
+    bot.outbound.send(ADMIN_WITHDRAWALS_CHANNEL_ID, embed=admin_embed, view=withdrawal_components(request_id),
+                      on_sent=lambda message: remember_withdrawal_post(bot, request_id, message))
     
     # Confirm to user
     embed_confirm = discord.Embed(
@@ -1069,37 +1204,24 @@ async def withdraw_command(ctx):
     embed_confirm.add_field(name="🪙 SOL You'll Receive", value=f"**{sol_amount:.6f} SOL**", inline=True)
     embed_confirm.add_field(name="📮 Recipient Address", value=f"`{recipient_solana_address}`", inline=False)
     embed_confirm.add_field(name="⏳ Status", value="Request submitted!\nAn admin will send SOL to your address shortly", inline=False)
-    await ctx.send(embed=embed_confirm)
+    await channel.send(embed=embed_confirm)
+
+async def withdraw_amount_timeout(conversation):
+    bot.outbound.send(conversation.channel_id, PRIORITY_REPLY, content="⏱️ Timeout. Please run `.withdraw` again.")
 
-@bot.command(name="withdrawals", help="[Admin] View pending withdrawal requests.")
+async def withdraw_address_timeout(conversation):
+    bot.outbound.send(conversation.channel_id, PRIORITY_REPLY, content="⏱️ **Withdrawal timeout!** You did not provide your wallet address within 2 minutes.\n\nPlease run `.withdraw` again to start over.")
+
+bot.conversations.register_step("withdraw", "amount", withdraw_amount_step, withdraw_amount_timeout)
+bot.conversations.register_step("withdraw", "address", withdraw_address_step, withdraw_address_timeout)
+
+@bot.command(name="withdrawals", help="[Admin] View pending withdrawal requests. Usage: .withdrawals [@user] [min:<DC>] [max:<DC>] [older:<age>] [newer:<age>]")
 @commands.has_permissions(administrator=True)
-async def withdrawals_command(ctx):
+async def withdrawals_command(ctx, *filters):
     if is_no_command_zone(ctx.channel.id):
         return await ctx.send("❌ Commands are not allowed in this channel. Please use a game channel or DMs.")
     
-    cursor = bot.db_conn.cursor()
-    cursor.execute("SELECT transaction_id, recipient, dc_amount, sol_amount, status, timestamp FROM bot_transactions WHERE transaction_type = 'withdrawal' AND status = 'pending' ORDER BY timestamp DESC LIMIT 20")
-    withdrawals = cursor.fetchall()
-    
-    if not withdrawals:
-        return await ctx.send("📊 No pending withdrawal requests found.")
-    
-    embed = discord.Embed(
-        title="💳 Pending Withdrawal Requests",
-        color=discord.Color.blurple(),
-        description="Review and approve withdrawal requests"
-    )
-    
-    for withdrawal in withdrawals:
-        trans_id, recipient, dc_amount, sol_amount, status, timestamp = withdrawal
-        embed.add_field(
-            name=f"Request #{trans_id} - {status.upper()}",
-            value=f"**To:** {recipient}\n**Amount:** {dc_amount:.2f} DC [${dc_amount * DC_VALUE_USD:.2f}]\n**SOL:** {sol_amount:.6f}\n**Time:** {timestamp}",
-            inline=False
-        )
-    
-    embed.set_footer(text=f"Use: .approve <request_id> <solana_address> to process")
-    await ctx.send(embed=embed)
+    await send_admin_queue(ctx, "withdrawals", filters, "📊 No pending withdrawal requests found.")
 
 @bot.command(name="approve", help="[Admin] Approve and send SOL for a withdrawal.")
 @commands.has_permissions(administrator=True)
@@ -1114,14 +1236,16 @@ async def approve_command(ctx, request_id: int, recipient_address: str):
     if not result:
         return await ctx.send(f"❌ Withdrawal request #{request_id} not found.")
     
-    recipient, dc_amount, sol_amount, status = result
+    recipient, dc_units, lamports, status = result
+    dc_amount, sol_amount = units_to_dc(dc_units), lamports_to_sol(lamports)
     
     if status != 'pending':
         return await ctx.send(f"❌ Request #{request_id} is already {status}.")
     
-    # Delete completed transaction from pending list
-    cursor.execute("DELETE FROM bot_transactions WHERE transaction_id = ?", (request_id,))
-    bot.db_conn.commit()
+    # Mark completed; it leaves the pending list but stays in bot_transactions
+    if not await bot.ledger.complete_withdrawal(request_id):
+        return await ctx.send(f"❌ Request #{request_id} was already handled.")
+    await disable_withdrawal_post(bot, request_id)
     
     embed = discord.Embed(
         title="✅ Withdrawal Approved & Completed",
@@ -1155,13 +1279,14 @@ async def coinflip_command(ctx, amount: float):
         return await ctx.send(f"❌ Coinflip can only be played in <#{COINFLIP_CHANNEL_ID}> or <#{ELITE_CASINO_CHANNEL_ID}>!")
     
     user_id = ctx.author.id
-    user_data = bot.get_user_data(user_id)
     
-    if not user_data or user_data[2] < amount or amount <= 0:
+    # The stake moves into escrow under the user's lock; the reservation itself is a conditional debit
+    async with bot.user_locks.hold(user_id):
+        reservation_id, balance_before, nonce = await bot.escrow.reserve(user_id, ctx.author.name, "coinflip", amount, COINFLIP_TIMEOUT)
+    
+    if reservation_id is None:
         return await ctx.send(f"{ctx.author.mention}, invalid bet amount or insufficient DC balance.")
-
-    bot.update_user_balance(user_id, -amount, ctx.author.name)
-    await bot.check_addiction_warnings(user_id, ctx, user_data[2])
+    bot.responsible_gaming.record_wager(ctx.author, amount, balance_before)
 
     embed = discord.Embed(
         title="🪙 Dragon Coinflip",
@@ -1169,8 +1294,9 @@ async def coinflip_command(ctx, amount: float):
         color=discord.Color.gold()
     )
     
-    view = CoinflipView(bot, user_id, amount)
-    await ctx.send(embed=embed, view=view)
+    session = bot.game_sessions.open(reservation_id, "cf", user_id, amount, nonce, COINFLIP_TIMEOUT, ctx.channel.id)
+    message = await ctx.send(embed=embed, view=coinflip_components(reservation_id))
+    session.message_id = message.id
 
 @bot.command(name="bj", help="Start a game of Blackjack. Usage: .bj <amount>")
 async def blackjack_command(ctx, amount: float):
@@ -1185,44 +1311,38 @@ async def blackjack_command(ctx, amount: float):
     
     user_id = ctx.author.id
     
-    if user_id in bot.active_blackjack_games:
-        return await ctx.send(f"{ctx.author.mention}, you already have an active Blackjack game. Finish it or wait for it to time out.")
+    async with bot.user_locks.hold(user_id):
+        if user_id in bot.active_blackjack_games:
+            return await ctx.send(f"{ctx.author.mention}, you already have an active Blackjack game. Finish it or wait for it to time out.")
 
-    user_data = bot.get_user_data(user_id)
-    
-    if not user_data or user_data[2] < amount or amount <= 0:
-        return await ctx.send(f"{ctx.author.mention}, invalid bet amount or insufficient DC balance.")
-
-    bot.update_user_balance(user_id, -amount, ctx.author.name)
-    await bot.check_addiction_warnings(user_id, ctx, user_data[2])
-    
-    game = BlackjackGame(user_id, bot.get_game_seed_generator())
-    game.start_game(amount)
-    bot.active_blackjack_games[user_id] = game
-    
-    view = BlackjackView(bot, user_id, game)
-    embed = game.get_status_embed(ctx.author, hide_dealer=True)
+        reservation_id, balance_before, nonce = await bot.escrow.reserve(user_id, ctx.author.name, "blackjack", amount, BLACKJACK_TIMEOUT)
+        if reservation_id is None:
+            return await ctx.send(f"{ctx.author.mention}, invalid bet amount or insufficient DC balance.")
+        
+        game = BlackjackGame(user_id, bot.get_game_seed_generator(nonce))
+        game.seed_epoch = bot.seed_epoch
+        game.start_game(amount)
+        bot.active_blackjack_games[user_id] = game
+    bot.responsible_gaming.record_wager(ctx.author, amount, balance_before)
     
-    message = await ctx.send(embed=embed, view=view)
-    view.message = message
-
     if game.state == "ENDED":
+        # Natural blackjack: settle before anything is sent so the round can't be lost to a crash
         result = game.get_result()
-        bot.update_game_stats(user_id, amount, amount + result['net_change'], ctx.author.name)
-        embed = game.get_status_embed(ctx.author, hide_dealer=False)
-        view.disable_buttons()
-        await message.edit(embed=embed, view=view)
+        await bot.escrow.settle(reservation_id, result['payout'], ctx.author.name, blackjack_round(game))
         del bot.active_blackjack_games[user_id]
+        return await ctx.send(embed=game.get_status_embed(ctx.author, hide_dealer=False), view=blackjack_components(reservation_id, disabled=True))
+    
+    session = bot.game_sessions.open(reservation_id, "bj", user_id, amount, game, BLACKJACK_TIMEOUT, ctx.channel.id)
+    embed = game.get_status_embed(ctx.author, hide_dealer=True)
+    message = await ctx.send(embed=embed, view=blackjack_components(reservation_id))
+    session.message_id = message.id
+    await bot.game_journal.open_game(reservation_id, user_id, "blackjack", game.seed, game.client_seed, game.nonce, amount, None, ctx.channel.id, message.id, seed_epoch=game.seed_epoch, guild_id=ctx.guild.id if ctx.guild else 0)
 
 @bot.command(name="rl", help="Play European Roulette. Usage: .rl <amount> <bet_type>")
 async def roulette_command(ctx, amount: float, bet_type: str):
     if is_no_command_zone(ctx.channel.id, ctx.author.guild_permissions.administrator):
         return await ctx.send("❌ Commands are not allowed in this channel. Please use a game channel or DMs.")
     
-    user_id = ctx.author.id
-    user_data = bot.get_user_data(user_id)
-    await bot.check_addiction_warnings(user_id, ctx, user_data[2] if user_data else 0)
-    
     # Roulette can be played in its channel or the elite casino channel
     ROULETTE_CHANNEL_ID = 1444449686177054821
     ELITE_CASINO_CHANNEL_ID = 1444450537398472734
@@ -1230,18 +1350,18 @@ async def roulette_command(ctx, amount: float, bet_type: str):
         return await ctx.send(f"❌ Roulette can only be played in <#{ROULETTE_CHANNEL_ID}> or <#{ELITE_CASINO_CHANNEL_ID}>!")
     
     user_id = ctx.author.id
-    user_data = bot.get_user_data(user_id)
-    
     bet_type = bet_type.lower()
-    
-    if not user_data or user_data[2] < amount or amount <= 0:
-        return await ctx.send(f"{ctx.author.mention}, invalid bet amount or insufficient DC balance.")
 
     payout_multiplier = get_payout_multiplier(bet_type)
     if payout_multiplier == 0.0:
         return await ctx.send(f"{ctx.author.mention}, invalid bet type. Supported types: a number (0-36), red, black, odd, even, low (1-18), high (19-36).")
-
-    bot.update_user_balance(user_id, -amount, ctx.author.name)
+    
+    async with bot.user_locks.hold(user_id):
+        reservation_id, balance_before, nonce = await bot.escrow.reserve(user_id, ctx.author.name, "roulette", amount, ROULETTE_TIMEOUT)
+    
+    if reservation_id is None:
+        return await ctx.send(f"{ctx.author.mention}, invalid bet amount or insufficient DC balance.")
+    bot.responsible_gaming.record_wager(ctx.author, amount, balance_before)
 
     embed = discord.Embed(
         title="🔴 Dragon Roulette 🟢",
@@ -1249,8 +1369,9 @@ async def roulette_command(ctx, amount: float, bet_type: str):
         color=discord.Color.red()
     )
     
-    view = RouletteView(bot, user_id, amount, bet_type)
-    await ctx.send(embed=embed, view=view)
+    session = bot.game_sessions.open(reservation_id, "rl", user_id, amount, (bet_type, nonce), ROULETTE_TIMEOUT, ctx.channel.id)
+    message = await ctx.send(embed=embed, view=roulette_components(reservation_id))
+    session.message_id = message.id
 
 @bot.command(name="mines", help="Start a game of Mines. Usage: .mines <amount> <num_mines>")
 async def mines_command(ctx, amount: float, num_mines: int):
@@ -1265,35 +1386,34 @@ async def mines_command(ctx, amount: float, num_mines: int):
     
     user_id = ctx.author.id
     
-    if user_id in active_mines_games:
-        return await ctx.send(f"{ctx.author.mention}, you already have an active Mines game. Cash out or click a tile on the board.")
-
-    user_data = bot.get_user_data(user_id)
-    
-    if not user_data or user_data[2] < amount or amount <= 0:
-        return await ctx.send(f"{ctx.author.mention}, invalid bet amount or insufficient DC balance.")
-    
     if not 1 <= num_mines <= 24:
         return await ctx.send(f"{ctx.author.mention}, the number of mines must be between 1 and 24.")
-
-    bot.update_user_balance(user_id, -amount, ctx.author.name)
-    await bot.check_addiction_warnings(user_id, ctx, user_data[2])
-    
-    game_state = generate_mines_board(bot.get_game_seed_generator(), user_id, num_mines)
-    game_state["bet"] = amount
-    active_mines_games[user_id] = game_state
     
-    view = MinesView(bot, user_id, game_state, amount)
+    async with bot.user_locks.hold(user_id):
+        if user_id in active_mines_games:
+            return await ctx.send(f"{ctx.author.mention}, you already have an active Mines game. Cash out or click a tile on the board.")
+
+        reservation_id, balance_before, nonce = await bot.escrow.reserve(user_id, ctx.author.name, "mines", amount, MINES_TIMEOUT)
+        if reservation_id is None:
+            return await ctx.send(f"{ctx.author.mention}, invalid bet amount or insufficient DC balance.")
+        
+        game_state = generate_mines_board(bot.get_game_seed_generator(nonce), user_id, num_mines)
+        game_state["seed_epoch"] = bot.seed_epoch
+        game_state["bet"] = amount
+        game_state["reservation_id"] = reservation_id
+        active_mines_games[user_id] = game_state
+    bot.responsible_gaming.record_wager(ctx.author, amount, balance_before)
+    
+    session = bot.game_sessions.open(reservation_id, "mines", user_id, amount, game_state, MINES_TIMEOUT, ctx.channel.id)
     embed = get_mines_embed(ctx.author, game_state, amount)
     
-    message = await ctx.send(embed=embed, view=view)
-    view.message = message
+    message = await ctx.send(embed=embed, view=mines_board_components(reservation_id, game_state))
+    session.message_id = message.id
     
     # Send cashout button in separate message
-    from views import MinesCashoutView
-    cashout_view = MinesCashoutView(bot, user_id, game_state, amount)
-    cashout_message = await ctx.send("**Click a tile to reveal, then use the button below to cash out!**", view=cashout_view)
-    view.cashout_message = cashout_message
+    cashout_message = await ctx.send("**Click a tile to reveal, then use the button below to cash out!**", view=mines_cashout_components(reservation_id))
+    session.extra_message_id = cashout_message.id
+    await bot.game_journal.open_game(reservation_id, user_id, "mines", game_state["seed"], game_state["client_seed"], game_state["nonce"], amount, num_mines, ctx.channel.id, message.id, cashout_message.id, game_state["seed_epoch"], ctx.guild.id if ctx.guild else 0)
 
 @bot.command(name="give", help="(Admin/Owner) Give DC to a user. Usage: .give @user <amount>")
 async def give_command(ctx, member: discord.Member, amount: float):
@@ -1307,22 +1427,13 @@ async def give_command(ctx, member: discord.Member, amount: float):
     if amount <= 0:
         return await ctx.send("Amount must be positive.")
     
-    bot.update_user_balance(member.id, amount, member.name)
+    await bot.update_user_balance(member.id, amount, member.name)
     await ctx.send(f"**✅ Success!** Gave **{amount:.2f} DC** [${amount * DC_VALUE_USD:.2f}] to {member.mention}.")
     
-    # Post to completion channel
+    # Post to completion channel in the next digest
     COMPLETED_CHANNEL_ID = 1445050084965355614
-    completed_channel = bot.get_channel(COMPLETED_CHANNEL_ID)
-    if completed_channel:
-        embed = discord.Embed(
-            title="💝 DC Given by Admin",
-            color=discord.Color.gold(),
-            timestamp=discord.utils.utcnow()
-        )
-        embed.add_field(name="Admin", value=f"{ctx.author.mention} ({ctx.author.name})", inline=True)
-        embed.add_field(name="Recipient", value=f"{member.mention} ({member.name})", inline=True)
-        embed.add_field(name="📊 Amount Given", value=f"**{amount:.2f} DC** [${amount * DC_VALUE_USD:.2f}]", inline=False)
-        await completed_channel.send(embed=embed)
+    bot.outbound.alert(COMPLETED_CHANNEL_ID, "💝 DC Given by Admin",
+                       f"{ctx.author.mention} ({ctx.author.name}) gave **{amount:.2f} DC** [${amount * DC_VALUE_USD:.2f}] to {member.mention} ({member.name})")
 
 @bot.command(name="remove", help="(Admin/Owner) Remove DC from a user. Usage: .remove @user <amount>")
 async def remove_command(ctx, member: discord.Member, amount: float):
@@ -1337,26 +1448,18 @@ async def remove_command(ctx, member: discord.Member, amount: float):
         return await ctx.send("Amount must be positive.")
     
     # Check if user has enough DC to remove
-    user_data = bot.get_user_data(member.id)
-    if not user_data or user_data[2] < amount:
-        return await ctx.send(f"❌ User {member.mention} does not have **{amount:.2f} DC** [${amount * DC_VALUE_USD:.2f}] to remove.")
-    
-    bot.update_user_balance(member.id, -amount, member.name)
+    async with bot.user_locks.hold(member.id):
+        user_data = bot.get_user_data(member.id)
+        if not user_data or user_data[2] < amount:
+            return await ctx.send(f"❌ User {member.mention} does not have **{amount:.2f} DC** [${amount * DC_VALUE_USD:.2f}] to remove.")
+        
+        await bot.update_user_balance(member.id, -amount, member.name)
     await ctx.send(f"**✅ Success!** Removed **{amount:.2f} DC** [${amount * DC_VALUE_USD:.2f}] from {member.mention}.")
     
-    # Post to completion channel
+    # Post to completion channel in the next digest
     COMPLETED_CHANNEL_ID = 1445050084965355614
-    completed_channel = bot.get_channel(COMPLETED_CHANNEL_ID)
-    if completed_channel:
-        embed = discord.Embed(
-            title="🗑️ DC Removed by Admin",
-            color=discord.Color.red(),
-            timestamp=discord.utils.utcnow()
-        )
-        embed.add_field(name="Admin", value=f"{ctx.author.mention} ({ctx.author.name})", inline=True)
-        embed.add_field(name="User", value=f"{member.mention} ({member.name})", inline=True)
-        embed.add_field(name="📊 Amount Removed", value=f"**{amount:.2f} DC** [${amount * DC_VALUE_USD:.2f}]", inline=False)
-        await completed_channel.send(embed=embed)
+    bot.outbound.alert(COMPLETED_CHANNEL_ID, "🗑️ DC Removed by Admin",
+                       f"{ctx.author.mention} ({ctx.author.name}) removed **{amount:.2f} DC** [${amount * DC_VALUE_USD:.2f}] from {member.mention} ({member.name})")
 
 @bot.command(name="zap", help="(Admin/Staff) Delete all messages in the channel. Usage: .zap [limit]")
 async def zap_command(ctx, limit: int = 100):
@@ -1399,23 +1502,133 @@ async def botbalance_command(ctx):
     if is_no_command_zone(ctx.channel.id, True):
         return await ctx.send("❌ Commands are not allowed in this channel. Please use a game channel or DMs.")
     
-    try:
-        cursor = bot.db_conn.cursor()
-        cursor.execute("SELECT COALESCE(SUM(CASE WHEN transaction_type='deposit' THEN sol_amount ELSE 0 END), 0) - COALESCE(SUM(CASE WHEN transaction_type='withdrawal' THEN sol_amount ELSE 0 END), 0) FROM bot_transactions")
-        result = cursor.fetchone()
-        estimated_sol = float(result[0]) if result and result[0] else 0.0
-    except Exception as e:
-        estimated_sol = 0.0
-        print(f"Error querying bot_transactions: {e}")
+    # Running totals kept by the ledger; no scan of bot_transactions or users
+    units = read_totals(bot.db_conn)
+    totals = {key: lamports_to_sol(value) if key.startswith("sol_") else units_to_dc(value) for key, value in units.items()}
+    estimated_sol = totals["sol_deposited"] - totals["sol_withdrawn"]
+    liabilities = totals["user_balances"] + totals["escrow_open"]
     
     embed = discord.Embed(
         title="🤖 Bot Balance (tip.cc)",
         color=discord.Color.blue()
     )
-    embed.add_field(name="📊 Estimated Balance (Tracked)", value=f"**{estimated_sol:.6f} SOL**\n(Based on deposits - withdrawals)", inline=False)
+    embed.add_field(name="📊 Estimated Balance (Tracked)", value=f"**{estimated_sol:.6f} SOL**\n(Based on deposits - completed withdrawals)", inline=False)
+    embed.add_field(name="📥 SOL In", value=f"{totals['sol_deposited']:.6f} SOL deposited\n{totals['sol_pending_deposits']:.6f} SOL awaiting verification", inline=True)
+    embed.add_field(name="📤 SOL Out", value=f"{totals['sol_withdrawn']:.6f} SOL sent\n{totals['sol_pending_withdrawals']:.6f} SOL to send", inline=True)
+    embed.add_field(name="💎 Owed to Players", value=f"**{liabilities:.2f} DC** [${liabilities * DC_VALUE_USD:.2f}]\n{totals['user_balances']:.2f} DC in balances, {totals['escrow_open']:.2f} DC in {units['escrow_open_count']} in-flight games", inline=False)
+    embed.add_field(name="🏦 House", value=f"P&L **{totals['house_pnl']:+.2f} DC**\nAdmin adjustments {totals['admin_adjustments']:+.2f} DC", inline=False)
+    verification = last_verification(bot.db_conn)
+    if verification is None:
+        verified = "Not verified yet"
+    else:
+        verified_at, drifted = verification
+        verified = f"<t:{verified_at}:R>" + (f", ⚠️ drift in {', '.join(drifted)}" if drifted else ", no drift")
+    embed.add_field(name="🔎 Last Full Recompute", value=verified, inline=False)
     embed.add_field(name="✅ To Check Real Balance", value="Since tip.cc only responds to users (not bots), you need to run this command:\n\n`$balance`\n\nTip.cc will respond with the actual current balance.", inline=False)
     await ctx.send(embed=embed)
 
+@bot.command(name="stats", help="(Admin) Show command latency, stage timings and bot health.")
+@commands.has_permissions(administrator=True)
+async def stats_command(ctx):
+    if is_no_command_zone(ctx.channel.id, True):
+        return await ctx.send("❌ Commands are not allowed in this channel. Please use a game channel or DMs.")
+
+    metrics = bot.metrics
+    embed = discord.Embed(title="📈 Bot Performance", color=discord.Color.blue())
+
+    rows = metrics.command_summary()[:10]
+    lines = [f"`{name}` {count}× p50 {format_ms(p50)} p95 {format_ms(p95)}" + (f" ❌{errors}" if errors else "") for name, count, p50, p95, errors in rows]
+    embed.add_field(name="⏱️ Commands & Buttons", value="\n".join(lines) or "No commands handled yet.", inline=False)
+
+    stages = metrics.stage_summary()
+    lines = [f"`{stage}` {count}× p50 {format_ms(p50)} p95 {format_ms(p95)} total {total:.1f}s" for stage, (count, p50, p95, total) in sorted(stages.items())]
+    embed.add_field(name="🧩 Stages", value="\n".join(lines) or "No stage timings yet.", inline=False)
+
+    embed.add_field(name="🔁 Event Loop Lag", value=f"last {format_ms(metrics.last_loop_lag)}, p99 {format_ms(metrics.loop_lag.quantile(0.99))}", inline=True)
+    embed.add_field(name="🎲 Active Games", value=f"{len(active_blackjack_games)} blackjack, {len(active_mines_games)} mines, {len(bot.game_sessions)} sessions", inline=True)
+    errors = metrics.discord_errors()
+    embed.add_field(name="🌐 Discord Errors", value=", ".join(f"{status}: {count}" for status, count in sorted(errors.items())) or "None", inline=True)
+    throttled = {}
+    for (command, _), count in metrics.rate_limited.values.items():
+        throttled[command] = throttled.get(command, 0) + count
+    embed.add_field(name="🚦 Throttled", value=", ".join(f"`{command}` {count}" for command, count in sorted(throttled.items(), key=lambda item: -item[1])[:8]) or "None", inline=False)
+    embed.set_footer(text=f"Prometheus: http://{METRICS_HOST}:{METRICS_PORT}/metrics")
+    await ctx.send(embed=embed)
+
+@bot.command(name="cpuprofile", help="(Admin) Sample the bot's CPU usage for a few seconds. Usage: .cpuprofile [seconds]")
+@commands.has_permissions(administrator=True)
+async def cpuprofile_command(ctx, seconds: int = 10):
+    if is_no_command_zone(ctx.channel.id, True):
+        return await ctx.send("❌ Commands are not allowed in this channel. Please use a game channel or DMs.")
+    if bot.profiler.cpu_running:
+        return await ctx.send("❌ A CPU profile is already running.")
+
+    seconds = max(1, min(seconds, MAX_PROFILE_SECONDS))
+    await ctx.send(f"🔬 Sampling for {seconds}s...")
+    path, (by_label, top_stacks, leaves), total = await bot.profiler.profile_cpu(seconds)
+
+    embed = discord.Embed(title="🔬 CPU Profile", description=f"{total} samples over {seconds}s", color=discord.Color.blue())
+    lines = [f"`{label}` {count / total:.1%}" for label, count in by_label.most_common(10)]
+    embed.add_field(name="By Command", value="\n".join(lines) or "No samples.", inline=False)
+    lines = [f"`{leaf}` {count / total:.1%}" for leaf, count in leaves[:8]]
+    embed.add_field(name="Hottest Functions", value="\n".join(lines) or "Idle the whole time.", inline=False)
+    busiest = next((label for label, _ in by_label.most_common() if label != "idle"), None)
+    if busiest:
+        stack, count = top_stacks[busiest][0]
+        embed.add_field(name=f"Top Stack: {busiest}", value=f"```{' > '.join(stack[-5:])[-1000:]}```", inline=False)
+    embed.set_footer(text=path)
+    await ctx.send(embed=embed, file=discord.File(path))
+
+@bot.command(name="memsnap", help="(Admin) Diff memory allocations since the last snapshot. Usage: .memsnap or .memsnap stop")
+@commands.has_permissions(administrator=True)
+async def memsnap_command(ctx, action: str = None):
+    if is_no_command_zone(ctx.channel.id, True):
+        return await ctx.send("❌ Commands are not allowed in this channel. Please use a game channel or DMs.")
+
+    profiler = bot.profiler
+    if action == "stop":
+        if profiler.last_snapshot is None:
+            return await ctx.send("Memory tracing is not running.")
+        profiler.stop_memory_tracing()
+        return await ctx.send("🧠 Memory tracing stopped.")
+    if profiler.last_snapshot is None:
+        profiler.start_memory_tracing()
+        return await ctx.send("🧠 Memory tracing started. Run `.memsnap` again later to see what grew, and `.memsnap stop` when done.")
+
+    path, growth, (before, after) = profiler.memory_diff()
+    embed = discord.Embed(title="🧠 Memory Diff", color=discord.Color.blue())
+    lines = [f"`{stat.traceback[0].filename.rsplit('/', 1)[-1]}:{stat.traceback[0].lineno}` {stat.size_diff / 1024:+.1f} KiB ({stat.count_diff:+d})" for stat in growth]
+    embed.add_field(name="Top Growth", value="\n".join(lines) or "Nothing grew.", inline=False)
+    lines = [f"{name}: {before[name]} → {value}" for name, value in after.items()]
+    embed.add_field(name="Tracked Objects", value="\n".join(lines), inline=False)
+    embed.set_footer(text=path)
+    await ctx.send(embed=embed, file=discord.File(path))
+
+@bot.command(name="trace", help="(Admin) Record anonymized command and button traffic for replay. Usage: .trace start|stop")
+@commands.has_permissions(administrator=True)
+async def trace_command(ctx, action: str):
+    if is_no_command_zone(ctx.channel.id, True):
+        return await ctx.send("❌ Commands are not allowed in this channel. Please use a game channel or DMs.")
+
+    action = action.lower()
+    if action == "start":
+        if bot.trace_recorder is not None:
+            return await ctx.send(f"❌ Already recording to `{bot.trace_recorder.path}`.")
+        os.makedirs(TRACE_DIR, exist_ok=True)
+        path = os.path.join(TRACE_DIR, f"trace_{time.strftime('%Y%m%d_%H%M%S')}.jsonl.gz")
+        bot.trace_recorder = TraceRecorder(path, BOT_PREFIX)
+        print(f"[TRACE] Recording to {path}")
+        await ctx.send(f"⏺️ Recording command and button traffic to `{path}`. Run `.trace stop` to finish.")
+    elif action == "stop":
+        recorder = bot.trace_recorder
+        if recorder is None:
+            return await ctx.send("Not recording.")
+        bot.trace_recorder = None
+        recorder.close()
+        await ctx.send(f"⏹️ Recorded {recorder.events} events from {len(recorder.users)} players to `{recorder.path}`.")
+    else:
+        await ctx.send("Usage: `.trace start` or `.trace stop`")
+
 @bot.command(name="leaderboard", help="Shows the top players by Dragon Coin balance.")
 async def leaderboard_command(ctx):
     # Leaderboard can be used in the designated leaderboard channel OR admin channels
@@ -1439,14 +1652,22 @@ async def leaderboard_command(ctx):
             description="Top 10 Players by Dragon Coin Balance",
             color=discord.Color.gold()
         )
+        embed.set_footer(text="Balance updates in real-time")
+        
+        try:
+            card = await bot.cards.leaderboard(users)
+        except Exception as e:
+            print(f"[CARDS] Error rendering leaderboard card: {e}")
+        else:
+            embed.set_image(url="attachment://leaderboard.png")
+            return await ctx.send(embed=embed, file=discord.File(io.BytesIO(card), filename="leaderboard.png"))
         
         leaderboard_text = ""
-        for idx, (username, dc_balance, wagered, won, games) in enumerate(users, 1):
+        for idx, (username, dc_units, wagered, won, games) in enumerate(users, 1):
+            dc_balance = units_to_dc(dc_units)
             leaderboard_text += f"**#{idx}** {username}\n💎 **{dc_balance:.2f} DC** [${dc_balance * DC_VALUE_USD:.2f}]\n"
         
         embed.add_field(name="Top Players", value=leaderboard_text, inline=False)
-        embed.set_footer(text="Balance updates in real-time")
-        
         await ctx.send(embed=embed)
     except Exception as e:
         print(f"Error fetching leaderboard: {e}")
@@ -1465,13 +1686,13 @@ async def help_casino_command(ctx):
     
     embed.add_field(
         name="📊 Profile & Balance",
-        value="``.profile`` - View your profile and balance\n``.withdraw <amount>`` - Withdraw DC to SOL",
+        value="``.profile`` - View your profile and balance\n``.history`` - Page through your past rounds\n``.export rounds|transactions [csv|jsonl]`` - Get your history as a file by DM\n``.withdraw <amount>`` - Withdraw DC to SOL",
         inline=False
     )
     
     embed.add_field(
         name="🔐 Provably Fair",
-        value="Daily seeds are posted to the seed channel every 24 hours",
+        value="Server seeds change every 30 minutes and are committed in advance by a hash chain; each is revealed in the seed channel when its epoch ends\n``.seed [epoch]`` - Look up an epoch's seed and hash",
         inline=False
     )
     
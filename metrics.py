@@ -0,0 +1,289 @@
+import asyncio
+import re
+import time
+from aiohttp import TraceConfig, web
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+
+# Upper bounds in seconds; a final +Inf bucket is implied
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+LOOP_LAG_INTERVAL = 0.5
+
+# Command or button currently being handled, used to attribute stage timings
+current_command = ContextVar("current_command", default="background")
+# perf_counter() at which on_message started on the current message; the auth stage runs from here to the command body
+message_received = ContextVar("message_received", default=None)
+
+# Snowflakes, and the token or emoji that follows some path segments, become placeholders in route labels
+SNOWFLAKE = re.compile(r"/\d+(?=/|$)")
+PATH_PARAMETER = re.compile(r"/(interactions|webhooks)/\{id\}/[^/]+|/reactions/[^/]+")
+
+
+class Counter:
+    def __init__(self, name, help_text, labels=()):
+        self.name = name
+        self.help_text = help_text
+        self.labels = labels
+        self.values = {}
+
+    def inc(self, *label_values, amount=1):
+        self.values[label_values] = self.values.get(label_values, 0) + amount
+
+    def expose(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} counter"]
+        for label_values, value in self.values.items():
+            lines.append(f"{self.name}{format_labels(self.labels, label_values)} {value}")
+        return lines
+
+
+class Histogram:
+    """Fixed-bucket histogram; observe() is one bisect and two additions."""
+
+    def __init__(self, name, help_text, labels=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.labels = labels
+        self.buckets = buckets
+        self.series = {}
+
+    def observe(self, seconds, *label_values):
+        series = self.series.get(label_values)
+        if series is None:
+            series = self.series[label_values] = [[0] * (len(self.buckets) + 1), 0.0]
+        series[0][bisect_left(self.buckets, seconds)] += 1
+        series[1] += seconds
+
+    def count(self, *label_values):
+        series = self.series.get(label_values)
+        return sum(series[0]) if series else 0
+
+    def quantile(self, q, *label_values):
+        series = self.series.get(label_values)
+        return bucket_quantile(self.buckets, series[0], q) if series else 0.0
+
+    def expose(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        for label_values, (counts, total) in self.series.items():
+            running = 0
+            for bound, count in zip(self.buckets + ("+Inf",), counts):
+                running += count
+                lines.append(f"{self.name}_bucket{format_labels(self.labels + ('le',), label_values + (bound,))} {running}")
+            lines.append(f"{self.name}_sum{format_labels(self.labels, label_values)} {total}")
+            lines.append(f"{self.name}_count{format_labels(self.labels, label_values)} {running}")
+        return lines
+
+
+def bucket_quantile(buckets, counts, q):
+    """Estimates a quantile from bucket counts (upper bound of the bucket it falls in)."""
+    target = q * sum(counts)
+    running = 0
+    for index, count in enumerate(counts):
+        running += count
+        if running >= target:
+            return buckets[index] if index < len(buckets) else float("inf")
+    return float("inf")
+
+
+def route_path(path):
+    """Turns a REST URL path into a route label, e.g. /channels/{id}/messages."""
+    path = SNOWFLAKE.sub("/{id}", path.split("/api/v10", 1)[-1])
+    return PATH_PARAMETER.sub(lambda match: f"/{match.group(1)}/{{id}}/{{token}}" if match.group(1) else "/reactions/{emoji}", path)
+
+
+def format_labels(names, values):
+    if not names:
+        return ""
+    pairs = ",".join(f'{name}="{str(value)}"' for name, value in zip(names, values))
+    return "{" + pairs + "}"
+
+
+class Metrics:
+    """Counters and latency histograms for commands, button clicks and their stages.
+
+    Stages are auth, db_read, fairness, db_write and discord_api; each observation is attributed
+    to the command or button in `current_command`. Gauges such as active game counts are read
+    only when the endpoint is scraped or `.stats` is run, so they cost nothing in between.
+    """
+
+    def __init__(self):
+        self.commands = Histogram("dragon_command_seconds", "Command and button handling time", ("command",))
+        self.command_errors = Counter("dragon_command_errors_total", "Commands and buttons that raised", ("command",))
+        self.stages = Histogram("dragon_stage_seconds", "Time spent per stage of a command or button", ("command", "stage"))
+        self.discord_requests = Histogram("dragon_discord_request_seconds", "Discord REST calls", ("route",))
+        self.discord_statuses = Counter("dragon_discord_responses_total", "Discord REST responses by outcome", ("route", "outcome"))
+        self.external_requests = Histogram("dragon_external_request_seconds", "HTTP calls to price and RPC endpoints", ("endpoint", "outcome"))
+        self.user_lookups = Counter("dragon_user_lookups_total", "User id resolutions by where the user was found", ("source",))
+        self.outbound = Counter("dragon_outbound_messages_total", "Queued messages by outcome", ("kind", "outcome"))
+        self.card_renders = Counter("dragon_card_renders_total", "Profile and leaderboard cards by whether they were rendered or cached", ("card", "source"))
+        self.rate_limited = Counter("dragon_rate_limited_total", "Commands and clicks rejected by the throttle", ("command", "scope"))
+        self.loop_lag = Histogram("dragon_event_loop_lag_seconds", "Event loop scheduling delay", buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 5.0))
+        self.gauges = {}
+        self.last_loop_lag = 0.0
+        # Discord requests made while handling a command or button; the outbound queue paces itself around these
+        self.foreground_discord_requests = 0
+        self._lag_task = None
+
+    def observe_stage(self, stage, seconds):
+        self.stages.observe(seconds, current_command.get(), stage)
+
+    def timed(self, stage, func):
+        """Wraps a function or coroutine function so its duration is recorded under `stage`."""
+        observe = self.stages.observe
+
+        if asyncio.iscoroutinefunction(func):
+            @wraps(func)
+            async def timed_coroutine(*args, **kwargs):
+                started = time.perf_counter()
+                try:
+                    return await func(*args, **kwargs)
+                finally:
+                    observe(time.perf_counter() - started, current_command.get(), stage)
+            return timed_coroutine
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                observe(time.perf_counter() - started, current_command.get(), stage)
+        return wrapper
+
+    def instrument(self, obj, stage, *method_names):
+        """Replaces the given methods on one object with timed wrappers."""
+        for method_name in method_names:
+            setattr(obj, method_name, self.timed(stage, getattr(obj, method_name)))
+
+    def discord_trace(self):
+        """Returns an aiohttp trace config that times every Discord REST call, for the client's `http_trace` option.
+
+        Interaction responses and followups share the client's HTTP session, so they are timed too.
+        Each attempt is timed on its own: a request discord.py retries after a 429 shows up once per try.
+        """
+        observe_stage = self.stages.observe
+        observe_route = self.discord_requests.observe
+        statuses = self.discord_statuses
+        metrics = self
+
+        async def on_request_start(session, context, params):
+            context.key = f"{params.method} {route_path(params.url.path)}"
+            context.command = current_command.get()
+            if context.command != "background":
+                metrics.foreground_discord_requests += 1
+            context.started = time.perf_counter()
+
+        def finish(context, outcome):
+            elapsed = time.perf_counter() - context.started
+            observe_route(elapsed, context.key)
+            observe_stage(elapsed, context.command, "discord_api")
+            statuses.inc(context.key, outcome)
+
+        async def on_request_end(session, context, params):
+            status = params.response.status
+            finish(context, "ok" if status < 400 else str(status))
+
+        async def on_request_exception(session, context, params):
+            finish(context, type(params.exception).__name__)
+
+        trace = TraceConfig()
+        trace.on_request_start.append(on_request_start)
+        trace.on_request_end.append(on_request_end)
+        trace.on_request_exception.append(on_request_exception)
+        return trace
+
+    @contextmanager
+    def external(self, endpoint):
+        """Times an outbound HTTP call to a third-party endpoint (price feed, Solana RPC)."""
+        started = time.perf_counter()
+        outcome = "ok"
+        try:
+            yield
+        except Exception as e:
+            outcome = type(e).__name__
+            raise
+        finally:
+            self.external_requests.observe(time.perf_counter() - started, endpoint, outcome)
+
+    def gauge(self, name, help_text, read):
+        """Registers a gauge whose value is read by calling `read()` at scrape time."""
+        self.gauges[name] = (help_text, read)
+
+    def command_started(self, name):
+        """Marks the start of a command or button; returns a token for command_finished."""
+        return current_command.set(name), time.perf_counter()
+
+    def command_finished(self, token, failed=False):
+        context_token, started = token
+        name = current_command.get()
+        self.commands.observe(time.perf_counter() - started, name)
+        if failed:
+            self.command_errors.inc(name)
+        current_command.reset(context_token)
+
+    def command_summary(self):
+        """(name, count, p50, p95, errors) per command and button, busiest first."""
+        rows = []
+        for (name,), (counts, _) in self.commands.series.items():
+            rows.append((name, sum(counts), bucket_quantile(self.commands.buckets, counts, 0.5),
+                         bucket_quantile(self.commands.buckets, counts, 0.95), self.command_errors.values.get((name,), 0)))
+        rows.sort(key=lambda row: row[1], reverse=True)
+        return rows
+
+    def stage_summary(self):
+        """{stage: (count, p50, p95, total_seconds)} summed over all commands."""
+        merged = {}
+        for (_, stage), (counts, total) in self.stages.series.items():
+            if stage not in merged:
+                merged[stage] = [[0] * len(counts), 0.0]
+            merged[stage][0] = [a + b for a, b in zip(merged[stage][0], counts)]
+            merged[stage][1] += total
+        return {
+            stage: (sum(counts), bucket_quantile(self.stages.buckets, counts, 0.5), bucket_quantile(self.stages.buckets, counts, 0.95), total)
+            for stage, (counts, total) in merged.items()
+        }
+
+    def discord_errors(self):
+        """Count of failed Discord REST calls by status (429, 403, ...)."""
+        errors = {}
+        for (_, outcome), value in self.discord_statuses.values.items():
+            if outcome != "ok":
+                errors[outcome] = errors.get(outcome, 0) + value
+        return errors
+
+    def start_loop_monitor(self):
+        if self._lag_task is None or self._lag_task.done():
+            self._lag_task = asyncio.create_task(self._monitor_loop_lag())
+
+    async def _monitor_loop_lag(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            expected = loop.time() + LOOP_LAG_INTERVAL
+            await asyncio.sleep(LOOP_LAG_INTERVAL)
+            self.last_loop_lag = max(0.0, loop.time() - expected)
+            self.loop_lag.observe(self.last_loop_lag)
+
+    def expose(self):
+        """Renders everything in the Prometheus text format."""
+        lines = []
+        for metric in (self.commands, self.command_errors, self.stages, self.discord_requests, self.discord_statuses, self.external_requests, self.user_lookups, self.card_renders, self.outbound, self.rate_limited, self.loop_lag):
+            lines.extend(metric.expose())
+        for name, (help_text, read) in self.gauges.items():
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} gauge")
+            lines.append(f"{name} {read()}")
+        return "\n".join(lines) + "\n"
+
+    async def serve(self, host, port):
+        """Serves /metrics over HTTP for Prometheus."""
+        async def handle(request):
+            return web.Response(text=self.expose(), content_type="text/plain", charset="utf-8")
+
+        app = web.Application()
+        app.router.add_get("/metrics", handle)
+        runner = web.AppRunner(app, access_log=None)
+        await runner.setup()
+        await web.TCPSite(runner, host, port).start()
+        print(f"[METRICS] Serving Prometheus metrics on http://{host}:{port}/metrics")
+        return runner
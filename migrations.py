@@ -0,0 +1,535 @@
+#!/usr/bin/env python3
+"""Versioned schema migrations for the bot's SQLite database.
+
+Each migration has a number and is recorded in schema_version once applied, so a bot that is
+already up to date does one SELECT at startup instead of re-running every CREATE and ALTER.
+Schema migrations run in order inside their own write transaction before the bot uses the
+database. Background migrations (index builds, backfills) run on a separate connection in a
+worker thread, so the bot keeps serving games while a large database is upgraded. Nothing may
+depend on a background migration having finished.
+
+A migration function that returns False has more to do and is called again in a new
+transaction, so large copies and backfills never hold the write lock for long.
+
+Usage: python migrations.py [--status]  (database from DB_FILE)
+  Applies every pending migration, background ones included, without starting the bot.
+"""
+import argparse
+import asyncio
+import os
+import sqlite3
+import time
+from admin_queues import create_queue_indexes
+from money import DC_UNITS, LAMPORTS_PER_SOL
+from responsible_gaming import USAGE_SLOT_SECONDS
+from seeds import SEED_EPOCH_SECONDS
+
+# Rows per backfill batch; each batch holds the write lock for a few milliseconds
+BACKFILL_BATCH_ROWS = 2000
+# Pause between background batches, so bot writes waiting on the lock get in first
+BACKGROUND_PAUSE_SECONDS = 0.05
+
+
+def create_base_tables(cursor):
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS users (
+            user_id INTEGER PRIMARY KEY,
+            username TEXT NOT NULL,
+            dragon_coins REAL DEFAULT 0.00,
+            total_wagered REAL DEFAULT 0.00,
+            total_won REAL DEFAULT 0.00,
+            games_played INTEGER DEFAULT 0,
+            is_elite_dragon BOOLEAN DEFAULT 0,
+            client_seed TEXT DEFAULT 'default_seed',
+            nonce INTEGER DEFAULT 0,
+            total_deposited REAL DEFAULT 0.00,
+            daily_wager_amount REAL DEFAULT 0.00,
+            daily_usage_seconds INTEGER DEFAULT 0,
+            last_usage_warning_time DATETIME DEFAULT NULL,
+            session_start_time DATETIME DEFAULT CURRENT_TIMESTAMP,
+            last_daily_reset DATE DEFAULT NULL
+        )
+    """)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS bot_transactions (
+            transaction_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER,
+            recipient TEXT,
+            sol_address TEXT,
+            sol_amount REAL,
+            dc_amount REAL,
+            transaction_type TEXT,
+            status TEXT DEFAULT 'pending',
+            tx_hash TEXT,
+            timestamp DATETIME DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS seed_history (
+            seed_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            secret_seed TEXT NOT NULL,
+            public_hash TEXT NOT NULL,
+            posted_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+            secret_revealed BOOLEAN DEFAULT 0
+        )
+    """)
+
+
+def add_responsible_gaming_columns(cursor):
+    # Databases from before versioning may have a users table without these columns
+    cursor.execute("PRAGMA table_info(users)")
+    columns = [col[1] for col in cursor.fetchall()]
+    if 'daily_wager_amount' not in columns:
+        cursor.execute("ALTER TABLE users ADD COLUMN daily_wager_amount REAL DEFAULT 0.00")
+    if 'daily_usage_seconds' not in columns:
+        cursor.execute("ALTER TABLE users ADD COLUMN daily_usage_seconds INTEGER DEFAULT 0")
+    if 'last_usage_warning_time' not in columns:
+        cursor.execute("ALTER TABLE users ADD COLUMN last_usage_warning_time DATETIME DEFAULT NULL")
+    if 'session_start_time' not in columns:
+        cursor.execute("ALTER TABLE users ADD COLUMN session_start_time DATETIME DEFAULT NULL")
+    if 'last_daily_reset' not in columns:
+        cursor.execute("ALTER TABLE users ADD COLUMN last_daily_reset DATE DEFAULT NULL")
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS daily_usage_history (
+            user_id INTEGER NOT NULL,
+            day DATE NOT NULL,
+            wagered REAL DEFAULT 0.00,
+            usage_seconds INTEGER DEFAULT 0,
+            PRIMARY KEY (user_id, day)
+        )
+    """)
+
+
+def create_escrow_tables(cursor):
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS escrow_reservations (
+            reservation_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER NOT NULL,
+            game TEXT NOT NULL,
+            stake REAL NOT NULL,
+            payout REAL,
+            status TEXT NOT NULL DEFAULT 'open',
+            created_at INTEGER NOT NULL,
+            expires_at INTEGER NOT NULL,
+            settled_at INTEGER
+        )
+    """)
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_escrow_open ON escrow_reservations (status, expires_at)")
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS game_journal (
+            reservation_id INTEGER PRIMARY KEY,
+            user_id INTEGER NOT NULL,
+            game TEXT NOT NULL,
+            seed INTEGER NOT NULL,
+            client_seed TEXT,
+            nonce INTEGER,
+            bet REAL NOT NULL,
+            mines_count INTEGER,
+            actions TEXT NOT NULL DEFAULT '',
+            channel_id INTEGER,
+            message_id INTEGER,
+            extra_message_id INTEGER,
+            updated_at INTEGER
+        )
+    """)
+
+
+def create_bot_state_table(cursor):
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS bot_state (
+            key TEXT PRIMARY KEY,
+            value TEXT
+        )
+    """)
+
+
+def create_treasury_table(cursor):
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS treasury_totals (
+            key TEXT PRIMARY KEY,
+            value REAL NOT NULL DEFAULT 0
+        )
+    """)
+
+
+def build_queue_indexes(cursor):
+    # One batch: SQLite cannot build an index in pieces
+    create_queue_indexes(cursor)
+
+
+def complete_tip_deposits(cursor):
+    """tip.cc deposits used to be stored with the default 'pending' status although they were credited on arrival."""
+    cursor.execute("""
+        UPDATE bot_transactions SET status = 'completed' WHERE transaction_id IN (
+            SELECT transaction_id FROM bot_transactions WHERE transaction_type = 'deposit' AND status = 'pending' LIMIT ?
+        )
+    """, (BACKFILL_BATCH_ROWS,))
+    return cursor.rowcount < BACKFILL_BATCH_ROWS
+
+
+# Tables rebuilt by migration 8 with integer money columns: (CREATE statement, key columns, {money column: units per DC or SOL})
+INTEGER_MONEY_TABLES = {
+    "users": ("""
+        CREATE TABLE IF NOT EXISTS {table} (
+            user_id INTEGER PRIMARY KEY,
+            username TEXT NOT NULL,
+            dragon_coins INTEGER DEFAULT 0,
+            total_wagered INTEGER DEFAULT 0,
+            total_won INTEGER DEFAULT 0,
+            games_played INTEGER DEFAULT 0,
+            is_elite_dragon BOOLEAN DEFAULT 0,
+            client_seed TEXT DEFAULT 'default_seed',
+            nonce INTEGER DEFAULT 0,
+            total_deposited INTEGER DEFAULT 0,
+            daily_wager_amount INTEGER DEFAULT 0,
+            daily_usage_seconds INTEGER DEFAULT 0,
+            last_usage_warning_time DATETIME DEFAULT NULL,
+            session_start_time DATETIME DEFAULT CURRENT_TIMESTAMP,
+            last_daily_reset DATE DEFAULT NULL
+        )
+    """, ("user_id",), {"dragon_coins": DC_UNITS, "total_wagered": DC_UNITS, "total_won": DC_UNITS, "total_deposited": DC_UNITS, "daily_wager_amount": DC_UNITS}),
+    "bot_transactions": ("""
+        CREATE TABLE IF NOT EXISTS {table} (
+            transaction_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER,
+            recipient TEXT,
+            sol_address TEXT,
+            sol_amount INTEGER,
+            dc_amount INTEGER,
+            transaction_type TEXT,
+            status TEXT DEFAULT 'pending',
+            tx_hash TEXT,
+            timestamp DATETIME DEFAULT CURRENT_TIMESTAMP
+        )
+    """, ("transaction_id",), {"dc_amount": DC_UNITS, "sol_amount": LAMPORTS_PER_SOL}),
+    "escrow_reservations": ("""
+        CREATE TABLE IF NOT EXISTS {table} (
+            reservation_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER NOT NULL,
+            game TEXT NOT NULL,
+            stake INTEGER NOT NULL,
+            payout INTEGER,
+            status TEXT NOT NULL DEFAULT 'open',
+            created_at INTEGER NOT NULL,
+            expires_at INTEGER NOT NULL,
+            settled_at INTEGER
+        )
+    """, ("reservation_id",), {"stake": DC_UNITS, "payout": DC_UNITS}),
+    "game_journal": ("""
+        CREATE TABLE IF NOT EXISTS {table} (
+            reservation_id INTEGER PRIMARY KEY,
+            user_id INTEGER NOT NULL,
+            game TEXT NOT NULL,
+            seed INTEGER NOT NULL,
+            client_seed TEXT,
+            nonce INTEGER,
+            bet INTEGER NOT NULL,
+            mines_count INTEGER,
+            actions TEXT NOT NULL DEFAULT '',
+            channel_id INTEGER,
+            message_id INTEGER,
+            extra_message_id INTEGER,
+            updated_at INTEGER
+        )
+    """, ("reservation_id",), {"bet": DC_UNITS}),
+    "daily_usage_history": ("""
+        CREATE TABLE IF NOT EXISTS {table} (
+            user_id INTEGER NOT NULL,
+            day DATE NOT NULL,
+            wagered INTEGER DEFAULT 0,
+            usage_seconds INTEGER DEFAULT 0,
+            PRIMARY KEY (user_id, day)
+        )
+    """, ("user_id", "day"), {"wagered": DC_UNITS}),
+}
+
+
+def _column_type(cursor, table, column):
+    for row in cursor.execute(f"PRAGMA table_info({table})"):
+        if row[1] == column:
+            return row[2].upper()
+    return None
+
+
+def _rebuild_batch(cursor, table, create_sql, keys, money):
+    """Copies the next batch of `table` into {table}_new with money columns scaled to integers.
+
+    Progress is the last key copied, so an interrupted rebuild picks up where it stopped. After the
+    last batch the new table replaces the old one, keeping its indexes and AUTOINCREMENT counter.
+    """
+    new_table = f"{table}_new"
+    cursor.execute(create_sql.format(table=new_table))
+    columns = [row[1] for row in cursor.execute(f"PRAGMA table_info({new_table})")]
+    key_list = ", ".join(keys)
+    last = cursor.execute(f"SELECT {key_list} FROM {new_table} ORDER BY {', '.join(key + ' DESC' for key in keys)} LIMIT 1").fetchone()
+    where = f"({key_list}) > ({', '.join('?' * len(keys))})" if last else "1"
+    values = [f"CAST(ROUND({column} * {money[column]}) AS INTEGER)" if column in money else column for column in columns]
+    cursor.execute(
+        f"INSERT INTO {new_table} ({', '.join(columns)}) SELECT {', '.join(values)} FROM {table} WHERE {where} ORDER BY {key_list} LIMIT ?",
+        (*(last or ()), BACKFILL_BATCH_ROWS)
+    )
+    if cursor.rowcount == BACKFILL_BATCH_ROWS:
+        return False
+    indexes = [row[0] for row in cursor.execute("SELECT sql FROM sqlite_master WHERE type = 'index' AND tbl_name = ? AND sql IS NOT NULL", (table,))]
+    # Request ids must not be reused for rows that were deleted before the rebuild
+    if cursor.execute("SELECT 1 FROM sqlite_master WHERE name = 'sqlite_sequence'").fetchone():
+        cursor.execute("DELETE FROM sqlite_sequence WHERE name = ?", (new_table,))
+        cursor.execute("INSERT INTO sqlite_sequence (name, seq) SELECT ?, seq FROM sqlite_sequence WHERE name = ?", (new_table, table))
+    cursor.execute(f"DROP TABLE {table}")
+    cursor.execute(f"ALTER TABLE {new_table} RENAME TO {table}")
+    for sql in indexes:
+        cursor.execute(sql)
+    return True
+
+
+def convert_money_to_integers(cursor):
+    """Rebuilds the money tables with INTEGER micro-DC and lamport columns, one batch per call.
+
+    treasury_totals is recreated empty; bootstrap_totals seeds it again from the converted rows.
+    """
+    for table, (create_sql, keys, money) in INTEGER_MONEY_TABLES.items():
+        if _column_type(cursor, table, next(iter(money))) != "INTEGER":
+            _rebuild_batch(cursor, table, create_sql, keys, money)
+            return False
+    if _column_type(cursor, "treasury_totals", "value") != "INTEGER":
+        cursor.execute("DROP TABLE IF EXISTS treasury_totals")
+        cursor.execute("""
+            CREATE TABLE treasury_totals (
+                key TEXT PRIMARY KEY,
+                value INTEGER NOT NULL DEFAULT 0
+            )
+        """)
+    return True
+
+
+def create_seed_chain_tables(cursor):
+    """Hash-chain server seeds (seeds.py), one row per 30-minute epoch; seed_history is kept for older seeds."""
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS seed_chains (
+            chain_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            first_epoch INTEGER NOT NULL,
+            length INTEGER NOT NULL,
+            terminal_hash TEXT NOT NULL,
+            created_at INTEGER NOT NULL
+        )
+    """)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS server_seeds (
+            epoch INTEGER PRIMARY KEY,
+            chain_id INTEGER NOT NULL,
+            seed TEXT NOT NULL,
+            revealed INTEGER NOT NULL DEFAULT 0
+        )
+    """)
+    # Reveals only visit seeds not yet revealed, however long the history gets
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_server_seeds_unrevealed ON server_seeds (epoch) WHERE revealed = 0")
+
+
+def create_rounds_table(cursor):
+    """Per-round game history (rounds.py); game_journal also keeps the seed epoch of games in progress."""
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS rounds (
+            user_id INTEGER NOT NULL,
+            round_id INTEGER NOT NULL,
+            game INTEGER NOT NULL,
+            stake INTEGER NOT NULL,
+            payout INTEGER NOT NULL,
+            settled_at INTEGER NOT NULL,
+            seed_epoch INTEGER,
+            client_seed TEXT,
+            nonce INTEGER,
+            outcome INTEGER NOT NULL,
+            PRIMARY KEY (user_id, round_id)
+        ) WITHOUT ROWID
+    """)
+    if _column_type(cursor, "game_journal", "seed_epoch") is None:
+        cursor.execute("ALTER TABLE game_journal ADD COLUMN seed_epoch INTEGER")
+        # Games in progress during the upgrade drew their seed when their stake was reserved
+        cursor.execute(f"""
+            UPDATE game_journal SET seed_epoch = (
+                SELECT created_at / {SEED_EPOCH_SECONDS} FROM escrow_reservations e WHERE e.reservation_id = game_journal.reservation_id
+            )
+        """)
+
+
+def build_balance_index(cursor):
+    # The leaderboard's top 10 and the rank on profile cards (cards.py) read it instead of every user
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_users_balance ON users (dragon_coins)")
+
+
+def add_wager_warning_columns(cursor):
+    """The day's wager baseline (micro-DC) and the wager warning level already sent, so a restart neither resets nor repeats them."""
+    if _column_type(cursor, "users", "daily_wager_baseline") is None:
+        cursor.execute("ALTER TABLE users ADD COLUMN daily_wager_baseline INTEGER DEFAULT 0")
+    if _column_type(cursor, "users", "daily_warned_level") is None:
+        cursor.execute("ALTER TABLE users ADD COLUMN daily_warned_level INTEGER DEFAULT 0")
+
+
+def create_usage_slots_table(cursor):
+    """Wager (micro-DC) and usage seconds per user per 15-minute slot, summed over a trailing window by responsible_gaming.py."""
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS usage_slots (
+            user_id INTEGER NOT NULL,
+            slot INTEGER NOT NULL,
+            wagered INTEGER NOT NULL DEFAULT 0,
+            usage_seconds INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (user_id, slot)
+        ) WITHOUT ROWID
+    """)
+    # Startup loads and the daily archive read slot ranges across all users
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_usage_slots_slot ON usage_slots (slot)")
+    # Today's counters so far carry over into the current slot, so the upgrade does not reset anyone's warnings
+    cursor.execute(f"""
+        INSERT OR IGNORE INTO usage_slots (user_id, slot, wagered, usage_seconds)
+        SELECT user_id, CAST(strftime('%s', 'now') AS INTEGER) / {USAGE_SLOT_SECONDS}, daily_wager_amount, daily_usage_seconds
+        FROM users WHERE daily_wager_amount > 0 OR daily_usage_seconds > 0
+    """)
+
+
+def add_journal_guild_column(cursor):
+    """The guild a journaled game is played in (0 in DMs), so only the shard process receiving its events restores it."""
+    if _column_type(cursor, "game_journal", "guild_id") is None:
+        cursor.execute("ALTER TABLE game_journal ADD COLUMN guild_id INTEGER")
+
+
+def add_withdrawal_message_column(cursor):
+    """The admin post of a withdrawal request, so its buttons can be disabled once it is no longer pending."""
+    if _column_type(cursor, "bot_transactions", "admin_message_id") is None:
+        cursor.execute("ALTER TABLE bot_transactions ADD COLUMN admin_message_id INTEGER")
+
+
+# (version, description, function, background). Never renumber or edit an applied migration; add a new one.
+MIGRATIONS = [
+    (1, "users, transactions and seed history", create_base_tables, False),
+    (2, "responsible-gaming columns and daily usage history", add_responsible_gaming_columns, False),
+    (3, "escrow reservations and game journal", create_escrow_tables, False),
+    (4, "bot state", create_bot_state_table, False),
+    (5, "treasury totals", create_treasury_table, False),
+    (6, "admin queue indexes", build_queue_indexes, True),
+    (7, "mark credited tip.cc deposits completed", complete_tip_deposits, True),
+    (8, "integer micro-DC and lamport money columns", convert_money_to_integers, False),
+    (9, "hash-chain server seeds", create_seed_chain_tables, False),
+    (10, "per-round game history", create_rounds_table, False),
+    (11, "balance index for leaderboard and ranks", build_balance_index, True),
+    (12, "persisted wager warning baseline and level", add_wager_warning_columns, False),
+    (13, "sliding-window usage slots", create_usage_slots_table, False),
+    (14, "guild of journaled games", add_journal_guild_column, False),
+    (15, "admin post of withdrawal requests", add_withdrawal_message_column, False),
+]
+
+
+def create_version_table(db_conn):
+    db_conn.execute("""
+        CREATE TABLE IF NOT EXISTS schema_version (
+            version INTEGER PRIMARY KEY,
+            description TEXT NOT NULL,
+            applied_at INTEGER NOT NULL
+        )
+    """)
+    db_conn.commit()
+
+
+def applied_versions(db_conn):
+    return {row[0] for row in db_conn.execute("SELECT version FROM schema_version")}
+
+
+def _record(cursor, version, description):
+    cursor.execute("INSERT INTO schema_version (version, description, applied_at) VALUES (?, ?, ?)", (version, description, int(time.time())))
+
+
+def _apply_batch(db_conn, migration):
+    """Runs one batch of a migration in a BEGIN IMMEDIATE transaction. Returns True once it is applied.
+
+    schema_version is re-checked under the write lock, so processes starting together apply
+    every migration exactly once.
+    """
+    version, description, apply, _ = migration
+    db_conn.execute("BEGIN IMMEDIATE")
+    try:
+        if db_conn.execute("SELECT 1 FROM schema_version WHERE version = ?", (version,)).fetchone() is not None:
+            db_conn.rollback()
+            return True
+        cursor = db_conn.cursor()
+        done = apply(cursor) is not False
+        if done:
+            _record(cursor, version, description)
+        db_conn.commit()
+        return done
+    except Exception:
+        db_conn.rollback()
+        raise
+
+
+def migrate(db_conn):
+    """Applies pending schema migrations in order, each to completion. Returns the versions applied."""
+    create_version_table(db_conn)
+    pending = [migration for migration in MIGRATIONS if not migration[3] and migration[0] not in applied_versions(db_conn)]
+    for migration in pending:
+        started = time.perf_counter()
+        batches = 1
+        while not _apply_batch(db_conn, migration):
+            batches += 1
+        print(f"[MIGRATE] Applied {migration[0]}: {migration[1]} in {batches} batches, {(time.perf_counter() - started) * 1000:.1f} ms")
+    return [migration[0] for migration in pending]
+
+
+def pending_background(db_conn):
+    done = applied_versions(db_conn)
+    return [migration for migration in MIGRATIONS if migration[3] and migration[0] not in done]
+
+
+def run_batch(db_file, migration):
+    """Runs one batch of a background migration on its own connection. Returns True once it is applied."""
+    db_conn = sqlite3.connect(db_file)
+    try:
+        return _apply_batch(db_conn, migration)
+    finally:
+        db_conn.close()
+
+
+async def run_background_migrations(db_conn, db_file):
+    """Works through pending background migrations in a worker thread, yielding the lock between batches."""
+    create_version_table(db_conn)
+    for migration in pending_background(db_conn):
+        version, description = migration[:2]
+        started = time.perf_counter()
+        batches = 1
+        try:
+            while not await asyncio.to_thread(run_batch, db_file, migration):
+                batches += 1
+                await asyncio.sleep(BACKGROUND_PAUSE_SECONDS)
+        except Exception as e:
+            # Later background migrations may build on this one, so stop and retry on the next start
+            print(f"[MIGRATE] Background migration {version} ({description}) failed: {e}")
+            return
+        print(f"[MIGRATE] Applied {version}: {description} in {batches} batches, {time.perf_counter() - started:.1f}s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Apply pending database migrations without starting the bot.")
+    parser.add_argument("--status", action="store_true", help="list migrations and whether they are applied, then exit")
+    args = parser.parse_args()
+
+    db_file = os.getenv("DB_FILE", "dragon_casino.db")
+    db_conn = sqlite3.connect(db_file)
+    db_conn.execute("PRAGMA journal_mode=WAL")
+    if args.status:
+        create_version_table(db_conn)
+        done = applied_versions(db_conn)
+        for version, description, _, background in MIGRATIONS:
+            state = "applied" if version in done else "pending"
+            print(f"{version:4d}  {state:8s} {'background' if background else 'schema':10s} {description}")
+        return
+
+    migrate(db_conn)
+    # Offline there is nothing to stay responsive for, but batching keeps each transaction small
+    for migration in pending_background(db_conn):
+        started = time.perf_counter()
+        while not run_batch(db_file, migration):
+            pass
+        print(f"[MIGRATE] Applied {migration[0]}: {migration[1]} in {time.perf_counter() - started:.1f}s")
+    print(f"[MIGRATE] {db_file} is at version {max(applied_versions(db_conn))}")
+
+
+if __name__ == "__main__":
+    main()
@@ -41,6 +41,7 @@ def generate_mines_board(seed_generator, user_id, mines_count):
     
     return {
         "mine_positions": set(mine_positions),
+        "seed": result_num,
         "client_seed": client_seed,
         "nonce": nonce,
         "mines_count": mines_count,
@@ -48,6 +49,14 @@ def generate_mines_board(seed_generator, user_id, mines_count):
         "board_state": ['❓'] * BOARD_SIZE
     }
 
+def restore_mines_board(seed, client_seed, nonce, mines_count, revealed):
+    """Rebuilds a board from its seed and the journaled safe tile indices."""
+    game_state = generate_mines_board(lambda *_: (seed, client_seed, nonce), None, mines_count)
+    for tile_index in revealed:
+        game_state["board_state"][tile_index] = '💎'
+        game_state["safe_clicks"] += 1
+    return game_state
+
 def get_mines_embed(user, game_state, bet_amount, net_change=None, final=False):
     """Generates the Mines game embed."""
     
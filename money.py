@@ -0,0 +1,27 @@
+"""Fixed-point money.
+
+Every amount in the database is an INTEGER: Dragon Coins in micro-DC and SOL in lamports, so
+balances, running totals and SQL sums are exact integer arithmetic. Commands, games and embeds
+keep working in DC and SOL; amounts are converted once where they enter or leave the ledger.
+"""
+
+DC_UNITS = 1_000_000            # micro-DC per DC
+LAMPORTS_PER_SOL = 1_000_000_000
+
+
+def dc_to_units(amount):
+    """DC amount (float or int) to integer micro-DC, rounded to the nearest unit."""
+    return round(amount * DC_UNITS)
+
+
+def units_to_dc(units):
+    """Integer micro-DC to DC for display and game maths."""
+    return units / DC_UNITS
+
+
+def sol_to_lamports(amount):
+    return round(amount * LAMPORTS_PER_SOL)
+
+
+def lamports_to_sol(lamports):
+    return lamports / LAMPORTS_PER_SOL
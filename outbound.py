@@ -0,0 +1,206 @@
+import asyncio
+import heapq
+import itertools
+import time
+import aiohttp
+import discord
+
+# Lower runs first. Player replies to commands and clicks are sent inline and never queued.
+PRIORITY_REPLY = 0    # deferred messages a player is waiting on (conversation timeouts)
+PRIORITY_NOTICE = 1   # DMs, seed posts, admin posts that need a button
+PRIORITY_DIGEST = 2   # coalesced admin alerts and audit lines
+# Discord allows about 50 REST requests/s per bot; queued sends only use what commands leave over
+REQUEST_BUDGET = 45.0
+MIN_BACKGROUND_RATE = 1.0
+# Per-channel pacing for queued sends (Discord allows 5 messages per 5 seconds per channel)
+ROUTE_INTERVAL = 1.0
+# Delays before each retry of a failed send; Forbidden and NotFound are never retried
+RETRY_DELAYS = (5, 30, 120)
+DIGEST_INTERVAL = 60
+DIGEST_EMBED_CHARS = 4000
+MAX_EMBEDS_PER_MESSAGE = 10
+
+
+class OutboundJob:
+    __slots__ = ("kind", "target", "kwargs", "priority", "attempts", "on_sent")
+
+    def __init__(self, kind, target, kwargs, priority, on_sent=None):
+        self.kind = kind
+        self.target = target
+        self.kwargs = kwargs
+        self.priority = priority
+        self.attempts = 0
+        self.on_sent = on_sent
+
+    @property
+    def route(self):
+        return (self.kind, self.target)
+
+
+class OutboundScheduler:
+    """Queue for every message the bot sends that no player is waiting on.
+
+    Admin alerts, DMs, seed posts and audit posts are enqueued without awaiting Discord and sent by
+    one worker in priority order. The worker paces itself to the REST budget that command and
+    button traffic leave free (counted by Metrics as foreground requests), spaces sends to the same
+    channel, and retries transient failures with backoff. Alerts passed to `alert()` are collected
+    per channel and posted as one digest embed every DIGEST_INTERVAL seconds.
+    """
+
+    def __init__(self, bot):
+        self.bot = bot
+        self.ready = []
+        self.delayed = []
+        self.digests = {}
+        self.route_next = {}
+        self._seq = itertools.count()
+        self._wakeup = asyncio.Event()
+        self._last_send = 0.0
+        self._sampled_at = time.monotonic()
+        self._sampled_count = 0
+        self._foreground_rate = 0.0
+        self._worker = None
+        self._digest_task = None
+
+    def __len__(self):
+        return len(self.ready) + len(self.delayed)
+
+    def start(self):
+        """Starts the send worker and the digest flusher."""
+        if self._worker is None or self._worker.done():
+            self._worker = asyncio.create_task(self._run())
+        if self._digest_task is None or self._digest_task.done():
+            self._digest_task = asyncio.create_task(self._flush_digests_periodically())
+
+    def send(self, channel_id, priority=PRIORITY_NOTICE, on_sent=None, **kwargs):
+        """Queues `channel.send(**kwargs)` for a channel id; `on_sent(message)` is awaited once it is posted."""
+        self._push(OutboundJob("channel", channel_id, kwargs, priority, on_sent))
+
+    def dm(self, user_id, priority=PRIORITY_NOTICE, **kwargs):
+        """Queues a direct message; users with closed DMs are skipped without retrying."""
+        self._push(OutboundJob("dm", user_id, kwargs, priority))
+
+    def alert(self, channel_id, title, line):
+        """Adds one line under `title` to the next digest posted in `channel_id`."""
+        self.digests.setdefault(channel_id, {}).setdefault(title, []).append(line)
+
+    def _push(self, job):
+        heapq.heappush(self.ready, (job.priority, next(self._seq), job))
+        self._wakeup.set()
+
+    def _delay(self, job, due):
+        heapq.heappush(self.delayed, (due, next(self._seq), job))
+        self._wakeup.set()
+
+    def flush_digests(self):
+        """Turns the collected alerts into digest messages at PRIORITY_DIGEST; returns how many alerts were flushed."""
+        flushed = 0
+        digests, self.digests = self.digests, {}
+        for channel_id, sections in digests.items():
+            embeds = []
+            for title, lines in sections.items():
+                flushed += len(lines)
+                chunk = []
+                size = 0
+                for line in lines:
+                    if chunk and size + len(line) + 1 > DIGEST_EMBED_CHARS:
+                        embeds.append(self._digest_embed(title, chunk))
+                        chunk, size = [], 0
+                    chunk.append(line)
+                    size += len(line) + 1
+                embeds.append(self._digest_embed(title, chunk))
+            for start in range(0, len(embeds), MAX_EMBEDS_PER_MESSAGE):
+                self.send(channel_id, PRIORITY_DIGEST, embeds=embeds[start:start + MAX_EMBEDS_PER_MESSAGE])
+        return flushed
+
+    @staticmethod
+    def _digest_embed(title, lines):
+        embed = discord.Embed(title=f"{title} ({len(lines)})", description="\n".join(lines)[:DIGEST_EMBED_CHARS], color=discord.Color.dark_gold(), timestamp=discord.utils.utcnow())
+        embed.set_footer(text=f"Digest of the last {DIGEST_INTERVAL} seconds")
+        return embed
+
+    async def _flush_digests_periodically(self):
+        while True:
+            await asyncio.sleep(DIGEST_INTERVAL)
+            try:
+                self.flush_digests()
+                now = time.monotonic()
+                self.route_next = {route: ready_at for route, ready_at in self.route_next.items() if ready_at > now}
+            except Exception as e:
+                print(f"[OUTBOUND] Error flushing digests: {e}")
+
+    def _background_interval(self, now):
+        """Seconds between queued sends, given how many requests commands and buttons made in the last second."""
+        elapsed = now - self._sampled_at
+        if elapsed >= 1.0:
+            count = self.bot.metrics.foreground_discord_requests
+            self._foreground_rate = (count - self._sampled_count) / elapsed
+            self._sampled_count = count
+            self._sampled_at = now
+        return 1.0 / max(MIN_BACKGROUND_RATE, REQUEST_BUDGET - self._foreground_rate)
+
+    async def _run(self):
+        while True:
+            now = time.monotonic()
+            while self.delayed and self.delayed[0][0] <= now:
+                _, _, job = heapq.heappop(self.delayed)
+                heapq.heappush(self.ready, (job.priority, next(self._seq), job))
+            if not self.ready:
+                self._wakeup.clear()
+                timeout = self.delayed[0][0] - now if self.delayed else None
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            wait = self._last_send + self._background_interval(now) - now
+            if wait > 0:
+                await asyncio.sleep(wait)
+                continue
+            _, _, job = heapq.heappop(self.ready)
+            route_ready = self.route_next.get(job.route, 0.0)
+            if route_ready > now:
+                self._delay(job, route_ready)
+                continue
+            self.route_next[job.route] = now + ROUTE_INTERVAL
+            self._last_send = now
+            await self._deliver(job)
+
+    async def _deliver(self, job):
+        metrics = self.bot.metrics
+        try:
+            if job.kind == "dm":
+                user = await self.bot.user_cache.resolve(job.target)
+                if user is None:
+                    metrics.outbound.inc(job.kind, "dropped")
+                    print(f"[OUTBOUND] Dropped dm message to {job.target}: unknown user")
+                    return
+                await user.send(**job.kwargs)
+            else:
+                message = await self.bot.get_partial_messageable(job.target).send(**job.kwargs)
+                if job.on_sent is not None:
+                    await self._notify_sent(job, message)
+            metrics.outbound.inc(job.kind, "sent")
+        except (discord.Forbidden, discord.NotFound) as e:
+            metrics.outbound.inc(job.kind, "dropped")
+            print(f"[OUTBOUND] Dropped {job.kind} message to {job.target}: {e}")
+        except (discord.HTTPException, aiohttp.ClientError, asyncio.TimeoutError) as e:
+            if job.attempts < len(RETRY_DELAYS):
+                metrics.outbound.inc(job.kind, "retried")
+                self._delay(job, time.monotonic() + RETRY_DELAYS[job.attempts])
+                job.attempts += 1
+            else:
+                metrics.outbound.inc(job.kind, "dropped")
+                print(f"[OUTBOUND] Giving up on {job.kind} message to {job.target} after {job.attempts} retries: {e}")
+        except Exception as e:
+            metrics.outbound.inc(job.kind, "dropped")
+            print(f"[OUTBOUND] Error sending {job.kind} message to {job.target}: {e}")
+
+    @staticmethod
+    async def _notify_sent(job, message):
+        # The message is out, so a failing callback must not make it look like a failed send
+        try:
+            await job.on_sent(message)
+        except Exception as e:
+            print(f"[OUTBOUND] Error after sending {job.kind} message to {job.target}: {e}")
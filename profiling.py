@@ -0,0 +1,171 @@
+import asyncio
+import gc
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+import discord
+from blackjack import active_blackjack_games
+from mines import active_mines_games
+
+PROFILE_DIR = "profiles"
+SAMPLE_INTERVAL = 0.005
+MAX_PROFILE_SECONDS = 60
+MAX_STACK_DEPTH = 40
+MEMORY_TRACE_FRAMES = 10
+TOP_ENTRIES = 50
+
+
+def frame_name(code):
+    return f"{os.path.basename(code.co_filename)}:{code.co_name}"
+
+
+def sample_stacks(thread_id, labels, duration, interval=SAMPLE_INTERVAL):
+    """Samples one thread's Python stack every `interval` seconds; runs on a worker thread.
+
+    Each sample is attributed to the innermost command or button handler on the stack, "idle"
+    when the event loop is waiting in its selector, and "background" otherwise.
+    """
+    samples = Counter()
+    deadline = time.monotonic() + duration
+    while time.monotonic() < deadline:
+        frame = sys._current_frames().get(thread_id)
+        if frame is None:
+            break
+        stack = []
+        label = None
+        while frame is not None and len(stack) < MAX_STACK_DEPTH:
+            code = frame.f_code
+            if label is None:
+                label = labels.get(code)
+            stack.append(frame_name(code))
+            frame = frame.f_back
+        if label is None:
+            label = "idle" if stack and stack[0].startswith("selectors.py:") else "background"
+        samples[(label, tuple(reversed(stack)))] += 1
+        time.sleep(interval)
+    return samples
+
+
+def summarize_samples(samples, per_label=3):
+    """Returns ({label: samples}, {label: [(stack, samples), ...]}, [(leaf, samples), ...]) from sample_stacks output."""
+    by_label = Counter()
+    stacks = {}
+    leaves = Counter()
+    for (label, stack), count in samples.items():
+        by_label[label] += count
+        stacks.setdefault(label, []).append((stack, count))
+        if label != "idle":
+            leaves[stack[-1]] += count
+    top_stacks = {label: sorted(entries, key=lambda entry: entry[1], reverse=True)[:per_label] for label, entries in stacks.items()}
+    return by_label, top_stacks, leaves.most_common(10)
+
+
+def timestamped_path(prefix):
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    return os.path.join(PROFILE_DIR, f"{prefix}_{time.strftime('%Y%m%d_%H%M%S')}.txt")
+
+
+class Profiler:
+    """On-demand CPU sampling and tracemalloc diffs for the running bot.
+
+    Nothing is installed until an admin asks for a profile: the sampler thread exists only for the
+    requested duration and tracemalloc is started by the first `.memsnap` and stopped by `.memsnap stop`.
+    """
+
+    def __init__(self, bot):
+        self.bot = bot
+        self.cpu_running = False
+        self.last_snapshot = None
+        self.last_counts = None
+
+    def handler_labels(self):
+        """Maps the code object of every command, button and conversation handler to a display name."""
+        labels = {command.callback.__code__: command.qualified_name for command in self.bot.walk_commands()}
+        for game, handler in self.bot.interaction_router.handlers.items():
+            labels[handler.__code__] = f"button:{game}"
+        for (kind, step), on_reply in self.bot.conversations.step_handlers().items():
+            if on_reply is not None:
+                labels[on_reply.__code__] = f"reply:{kind}:{step}"
+        return labels
+
+    async def profile_cpu(self, seconds):
+        """Samples the event loop thread for `seconds`; returns (report path, summarize_samples output, total samples)."""
+        self.cpu_running = True
+        try:
+            samples = await asyncio.to_thread(sample_stacks, threading.get_ident(), self.handler_labels(), seconds)
+        finally:
+            self.cpu_running = False
+        summary = summarize_samples(samples)
+        total = sum(samples.values())
+        path = timestamped_path("cpu")
+        with open(path, "w") as f:
+            f.write(f"# CPU profile: {seconds}s, {total} samples every {SAMPLE_INTERVAL * 1000:.0f}ms\n")
+            by_label, top_stacks, leaves = summary
+            for label, count in by_label.most_common():
+                f.write(f"\n## {label}: {count} samples ({count / total:.1%})\n")
+                for stack, stack_count in top_stacks[label]:
+                    f.write(f"{stack_count:6d}  {' > '.join(stack[-8:])}\n")
+            f.write("\n## Collapsed stacks (flamegraph.pl input)\n")
+            for (label, stack), count in samples.most_common():
+                f.write(f"{label};{';'.join(stack)} {count}\n")
+        print(f"[PROFILE] CPU profile written to {path}")
+        return path, summary, total
+
+    def tracked_counts(self):
+        """Sizes of the structures that grow with load, plus live discord.ui.View objects."""
+        return {
+            "blackjack games": len(active_blackjack_games),
+            "mines games": len(active_mines_games),
+            "game sessions": len(self.bot.game_sessions),
+            "conversations": len(self.bot.conversations),
+            "wheel timers": len(self.bot.timing_wheel),
+            "views": sum(1 for obj in gc.get_objects() if isinstance(obj, discord.ui.View)),
+        }
+
+    def start_memory_tracing(self):
+        tracemalloc.start(MEMORY_TRACE_FRAMES)
+        self.last_snapshot = self.take_snapshot()
+        self.last_counts = self.tracked_counts()
+        print("[PROFILE] tracemalloc started")
+
+    def stop_memory_tracing(self):
+        tracemalloc.stop()
+        self.last_snapshot = None
+        self.last_counts = None
+        print("[PROFILE] tracemalloc stopped")
+
+    def take_snapshot(self):
+        return tracemalloc.take_snapshot().filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+            tracemalloc.Filter(False, "<unknown>"),
+        ))
+
+    def memory_diff(self):
+        """Diffs a new snapshot against the previous one; returns (report path, top growth stats, (before, after) counts)."""
+        snapshot = self.take_snapshot()
+        counts = self.tracked_counts()
+        stats = snapshot.compare_to(self.last_snapshot, "lineno")
+        growth = [stat for stat in stats if stat.size_diff > 0]
+        path = timestamped_path("memory")
+        with open(path, "w") as f:
+            f.write(f"# tracemalloc diff, traced memory now {tracemalloc.get_traced_memory()[0] / 1024:.0f} KiB\n\n")
+            for name, value in counts.items():
+                f.write(f"{name}: {self.last_counts[name]} -> {value}\n")
+            f.write("\n## Top growth by line\n")
+            for stat in growth[:TOP_ENTRIES]:
+                f.write(f"{stat}\n")
+            f.write("\n## Top growth by traceback\n")
+            for stat in snapshot.compare_to(self.last_snapshot, "traceback")[:10]:
+                if stat.size_diff <= 0:
+                    continue
+                f.write(f"\n{stat.size_diff / 1024:+.1f} KiB, {stat.count_diff:+d} blocks\n")
+                f.write("\n".join(stat.traceback.format()) + "\n")
+        previous_counts = self.last_counts
+        self.last_snapshot = snapshot
+        self.last_counts = counts
+        print(f"[PROFILE] Memory diff written to {path}")
+        return path, growth[:10], (previous_counts, counts)
@@ -0,0 +1,95 @@
+import time
+
+# (tokens per second, burst) for each scope; a request must have a token in every bucket that applies
+USER_LIMIT = (3.0, 8)        # everything one user sends: commands and game clicks together
+CHANNEL_LIMIT = (25.0, 50)   # everything in one channel, to keep one busy room from starving the rest
+COMMAND_LIMITS = {
+    # per user, per command
+    "cf": (1.0, 3),
+    "rl": (1.0, 3),
+    "bj": (0.5, 2),
+    "mines": (0.5, 2),
+    "deposit": (0.1, 2),
+    "withdraw": (0.1, 2),
+    "give": (1.0, 5),
+    "remove": (1.0, 5),
+    "zap": (0.05, 1),
+    "thanos": (0.05, 1),
+    "export": (0.01, 2),
+    # per user, per game, for button clicks (a Mines board is up to 25 clicks)
+    "button:cf": (2.0, 3),
+    "button:rl": (2.0, 3),
+    "button:bj": (3.0, 5),
+    "button:mines": (4.0, 8),
+}
+DEFAULT_COMMAND_LIMIT = (1.0, 5)
+# Buckets idle this long are full again and can be dropped
+IDLE_BUCKET_SECONDS = 120
+
+
+class TokenBucket:
+    __slots__ = ("tokens", "updated")
+
+    def __init__(self, burst, now):
+        self.tokens = float(burst)
+        self.updated = now
+
+    def refill(self, rate, burst, now):
+        tokens = self.tokens + (now - self.updated) * rate
+        self.tokens = burst if tokens > burst else tokens
+        self.updated = now
+        return self.tokens
+
+
+class RateLimiter:
+    """Per-user, per-channel and per-user-per-command token buckets in front of command and button dispatch.
+
+    `check()` is a few dict lookups and float operations, with no DB or Discord calls, so a spammed
+    command or a mashed button costs almost nothing once it is over the limit. Tokens are only taken
+    when every applicable bucket has one, so a rejected request does not drain the others.
+    """
+
+    def __init__(self):
+        self.buckets = {}
+        self.noticed = set()
+
+    def _bucket(self, key, burst, now):
+        bucket = self.buckets.get(key)
+        if bucket is None:
+            bucket = self.buckets[key] = TokenBucket(burst, now)
+        return bucket
+
+    def check(self, user_id, channel_id, command):
+        """Takes a token for `command` and returns None, or returns the scope that is out of tokens."""
+        now = time.monotonic()
+        command_rate, command_burst = COMMAND_LIMITS.get(command, DEFAULT_COMMAND_LIMIT)
+        command_bucket = self._bucket((command, user_id), command_burst, now)
+        if command_bucket.refill(command_rate, command_burst, now) < 1:
+            return "command"
+        user_bucket = self._bucket(("user", user_id), USER_LIMIT[1], now)
+        if user_bucket.refill(*USER_LIMIT, now) < 1:
+            return "user"
+        channel_bucket = self._bucket(("channel", channel_id), CHANNEL_LIMIT[1], now)
+        if channel_bucket.refill(*CHANNEL_LIMIT, now) < 1:
+            return "channel"
+        command_bucket.tokens -= 1
+        user_bucket.tokens -= 1
+        channel_bucket.tokens -= 1
+        self.noticed.discard(user_id)
+        return None
+
+    def should_notice(self, user_id):
+        """True the first time a user is throttled since their last allowed request, so the warning is sent once."""
+        if user_id in self.noticed:
+            return False
+        self.noticed.add(user_id)
+        return True
+
+    def prune(self):
+        """Drops buckets that have been idle long enough to be full again."""
+        cutoff = time.monotonic() - IDLE_BUCKET_SECONDS
+        idle = [key for key, bucket in self.buckets.items() if bucket.updated < cutoff]
+        for key in idle:
+            del self.buckets[key]
+        self.noticed.clear()
+        return len(idle)
@@ -0,0 +1,356 @@
+import asyncio
+import calendar
+import os
+import time
+from collections import deque
+from datetime import date, datetime, timedelta
+from zoneinfo import ZoneInfo
+import discord
+from money import dc_to_units, units_to_dc
+
+ADMIN_CHANNEL_ID = 1445050819383791658
+
+# Percent of the starting balance wagered within the window at which a wager warning fires (once per level per crossing)
+WAGER_WARNING_LEVELS = (100, 50)
+# Dragon Casino Time warning: first at 30 minutes, then again every 30 minutes
+SESSION_WARNING_SECONDS = 1800
+# Gaps between bets longer than this do not count towards Dragon Casino Time
+SESSION_IDLE_SECONDS = 300
+# Warnings look at the trailing 24 hours, kept as 15-minute slots so the window slides without a midnight reset
+USAGE_WINDOW_SECONDS = 86400
+USAGE_SLOT_SECONDS = 900
+WINDOW_SLOTS = USAGE_WINDOW_SECONDS // USAGE_SLOT_SECONDS
+# Slots older than this are pruned by the daily archive
+USAGE_RETENTION_SECONDS = 3 * 86400
+# daily_usage_history is archived per calendar day in this timezone
+DAILY_RESET_TIMEZONE = ZoneInfo(os.getenv("DAILY_RESET_TIMEZONE", "UTC"))
+
+
+def current_usage_day(now=None):
+    """Returns the usage day (YYYY-MM-DD) that is currently open."""
+    now = now or datetime.now(DAILY_RESET_TIMEZONE)
+    return now.strftime("%Y-%m-%d")
+
+
+def seconds_until_next_reset(now=None):
+    """Returns the number of seconds until the next daily rollover boundary."""
+    now = now or datetime.now(DAILY_RESET_TIMEZONE)
+    boundary = datetime.combine(now.date() + timedelta(days=1), datetime.min.time(), tzinfo=DAILY_RESET_TIMEZONE)
+    return max(0.0, (boundary - now).total_seconds())
+
+
+def usage_slot(now=None):
+    """Returns the slot number containing `now` (seconds since the epoch)."""
+    return int((time.time() if now is None else now) // USAGE_SLOT_SECONDS)
+
+
+def day_slots(day):
+    """Returns the [first, end) slot range covering the usage day `day` (YYYY-MM-DD)."""
+    start = datetime.strptime(day, "%Y-%m-%d").replace(tzinfo=DAILY_RESET_TIMEZONE)
+    end = datetime.combine(start.date() + timedelta(days=1), datetime.min.time(), tzinfo=DAILY_RESET_TIMEZONE)
+    return usage_slot(start.timestamp()), usage_slot(end.timestamp())
+
+
+def finished_days(last_day, now=None):
+    """Returns the usage days from `last_day` through yesterday, oldest first."""
+    today = (now or datetime.now(DAILY_RESET_TIMEZONE)).date()
+    day = min(date.fromisoformat(last_day), today - timedelta(days=1))
+    days = []
+    while day < today:
+        days.append(day.isoformat())
+        day += timedelta(days=1)
+    return days
+
+
+def archive_daily_usage(db_conn, days):
+    """Archives every user's totals for each of `days` into daily_usage_history, then prunes slots past retention.
+
+    Rows are replaced, so archiving a day again picks up slots another shard flushed after the first pass.
+    """
+    cursor = db_conn.cursor()
+    archived = 0
+    for day in days:
+        first, end = day_slots(day)
+        cursor.execute("""
+            INSERT OR REPLACE INTO daily_usage_history (user_id, day, wagered, usage_seconds)
+            SELECT user_id, ?, SUM(wagered), SUM(usage_seconds) FROM usage_slots
+            WHERE slot >= ? AND slot < ?
+            GROUP BY user_id
+        """, (day, first, end))
+        archived += cursor.rowcount
+    cursor.execute("DELETE FROM usage_slots WHERE slot < ?", (usage_slot() - USAGE_RETENTION_SECONDS // USAGE_SLOT_SECONDS,))
+    cursor.execute("INSERT OR REPLACE INTO bot_state (key, value) VALUES ('last_daily_rollover', ?)", (current_usage_day(),))
+    db_conn.commit()
+    return archived
+
+
+class UserUsage:
+    """One user's responsible-gaming counters over the trailing USAGE_WINDOW_SECONDS.
+
+    `slots` holds [slot, wagered, usage_seconds] entries oldest first and `wagered` / `usage_seconds`
+    are their running sums, so sliding the window only pops the entries that fell out of it.
+    """
+    __slots__ = ("slots", "wagered", "usage_seconds", "baseline", "last_activity", "last_time_warning", "warned_level", "pending")
+
+    def __init__(self, last_time_warning=0, baseline=0, warned_level=0):
+        self.slots = deque()
+        self.wagered = 0
+        self.usage_seconds = 0
+        # Balance (micro-DC) before the first wager of the current window; the wager warnings are percentages of it
+        self.baseline = baseline
+        self.last_activity = 0.0
+        self.last_time_warning = last_time_warning
+        # Highest wager warning level the window's total is still past and has been warned about
+        self.warned_level = warned_level
+        # [wagered, usage_seconds] added on this shard since the last flush, by slot number
+        self.pending = {}
+
+    def advance(self, slot):
+        """Drops the entries that fell out of the window ending at `slot`."""
+        first = slot - WINDOW_SLOTS + 1
+        slots = self.slots
+        while slots and slots[0][0] < first:
+            _, wagered, usage_seconds = slots.popleft()
+            self.wagered -= wagered
+            self.usage_seconds -= usage_seconds
+
+    def add(self, slot, wagered, usage_seconds):
+        """Adds to the entry for `slot`, or to the newest one if the clock stepped back."""
+        slots = self.slots
+        if not slots or slots[-1][0] < slot:
+            slots.append([slot, 0, 0])
+        entry = slots[-1]
+        entry[1] += wagered
+        entry[2] += usage_seconds
+        self.wagered += wagered
+        self.usage_seconds += usage_seconds
+        return entry
+
+    def reload(self, rows):
+        """Replaces the window with persisted (slot, wagered, usage_seconds) rows, oldest first."""
+        self.slots = deque([slot, wagered, usage_seconds] for slot, wagered, usage_seconds in rows)
+        self.wagered = sum(entry[1] for entry in self.slots)
+        self.usage_seconds = sum(entry[2] for entry in self.slots)
+
+
+class ResponsibleGamingTracker:
+    """Keeps per-user wager and session counters in memory and flushes them to the database periodically.
+
+    Thresholds are evaluated in O(1) amortized when a wager is recorded, over a window that slides
+    in 15-minute slots and includes other shards' wagers as of the last flush; warnings are handed to the bot's outbound queue so the bet path never waits
+    on Discord. The daily rollover task only archives the finished day into daily_usage_history.
+    """
+
+    def __init__(self, bot):
+        self.bot = bot
+        self.usage = {}
+        self.dirty = set()
+        self.loaded = False
+        self._rollover_task = None
+
+    def load(self, db_conn):
+        """Catches up on a missed rollover, then loads the window's persisted slots in one query."""
+        cursor = db_conn.cursor()
+        cursor.execute("SELECT value FROM bot_state WHERE key = 'last_daily_rollover'")
+        row = cursor.fetchone()
+        if row is None:
+            cursor.execute("INSERT INTO bot_state (key, value) VALUES ('last_daily_rollover', ?)", (current_usage_day(),))
+            db_conn.commit()
+        elif row[0] != current_usage_day():
+            days = finished_days(row[0])
+            archived = archive_daily_usage(db_conn, days)
+            print(f"[RG] Caught up missed daily rollover for {', '.join(days)} ({archived} rows archived)")
+
+        cursor.execute("""
+            SELECT user_id, slot, wagered, usage_seconds FROM usage_slots
+            WHERE slot > ? ORDER BY user_id, slot
+        """, (usage_slot() - WINDOW_SLOTS,))
+        for user_id, slot, wagered, usage_seconds in cursor.fetchall():
+            self._get(user_id).add(slot, wagered, usage_seconds)
+
+        cursor.execute("""
+            SELECT user_id, last_usage_warning_time, daily_wager_baseline, daily_warned_level FROM users
+            WHERE last_usage_warning_time IS NOT NULL OR daily_wager_baseline > 0 OR daily_warned_level > 0
+        """)
+        for user_id, last_warning, baseline, warned_level in cursor.fetchall():
+            usage = self.usage.get(user_id)
+            if usage is None:
+                continue
+            if last_warning:
+                try:
+                    usage.last_time_warning = calendar.timegm(time.strptime(last_warning, "%Y-%m-%d %H:%M:%S"))
+                except ValueError:
+                    pass
+            usage.baseline = baseline or 0
+            usage.warned_level = warned_level or 0
+        self.loaded = True
+        print(f"[RG] Loaded usage counters for {len(self.usage)} users")
+
+    def start(self):
+        """Starts the daily rollover scheduler."""
+        if self._rollover_task is None or self._rollover_task.done():
+            self._rollover_task = asyncio.create_task(self._run_daily_rollover())
+
+    def _get(self, user_id):
+        usage = self.usage.get(user_id)
+        if usage is None:
+            usage = UserUsage()
+            self.usage[user_id] = usage
+        return usage
+
+    def _window(self, user_id):
+        """Returns the user's counters slid to the current slot, or None if they have none."""
+        usage = self.usage.get(user_id)
+        if usage is not None:
+            usage.advance(usage_slot())
+        return usage
+
+    def _forget_idle(self):
+        """Drops users whose window is empty and who have nothing left to flush."""
+        slot = usage_slot()
+        for user_id, usage in list(self.usage.items()):
+            usage.advance(slot)
+            if not usage.slots and user_id not in self.dirty:
+                del self.usage[user_id]
+
+    def rollover(self, db_conn):
+        """Flushes pending counters and archives the finished day(s); the window itself never resets.
+
+        Every shard process archives after flushing its own counters, even when another one already
+        rolled the day over, so the last of them leaves complete totals in daily_usage_history.
+        """
+        cursor = db_conn.cursor()
+        cursor.execute("SELECT value FROM bot_state WHERE key = 'last_daily_rollover'")
+        row = cursor.fetchone()
+        days = finished_days(row[0] if row else current_usage_day())
+        self.flush(db_conn)
+        archived = archive_daily_usage(db_conn, days)
+        self._forget_idle()
+        print(f"[RG] Daily rollover for {', '.join(days)}: archived {archived} rows")
+        return archived
+
+    async def _run_daily_rollover(self):
+        while True:
+            await asyncio.sleep(seconds_until_next_reset() + 1)
+            try:
+                self.rollover(self.bot.db_conn)
+            except Exception as e:
+                print(f"[RG] Daily rollover failed: {e}")
+
+    def record_wager(self, user, amount, balance_before):
+        """Adds a wager to the user's window and queues a warning if a threshold was crossed."""
+        now = time.time()
+        slot = usage_slot(now)
+        usage = self._get(user.id)
+        usage.advance(slot)
+        if usage.wagered <= 0:
+            usage.baseline = dc_to_units(balance_before)
+        usage_seconds = int(min(now - usage.last_activity, SESSION_IDLE_SECONDS)) if usage.last_activity else 0
+        entry = usage.add(slot, dc_to_units(amount), usage_seconds)
+        pending = usage.pending.setdefault(entry[0], [0, 0])
+        pending[0] += dc_to_units(amount)
+        pending[1] += usage_seconds
+        usage.last_activity = now
+        self.dirty.add(user.id)
+
+        reason = None
+        if usage.baseline > 0:
+            percent = usage.wagered / usage.baseline * 100
+            reached = next((level for level in WAGER_WARNING_LEVELS if percent >= level), 0)
+            if reached > usage.warned_level:
+                reason = ("wager", f"wagered {reached}% of their balance ({units_to_dc(usage.wagered):.2f} DC) in the last 24 hours")
+            # Once old wagers slide out of the window a level can be crossed, and warned about, again
+            usage.warned_level = reached
+
+        if reason is None and usage.usage_seconds >= SESSION_WARNING_SECONDS and now - usage.last_time_warning >= SESSION_WARNING_SECONDS:
+            minutes = usage.usage_seconds // 60
+            if usage.last_time_warning:
+                reason = ("time", f"exceeded another 30 minutes of Dragon Casino Time ({minutes} minutes total)")
+            else:
+                reason = ("time", f"exceeded 30 minutes of Dragon Casino Time ({minutes} minutes)")
+            usage.last_time_warning = now
+
+        if reason:
+            self._send_warning(user, reason[0], reason[1])
+
+    def get_daily_wager_progress(self, user_id, initial_balance):
+        """Returns (current_wager, percent, wager_threshold) in DC over the last 24 hours."""
+        usage = self._window(user_id)
+        current_wager = units_to_dc(usage.wagered) if usage else 0.0
+        wager_threshold = units_to_dc(usage.baseline) if usage and usage.baseline > 0 else initial_balance
+        if wager_threshold <= 0:
+            return current_wager, 0, wager_threshold
+        percent = min(100, int((current_wager / wager_threshold) * 100))
+        return current_wager, percent, wager_threshold
+
+    def get_usage_seconds(self, user_id):
+        """Returns the Dragon Casino Time of the last 24 hours in seconds."""
+        usage = self._window(user_id)
+        if not usage:
+            return 0
+        return usage.usage_seconds
+
+    def flush(self, db_conn):
+        """Adds the wagers recorded since the last flush to the stored slots and persists warning state.
+
+        Slots are incremented rather than overwritten because other shard processes add to the same
+        user's slots; the flushed users' windows are then reloaded so their wagers count here too.
+        """
+        if not self.dirty:
+            return 0
+        slot_rows, state_rows = [], []
+        for user_id in self.dirty:
+            usage = self.usage.get(user_id)
+            if usage:
+                slot_rows.extend((user_id, slot, wagered, usage_seconds) for slot, (wagered, usage_seconds) in usage.pending.items())
+                state_rows.append((usage.last_time_warning or None, usage.baseline, usage.warned_level, user_id))
+        cursor = db_conn.cursor()
+        try:
+            cursor.executemany("""
+                INSERT INTO usage_slots (user_id, slot, wagered, usage_seconds) VALUES (?, ?, ?, ?)
+                ON CONFLICT(user_id, slot) DO UPDATE SET
+                    wagered = wagered + excluded.wagered,
+                    usage_seconds = usage_seconds + excluded.usage_seconds
+            """, slot_rows)
+            cursor.executemany("""
+                UPDATE users SET
+                    last_usage_warning_time = datetime(?, 'unixepoch'),
+                    daily_wager_baseline = ?,
+                    daily_warned_level = ?
+                WHERE user_id = ?
+            """, state_rows)
+            db_conn.commit()
+        except Exception:
+            # Everything stays dirty, so the next flush adds the same deltas once
+            db_conn.rollback()
+            raise
+        first = usage_slot() - WINDOW_SLOTS
+        for user_id in self.dirty:
+            usage = self.usage.get(user_id)
+            if usage:
+                usage.pending.clear()
+                cursor.execute("SELECT slot, wagered, usage_seconds FROM usage_slots WHERE user_id = ? AND slot > ? ORDER BY slot", (user_id, first))
+                usage.reload(cursor.fetchall())
+        self.dirty.clear()
+        return len(state_rows)
+
+    def _send_warning(self, user, kind, reason):
+        """Queues the warning DM and adds the alert to the admin digest."""
+        dm_embed = discord.Embed(
+            title="⚠️ Addiction Warning - Dragon Casino",
+            description="We care about your wellbeing! Take a break from gambling.",
+            color=discord.Color.red()
+        )
+        dm_embed.add_field(name="⏰ Action Needed", value="Please stop gambling and come back tomorrow.", inline=False)
+        if kind == "wager":
+            dm_embed.add_field(name="📊 Why?", value=f"You have {reason}. That's enough for today!", inline=False)
+        else:
+            dm_embed.add_field(name="⏱️ Why?", value=f"You have {reason}. Time to take a break!", inline=False)
+        dm_embed.add_field(name="💡 Resources", value="If gambling is affecting you, please seek help.", inline=False)
+
+        self.bot.user_cache.remember(user)
+        self.bot.outbound.dm(user.id, embed=dm_embed)
+
+        alert_type = "Wager threshold" if kind == "wager" else "Usage time threshold"
+        self.bot.outbound.alert(ADMIN_CHANNEL_ID, "🚨 Addiction Warning Alerts",
+                                f"<t:{int(time.time())}:T> {user.name} (ID: {user.id}), {alert_type}: {reason}")
@@ -0,0 +1,113 @@
+"""Per-round game history behind .history.
+
+Every settled round is one row in `rounds`, written by Escrow.settle in the same transaction that
+pays it out. The round id is the escrow reservation id. The table is WITHOUT ROWID with primary key
+(user_id, round_id), so a player's rounds are stored together and each .history page is one
+range read starting where the previous page stopped, however many rounds the table holds.
+
+Besides stake and payout, a row keeps what a player needs to re-check the round: the seed epoch
+(see seeds.py), client seed and nonce, and the outcome packed into one integer.
+"""
+import discord
+from blackjack import calculate_hand_value
+from money import units_to_dc
+
+DC_VALUE_USD = 1.00
+PAGE_SIZE = 10
+GAME_CODES = {"coinflip": 0, "roulette": 1, "blackjack": 2, "mines": 3}
+GAME_NAMES = {code: game for game, code in GAME_CODES.items()}
+GAME_LABELS = {"coinflip": "🪙 Coinflip", "roulette": "🔴 Roulette", "blackjack": "🃏 Blackjack", "mines": "💣 Mines"}
+# Roulette bet types by code: numbers 0-36 are their own code. New types go at the end, so stored codes keep their meaning
+ROULETTE_BETS = [str(number) for number in range(37)] + ["red", "black", "odd", "even", "low", "high",
+                                                         "col1", "col2", "col3", "doz1", "doz2", "doz3"]
+
+
+# Packed outcomes. Bit layouts:
+#   coinflip:  side (1 bit: 0 heads, 1 tails) | roll 0-9999 << 1
+#   roulette:  number 0-36 (6 bits) | bet type code << 6
+#   blackjack: player total (5 bits) | dealer total << 5 | player cards (4 bits) << 10 | dealer cards << 14
+#   mines:     mines (5 bits) | safe clicks << 5 | hit a mine (1 bit) << 10 | mine positions (25-bit mask) << 11
+def pack_coinflip(roll, side):
+    return (side == "tails") | roll << 1
+
+
+def pack_roulette(number, bet_type):
+    # .rl accepts numbers with leading zeros ("07"); they are stored as the number
+    if bet_type.isdigit():
+        bet_type = str(int(bet_type))
+    return number | ROULETTE_BETS.index(bet_type) << 6
+
+
+def pack_blackjack(game):
+    return (calculate_hand_value(game.player_hand) | calculate_hand_value(game.dealer_hand) << 5
+            | len(game.player_hand) << 10 | len(game.dealer_hand) << 14)
+
+
+def pack_mines(game_state, hit_mine):
+    mine_mask = sum(1 << position for position in game_state["mine_positions"])
+    return game_state["mines_count"] | game_state["safe_clicks"] << 5 | hit_mine << 10 | mine_mask << 11
+
+
+def blackjack_round(game):
+    """Escrow.settle round_info for a Blackjack game."""
+    return game.seed_epoch, game.client_seed, game.nonce, pack_blackjack(game)
+
+
+def mines_round(game_state, hit_mine):
+    """Escrow.settle round_info for a Mines game."""
+    return game_state["seed_epoch"], game_state["client_seed"], game_state["nonce"], pack_mines(game_state, hit_mine)
+
+
+def describe_outcome(game, outcome):
+    if game == "coinflip":
+        side = "tails" if outcome & 1 else "heads"
+        roll = outcome >> 1
+        return f"Picked {side}, landed {'heads' if roll < 5000 else 'tails'} (roll {roll})"
+    if game == "roulette":
+        return f"Bet {ROULETTE_BETS[outcome >> 6]}, landed {outcome & 63}"
+    if game == "blackjack":
+        return f"Player {outcome & 31} ({outcome >> 10 & 15} cards) vs dealer {outcome >> 5 & 31} ({outcome >> 14 & 15} cards)"
+    mines = [str(position + 1) for position in range(25) if outcome >> 11 >> position & 1]
+    ending = "hit a mine" if outcome >> 10 & 1 else "safe"
+    return f"{outcome & 31} mines, {outcome >> 5 & 31} safe clicks, {ending} (mines at {', '.join(mines)})"
+
+
+def record_round(cursor, round_id, user_id, game, stake, payout, settled_at, seed_epoch, client_seed, nonce, outcome):
+    """Stores one settled round inside the caller's transaction; stake and payout in micro-DC."""
+    cursor.execute(
+        "INSERT INTO rounds (user_id, round_id, game, stake, payout, settled_at, seed_epoch, client_seed, nonce, outcome) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+        (user_id, round_id, GAME_CODES[game], stake, payout, settled_at, seed_epoch, client_seed, nonce, outcome)
+    )
+
+
+def fetch_history(db_conn, user_id, cursor=None):
+    """Returns (rows, next_cursor) for one page of a player's rounds, newest first.
+
+    `cursor` is the round id the previous page ended on; next_cursor is None on the last page.
+    """
+    where = "user_id = ?" if cursor is None else "user_id = ? AND round_id < ?"
+    params = (user_id,) if cursor is None else (user_id, cursor)
+    rows = db_conn.execute(f"""
+        SELECT round_id, game, stake, payout, settled_at, seed_epoch, client_seed, nonce, outcome
+        FROM rounds WHERE {where}
+        ORDER BY round_id DESC LIMIT ?
+    """, params + (PAGE_SIZE + 1,)).fetchall()
+    if len(rows) > PAGE_SIZE:
+        rows = rows[:PAGE_SIZE]
+        return rows, rows[-1][0]
+    return rows, None
+
+
+def history_embed(user, rows, page):
+    embed = discord.Embed(title=f"📜 Game History - {user.display_name}", color=discord.Color.gold(),
+                          description="Newest first. Check a round with `.seed <epoch>` and its client seed and nonce.")
+    for round_id, game_code, stake_units, payout_units, settled_at, seed_epoch, client_seed, nonce, outcome in rows:
+        game = GAME_NAMES[game_code]
+        stake, payout = units_to_dc(stake_units), units_to_dc(payout_units)
+        net = payout - stake
+        value = (f"**Bet:** {stake:.2f} DC • **Payout:** {payout:.2f} DC • **Net:** {net:+.2f} DC [${net * DC_VALUE_USD:+.2f}]\n"
+                 f"{describe_outcome(game, outcome)}\n"
+                 f"Epoch `{seed_epoch}` • Client Seed `{client_seed}` • Nonce `{nonce}` • <t:{settled_at}:R>")
+        embed.add_field(name=f"{GAME_LABELS[game]} #{round_id}", value=value, inline=False)
+    embed.set_footer(text=f"Page {page + 1}")
+    return embed
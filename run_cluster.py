@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+Dragon Casino Bot - Sharded launcher
+Starts the ledger service and one bot process per group of shards, all on this machine.
+
+Environment:
+  SHARD_COUNT      total number of gateway shards (required by Discord to match across processes)
+  SHARD_PROCESSES  number of bot processes to spread the shards over (default: CPU count)
+  LEDGER_SOCKET    Unix socket path of the ledger service
+  METRICS_PORT     Prometheus port of the first bot process; each further process uses the next port
+"""
+import os
+import signal
+import sqlite3
+import subprocess
+import sys
+import time
+from ledger_service import DEFAULT_SOCKET_PATH
+from migrations import migrate
+
+
+def shard_groups(shard_count, processes):
+    """Splits shard ids 0..shard_count-1 round-robin over `processes` groups."""
+    groups = [[] for _ in range(min(processes, shard_count))]
+    for shard_id in range(shard_count):
+        groups[shard_id % len(groups)].append(shard_id)
+    return groups
+
+
+def main():
+    shard_count = int(os.getenv("SHARD_COUNT", "1"))
+    processes = int(os.getenv("SHARD_PROCESSES", str(os.cpu_count() or 1)))
+    socket_path = os.getenv("LEDGER_SOCKET", DEFAULT_SOCKET_PATH)
+    here = os.path.dirname(os.path.abspath(__file__))
+
+    # Schema migrations run once here, before any process uses the database; background ones run in the ledger service
+    db_conn = sqlite3.connect(os.getenv("DB_FILE", "dragon_casino.db"))
+    db_conn.execute("PRAGMA journal_mode=WAL")
+    migrate(db_conn)
+    db_conn.close()
+
+    env = dict(os.environ, LEDGER_SOCKET=socket_path, SHARD_COUNT=str(shard_count))
+    children = [subprocess.Popen([sys.executable, "-u", os.path.join(here, "ledger_service.py")], env=env)]
+    while not os.path.exists(socket_path):
+        if children[0].poll() is not None:
+            sys.exit("[CLUSTER] Ledger service failed to start")
+        time.sleep(0.1)
+
+    metrics_port = int(os.getenv("METRICS_PORT", "9108"))
+    for index, shard_ids in enumerate(shard_groups(shard_count, processes)):
+        shard_env = dict(env, SHARD_IDS=",".join(str(shard_id) for shard_id in shard_ids), METRICS_PORT=str(metrics_port + index))
+        children.append(subprocess.Popen([sys.executable, "-u", os.path.join(here, "run_bot.py")], env=shard_env))
+        print(f"[CLUSTER] Started shards {shard_ids} (pid {children[-1].pid})")
+
+    def shutdown(*_):
+        # Stop the shards first so nothing is mid-request when the ledger goes away
+        for child in reversed(children):
+            child.terminate()
+            child.wait()
+        sys.exit(0)
+
+    signal.signal(signal.SIGTERM, shutdown)
+    signal.signal(signal.SIGINT, shutdown)
+    while True:
+        for child in children:
+            if child.poll() is not None:
+                print(f"[CLUSTER] Process {child.pid} exited with {child.returncode}, stopping cluster")
+                shutdown()
+        time.sleep(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+"""Pre-committed server seeds.
+
+Server seeds come from hash chains. A chain of CHAIN_LENGTH seeds is generated in one backward pass
+from a random root, seed[i] = sha256(seed[i + 1]), and only its terminal hash sha256(seed[0]) is
+published before the chain is used. Epoch k of the chain plays with seed[k], which is revealed once
+the epoch ends. Because sha256(seed[k]) == seed[k - 1], each revealed seed is checked with one hash
+against the seed revealed before it (the terminal hash for the first epoch), and no seed can be
+changed after the terminal hash is out.
+"""
+import datetime
+import hashlib
+import secrets
+import time
+
+SEED_EPOCH_SECONDS = 1800
+# Epoch boundaries as times of day, for tasks.loop(time=...); 1800 divides a day, so they are exact
+SEED_EPOCH_TIMES = [datetime.time(hour=minute // 60, minute=minute % 60, tzinfo=datetime.timezone.utc) for minute in range(0, 24 * 60, SEED_EPOCH_SECONDS // 60)]
+CHAIN_LENGTH = 1440             # 30 days of epochs per chain
+# The next chain is generated, and its terminal hash posted, when fewer epochs than this are left
+CHAIN_REFILL_EPOCHS = 48
+
+
+def current_epoch(now=None):
+    return int((time.time() if now is None else now) // SEED_EPOCH_SECONDS)
+
+
+def epoch_start(epoch):
+    return epoch * SEED_EPOCH_SECONDS
+
+
+def hash_seed(seed):
+    return hashlib.sha256(seed.encode()).hexdigest()
+
+
+def generate_chain(length=CHAIN_LENGTH):
+    """Returns (seeds in play order, terminal hash) for a new chain."""
+    seeds = [None] * length
+    seed = secrets.token_hex(32)
+    for i in range(length - 1, -1, -1):
+        seeds[i] = seed
+        seed = hash_seed(seed)
+    return seeds, seed
+
+
+def ensure_chain(db_conn, epoch):
+    """Generates the next chain if seeds run out within CHAIN_REFILL_EPOCHS of `epoch`.
+
+    Returns (chain_id, first_epoch, terminal_hash) of a new chain, or None. The check runs under
+    the write lock, so shard processes starting together generate one chain between them.
+    """
+    db_conn.execute("BEGIN IMMEDIATE")
+    try:
+        last = db_conn.execute("SELECT MAX(epoch) FROM server_seeds").fetchone()[0]
+        if last is not None and last >= epoch + CHAIN_REFILL_EPOCHS:
+            db_conn.rollback()
+            return None
+        # After downtime past the end of the last chain, the new one starts now
+        first_epoch = epoch if last is None or last < epoch else last + 1
+        seeds, terminal_hash = generate_chain()
+        chain_id = db_conn.execute(
+            "INSERT INTO seed_chains (first_epoch, length, terminal_hash, created_at) VALUES (?, ?, ?, ?)",
+            (first_epoch, len(seeds), terminal_hash, int(time.time()))
+        ).lastrowid
+        db_conn.executemany("INSERT INTO server_seeds (epoch, chain_id, seed) VALUES (?, ?, ?)",
+                            ((first_epoch + i, chain_id, seed) for i, seed in enumerate(seeds)))
+        db_conn.commit()
+    except Exception:
+        db_conn.rollback()
+        raise
+    print(f"[SEEDS] Generated chain {chain_id} for epochs {first_epoch}-{first_epoch + len(seeds) - 1}, terminal hash {terminal_hash}")
+    return chain_id, first_epoch, terminal_hash
+
+
+def seed_for_epoch(db_conn, epoch):
+    """The server seed of an epoch, or None if no chain covers it; one primary-key lookup."""
+    row = db_conn.execute("SELECT seed FROM server_seeds WHERE epoch = ?", (epoch,)).fetchone()
+    return row[0] if row else None
+
+
+def lookup(db_conn, epoch):
+    """Returns (chain_id, seed, revealed, first_epoch, terminal_hash) for an epoch, or None."""
+    return db_conn.execute("""
+        SELECT s.chain_id, s.seed, s.revealed, c.first_epoch, c.terminal_hash
+        FROM server_seeds s JOIN seed_chains c ON c.chain_id = s.chain_id
+        WHERE s.epoch = ?
+    """, (epoch,)).fetchone()
+
+
+def commitment(db_conn, epoch):
+    """Returns (value, rounds, anchor_epoch): a public value that commits to the seed of `epoch`, or None.
+
+    SHA-256 applied `rounds` times to the seed gives `value`, which is the newest seed of the same
+    chain revealed before `epoch` (anchor_epoch), or the chain's terminal hash (anchor_epoch None).
+    The plain hash of the seed is the previous epoch's seed, so it must not be shown while that
+    seed is still held back by reveal_ended.
+    """
+    row = db_conn.execute("""
+        SELECT c.first_epoch, c.terminal_hash
+        FROM server_seeds s JOIN seed_chains c ON c.chain_id = s.chain_id
+        WHERE s.epoch = ?
+    """, (epoch,)).fetchone()
+    if row is None:
+        return None
+    first_epoch, terminal_hash = row
+    anchor = db_conn.execute(
+        "SELECT epoch, seed FROM server_seeds WHERE epoch >= ? AND epoch < ? AND revealed = 1 ORDER BY epoch DESC LIMIT 1",
+        (first_epoch, epoch)
+    ).fetchone()
+    if anchor is None:
+        return terminal_hash, epoch - first_epoch + 1, None
+    return anchor[1], epoch - anchor[0], anchor[0]
+
+
+def describe_commitment(value, rounds, anchor_epoch):
+    """One line telling a player how to check a seed against its commitment."""
+    source = "the chain's terminal hash" if anchor_epoch is None else f"the seed revealed for epoch {anchor_epoch}"
+    times = "" if rounds == 1 else f" applied {rounds} times"
+    return f"SHA-256{times} of the seed equals this hash, which is {source}."
+
+
+def reveal_ended(db_conn, epoch):
+    """Marks the seeds of every epoch before `epoch` revealed, up to the oldest epoch a game in progress was dealt from.
+
+    A Blackjack hand or Mines board is drawn when its stake is reserved, so its seed must stay secret
+    until the round is settled or refunded. Any later seed would give it away through the hash chain,
+    so reveals stop at the oldest such epoch and catch up at a later epoch boundary. Rounds not yet
+    journaled count from the epoch their stake was reserved in.
+
+    Returns the newly revealed (epoch, seed) rows, newest first. Only the process whose UPDATE
+    revealed them gets rows back, so exactly one shard posts each reveal.
+    """
+    rows = db_conn.execute(f"""
+        UPDATE server_seeds SET revealed = 1
+        WHERE revealed = 0 AND epoch < ? AND epoch < COALESCE((
+            SELECT MIN(COALESCE(j.seed_epoch, e.created_at / {SEED_EPOCH_SECONDS}))
+            FROM escrow_reservations e LEFT JOIN game_journal j ON j.reservation_id = e.reservation_id
+            WHERE e.status = 'open' AND e.game IN ('blackjack', 'mines')
+        ), ?)
+        RETURNING epoch, seed
+    """, (epoch, epoch)).fetchall()
+    db_conn.commit()
+    return sorted(rows, reverse=True)
@@ -13,9 +13,11 @@ if [ -f "$PID_FILE" ]; then
     fi
 fi
 
-# Kill any stray processes
+# Stop any stray processes, giving them a chance to shut down cleanly first.
+# In-flight games are journaled, so they resume after the restart either way.
+killall python 2>/dev/null || true
+sleep 5
 killall -9 python 2>/dev/null || true
-sleep 1
 
 # Start the bot and store its PID
 python main.py &
@@ -0,0 +1,47 @@
+"""Every escrowed round takes its own provably fair nonce when its stake is reserved."""
+import os
+import sqlite3
+import sys
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from ledger import Ledger
+from migrations import migrate
+
+
+def ledger_with_player():
+    conn = sqlite3.connect(":memory:")
+    with mock.patch("builtins.print"):
+        migrate(conn)
+    ledger = Ledger(conn)
+    ledger.update_user_balance(1, 100.0, "player")
+    return ledger
+
+
+def stored_nonce(ledger):
+    return ledger.db_conn.execute("SELECT nonce FROM users WHERE user_id = 1").fetchone()[0]
+
+
+class ReservedNonceTest(unittest.TestCase):
+    def test_open_rounds_never_share_a_nonce(self):
+        ledger = ledger_with_player()
+        start = stored_nonce(ledger)
+        # A Blackjack game still open while two instant rounds are drawn and settled
+        reservations = [ledger.escrow.reserve(1, "player", game, 1.0, 60) for game in ("blackjack", "coinflip", "roulette")]
+        self.assertEqual([nonce for _, _, nonce in reservations], [start, start + 1, start + 2])
+        for reservation_id, _, nonce in reservations[1:]:
+            self.assertTrue(ledger.escrow.settle(reservation_id, 0.0, "player", (0, "seed", nonce, 0)))
+        self.assertTrue(ledger.escrow.settle(reservations[0][0], 2.0, "player"))
+        # Settling does not advance the nonce a second time
+        self.assertEqual(stored_nonce(ledger), start + 3)
+
+    def test_rejected_stake_takes_no_nonce(self):
+        ledger = ledger_with_player()
+        start = stored_nonce(ledger)
+        self.assertEqual(ledger.escrow.reserve(1, "player", "coinflip", 1000.0, 60), (None, None, None))
+        self.assertEqual(stored_nonce(ledger), start)
+
+
+if __name__ == "__main__":
+    unittest.main()
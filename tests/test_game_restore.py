@@ -0,0 +1,43 @@
+"""Shard processes restore only the journaled games whose events they receive."""
+import os
+import sys
+import types
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from main import DragonCasinoBot
+
+SHARD_COUNT = 4
+
+
+def guild_on_shard(shard_id):
+    return (1_000_000 + shard_id) << 22
+
+
+def shard_process(shard_ids, cached_channels=()):
+    return types.SimpleNamespace(shard_ids=shard_ids, shard_count=SHARD_COUNT,
+                                 get_channel=lambda channel_id: object() if channel_id in cached_channels else None)
+
+
+class RunsShardOfTest(unittest.TestCase):
+    def test_each_guild_has_exactly_one_owner(self):
+        processes = [shard_process([0, 1]), shard_process([2, 3])]
+        for shard_id in range(SHARD_COUNT):
+            owners = [process for process in processes if DragonCasinoBot.runs_shard_of(process, guild_on_shard(shard_id), 1)]
+            self.assertEqual(len(owners), 1)
+            self.assertIn(shard_id, owners[0].shard_ids)
+
+    def test_direct_messages_belong_to_shard_zero(self):
+        self.assertTrue(DragonCasinoBot.runs_shard_of(shard_process([0, 1]), 0, 1))
+        self.assertFalse(DragonCasinoBot.runs_shard_of(shard_process([2, 3]), 0, 1))
+
+    def test_unrecorded_guild_falls_back_to_the_channel_cache(self):
+        self.assertTrue(DragonCasinoBot.runs_shard_of(shard_process([0], cached_channels={5}), None, 5))
+        self.assertFalse(DragonCasinoBot.runs_shard_of(shard_process([1]), None, 5))
+
+    def test_single_process_owns_everything(self):
+        self.assertTrue(DragonCasinoBot.runs_shard_of(shard_process(None), guild_on_shard(3), 1))
+
+
+if __name__ == "__main__":
+    unittest.main()
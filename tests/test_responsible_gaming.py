@@ -0,0 +1,167 @@
+"""The responsible-gaming tracker: a trailing 24-hour window, and flushes that survive a failed write."""
+import os
+import sqlite3
+import sys
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+import responsible_gaming
+from migrations import migrate
+from money import dc_to_units
+from responsible_gaming import USAGE_SLOT_SECONDS, USAGE_WINDOW_SECONDS, ResponsibleGamingTracker
+
+# 23:45 UTC, so an hour later is the next calendar day
+START = 1_700_000_000 // 86400 * 86400 + 86400 - USAGE_SLOT_SECONDS
+
+
+class FakeOutbound:
+    def __init__(self):
+        self.dms = []
+
+    def dm(self, user_id, embed):
+        self.dms.append(embed)
+
+    def alert(self, channel_id, title, line):
+        pass
+
+
+class FakeBot:
+    def __init__(self, db_conn):
+        self.db_conn = db_conn
+        self.outbound = FakeOutbound()
+        self.user_cache = mock.Mock()
+
+
+class FakeUser:
+    id = 1
+    name = "player"
+
+
+class OtherUser:
+    id = 2
+    name = "other"
+
+
+def database():
+    conn = sqlite3.connect(":memory:")
+    with mock.patch("builtins.print"):
+        migrate(conn)
+    conn.execute("INSERT INTO users (user_id, username, dragon_coins) VALUES (1, 'player', ?)", (dc_to_units(100),))
+    conn.commit()
+    return conn
+
+
+class SlidingWindowTest(unittest.TestCase):
+    def setUp(self):
+        self.now = START
+        patcher = mock.patch.object(responsible_gaming.time, "time", lambda: self.now)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.conn = database()
+        self.bot = FakeBot(self.conn)
+        self.tracker = ResponsibleGamingTracker(self.bot)
+
+    def wager_warnings(self):
+        return [embed for embed in self.bot.outbound.dms if "wagered" in embed.fields[1].value]
+
+    def test_window_spans_midnight(self):
+        self.tracker.record_wager(FakeUser, 60, 100)
+        self.now += 2 * USAGE_SLOT_SECONDS
+        # A calendar-day counter would have reset here and let this through silently
+        self.tracker.record_wager(FakeUser, 60, 40)
+        self.assertEqual(len(self.wager_warnings()), 2)
+        self.assertEqual(self.tracker.get_daily_wager_progress(1, 100)[0], 120)
+
+    def test_wagers_slide_out_after_a_day(self):
+        self.tracker.record_wager(FakeUser, 60, 100)
+        self.now += USAGE_WINDOW_SECONDS
+        self.assertEqual(self.tracker.get_daily_wager_progress(1, 100)[0], 0)
+        self.tracker.record_wager(FakeUser, 60, 40)
+        # The window restarted from the new balance, so 60 DC is past both levels again
+        self.assertEqual(self.tracker.get_daily_wager_progress(1, 40), (60, 100, 40))
+        self.assertEqual(len(self.wager_warnings()), 2)
+
+    def test_window_survives_restart(self):
+        self.tracker.record_wager(FakeUser, 30, 100)
+        self.now += USAGE_SLOT_SECONDS
+        self.tracker.record_wager(FakeUser, 30, 70)
+        self.tracker.flush(self.conn)
+        restarted = ResponsibleGamingTracker(self.bot)
+        with mock.patch("builtins.print"):
+            restarted.load(self.conn)
+        self.assertEqual(restarted.get_daily_wager_progress(1, 100), (60, 60, 100))
+        self.assertEqual(restarted.usage[1].warned_level, 50)
+
+    def test_failed_flush_keeps_counters_dirty(self):
+        self.tracker.record_wager(FakeUser, 30, 100)
+        failing = mock.Mock(wraps=self.conn)
+        failing.commit.side_effect = sqlite3.OperationalError("database is locked")
+        with self.assertRaises(sqlite3.OperationalError):
+            self.tracker.flush(failing)
+        self.assertIn(1, self.tracker.dirty)
+        self.tracker.flush(self.conn)
+        self.assertEqual(self.conn.execute("SELECT SUM(wagered) FROM usage_slots WHERE user_id = 1").fetchone()[0], dc_to_units(30))
+        self.assertFalse(self.tracker.dirty)
+
+
+class DailyArchiveTest(unittest.TestCase):
+    def setUp(self):
+        self.now = START
+        patchers = [
+            mock.patch.object(responsible_gaming.time, "time", lambda: self.now),
+            mock.patch.object(responsible_gaming, "datetime", wraps=responsible_gaming.datetime),
+            mock.patch("builtins.print"),
+        ]
+        patchers[1].start().now.side_effect = lambda tz: responsible_gaming.datetime.fromtimestamp(self.now, tz)
+        for patcher in patchers[::2]:
+            patcher.start()
+        for patcher in patchers:
+            self.addCleanup(patcher.stop)
+        self.conn = database()
+        self.shards = [ResponsibleGamingTracker(FakeBot(self.conn)) for _ in range(2)]
+        for shard in self.shards:
+            shard.load(self.conn)
+
+    def history(self):
+        return self.conn.execute("SELECT day, SUM(wagered) FROM daily_usage_history GROUP BY day ORDER BY day").fetchall()
+
+    def test_late_shard_completes_the_archive(self):
+        self.shards[0].record_wager(FakeUser, 10, 100)
+        self.shards[1].record_wager(OtherUser, 10, 100)
+        self.now += USAGE_SLOT_SECONDS + 1
+        self.shards[0].rollover(self.conn)
+        self.shards[1].record_wager(OtherUser, 10, 90)
+        self.assertEqual(self.history(), [("2023-11-14", dc_to_units(10))])
+        # The second shard's minute flush and its own rollover run after the first shard archived
+        self.shards[1].flush(self.conn)
+        self.shards[1].rollover(self.conn)
+        self.assertEqual(self.history(), [("2023-11-14", dc_to_units(20))])
+        # Today's wager stays in the window and out of yesterday's row
+        self.assertEqual(self.shards[1].get_daily_wager_progress(2, 100)[0], 20)
+
+    def test_shards_add_to_the_same_slot(self):
+        for shard in self.shards:
+            shard.record_wager(FakeUser, 10, 100)
+        for shard in self.shards:
+            shard.flush(self.conn)
+        self.assertEqual(self.conn.execute("SELECT SUM(wagered) FROM usage_slots WHERE user_id = 1").fetchone()[0], dc_to_units(20))
+        # Each shard's window now holds the other's wager too
+        self.assertEqual(self.shards[1].get_daily_wager_progress(1, 100)[0], 20)
+        # The first shard flushed before the second wrote, so it picks that wager up on its next flush
+        self.shards[0].record_wager(FakeUser, 10, 80)
+        self.shards[0].flush(self.conn)
+        self.assertEqual(self.shards[0].get_daily_wager_progress(1, 100)[0], 30)
+
+    def test_catch_up_archives_every_missed_day(self):
+        self.shards[0].record_wager(FakeUser, 10, 100)
+        self.now += USAGE_SLOT_SECONDS + 1
+        self.shards[0].record_wager(FakeUser, 5, 90)
+        self.shards[0].flush(self.conn)
+        self.now += 2 * 86400
+        ResponsibleGamingTracker(FakeBot(self.conn)).load(self.conn)
+        self.assertEqual(self.history(), [("2023-11-14", dc_to_units(10)), ("2023-11-15", dc_to_units(5))])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,48 @@
+"""Every bet type .rl accepts can be packed into a round and read back; a failed spin keeps its stake refundable."""
+import os
+import sys
+import types
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from roulette import get_payout_multiplier
+from rounds import describe_outcome, pack_roulette
+from views import handle_roulette
+
+NAMED_BETS = ["red", "black", "odd", "even", "low", "high", "col1", "col2", "col3", "doz1", "doz2", "doz3"]
+NUMBER_BETS = [str(number) for number in range(37)] + ["00", "07", "036"]
+
+
+class RouletteRoundTest(unittest.TestCase):
+    def test_every_accepted_bet_round_trips(self):
+        for bet_type in NAMED_BETS + NUMBER_BETS:
+            self.assertGreater(get_payout_multiplier(bet_type), 0, bet_type)
+            canonical = str(int(bet_type)) if bet_type.isdigit() else bet_type
+            for number in (0, 17, 36):
+                with self.subTest(bet_type=bet_type, number=number):
+                    self.assertEqual(describe_outcome("roulette", pack_roulette(number, bet_type)), f"Bet {canonical}, landed {number}")
+
+
+class HandleRouletteTest(unittest.IsolatedAsyncioTestCase):
+    async def test_session_stays_open_until_settled(self):
+        bot = types.SimpleNamespace(
+            seed_epoch=1,
+            game_sessions=mock.Mock(),
+            escrow=types.SimpleNamespace(settle=mock.AsyncMock(side_effect=TimeoutError)),
+            get_game_seed_generator=lambda nonce: lambda user_id, low, high: (7, "client", nonce),
+        )
+        session = types.SimpleNamespace(game_id=5, user_id=1, bet=10.0, state=("red", 3))
+        with self.assertRaises(TimeoutError):
+            await handle_roulette(bot, mock.Mock(), session, "spin", None)
+        # Left to time out, so expire_roulette refunds the stake
+        bot.game_sessions.close.assert_not_called()
+
+        bot.escrow.settle = mock.AsyncMock(return_value=False)
+        interaction = mock.Mock(response=mock.AsyncMock())
+        await handle_roulette(bot, interaction, session, "spin", None)
+        bot.game_sessions.close.assert_called_once_with(5)
+
+
+if __name__ == "__main__":
+    unittest.main()
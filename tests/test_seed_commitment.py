@@ -0,0 +1,75 @@
+"""While a game holds back reveals, nothing shown for any epoch may give away a seed that is still secret."""
+import os
+import sqlite3
+import sys
+import types
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+import main
+from ledger import Ledger
+from migrations import migrate
+from seeds import commitment, current_epoch, ensure_chain, hash_seed, reveal_ended
+
+PAST_EPOCHS = 5
+# Epochs after the one a Blackjack hand was dealt from that keep going while it stays open
+LATER_EPOCHS = 3
+
+
+def displayed_text(embed):
+    return [embed.description or ""] + [f"{field.name} {field.value}" for field in embed.fields]
+
+
+class SeedCommitmentTest(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.conn = sqlite3.connect(":memory:")
+        with mock.patch("builtins.print"):
+            migrate(self.conn)
+            self.dealt_epoch = current_epoch()
+            ensure_chain(self.conn, self.dealt_epoch - PAST_EPOCHS)
+        ledger = Ledger(self.conn)
+        ledger.update_user_balance(1, 100.0, "player")
+        # A Blackjack hand dealt now and still open when later epochs begin
+        ledger.escrow.reserve(1, "player", "blackjack", 10.0, 180)
+        self.epoch = self.dealt_epoch + LATER_EPOCHS
+        reveal_ended(self.conn, self.epoch)
+
+    def secret_seeds(self):
+        return {seed for (seed,) in self.conn.execute("SELECT seed FROM server_seeds WHERE revealed = 0")}
+
+    def test_reveals_stop_at_the_open_hand(self):
+        revealed = self.conn.execute("SELECT MAX(epoch) FROM server_seeds WHERE revealed = 1").fetchone()[0]
+        self.assertEqual(revealed, self.dealt_epoch - 1)
+
+    def test_commitment_is_public_and_binds_the_seed(self):
+        secret = self.secret_seeds()
+        for epoch in range(self.dealt_epoch - PAST_EPOCHS, self.epoch + 1):
+            value, rounds, anchor_epoch = commitment(self.conn, epoch)
+            self.assertNotIn(value, secret)
+            seed = self.conn.execute("SELECT seed FROM server_seeds WHERE epoch = ?", (epoch,)).fetchone()[0]
+            for _ in range(rounds):
+                seed = hash_seed(seed)
+            self.assertEqual(seed, value)
+        # The plain hash of the current seed would have been the still-secret seed before it
+        current_seed = self.conn.execute("SELECT seed FROM server_seeds WHERE epoch = ?", (self.epoch,)).fetchone()[0]
+        self.assertIn(hash_seed(current_seed), secret)
+
+    async def test_seed_command_shows_no_secret_seed(self):
+        secret = self.secret_seeds()
+        ctx = types.SimpleNamespace(channel=types.SimpleNamespace(id=1), author=types.SimpleNamespace(guild_permissions=types.SimpleNamespace(administrator=False)),
+                                    send=mock.AsyncMock())
+        with mock.patch.object(main.bot, "db_conn", self.conn), mock.patch.object(main.bot, "seed_epoch", self.epoch):
+            for epoch in range(self.dealt_epoch - PAST_EPOCHS, self.epoch + 2):
+                await main.seed_command.callback(ctx, epoch)
+        shown = 0
+        for call in ctx.send.call_args_list:
+            embed = call.kwargs.get("embed")
+            for text in displayed_text(embed) if embed else call.args:
+                shown += 1
+                self.assertFalse([seed for seed in secret if seed in text], text)
+        self.assertGreater(shown, 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
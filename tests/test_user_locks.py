@@ -0,0 +1,82 @@
+"""Concurrent bets on one user: under UserLocks no balance update may be lost or overdraw."""
+import asyncio
+import os
+import sqlite3
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from user_locks import UserLocks
+
+STARTING_BALANCE = 1000
+STAKE = 7
+BETS = 400
+
+
+def balance_table():
+    conn = sqlite3.connect(":memory:")
+    conn.execute("CREATE TABLE users (user_id INTEGER PRIMARY KEY, dragon_coins INTEGER NOT NULL)")
+    conn.executemany("INSERT INTO users VALUES (?, ?)", [(1, STARTING_BALANCE), (2, STARTING_BALANCE)])
+    conn.commit()
+    return conn
+
+
+def read_balance(conn, user_id):
+    return conn.execute("SELECT dragon_coins FROM users WHERE user_id = ?", (user_id,)).fetchone()[0]
+
+
+async def bet(conn, locks, user_id, accepted):
+    """A command's path: check the balance, await Discord, then write the new balance back."""
+    async with locks.hold(user_id):
+        balance = read_balance(conn, user_id)
+        await asyncio.sleep(0)
+        if balance < STAKE:
+            return
+        conn.execute("UPDATE users SET dragon_coins = ? WHERE user_id = ?", (balance - STAKE, user_id))
+        conn.commit()
+        accepted[user_id] += 1
+
+
+async def unlocked_bet(conn, user_id, accepted):
+    balance = read_balance(conn, user_id)
+    await asyncio.sleep(0)
+    if balance >= STAKE:
+        conn.execute("UPDATE users SET dragon_coins = ? WHERE user_id = ?", (balance - STAKE, user_id))
+        conn.commit()
+        accepted[user_id] += 1
+
+
+class UserLocksTest(unittest.IsolatedAsyncioTestCase):
+    async def test_concurrent_bets_lose_no_updates(self):
+        conn = balance_table()
+        locks = UserLocks()
+        accepted = {1: 0, 2: 0}
+        await asyncio.gather(*(bet(conn, locks, 1 + i % 2, accepted) for i in range(BETS)))
+        for user_id in (1, 2):
+            # Every accepted bet is debited exactly once, and bets stop only when the balance runs out
+            self.assertEqual(read_balance(conn, user_id), STARTING_BALANCE - accepted[user_id] * STAKE)
+            self.assertEqual(accepted[user_id], STARTING_BALANCE // STAKE)
+            self.assertGreaterEqual(read_balance(conn, user_id), 0)
+        self.assertEqual(len(locks), 0)
+
+    async def test_without_the_lock_updates_are_lost(self):
+        # Shows the test above can fail: the same interleaving without the lock overwrites debits
+        conn = balance_table()
+        accepted = {1: 0, 2: 0}
+        await asyncio.gather(*(unlocked_bet(conn, 1, accepted) for _ in range(BETS)))
+        self.assertNotEqual(read_balance(conn, 1), STARTING_BALANCE - accepted[1] * STAKE)
+
+    async def test_other_users_are_not_blocked(self):
+        locks = UserLocks()
+        async with locks.hold(1):
+            self.assertTrue(locks.is_locked(1))
+            await asyncio.wait_for(self._hold_briefly(locks, 2), 1.0)
+        self.assertEqual(len(locks), 0)
+
+    async def _hold_briefly(self, locks, user_id):
+        async with locks.hold(user_id):
+            self.assertTrue(locks.is_locked(user_id))
+
+
+if __name__ == "__main__":
+    unittest.main()
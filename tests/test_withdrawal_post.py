@@ -0,0 +1,113 @@
+"""The admin withdrawal post: its buttons work without any in-memory view and are disabled once the request is done."""
+import os
+import sqlite3
+import sys
+import types
+import unittest
+from unittest import mock
+
+import discord
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from interaction_router import InteractionRouter, game_custom_id
+from ledger import AsyncLedger
+from metrics import Metrics
+from migrations import migrate
+from ratelimit import RateLimiter
+from views import GAME_HANDLERS, PERSISTENT_HANDLERS, disable_withdrawal_post, remember_withdrawal_post
+
+ADMIN_POST_ID = 555
+
+
+class FakeOutbound:
+    def __init__(self):
+        self.dms = []
+
+    def dm(self, user_id, embed):
+        self.dms.append(user_id)
+
+    def alert(self, channel_id, title, line):
+        pass
+
+
+class FakeMessage:
+    def __init__(self, message_id):
+        self.id = message_id
+        self.edits = []
+
+    async def edit(self, **fields):
+        self.edits.append(fields)
+
+
+class FakeInteraction:
+    type = discord.InteractionType.component
+    channel_id = 1
+
+    def __init__(self, custom_id, administrator=True):
+        self.data = {"custom_id": custom_id}
+        self.user = types.SimpleNamespace(id=9, guild_permissions=types.SimpleNamespace(administrator=administrator))
+        self.response = mock.AsyncMock()
+        self.followup = mock.AsyncMock()
+        self.edited_views = []
+
+    async def edit_original_response(self, view):
+        self.edited_views.append(view)
+
+
+def all_disabled(view):
+    return all(item.disabled for item in view.children)
+
+
+class WithdrawalPostTest(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        conn = sqlite3.connect(":memory:")
+        with mock.patch("builtins.print"):
+            migrate(conn)
+        self.post = FakeMessage(ADMIN_POST_ID)
+        channel = types.SimpleNamespace(get_partial_message=lambda message_id: self.post)
+        self.bot = types.SimpleNamespace(
+            db_conn=conn, ledger=AsyncLedger(conn), outbound=FakeOutbound(), rate_limiter=RateLimiter(),
+            metrics=Metrics(), game_sessions={}, get_partial_messageable=lambda channel_id: channel,
+        )
+        await self.bot.ledger.update_user_balance(7, 50.0, "player")
+        self.request_id = await self.bot.ledger.request_withdrawal(7, "player", 20.0, 0.1, "So1anaAddress")
+        await remember_withdrawal_post(self.bot, self.request_id, self.post)
+        # A freshly started bot: nothing about the post is held in memory
+        self.router = InteractionRouter(self.bot, GAME_HANDLERS, PERSISTENT_HANDLERS)
+
+    def status(self):
+        return self.bot.db_conn.execute("SELECT status FROM bot_transactions WHERE transaction_id = ?", (self.request_id,)).fetchone()[0]
+
+    async def test_confirm_after_restart_completes_and_disables(self):
+        click = FakeInteraction(game_custom_id("wd", "confirm", self.request_id))
+        await self.router.dispatch(click)
+        self.assertEqual(self.status(), "completed")
+        self.assertEqual(self.bot.outbound.dms, [7])
+        self.assertTrue(all_disabled(click.edited_views[-1]))
+
+        again = FakeInteraction(game_custom_id("wd", "confirm", self.request_id))
+        await self.router.dispatch(again)
+        self.assertEqual(self.bot.outbound.dms, [7])
+        self.assertIn("already completed", again.followup.send.call_args.args[0])
+
+    async def test_non_admins_cannot_confirm(self):
+        await self.router.dispatch(FakeInteraction(game_custom_id("wd", "confirm", self.request_id), administrator=False))
+        self.assertEqual(self.status(), "pending")
+
+    async def test_approve_command_disables_the_post(self):
+        # What .approve does after completing the request
+        self.assertTrue(await self.bot.ledger.complete_withdrawal(self.request_id))
+        await disable_withdrawal_post(self.bot, self.request_id)
+        self.assertTrue(all_disabled(self.post.edits[-1]["view"]))
+
+    async def test_post_sent_after_completion_is_disabled_at_once(self):
+        request_id = await self.bot.ledger.request_withdrawal(7, "player", 10.0, 0.05, "So1anaAddress")
+        await self.bot.ledger.complete_withdrawal(request_id)
+        late_post = FakeMessage(ADMIN_POST_ID)
+        self.post = late_post
+        await remember_withdrawal_post(self.bot, request_id, late_post)
+        self.assertTrue(all_disabled(late_post.edits[-1]["view"]))
+
+
+if __name__ == "__main__":
+    unittest.main()
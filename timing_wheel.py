@@ -0,0 +1,141 @@
+import asyncio
+import math
+
+
+class Timer:
+    """A pending expiry. Returned by TimingWheel.schedule and used to cancel or reschedule it."""
+    __slots__ = ("expires", "callback", "item", "bucket")
+
+    def __init__(self, expires, callback, item):
+        self.expires = expires
+        self.callback = callback
+        self.item = item
+        self.bucket = None
+
+    @property
+    def pending(self):
+        return self.bucket is not None
+
+
+class TimingWheel:
+    """Hierarchical timing wheel that owns the timeouts of every open game round and conversation.
+
+    Time advances in fixed ticks. Level 0 has one bucket per tick; each higher level covers `slots`
+    times the span of the one below and is cascaded down as the lower level wraps. Scheduling and
+    cancelling a timer are O(1) set operations, and a single driver task wakes once per tick. All
+    timers that fall due in a tick are grouped by callback, and each callback is awaited once with
+    the list of expired items.
+    """
+
+    def __init__(self, tick=1.0, slots=64, levels=3):
+        self.tick = tick
+        self.slots = slots
+        self.levels = levels
+        self._spans = [slots ** level for level in range(levels + 1)]
+        self._wheels = [[set() for _ in range(slots)] for _ in range(levels)]
+        self._now = 0
+        self._count = 0
+        self._origin = None
+        self._task = None
+
+    def schedule(self, delay, callback, item):
+        """Calls `await callback([item, ...])` once `delay` seconds have passed."""
+        timer = Timer(0, callback, item)
+        self._insert(timer, delay)
+        return timer
+
+    def cancel(self, timer):
+        """Cancels a pending timer. Cancelling an expired or cancelled timer does nothing."""
+        if timer.bucket is not None:
+            timer.bucket.discard(timer)
+            timer.bucket = None
+            self._count -= 1
+
+    def reschedule(self, timer, delay):
+        """Moves a timer to expire `delay` seconds from now, e.g. after player activity."""
+        self.cancel(timer)
+        self._insert(timer, delay)
+        return timer
+
+    def _insert(self, timer, delay):
+        timer.expires = self._now + max(1, math.ceil(delay / self.tick))
+        self._place(timer)
+        self._count += 1
+
+    def _place(self, timer):
+        delta = timer.expires - self._now
+        for level in range(self.levels):
+            if delta < self._spans[level + 1]:
+                break
+        else:
+            # Beyond the wheel's range: park it in the furthest top-level bucket and re-place it on cascade
+            level = self.levels - 1
+            delta = self._spans[self.levels] - 1
+        index = ((self._now + delta) // self._spans[level]) % self.slots
+        bucket = self._wheels[level][index]
+        bucket.add(timer)
+        timer.bucket = bucket
+
+    def advance(self):
+        """Moves the wheel forward one tick and returns the timers that expired."""
+        self._now += 1
+        now = self._now
+        due = []
+        for level in range(self.levels - 1, 0, -1):
+            span = self._spans[level]
+            if now % span:
+                continue
+            bucket = self._wheels[level][(now // span) % self.slots]
+            cascading = list(bucket)
+            bucket.clear()
+            for timer in cascading:
+                if timer.expires <= now:
+                    timer.bucket = None
+                    due.append(timer)
+                else:
+                    self._place(timer)
+        bucket = self._wheels[0][now % self.slots]
+        for timer in bucket:
+            timer.bucket = None
+            due.append(timer)
+        bucket.clear()
+        self._count -= len(due)
+        return due
+
+    async def fire(self, due):
+        """Runs the callbacks of expired timers, one call per callback with all of its items."""
+        batches = {}
+        for timer in due:
+            batches.setdefault(timer.callback, []).append(timer.item)
+        for callback, items in batches.items():
+            try:
+                await callback(items)
+            except Exception as e:
+                print(f"[TIMERS] Error in expiry callback {getattr(callback, '__qualname__', callback)}: {e}")
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    def is_running(self):
+        return self._task is not None and not self._task.done()
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        self._origin = loop.time() - self._now * self.tick
+        while True:
+            await asyncio.sleep(max(0.0, self._origin + (self._now + 1) * self.tick - loop.time()))
+            due = []
+            # Catch up on every tick that has passed, in case the loop was blocked
+            while self._origin + (self._now + 1) * self.tick <= loop.time():
+                due.extend(self.advance())
+            if due:
+                await self.fire(due)
+
+    def __len__(self):
+        return self._count
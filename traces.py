@@ -0,0 +1,76 @@
+import gzip
+import json
+import re
+import time
+from interaction_router import parse_custom_id
+
+TRACE_DIR = "traces"
+TRACE_VERSION = 1
+# Only player-facing commands are recorded; admin commands and deposit/withdraw replies never are
+RECORDED_COMMANDS = {"cf", "bj", "rl", "mines", "balance", "profile", "leaderboard", "help_casino"}
+MENTION_PATTERN = re.compile(r"<@!?(\d+)>")
+
+
+class TraceRecorder:
+    """Opt-in recorder of anonymized command and button events, written as gzipped JSONL.
+
+    The first line is a header; each following line is one event:
+      ["m", ms, user, channel_id, content]           a recorded command message
+      ["i", ms, user, channel_id, game, action, arg]  a game button click
+    `ms` counts from the start of the recording and `user` is a per-trace sequence number, so no
+    Discord user ids, names or game ids end up in the file. Mentions in commands are replaced the
+    same way. benchmarks/replay_trace.py plays a trace back against a local instance.
+    """
+
+    def __init__(self, path, prefix):
+        self.path = path
+        self.prefix = prefix
+        self.file = gzip.open(path, "wt", encoding="utf-8")
+        self.started = time.monotonic()
+        self.users = {}
+        self.events = 0
+        self._write({"version": TRACE_VERSION, "started": time.strftime("%Y-%m-%dT%H:%M:%S"), "prefix": prefix})
+
+    def _write(self, entry):
+        self.file.write(json.dumps(entry, separators=(",", ":")) + "\n")
+
+    def _user(self, user_id):
+        anon = self.users.get(user_id)
+        if anon is None:
+            anon = self.users[user_id] = len(self.users) + 1
+        return anon
+
+    def _elapsed_ms(self):
+        return int((time.monotonic() - self.started) * 1000)
+
+    def record_message(self, message):
+        content = message.content
+        if not content.startswith(self.prefix):
+            return
+        command = content[len(self.prefix):].split(" ", 1)[0].lower()
+        if command not in RECORDED_COMMANDS:
+            return
+        content = MENTION_PATTERN.sub(lambda match: f"<@{self._user(int(match.group(1)))}>", content)
+        self._write(["m", self._elapsed_ms(), self._user(message.author.id), message.channel.id, content])
+        self.events += 1
+
+    def record_interaction(self, interaction):
+        parsed = parse_custom_id((interaction.data or {}).get("custom_id", ""))
+        if parsed is None:
+            return
+        game, action, _, arg = parsed
+        self._write(["i", self._elapsed_ms(), self._user(interaction.user.id), interaction.channel_id, game, action, arg])
+        self.events += 1
+
+    def close(self):
+        self.file.close()
+        print(f"[TRACE] Recorded {self.events} events from {len(self.users)} users to {self.path}")
+
+
+def read_trace(path):
+    """Returns (header, events) from a trace file."""
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        header = json.loads(f.readline())
+        if header.get("version") != TRACE_VERSION:
+            raise ValueError(f"unsupported trace version {header.get('version')}")
+        return header, [json.loads(line) for line in f]
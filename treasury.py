@@ -0,0 +1,106 @@
+import json
+import time
+from money import units_to_dc
+
+# Running totals kept in treasury_totals; micro-DC unless prefixed sol_ (lamports), see money.py
+TOTAL_KEYS = (
+    "user_balances",            # sum of users.dragon_coins
+    "escrow_open",              # stakes held by in-flight games
+    "escrow_open_count",
+    "house_pnl",                # stakes minus payouts of settled games
+    "dc_deposited", "sol_deposited",
+    "dc_pending_deposits", "sol_pending_deposits",
+    "dc_withdrawn", "sol_withdrawn",
+    "dc_pending_withdrawals", "sol_pending_withdrawals",
+    "admin_adjustments",        # net .give/.remove and other direct balance changes
+)
+
+def apply_totals(cursor, **deltas):
+    """Adds to running totals inside the caller's transaction; the caller commits with the money movement."""
+    cursor.executemany("UPDATE treasury_totals SET value = value + ? WHERE key = ?", [(delta, key) for key, delta in deltas.items() if delta])
+
+
+def read_totals(db_conn):
+    """Returns every running total; one read of a 13-row table."""
+    return dict(db_conn.execute("SELECT key, value FROM treasury_totals").fetchall())
+
+
+def recompute_totals(db_conn):
+    """Full recompute of every total from the users, escrow and transaction tables."""
+    totals = dict.fromkeys(TOTAL_KEYS, 0)
+    totals["user_balances"] = db_conn.execute("SELECT COALESCE(SUM(dragon_coins), 0) FROM users").fetchone()[0]
+    for status, count, stake, pnl in db_conn.execute(
+        "SELECT status, COUNT(*), COALESCE(SUM(stake), 0), COALESCE(SUM(stake - payout), 0) FROM escrow_reservations WHERE status IN ('open', 'settled') GROUP BY status"
+    ):
+        if status == "open":
+            totals["escrow_open"] = stake
+            totals["escrow_open_count"] = count
+        else:
+            totals["house_pnl"] = pnl
+    for transaction_type, status, dc, sol in db_conn.execute(
+        "SELECT transaction_type, status, COALESCE(SUM(dc_amount), 0), COALESCE(SUM(sol_amount), 0) FROM bot_transactions GROUP BY transaction_type, status"
+    ):
+        if transaction_type == "deposit":
+            # tip.cc deposits are credited on arrival; requests wait in pending_verification until approved
+            prefix = "pending_deposits" if status == "pending_verification" else "deposited"
+        elif transaction_type == "withdrawal":
+            if status == "pending":
+                prefix = "pending_withdrawals"
+            elif status == "completed":
+                prefix = "withdrawn"
+            else:
+                continue
+        elif transaction_type == "adjustment":
+            totals["admin_adjustments"] += dc
+            continue
+        else:
+            continue
+        totals[f"dc_{prefix}"] += dc
+        totals[f"sol_{prefix}"] += sol
+    return totals
+
+
+def bootstrap_totals(db_conn):
+    """Seeds treasury_totals from a full recompute the first time it is used. Returns True if it did."""
+    db_conn.execute("BEGIN IMMEDIATE")
+    try:
+        if db_conn.execute("SELECT COUNT(*) FROM treasury_totals").fetchone()[0] >= len(TOTAL_KEYS):
+            db_conn.rollback()
+            return False
+        totals = recompute_totals(db_conn)
+        db_conn.executemany("INSERT OR IGNORE INTO treasury_totals (key, value) VALUES (?, ?)", totals.items())
+        db_conn.commit()
+    except Exception:
+        db_conn.rollback()
+        raise
+    print(f"[TREASURY] Seeded running totals: {units_to_dc(totals['user_balances']):.2f} DC in balances, {units_to_dc(totals['escrow_open']):.2f} DC in escrow")
+    return True
+
+
+def verify_totals(db_conn):
+    """Compares the running totals with a full recompute, both read in one snapshot.
+
+    Returns {key: (running, recomputed)} for every total that differs, and records the result in
+    bot_state so .botbalance can show when the totals were last confirmed. Totals are integers,
+    so any difference at all is drift.
+    """
+    db_conn.execute("BEGIN")
+    try:
+        running = read_totals(db_conn)
+        recomputed = recompute_totals(db_conn)
+    finally:
+        db_conn.rollback()
+    drift = {key: (running.get(key, 0), value) for key, value in recomputed.items() if running.get(key, 0) != value}
+    db_conn.execute("INSERT OR REPLACE INTO bot_state (key, value) VALUES ('treasury_verified', ?)",
+                    (json.dumps({"at": int(time.time()), "drift": sorted(drift)}),))
+    db_conn.commit()
+    return drift
+
+
+def last_verification(db_conn):
+    """Returns (unix time, drifted keys) of the last verification, or None."""
+    row = db_conn.execute("SELECT value FROM bot_state WHERE key = 'treasury_verified'").fetchone()
+    if row is None:
+        return None
+    result = json.loads(row[0])
+    return result["at"], result["drift"]
@@ -0,0 +1,74 @@
+import asyncio
+import time
+from collections import OrderedDict
+import discord
+
+# Resolved users are kept this long; names and avatars may be this stale in DMs and deposit posts
+USER_CACHE_TTL = 600
+USER_CACHE_SIZE = 10_000
+
+
+class UserCache:
+    """Resolves user ids to User objects with as few REST calls as possible.
+
+    Lookups try discord.py's gateway cache first, then a TTL cache of users resolved or seen
+    earlier, and only then GET /users/{id}. Concurrent lookups of the same missing id share one
+    in-flight request, so a burst of DMs or alerts for one user costs a single fetch.
+    """
+
+    def __init__(self, bot, ttl=USER_CACHE_TTL, max_size=USER_CACHE_SIZE):
+        self.bot = bot
+        self.ttl = ttl
+        self.max_size = max_size
+        self.users = OrderedDict()
+        self.in_flight = {}
+
+    def __len__(self):
+        return len(self.users)
+
+    def remember(self, user):
+        """Caches a User or Member the caller already has, e.g. ctx.author."""
+        self.users[user.id] = (time.monotonic() + self.ttl, user)
+        self.users.move_to_end(user.id)
+        if len(self.users) > self.max_size:
+            self.users.popitem(last=False)
+
+    def get(self, user_id):
+        """Returns the user from the gateway or TTL cache, or None without making a request."""
+        user = self.bot.get_user(user_id)
+        if user is not None:
+            self.bot.metrics.user_lookups.inc("gateway")
+            return user
+        entry = self.users.get(user_id)
+        if entry is None:
+            return None
+        if entry[0] < time.monotonic():
+            del self.users[user_id]
+            return None
+        self.users.move_to_end(user_id)
+        self.bot.metrics.user_lookups.inc("cache")
+        return entry[1]
+
+    async def resolve(self, user_id):
+        """Returns the user, fetching it on a cache miss; None if Discord has no such user."""
+        user = self.get(user_id)
+        if user is not None:
+            return user
+        fetch = self.in_flight.get(user_id)
+        if fetch is None:
+            fetch = self.in_flight[user_id] = asyncio.ensure_future(self._fetch(user_id))
+            self.bot.metrics.user_lookups.inc("rest")
+        else:
+            self.bot.metrics.user_lookups.inc("shared")
+        # Shielded so one caller being cancelled does not cancel the fetch the others are waiting on
+        return await asyncio.shield(fetch)
+
+    async def _fetch(self, user_id):
+        try:
+            user = await self.bot.fetch_user(user_id)
+        except discord.NotFound:
+            return None
+        finally:
+            self.in_flight.pop(user_id, None)
+        self.remember(user)
+        return user
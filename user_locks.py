@@ -0,0 +1,38 @@
+import asyncio
+from contextlib import asynccontextmanager
+
+
+class UserLocks:
+    """Serializes balance mutations per user while letting different users run in parallel.
+
+    A lock only exists while someone holds or waits on it, so the registry stays as small as the
+    number of users currently betting.
+    """
+
+    def __init__(self):
+        self._locks = {}
+        self._waiters = {}
+
+    @asynccontextmanager
+    async def hold(self, user_id):
+        """Async context manager that holds the given user's lock."""
+        lock = self._locks.get(user_id)
+        if lock is None:
+            lock = self._locks[user_id] = asyncio.Lock()
+            self._waiters[user_id] = 0
+        self._waiters[user_id] += 1
+        try:
+            async with lock:
+                yield
+        finally:
+            self._waiters[user_id] -= 1
+            if self._waiters[user_id] == 0:
+                del self._waiters[user_id]
+                del self._locks[user_id]
+
+    def is_locked(self, user_id):
+        lock = self._locks.get(user_id)
+        return lock is not None and lock.locked()
+
+    def __len__(self):
+        return len(self._locks)
@@ -1,10 +1,18 @@
 import discord
 from discord.ui import View, Button
 from mines import get_payout_multiplier as get_mines_multiplier, get_mines_embed, BOARD_SIZE, active_mines_games
+from game_journal import encode_tile
+from interaction_router import game_custom_id
+from money import units_to_dc, lamports_to_sol
+from admin_queues import fetch_page, queue_embed
+from rounds import fetch_history, history_embed, pack_coinflip, pack_roulette, blackjack_round, mines_round
 from blackjack import BlackjackGame, active_blackjack_games
 from roulette import spin_wheel, check_win, get_payout_multiplier as get_roulette_multiplier, get_roulette_embed
 
 DC_VALUE_USD = 1.00
+ADMIN_WITHDRAWALS_CHANNEL_ID = 1445049709214306434
+# Lifetime of deposit/withdraw button views; expired by the bot's timing wheel rather than a per-view timer
+CONVERSATION_VIEW_TIMEOUT = 300
 
 class DepositView(View):
     def __init__(self, user_id, dc_amount, sol_amount, usd_amount, wallet_address, callback, timeout=300):
@@ -68,377 +76,418 @@ class WithdrawView(View):
         await self.callback(self.user_id, self.dc_amount, self.sol_amount, self.usd_amount, self.solana_address, "cancel")
         self.stop()
 
-class ConfirmWithdrawalView(View):
-    """View for admin to confirm withdrawal completion after manually sending SOL."""
-    def __init__(self, bot, request_id, user_id, username, dc_amount, sol_amount, timeout=300):
-        super().__init__(timeout=timeout)
-        self.bot = bot
-        self.request_id = request_id
-        self.user_id = user_id
-        self.username = username
-        self.dc_amount = dc_amount
-        self.sol_amount = sol_amount
-
-    @discord.ui.button(label="✅ SOL Sent - Confirm", style=discord.ButtonStyle.success)
-    async def confirm_button(self, interaction: discord.Interaction, button: discord.ui.Button):
-        if not interaction.user.guild_permissions.administrator:
-            return await interaction.response.send_message("Only admins can use this button!", ephemeral=True)
-        
-        await interaction.response.defer()
-        
-        # Mark as completed
-        cursor = self.bot.db_conn.cursor()
-        cursor.execute("UPDATE bot_transactions SET status = ? WHERE transaction_id = ?", ("completed", self.request_id))
-        self.bot.db_conn.commit()
-        
-        # Send DM to user
-        try:
-            user = await self.bot.fetch_user(self.user_id)
-            dm_embed = discord.Embed(
-                title="✅ Withdrawal Completed!",
-                color=discord.Color.green()
-            )
-            dm_embed.add_field(name="Request ID", value=f"#{self.request_id}", inline=True)
-            dm_embed.add_field(name="📊 Amount Sent", value=f"**{self.sol_amount:.6f} SOL**", inline=True)
-            dm_embed.add_field(name="💎 DC Withdrawn", value=f"**{self.dc_amount:.2f} DC** [${self.dc_amount * DC_VALUE_USD:.2f}]", inline=False)
-            dm_embed.add_field(name="Status", value="Your withdrawal has been processed and SOL sent to your wallet!", inline=False)
-            await user.send(embed=dm_embed)
-        except Exception as e:
-            print(f"Could not send DM to user {self.user_id}: {e}")
-        
-        # Post to completed channel
-        COMPLETED_WITHDRAWALS_CHANNEL_ID = 1445050084965355614  # Completed withdrawals channel
-        completed_channel = self.bot.get_channel(COMPLETED_WITHDRAWALS_CHANNEL_ID)
-        if completed_channel:
-            completed_embed = discord.Embed(
-                title="✅ Withdrawal Completed",
-                color=discord.Color.green(),
-                timestamp=discord.utils.utcnow()
-            )
-            completed_embed.add_field(name="Request ID", value=f"#{self.request_id}", inline=True)
-            completed_embed.add_field(name="User", value=f"<@{self.user_id}> ({self.username})", inline=True)
-            completed_embed.add_field(name="📊 DC Withdrawn", value=f"**{self.dc_amount:.2f} DC** [${self.dc_amount * DC_VALUE_USD:.2f}]", inline=True)
-            completed_embed.add_field(name="🪙 SOL Sent", value=f"**{self.sol_amount:.6f} SOL**", inline=True)
-            await completed_channel.send(embed=completed_embed)
-        
-        await interaction.followup.send(f"✅ Withdrawal request #{self.request_id} marked as completed. User notified via DM.", ephemeral=True)
-        self.stop()
-
-    @discord.ui.button(label="❌ Cancel", style=discord.ButtonStyle.danger)
-    async def cancel_button(self, interaction: discord.Interaction, button: discord.ui.Button):
-        if not interaction.user.guild_permissions.administrator:
-            return await interaction.response.send_message("Only admins can use this button!", ephemeral=True)
-        
-        await interaction.response.defer()
-        await interaction.followup.send(f"❌ Cancelled. Withdrawal request #{self.request_id} remains pending.", ephemeral=True)
-        self.stop()
+class QueuePagerView(View):
+    """Prev/Next buttons for an admin queue (.pending_deposits, .withdrawals).
 
-class MinesCashoutView(View):
-    """Separate view for cashout button."""
-    def __init__(self, bot, user_id, game_state, bet_amount, timeout=180):
+    Keeps the keyset cursor each visited page started from, so Next continues the index scan
+    where the current page ended and Prev re-runs the previous page's scan.
+    """
+    def __init__(self, bot, author_id, queue, filters, next_cursor, timeout=300):
         super().__init__(timeout=timeout)
         self.bot = bot
-        self.user_id = user_id
-        self.game_state = game_state
-        self.bet_amount = bet_amount
-        
-        cashout_button = Button(label="💰 Cash Out", style=discord.ButtonStyle.success, custom_id="mines_cashout")
-        cashout_button.callback = self.cashout_callback
-        self.add_item(cashout_button)
-    
-    async def cashout_callback(self, interaction: discord.Interaction):
-        """Handles the cashout button click."""
-        if interaction.user.id != self.user_id:
-            return await interaction.response.send_message("This is not your game!", ephemeral=True)
-
-        if self.game_state["safe_clicks"] == 0:
-            return await interaction.response.send_message("You must click at least one tile before cashing out.", ephemeral=True)
-
-        multiplier = get_mines_multiplier(self.game_state["mines_count"], self.game_state["safe_clicks"])
-        win_amount = self.bet_amount * multiplier
-        net_change = win_amount
-        
-        for mine_pos in self.game_state["mine_positions"]:
-            if self.game_state["board_state"][mine_pos] == '❓':
-                self.game_state["board_state"][mine_pos] = '💥'
-        
-        self.bot.update_game_stats(self.user_id, self.bet_amount, net_change, interaction.user.name)
-        del active_mines_games[self.user_id]
-        self.stop()
-        
-        for item in self.children:
-            item.disabled = True
-            
-        embed = get_mines_embed(interaction.user, self.game_state, self.bet_amount, win_amount - self.bet_amount, final=True)
+        self.author_id = author_id
+        self.queue = queue
+        self.filters = filters
+        self.page_cursors = [None]
+        self.next_cursor = next_cursor
+        self._update_buttons()
+
+    def _update_buttons(self):
+        self.previous_button.disabled = len(self.page_cursors) == 1
+        self.next_button.disabled = self.next_cursor is None
+
+    async def _show(self, interaction):
+        rows, self.next_cursor = fetch_page(self.bot.db_conn, self.queue, self.filters, self.page_cursors[-1])
+        self._update_buttons()
+        embed = queue_embed(self.queue, self.filters, rows, len(self.page_cursors) - 1)
         await interaction.response.edit_message(embed=embed, view=self)
 
-class MinesView(View):
-    def __init__(self, bot, user_id, game_state, bet_amount, timeout=180):
-        super().__init__(timeout=timeout)
-        self.bot = bot
-        self.user_id = user_id
-        self.game_state = game_state
-        self.bet_amount = bet_amount
-        self.cashout_message = None
-        self.create_buttons()
-
-    def create_buttons(self):
-        """Creates the 5x5 grid of tile buttons only (25 items max)."""
-        self.clear_items()
-        
-        for i in range(BOARD_SIZE):
-            tile_number = i + 1
-            tile_symbol = self.game_state["board_state"][i]
-            
-            is_disabled = (tile_symbol != '❓')
-            
-            button = Button(
-                label=str(tile_number),
-                style=discord.ButtonStyle.secondary if not is_disabled else discord.ButtonStyle.grey,
-                custom_id=f"mines_tile_{tile_number}",
-                disabled=is_disabled,
-                row=i // 5
-            )
-            button.callback = self.tile_callback
-            self.add_item(button)
-
-    async def tile_callback(self, interaction: discord.Interaction):
-        """Handles a tile click."""
-        if interaction.user.id != self.user_id:
-            return await interaction.response.send_message("This is not your game!", ephemeral=True)
-
-        tile_number = int(interaction.data["custom_id"].split("_")[-1])
-        tile_index = tile_number - 1
-        
-        if self.game_state["board_state"][tile_index] != '❓':
-            return await interaction.response.send_message("This tile has already been clicked.", ephemeral=True)
-
-        if tile_index in self.game_state["mine_positions"]:
-            self.game_state["board_state"][tile_index] = '💥'
-            net_change = 0.0
-            
-            for mine_pos in self.game_state["mine_positions"]:
-                self.game_state["board_state"][mine_pos] = '💥'
-            
-            self.bot.update_game_stats(self.user_id, self.bet_amount, net_change, interaction.user.name)
-            del active_mines_games[self.user_id]
-            self.stop()
-            
-            self.create_buttons()
-            for item in self.children:
-                item.disabled = True
-            
-            embed = get_mines_embed(interaction.user, self.game_state, self.bet_amount, self.bet_amount * -1, final=True)
-            await interaction.response.edit_message(embed=embed, view=self)
-            
-            # Disable cashout button too
-            if self.cashout_message:
-                try:
-                    await self.cashout_message.edit(view=MinesCashoutView(self.bot, self.user_id, self.game_state, self.bet_amount))
-                    # Disable all items in the new view
-                    for view_item in await self.cashout_message.channel.fetch_message(self.cashout_message.id):
-                        view_item.disabled = True
-                except:
-                    pass
-            
-        else:
-            self.game_state["board_state"][tile_index] = '💎'
-            self.game_state["safe_clicks"] += 1
-            
-            self.create_buttons()
-            
-            embed = get_mines_embed(interaction.user, self.game_state, self.bet_amount)
-            await interaction.response.edit_message(embed=embed, view=self)
-
-    async def on_timeout(self):
-        """Handles game timeout."""
-        if self.user_id in active_mines_games:
-            del active_mines_games[self.user_id]
-            
-            self.create_buttons()
-            for item in self.children:
-                item.disabled = True
-                
-            channel = self.bot.get_channel(self.message.channel.id)
-            if channel:
-                await self.message.edit(content=f"**{self.message.author.mention}**, your Mines game timed out. Your bet of **{self.bet_amount:.2f} DC** [${self.bet_amount * DC_VALUE_USD:.2f}] has been lost.", view=self)
-
-class BlackjackView(View):
-    def __init__(self, bot, user_id, game: BlackjackGame, timeout=180):
+    async def interaction_check(self, interaction: discord.Interaction):
+        if interaction.user.id != self.author_id:
+            await interaction.response.send_message("Run the command yourself to page through the queue.", ephemeral=True)
+            return False
+        return True
+
+    @discord.ui.button(label="◀ Prev", style=discord.ButtonStyle.secondary)
+    async def previous_button(self, interaction: discord.Interaction, button: discord.ui.Button):
+        if len(self.page_cursors) > 1:
+            self.page_cursors.pop()
+        await self._show(interaction)
+
+    @discord.ui.button(label="Next ▶", style=discord.ButtonStyle.secondary)
+    async def next_button(self, interaction: discord.Interaction, button: discord.ui.Button):
+        if self.next_cursor is not None:
+            self.page_cursors.append(self.next_cursor)
+        await self._show(interaction)
+
+class HistoryPagerView(View):
+    """Prev/Next buttons for .history, keyset-paged on round id like QueuePagerView."""
+    def __init__(self, bot, author_id, user, next_cursor, timeout=300):
         super().__init__(timeout=timeout)
         self.bot = bot
-        self.user_id = user_id
-        self.game = game
-        
-        self.hit_button = Button(label="Hit", style=discord.ButtonStyle.success, custom_id="bj_hit")
-        self.stand_button = Button(label="Stand", style=discord.ButtonStyle.danger, custom_id="bj_stand")
-        
-        self.hit_button.callback = self.hit_callback
-        self.stand_button.callback = self.stand_callback
-        
-        self.add_item(self.hit_button)
-        self.add_item(self.stand_button)
-
-    def disable_buttons(self):
-        self.hit_button.disabled = True
-        self.stand_button.disabled = True
-
-    async def hit_callback(self, interaction: discord.Interaction):
-        if interaction.user.id != self.user_id:
-            return await interaction.response.send_message("This is not your game!", ephemeral=True)
-
-        status = self.game.hit()
-        
-        if status in ["BUST", "STAND"]:
-            self.disable_buttons()
-            self.stop()
-            
-            if status == "STAND":
-                self.game.stand()
-            
-            result = self.game.get_result()
-            self.bot.update_game_stats(self.user_id, self.game.bet, self.game.bet + result['net_change'], interaction.user.name)
-            del active_blackjack_games[self.user_id]
-            
-            embed = self.game.get_status_embed(interaction.user, hide_dealer=False)
-            await interaction.response.edit_message(embed=embed, view=self)
-        else:
-            embed = self.game.get_status_embed(interaction.user, hide_dealer=True)
-            await interaction.response.edit_message(embed=embed, view=self)
-
-    async def stand_callback(self, interaction: discord.Interaction):
-        if interaction.user.id != self.user_id:
-            return await interaction.response.send_message("This is not your game!", ephemeral=True)
-
-        self.disable_buttons()
-        self.stop()
-        
-        self.game.stand()
-        
-        result = self.game.get_result()
-        self.bot.update_game_stats(self.user_id, self.game.bet, self.game.bet + result['net_change'], interaction.user.name)
-        del active_blackjack_games[self.user_id]
-        
-        embed = self.game.get_status_embed(interaction.user, hide_dealer=False)
+        self.author_id = author_id
+        self.user = user
+        self.page_cursors = [None]
+        self.next_cursor = next_cursor
+        self._update_buttons()
+
+    def _update_buttons(self):
+        self.previous_button.disabled = len(self.page_cursors) == 1
+        self.next_button.disabled = self.next_cursor is None
+
+    async def _show(self, interaction):
+        rows, self.next_cursor = fetch_history(self.bot.db_conn, self.user.id, self.page_cursors[-1])
+        self._update_buttons()
+        embed = history_embed(self.user, rows, len(self.page_cursors) - 1)
         await interaction.response.edit_message(embed=embed, view=self)
 
-    async def on_timeout(self):
-        if self.user_id in active_blackjack_games:
-            del active_blackjack_games[self.user_id]
-            self.disable_buttons()
-            channel = self.bot.get_channel(self.message.channel.id)
-            if channel:
-                await self.message.edit(content=f"**{self.message.author.mention}**, your Blackjack game timed out. Your bet of **{self.game.bet:.2f} DC** has been lost.", view=self)
-
-class CoinflipView(View):
-    def __init__(self, bot, user_id, bet_amount, timeout=60):
-        super().__init__(timeout=timeout)
-        self.bot = bot
-        self.user_id = user_id
-        self.bet_amount = bet_amount
-        
-        self.heads_button = Button(label="Heads (H)", style=discord.ButtonStyle.primary, custom_id="cf_heads")
-        self.tails_button = Button(label="Tails (T)", style=discord.ButtonStyle.primary, custom_id="cf_tails")
-        
-        self.heads_button.callback = self.flip_callback
-        self.tails_button.callback = self.flip_callback
-        
-        self.add_item(self.heads_button)
-        self.add_item(self.tails_button)
+    async def interaction_check(self, interaction: discord.Interaction):
+        if interaction.user.id != self.author_id:
+            await interaction.response.send_message("Run `.history` yourself to page through your rounds.", ephemeral=True)
+            return False
+        return True
+
+    @discord.ui.button(label="◀ Prev", style=discord.ButtonStyle.secondary)
+    async def previous_button(self, interaction: discord.Interaction, button: discord.ui.Button):
+        if len(self.page_cursors) > 1:
+            self.page_cursors.pop()
+        await self._show(interaction)
+
+    @discord.ui.button(label="Next ▶", style=discord.ButtonStyle.secondary)
+    async def next_button(self, interaction: discord.Interaction, button: discord.ui.Button):
+        if self.next_cursor is not None:
+            self.page_cursors.append(self.next_cursor)
+        await self._show(interaction)
+
+# Game rounds are not backed by View objects. Their buttons carry the round id in the custom_id
+# and every click is dispatched by InteractionRouter to the handlers below, which work on the
+# round's GameSession. The View built for each message only serializes the components: it is
+# stopped before sending, so discord.py neither stores it nor runs a timer for it.
+COINFLIP_TIMEOUT = 60
+ROULETTE_TIMEOUT = 60
+BLACKJACK_TIMEOUT = 180
+MINES_TIMEOUT = 180
+
+def _components(*buttons):
+    """Wraps buttons in a stopped, timer-less View that is only used to serialize components."""
+    view = View(timeout=None)
+    for button in buttons:
+        view.add_item(button)
+    view.stop()
+    return view
+
+async def _edit_session_message(bot, session, message_id, **fields):
+    """Edits one of a round's messages by id, without needing the Message object."""
+    if message_id is None:
+        return
+    channel = bot.get_partial_messageable(session.channel_id)
+    try:
+        await channel.get_partial_message(message_id).edit(**fields)
+    except discord.HTTPException:
+        pass
+
+def withdrawal_components(request_id, disabled=False):
+    """Buttons of a withdrawal's admin post; routed by custom_id, so they survive restarts."""
+    return _components(
+        Button(label="✅ SOL Sent - Confirm", style=discord.ButtonStyle.success, custom_id=game_custom_id("wd", "confirm", request_id), disabled=disabled),
+        Button(label="❌ Cancel", style=discord.ButtonStyle.danger, custom_id=game_custom_id("wd", "cancel", request_id), disabled=disabled)
+    )
+
+async def remember_withdrawal_post(bot, request_id, message):
+    """Stores the admin post's message id; disables it at once if the request was completed before it went out."""
+    row = bot.db_conn.execute(
+        "UPDATE bot_transactions SET admin_message_id = ? WHERE transaction_id = ? RETURNING status", (message.id, request_id)
+    ).fetchone()
+    bot.db_conn.commit()
+    if row and row[0] != "pending":
+        await disable_withdrawal_post(bot, request_id)
+
+async def disable_withdrawal_post(bot, request_id):
+    """Disables the buttons of a withdrawal's admin post once the request is no longer pending."""
+    row = bot.db_conn.execute("SELECT admin_message_id FROM bot_transactions WHERE transaction_id = ?", (request_id,)).fetchone()
+    if not row or row[0] is None:
+        return
+    channel = bot.get_partial_messageable(ADMIN_WITHDRAWALS_CHANNEL_ID)
+    try:
+        await channel.get_partial_message(row[0]).edit(view=withdrawal_components(request_id, disabled=True))
+    except discord.HTTPException:
+        pass
+
+async def handle_withdrawal_post(bot, interaction: discord.Interaction, request_id, action, arg):
+    """Confirm/Cancel on a withdrawal's admin post, after an admin sent the SOL by hand."""
+    if not interaction.user.guild_permissions.administrator:
+        return await interaction.response.send_message("Only admins can use this button!", ephemeral=True)
+    if action == "cancel":
+        return await interaction.response.send_message(f"❌ Cancelled. Withdrawal request #{request_id} remains pending.", ephemeral=True)
+    if action != "confirm":
+        return
+
+    row = bot.db_conn.execute(
+        "SELECT user_id, recipient, dc_amount, sol_amount FROM bot_transactions WHERE transaction_id = ? AND transaction_type = 'withdrawal'", (request_id,)
+    ).fetchone()
+    if row is None:
+        return await interaction.response.send_message(f"❌ Withdrawal request #{request_id} not found.", ephemeral=True)
+    user_id, username, dc_units, lamports = row
+    dc_amount, sol_amount = units_to_dc(dc_units), lamports_to_sol(lamports)
+
+    await interaction.response.defer()
+    # Mark as completed; another admin may have used .approve or the button first. Either way it is no longer pending
+    completed = await bot.ledger.complete_withdrawal(request_id)
+    await interaction.edit_original_response(view=withdrawal_components(request_id, disabled=True))
+    if not completed:
+        return await interaction.followup.send(f"❌ Withdrawal request #{request_id} was already completed.", ephemeral=True)
+
+    # Send DM to user
+    dm_embed = discord.Embed(
+        title="✅ Withdrawal Completed!",
+        color=discord.Color.green()
+    )
+    dm_embed.add_field(name="Request ID", value=f"#{request_id}", inline=True)
+    dm_embed.add_field(name="📊 Amount Sent", value=f"**{sol_amount:.6f} SOL**", inline=True)
+    dm_embed.add_field(name="💎 DC Withdrawn", value=f"**{dc_amount:.2f} DC** [${dc_amount * DC_VALUE_USD:.2f}]", inline=False)
+    dm_embed.add_field(name="Status", value="Your withdrawal has been processed and SOL sent to your wallet!", inline=False)
+    bot.outbound.dm(user_id, embed=dm_embed)
+
+    # Post to completed channel in the next digest
+    COMPLETED_WITHDRAWALS_CHANNEL_ID = 1445050084965355614  # Completed withdrawals channel
+    bot.outbound.alert(COMPLETED_WITHDRAWALS_CHANNEL_ID, "✅ Withdrawals Completed",
+                       f"**#{request_id}** <@{user_id}> ({username}): **{dc_amount:.2f} DC** [${dc_amount * DC_VALUE_USD:.2f}], sent **{sol_amount:.6f} SOL**")
+
+    await interaction.followup.send(f"✅ Withdrawal request #{request_id} marked as completed. User notified via DM.", ephemeral=True)
+
+def coinflip_components(game_id, disabled=False):
+    return _components(
+        Button(label="Heads (H)", style=discord.ButtonStyle.primary, custom_id=game_custom_id("cf", "heads", game_id), disabled=disabled),
+        Button(label="Tails (T)", style=discord.ButtonStyle.primary, custom_id=game_custom_id("cf", "tails", game_id), disabled=disabled)
+    )
+
+def roulette_components(game_id, disabled=False):
+    return _components(
+        Button(label="Spin the Wheel 🐉", style=discord.ButtonStyle.primary, custom_id=game_custom_id("rl", "spin", game_id), disabled=disabled)
+    )
+
+def blackjack_components(game_id, disabled=False):
+    return _components(
+        Button(label="Hit", style=discord.ButtonStyle.success, custom_id=game_custom_id("bj", "hit", game_id), disabled=disabled),
+        Button(label="Stand", style=discord.ButtonStyle.danger, custom_id=game_custom_id("bj", "stand", game_id), disabled=disabled)
+    )
+
+def mines_board_components(game_id, game_state, disabled=False):
+    """Creates the 5x5 grid of tile buttons only (25 items max)."""
+    buttons = []
+    for i in range(BOARD_SIZE):
+        is_disabled = disabled or game_state["board_state"][i] != '❓'
+        buttons.append(Button(
+            label=str(i + 1),
+            style=discord.ButtonStyle.secondary if not is_disabled else discord.ButtonStyle.grey,
+            custom_id=game_custom_id("mines", "tile", game_id, i),
+            disabled=is_disabled,
+            row=i // 5
+        ))
+    return _components(*buttons)
+
+def mines_cashout_components(game_id, disabled=False):
+    """Separate message for the cashout button."""
+    return _components(
+        Button(label="💰 Cash Out", style=discord.ButtonStyle.success, custom_id=game_custom_id("mines", "cashout", game_id), disabled=disabled)
+    )
+
+async def handle_coinflip(bot, interaction: discord.Interaction, session, action, arg):
+    if action not in ("heads", "tails"):
+        return
+    user_side = action
+    bet_amount = session.bet
+    bot.game_sessions.close(session.game_id)
+
+    # The session holds the nonce the stake's reservation took
+    result_num, client_seed, nonce = bot.get_fair_result(session.user_id, 0, 9999, session.state)
+    
+    winning_side = "heads" if result_num < 5000 else "tails"
+    
+    win_amount = 0.0
+    
+    if user_side == winning_side:
+        win_amount = bet_amount * 1.9
+        net_change = win_amount
+        result_text = f"**🎉 WINNER!** The coin landed on **{winning_side.upper()}**."
+        color = discord.Color.green()
+    else:
+        net_change = 0.0
+        result_text = f"**💔 LOSER!** The coin landed on **{winning_side.upper()}**."
+        color = discord.Color.red()
+
+    round_info = (bot.seed_epoch, client_seed, nonce, pack_coinflip(result_num, user_side))
+    if not await bot.escrow.settle(session.game_id, net_change, interaction.user.name, round_info):
+        return await interaction.response.send_message("This bet has already been settled.", ephemeral=True)
+    
+    embed = discord.Embed(
+        title="🪙 Coinflip Result",
+        description=result_text,
+        color=color
+    )
+    embed.add_field(name="Bet", value=f"{bet_amount:.2f} DC on {user_side.upper()}", inline=True)
+    embed.add_field(name="Payout", value=f"{win_amount:.2f} DC", inline=True)
+    embed.add_field(name="Net Change", value=f"{win_amount - bet_amount:+.2f} DC", inline=True)
+    embed.add_field(name="Next Nonce", value=nonce + 1, inline=True)
+    embed.add_field(name="Result Hash", value=f"Result: {result_num}", inline=True)
+    
+    await interaction.response.edit_message(embed=embed, view=coinflip_components(session.game_id, disabled=True))
 
-    def disable_buttons(self):
-        self.heads_button.disabled = True
-        self.tails_button.disabled = True
+async def expire_coinflip(bot, session):
+    """The coin was never flipped, so the stake goes back to the player."""
+    await bot.escrow.refund(session.game_id)
+    await _edit_session_message(bot, session, session.message_id, content=f"**Coinflip bet of {session.bet:.2f} DC timed out and has been refunded.**", view=coinflip_components(session.game_id, disabled=True))
 
-    async def flip_callback(self, interaction: discord.Interaction):
-        if interaction.user.id != self.user_id:
-            return await interaction.response.send_message("This is not your game!", ephemeral=True)
+async def handle_roulette(bot, interaction: discord.Interaction, session, action, arg):
+    if action != "spin":
+        return
+    bet_amount = session.bet
+    bet_type, nonce = session.state
 
-        user_side = "heads" if interaction.data["custom_id"] == "cf_heads" else "tails"
-        
-        result_num, client_seed, nonce = self.bot.get_fair_result(self.user_id, 0, 9999)
-        
-        winning_side = "heads" if result_num < 5000 else "tails"
-        
+    payout_multiplier = get_roulette_multiplier(bet_type)
+    
+    spin_result = spin_wheel(bot.get_game_seed_generator(nonce), session.user_id)
+    
+    if check_win(spin_result, bet_type):
+        win_amount = bet_amount * payout_multiplier
+        net_change = win_amount
+    else:
         win_amount = 0.0
-        
-        if user_side == winning_side:
-            win_amount = self.bet_amount * 1.9
-            net_change = win_amount
-            result_text = f"**🎉 WINNER!** The coin landed on **{winning_side.upper()}**."
-            color = discord.Color.green()
-        else:
-            net_change = 0.0
-            result_text = f"**💔 LOSER!** The coin landed on **{winning_side.upper()}**."
-            color = discord.Color.red()
-
-        self.bot.update_game_stats(self.user_id, self.bet_amount, net_change, interaction.user.name)
-        
-        embed = discord.Embed(
-            title="🪙 Coinflip Result",
-            description=result_text,
-            color=color
-        )
-        embed.add_field(name="Bet", value=f"{self.bet_amount:.2f} DC on {user_side.upper()}", inline=True)
-        embed.add_field(name="Payout", value=f"{win_amount:.2f} DC", inline=True)
-        embed.add_field(name="Net Change", value=f"{win_amount - self.bet_amount:+.2f} DC", inline=True)
-        embed.add_field(name="Next Nonce", value=nonce + 1, inline=True)
-        embed.add_field(name="Result Hash", value=f"Result: {result_num}", inline=True)
-        
-        self.disable_buttons()
-        self.stop()
-        await interaction.response.edit_message(embed=embed, view=self)
-
-    async def on_timeout(self):
-        self.disable_buttons()
-        if hasattr(self, 'message') and self.message:
-            channel = self.bot.get_channel(self.message.channel.id)
-            if channel:
-                try:
-                    await self.message.edit(content=f"**Coinflip bet of {self.bet_amount:.2f} DC timed out and has been lost.**", view=self)
-                except:
-                    pass
-
-class RouletteView(View):
-    def __init__(self, bot, user_id, bet_amount, bet_type, timeout=60):
-        super().__init__(timeout=timeout)
-        self.bot = bot
-        self.user_id = user_id
-        self.bet_amount = bet_amount
-        self.bet_type = bet_type
-        
-        self.spin_button = Button(label="Spin the Wheel 🐉", style=discord.ButtonStyle.primary, custom_id="rl_spin")
-        self.spin_button.callback = self.spin_callback
-        self.add_item(self.spin_button)
-
-    def disable_buttons(self):
-        self.spin_button.disabled = True
-
-    async def spin_callback(self, interaction: discord.Interaction):
-        if interaction.user.id != self.user_id:
-            return await interaction.response.send_message("This is not your game!", ephemeral=True)
+        net_change = 0.0
+
+    round_info = (bot.seed_epoch, spin_result["client_seed"], spin_result["nonce"], pack_roulette(spin_result["number"], bet_type))
+    settled = await bot.escrow.settle(session.game_id, net_change, interaction.user.name, round_info)
+    # Closed only now: if anything above fails, the session times out and expire_roulette refunds the stake
+    bot.game_sessions.close(session.game_id)
+    if not settled:
+        return await interaction.response.send_message("This bet has already been settled.", ephemeral=True)
+    
+    embed = get_roulette_embed(interaction.user, spin_result, bet_amount, bet_type, win_amount - bet_amount)
+    await interaction.response.edit_message(embed=embed, view=roulette_components(session.game_id, disabled=True))
+
+async def expire_roulette(bot, session):
+    """The wheel was never spun, so the stake goes back to the player."""
+    await bot.escrow.refund(session.game_id)
+    await _edit_session_message(bot, session, session.message_id, content=f"**<@{session.user_id}>**, your Roulette bet of **{session.bet:.2f} DC** timed out and has been refunded.", view=roulette_components(session.game_id, disabled=True))
+
+async def _finish_blackjack(bot, session, username):
+    """Settles a finished Blackjack round and forgets it."""
+    bot.game_sessions.close(session.game_id)
+    active_blackjack_games.pop(session.user_id, None)
+    result = session.state.get_result()
+    await bot.escrow.settle(session.game_id, result['payout'], username, blackjack_round(session.state))
+    await bot.game_journal.close_game(session.game_id)
+
+async def handle_blackjack(bot, interaction: discord.Interaction, session, action, arg):
+    game: BlackjackGame = session.state
+
+    if action == "hit":
+        status = game.hit()
+        if status == "STAND":
+            game.stand()
+        if status in ["BUST", "STAND"]:
+            await _finish_blackjack(bot, session, interaction.user.name)
+            embed = game.get_status_embed(interaction.user, hide_dealer=False)
+            return await interaction.response.edit_message(embed=embed, view=blackjack_components(session.game_id, disabled=True))
+
+        bot.game_sessions.touch(session)
+        await bot.game_journal.record_move(session.game_id, "h", BLACKJACK_TIMEOUT)
+        embed = game.get_status_embed(interaction.user, hide_dealer=True)
+        await interaction.response.edit_message(embed=embed, view=blackjack_components(session.game_id))
+
+    elif action == "stand":
+        game.stand()
+        await _finish_blackjack(bot, session, interaction.user.name)
+        embed = game.get_status_embed(interaction.user, hide_dealer=False)
+        await interaction.response.edit_message(embed=embed, view=blackjack_components(session.game_id, disabled=True))
+
+async def expire_blackjack(bot, session):
+    active_blackjack_games.pop(session.user_id, None)
+    await bot.escrow.settle(session.game_id, 0.0, round_info=blackjack_round(session.state))
+    await bot.game_journal.close_game(session.game_id)
+    await _edit_session_message(bot, session, session.message_id, content=f"**<@{session.user_id}>**, your Blackjack game timed out. Your bet of **{session.bet:.2f} DC** has been lost.", view=blackjack_components(session.game_id, disabled=True))
+
+def _reveal_mines(game_state):
+    for mine_pos in game_state["mine_positions"]:
+        if game_state["board_state"][mine_pos] == '❓':
+            game_state["board_state"][mine_pos] = '💥'
+
+async def handle_mines(bot, interaction: discord.Interaction, session, action, arg):
+    game_state = session.state
+    bet_amount = session.bet
+
+    if action == "cashout":
+        if game_state["safe_clicks"] == 0:
+            return await interaction.response.send_message("You must click at least one tile before cashing out.", ephemeral=True)
 
-        payout_multiplier = get_roulette_multiplier(self.bet_type)
-        
-        spin_result = spin_wheel(self.bot.get_game_seed_generator(), self.user_id)
-        
-        if check_win(spin_result, self.bet_type):
-            win_amount = self.bet_amount * payout_multiplier
-            net_change = win_amount
-        else:
-            win_amount = 0.0
-            net_change = 0.0
-
-        self.bot.update_game_stats(self.user_id, self.bet_amount, net_change, interaction.user.name)
+        multiplier = get_mines_multiplier(game_state["mines_count"], game_state["safe_clicks"])
+        win_amount = bet_amount * multiplier
+        bot.game_sessions.close(session.game_id)
+        active_mines_games.pop(session.user_id, None)
         
-        embed = get_roulette_embed(interaction.user, spin_result, self.bet_amount, self.bet_type, win_amount - self.bet_amount)
+        if not await bot.escrow.settle(session.game_id, win_amount, interaction.user.name, mines_round(game_state, False)):
+            return await interaction.response.send_message("This game has already ended.", ephemeral=True)
+        await bot.game_journal.close_game(session.game_id)
         
-        self.disable_buttons()
-        self.stop()
-        await interaction.response.edit_message(embed=embed, view=self)
+        _reveal_mines(game_state)
+        embed = get_mines_embed(interaction.user, game_state, bet_amount, win_amount - bet_amount, final=True)
+        return await interaction.response.edit_message(embed=embed, view=mines_cashout_components(session.game_id, disabled=True))
 
-    async def on_timeout(self):
-        self.disable_buttons()
-        channel = self.bot.get_channel(self.message.channel.id)
-        if channel:
-            await self.message.edit(content=f"**{self.message.author.mention}**, your Roulette bet of **{self.bet_amount:.2f} DC** timed out and has been lost.", view=self)
+    if action != "tile" or arg is None or not arg.isdigit() or int(arg) >= BOARD_SIZE:
+        return
+    tile_index = int(arg)
+    
+    if game_state["board_state"][tile_index] != '❓':
+        return await interaction.response.send_message("This tile has already been clicked.", ephemeral=True)
+
+    if tile_index in game_state["mine_positions"]:
+        bot.game_sessions.close(session.game_id)
+        active_mines_games.pop(session.user_id, None)
+        if not await bot.escrow.settle(session.game_id, 0.0, interaction.user.name, mines_round(game_state, True)):
+            return await interaction.response.send_message("This game has already ended.", ephemeral=True)
+        await bot.game_journal.close_game(session.game_id)
+        
+        game_state["board_state"][tile_index] = '💥'
+        _reveal_mines(game_state)
+        
+        embed = get_mines_embed(interaction.user, game_state, bet_amount, bet_amount * -1, final=True)
+        await interaction.response.edit_message(embed=embed, view=mines_board_components(session.game_id, game_state, disabled=True))
+        
+        # Disable cashout button too
+        await _edit_session_message(bot, session, session.extra_message_id, view=mines_cashout_components(session.game_id, disabled=True))
+        
+    else:
+        game_state["board_state"][tile_index] = '💎'
+        game_state["safe_clicks"] += 1
+        bot.game_sessions.touch(session)
+        await bot.game_journal.record_move(session.game_id, encode_tile(tile_index), MINES_TIMEOUT)
+        
+        embed = get_mines_embed(interaction.user, game_state, bet_amount)
+        await interaction.response.edit_message(embed=embed, view=mines_board_components(session.game_id, game_state))
+
+async def expire_mines(bot, session):
+    """Handles game timeout. The stake is forfeited, but the round is recorded."""
+    active_mines_games.pop(session.user_id, None)
+    await bot.escrow.settle(session.game_id, 0.0, round_info=mines_round(session.state, False))
+    await bot.game_journal.close_game(session.game_id)
+    await _edit_session_message(bot, session, session.message_id, content=f"**<@{session.user_id}>**, your Mines game timed out. Your bet of **{session.bet:.2f} DC** [${session.bet * DC_VALUE_USD:.2f}] has been lost.", view=mines_board_components(session.game_id, session.state, disabled=True))
+    await _edit_session_message(bot, session, session.extra_message_id, view=mines_cashout_components(session.game_id, disabled=True))
+
+GAME_HANDLERS = {
+    "cf": handle_coinflip,
+    "rl": handle_roulette,
+    "bj": handle_blackjack,
+    "mines": handle_mines,
+}
+
+# Buttons without a game session; the handler gets the id from the custom_id instead
+PERSISTENT_HANDLERS = {
+    "wd": handle_withdrawal_post,
+}
+
+GAME_EXPIRY_HANDLERS = {
+    "cf": expire_coinflip,
+    "rl": expire_roulette,
+    "bj": expire_blackjack,
+    "mines": expire_mines,
+}